@@ -6,6 +6,7 @@ ARP 表采集 API 路由
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+import uuid
 from typing import List
 from datetime import datetime
 
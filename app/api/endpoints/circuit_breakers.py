@@ -0,0 +1,49 @@
+"""
+设备熔断器 API 端点
+"""
+from fastapi import APIRouter
+
+from app.services.circuit_breaker import get_circuit_breaker
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_circuit_breakers():
+    """
+    获取熔断器汇总统计及各设备熔断状态
+    """
+    breaker = get_circuit_breaker()
+    return {"stats": breaker.get_stats(), "devices": breaker.get_all_states()}
+
+
+@router.get("/{device_id}")
+async def get_circuit_breaker_state(device_id: int):
+    """
+    获取单台设备的熔断状态
+
+    - **device_id**: 设备 ID
+    """
+    return get_circuit_breaker().get_state(device_id)
+
+
+@router.post("/reset")
+async def reset_all_circuit_breakers():
+    """
+    手动重置全部设备的熔断状态
+    """
+    breaker = get_circuit_breaker()
+    breaker.reset()
+    return {"success": True, "stats": breaker.get_stats()}
+
+
+@router.post("/{device_id}/reset")
+async def reset_circuit_breaker(device_id: int):
+    """
+    手动重置单台设备的熔断状态（如修正密码或恢复网络后）
+
+    - **device_id**: 设备 ID
+    """
+    breaker = get_circuit_breaker()
+    breaker.reset(device_id)
+    return {"success": True, "state": breaker.get_state(device_id)}
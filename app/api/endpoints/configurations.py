@@ -3,7 +3,7 @@
 """
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Header, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import uuid
@@ -25,6 +25,10 @@ from app.services.git_service import get_git_service, GitService
 from app.services.backup_scheduler import get_backup_scheduler, BackupSchedulerService
 from app.services.backup_executor import backup_executor
 from app.services.config_collection_service import collect_device_config
+from app.services.config_diff import ConfigDiffService, format_unified_diff, get_config_diff_service
+from app.services.config_hash import compute_config_hash
+from app.services.config_storage import (get_config_content, load_config_contents,
+                                         release_keyframe, store_config_content)
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +44,13 @@ def get_configurations(
     device_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    include_content: bool = True,
     db: Session = Depends(get_db)
 ):
     """
     获取配置列表
+
+    include_content=false 时不还原配置全文（config_content 返回 null），适合只展示版本列表的场景
     """
     query = db.query(Configuration, Device.hostname.label('device_name')).join(
         Device, Configuration.device_id == Device.id
@@ -58,8 +65,15 @@ def get_configurations(
     if end_date:
         query = query.filter(Configuration.config_time <= end_date)
     
+    if not include_content:
+        # 不读取配置内容列
+        query = query.options(defer(Configuration.config_content), defer(Configuration.config_data))
+    
     results = query.order_by(Configuration.config_time.desc()).offset(skip).limit(limit).all()
     
+    # 批量还原配置全文（同一关键帧只解压一次）
+    contents = load_config_contents(db, [config for config, _ in results]) if include_content else {}
+    
     # 转换为配置模式列表
     configurations = []
     for config, device_name in results:
@@ -67,11 +81,12 @@ def get_configurations(
             'id': config.id,
             'device_id': config.device_id,
             'device_name': device_name,
-            'config_content': config.config_content,
+            'config_content': contents.get(config.id),
             'config_time': config.config_time,
             'version': config.version,
             'change_description': config.change_description,
             'git_commit_id': config.git_commit_id,
+            'config_hash': config.config_hash,
             'created_at': config.created_at
         }
         configurations.append(ConfigurationSchema(**config_dict))
@@ -90,7 +105,10 @@ def create_configuration(configuration: ConfigurationCreate, db: Session = Depen
             detail=f"Device with id {configuration.device_id} not found"
         )
     
-    db_configuration = Configuration(**configuration.model_dump())
+    config_content = configuration.config_content
+    db_configuration = Configuration(**configuration.model_dump(exclude={'config_content'}))
+    db_configuration.config_hash = compute_config_hash(config_content, device.vendor)
+    store_config_content(db, db_configuration, config_content)
     db.add(db_configuration)
     db.commit()
     db.refresh(db_configuration)
@@ -99,11 +117,12 @@ def create_configuration(configuration: ConfigurationCreate, db: Session = Depen
         'id': db_configuration.id,
         'device_id': db_configuration.device_id,
         'device_name': device.hostname,
-        'config_content': db_configuration.config_content,
+        'config_content': config_content,
         'config_time': db_configuration.config_time,
         'version': db_configuration.version,
         'change_description': db_configuration.change_description,
         'git_commit_id': db_configuration.git_commit_id,
+        'config_hash': db_configuration.config_hash,
         'created_at': db_configuration.created_at
     }
     return ConfigurationSchema(**config_dict)
@@ -121,6 +140,7 @@ def batch_delete_configurations(config_ids: List[int], db: Session = Depends(get
         try:
             configuration = db.query(Configuration).filter(Configuration.id == config_id).first()
             if configuration:
+                release_keyframe(db, configuration)
                 db.delete(configuration)
                 success_count += 1
             else:
@@ -806,11 +826,12 @@ def get_configuration(config_id: int, db: Session = Depends(get_db)):
         'id': config.id,
         'device_id': config.device_id,
         'device_name': device_name,
-        'config_content': config.config_content,
+        'config_content': get_config_content(db, config),
         'config_time': config.config_time,
         'version': config.version,
         'change_description': config.change_description,
         'git_commit_id': config.git_commit_id,
+        'config_hash': config.config_hash,
         'created_at': config.created_at
     }
     return ConfigurationSchema(**config_dict)
@@ -844,11 +865,12 @@ def get_latest_configuration(device_id: int, db: Session = Depends(get_db)):
         'id': config.id,
         'device_id': config.device_id,
         'device_name': device_name,
-        'config_content': config.config_content,
+        'config_content': get_config_content(db, config),
         'config_time': config.config_time,
         'version': config.version,
         'change_description': config.change_description,
         'git_commit_id': config.git_commit_id,
+        'config_hash': config.config_hash,
         'created_at': config.created_at
     }
     return ConfigurationSchema(**config_dict)
@@ -865,6 +887,7 @@ def delete_configuration(config_id: int, db: Session = Depends(get_db)):
             detail=f"Configuration with id {config_id} not found"
         )
     
+    release_keyframe(db, configuration)
     db.delete(configuration)
     db.commit()
     return None
@@ -888,10 +911,14 @@ async def collect_config_from_device(
 def get_config_diff(
     config_id1: int,
     config_id2: int,
-    db: Session = Depends(get_db)
+    context: int = Query(3, ge=0, le=100, description="上下文行数"),
+    section_aware: bool = Query(False, description="同时按段（interface / vlan 等）返回差异"),
+    ignore_volatile: bool = Query(False, description="忽略时间戳等每次采集都会变化的行"),
+    db: Session = Depends(get_db),
+    diff_service: ConfigDiffService = Depends(get_config_diff_service)
 ):
     """
-    获取两个配置版本之间的差异
+    获取两个配置版本之间的差异（结果按两个版本的配置哈希缓存）
     """
     # 获取两个配置
     config1 = db.query(Configuration).filter(Configuration.id == config_id1).first()
@@ -907,27 +934,29 @@ def get_config_diff(
     if config1.device_id != config2.device_id:
         return {"success": False, "message": "Configurations belong to different devices"}
     
-    # 生成diff
-    import difflib
-    
-    if not config1.config_content:
-        config1.config_content = ""
-    if not config2.config_content:
-        config2.config_content = ""
+    # 生成diff（缓存命中时不读取配置全文）
+    vendor = None
+    if ignore_volatile:
+        vendor = db.query(Device.vendor).filter(Device.id == config1.device_id).scalar()
+    result = diff_service.diff_configurations(
+        db, config1, config2,
+        vendor=vendor,
+        context=context,
+        section_aware=section_aware,
+        ignore_volatile=ignore_volatile
+    )
     
-    diff = difflib.unified_diff(
-        config1.config_content.splitlines(),
-        config2.config_content.splitlines(),
+    diff_content = format_unified_diff(
+        result["lines"],
         fromfile=f"Version {config1.version} ({config1.config_time.strftime('%Y-%m-%d %H:%M:%S')})",
-        tofile=f"Version {config2.version} ({config2.config_time.strftime('%Y-%m-%d %H:%M:%S')})",
-        lineterm=""
+        tofile=f"Version {config2.version} ({config2.config_time.strftime('%Y-%m-%d %H:%M:%S')})"
     )
     
-    diff_content = "\n".join(diff)
-    
-    return {
+    response = {
         "success": True,
         "diff": diff_content,
+        "added_lines": result["added"],
+        "removed_lines": result["removed"],
         "config1": {
             "id": config1.id,
             "version": config1.version,
@@ -939,6 +968,9 @@ def get_config_diff(
             "config_time": config2.config_time
         }
     }
+    if section_aware:
+        response["sections"] = result["sections"]
+    return response
 
 @router.post("/{config_id}/commit-git", response_model=Dict[str, Any])
 def commit_config_to_git(
@@ -973,7 +1005,7 @@ def commit_config_to_git(
         if git_service.init_repo(git_config):
             commit_id = git_service.commit_config(
                 device.hostname,
-                config.config_content,
+                get_config_content(db, config),
                 f"Manual commit for {device.hostname} at {datetime.now()}"
             )
             if commit_id:
@@ -2,7 +2,11 @@
 设备信息采集API路由
 提供基于Netmiko的设备信息采集功能
 """
+import json
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -278,6 +282,66 @@ async def collect_mac_table(
         )
 
 
+def _save_collection_detail(db: Session, detail: dict):
+    """
+    保存单台设备的批量采集结果（不提交事务）
+
+    Args:
+        db: 数据库会话
+        detail: 单设备采集明细
+    """
+    if not detail['success']:
+        return
+
+    device_id = detail['device_id']
+
+    # 保存版本信息
+    if 'version' in detail['data']:
+        version_info = detail['data']['version']
+        device_version = DeviceVersion(**version_info)
+        db.add(device_version)
+
+        # 更新设备表中的版本信息
+        device = db.query(Device).filter(Device.id == device_id).first()
+        if device and version_info.get('software_version'):
+            device.os_version = version_info['software_version']
+
+    # 保存序列号
+    if 'serial' in detail['data']:
+        serial = detail['data']['serial']
+        device = db.query(Device).filter(Device.id == device_id).first()
+        if device:
+            device.sn = serial
+
+    # 保存接口信息
+    if 'interfaces' in detail['data']:
+        interfaces = detail['data']['interfaces']
+        # 清空现有接口信息
+        db.query(Port).filter(Port.device_id == device_id).delete()
+        # 保存新的接口信息
+        for interface_info in interfaces:
+            port = Port(**interface_info)
+            db.add(port)
+
+    # 保存MAC地址表
+    if 'mac_table' in detail['data']:
+        mac_table = detail['data']['mac_table']
+        # 清空现有MAC地址表
+        db.query(MACAddressCurrent).filter(MACAddressCurrent.device_id == device_id).delete()
+        # 保存新的 MAC 地址表到 mac_current
+        for mac_entry in mac_table:
+            mac_address = MACAddressCurrent(
+                mac_address=mac_entry['mac_address'],
+                mac_device_id=device_id,
+                vlan_id=mac_entry.get('vlan_id'),
+                mac_interface=mac_entry['interface'],
+                is_trunk=mac_entry.get('is_trunk', False),
+                interface_description=mac_entry.get('description'),
+                last_seen=datetime.now()
+            )
+            db.add(mac_address)
+
+
 @router.post("/batch/collect", response_model=DeviceCollectionResult)
 async def batch_collect_device_info(
     collection_request: DeviceCollectionRequest,
@@ -314,55 +378,7 @@ async def batch_collect_device_info(
         
         # 处理采集结果并保存到数据库
         for detail in results['details']:
-            if detail['success']:
-                device_id = detail['device_id']
-                
-                # 保存版本信息
-                if 'version' in detail['data']:
-                    version_info = detail['data']['version']
-                    device_version = DeviceVersion(**version_info)
-                    db.add(device_version)
-                    
-                    # 更新设备表中的版本信息
-                    device = db.query(Device).filter(Device.id == device_id).first()
-                    if device and version_info.get('software_version'):
-                        device.os_version = version_info['software_version']
-                
-                # 保存序列号
-                if 'serial' in detail['data']:
-                    serial = detail['data']['serial']
-                    device = db.query(Device).filter(Device.id == device_id).first()
-                    if device:
-                        device.sn = serial
-                
-                # 保存接口信息
-                if 'interfaces' in detail['data']:
-                    interfaces = detail['data']['interfaces']
-                    # 清空现有接口信息
-                    db.query(Port).filter(Port.device_id == device_id).delete()
-                    # 保存新的接口信息
-                    for interface_info in interfaces:
-                        port = Port(**interface_info)
-                        db.add(port)
-                
-                # 保存MAC地址表
-                if 'mac_table' in detail['data']:
-                    mac_table = detail['data']['mac_table']
-                    # 清空现有MAC地址表
-                    db.query(MACAddressCurrent).filter(MACAddressCurrent.device_id == device_id).delete()
-                    # 保存新的 MAC 地址表到 mac_current
-                    from datetime import datetime
-                    for mac_entry in mac_table:
-                        mac_address = MACAddressCurrent(
-                            mac_address=mac_entry['mac_address'],
-                            mac_device_id=device_id,
-                            vlan_id=mac_entry.get('vlan_id'),
-                            mac_interface=mac_entry['interface'],
-                            is_trunk=mac_entry.get('is_trunk', False),
-                            interface_description=mac_entry.get('description'),
-                            last_seen=datetime.now()
-                        )
-                        db.add(mac_address)
+            _save_collection_detail(db, detail)
         db.commit()
         
         return DeviceCollectionResult(
@@ -380,6 +396,52 @@ async def batch_collect_device_info(
         )
 
 
+@router.post("/batch/collect/stream")
+async def batch_collect_device_info_stream(
+    collection_request: DeviceCollectionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    批量采集设备信息（流式返回）
+
+    以 NDJSON 逐行返回每台设备的采集明细，设备完成即返回并立即入库，
+    最后一行为汇总信息
+
+    Args:
+        collection_request: 批量采集请求
+        db: 数据库会话
+
+    Returns:
+        NDJSON 流式响应
+    """
+    devices = db.query(Device).filter(Device.id.in_(collection_request.device_ids)).all()
+
+    async def event_stream():
+        summary = {"type": "summary", "total": len(devices), "success": 0, "failed": 0}
+        async for detail in netmiko_service.iter_batch_collect_device_info(
+            devices,
+            collection_request.collect_types
+        ):
+            try:
+                _save_collection_detail(db, detail)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                detail["success"] = False
+                detail["error"] = f"保存采集结果失败: {str(e)}"
+
+            if detail["success"]:
+                summary["success"] += 1
+            else:
+                summary["failed"] += 1
+
+            yield json.dumps({"type": "device", **detail}, default=str, ensure_ascii=False) + "\n"
+
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 @router.get("/mac-addresses", response_model=List[MACAddressSchema])
 def get_mac_addresses(
     device_id: Optional[int] = None,
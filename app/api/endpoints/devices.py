@@ -491,6 +491,17 @@ async def batch_execute_command(batch_request: BatchCommandExecutionRequest, db:
                     "message": "设备不存在"
                 })
                 continue
+
+            # 熔断中的设备直接跳过，不等待连接超时
+            if netmiko_service.circuit_breaker.is_open(device_id):
+                failed_count += 1
+                results.append({
+                    "device_id": device_id,
+                    "hostname": device.hostname,
+                    "success": False,
+                    "message": "设备连续连接失败，熔断中"
+                })
+                continue
             
             # 确定最终命令
             command = base_command
@@ -14,6 +14,7 @@ from app.schemas.ip_location_schemas import (
     CollectionStatus,
     CollectionTriggerResponse
 )
+from app.services.ip_location_cache import get_ip_location_cache
 from app.services.ip_location_service import get_ip_location_service
 import logging
 
@@ -116,4 +117,22 @@ async def trigger_collection(
         )
     except Exception as e:
         logger.error(f"触发收集任务失败: {e}")
-        raise HTTPException(status_code=500, detail=f"触发失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"触发失败: {str(e)}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    获取 IP 定位查询缓存统计（命中 / 未命中 / 淘汰 / 失效次数）
+    """
+    return get_ip_location_cache().get_stats()
+
+
+@router.post("/cache/clear")
+async def clear_cache():
+    """
+    手动清空 IP 定位查询缓存
+    """
+    cache = get_ip_location_cache()
+    cache.invalidate()
+    return {"success": True, "stats": cache.get_stats()}
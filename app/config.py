@@ -44,6 +44,28 @@ class Settings:
         self.ARP_MAC_COLLECTION_INTERVAL = int(
             os.getenv('ARP_MAC_COLLECTION_INTERVAL', '30')
         )
+        # ARP/MAC 并发采集配置
+        self.ARP_MAC_SWEEP_CONCURRENCY = int(os.getenv('ARP_MAC_SWEEP_CONCURRENCY', '20'))
+        self.ARP_MAC_DEVICE_TIMEOUT = int(os.getenv('ARP_MAC_DEVICE_TIMEOUT', '180'))
+        # 整轮采集截止时间（秒），0 表示取采集间隔的 90%
+        self.ARP_MAC_SWEEP_DEADLINE = int(os.getenv('ARP_MAC_SWEEP_DEADLINE', '0'))
+        self.ARP_MAC_QUARANTINE_THRESHOLD = int(os.getenv('ARP_MAC_QUARANTINE_THRESHOLD', '2'))
+        self.ARP_MAC_QUARANTINE_SWEEPS = int(os.getenv('ARP_MAC_QUARANTINE_SWEEPS', '3'))
+        # 批量 UPSERT 每条语句的最大行数
+        self.ARP_MAC_UPSERT_CHUNK_SIZE = int(os.getenv('ARP_MAC_UPSERT_CHUNK_SIZE', '1000'))
+
+        # IP 定位预计算引擎：python（逐行匹配）或 vectorized（pandas 列式计算）
+        self.IP_LOCATION_ENGINE = os.getenv('IP_LOCATION_ENGINE', 'python')
+        # IP 定位增量计算：只重算 ARP/MAC 变化的 IP
+        self.IP_LOCATION_INCREMENTAL_ENABLED = os.getenv('IP_LOCATION_INCREMENTAL_ENABLED', 'True').lower() == 'true'
+        # 周期性全量重建间隔（分钟），0 表示不自动全量重建
+        self.IP_LOCATION_FULL_REBUILD_MINUTES = int(os.getenv('IP_LOCATION_FULL_REBUILD_MINUTES', '360'))
+        # 受影响 IP 占比超过该值时改为全量重建
+        self.IP_LOCATION_INCREMENTAL_MAX_RATIO = float(os.getenv('IP_LOCATION_INCREMENTAL_MAX_RATIO', '0.5'))
+        # IP 定位查询缓存（LRU + TTL，新批次生效时失效）
+        self.IP_LOCATION_CACHE_ENABLED = os.getenv('IP_LOCATION_CACHE_ENABLED', 'True').lower() == 'true'
+        self.IP_LOCATION_CACHE_MAX_ENTRIES = int(os.getenv('IP_LOCATION_CACHE_MAX_ENTRIES', '10000'))
+        self.IP_LOCATION_CACHE_TTL_SECONDS = int(os.getenv('IP_LOCATION_CACHE_TTL_SECONDS', '300'))
 
         # Netmiko 超时配置（最终方案）
         self.NETMIKO_DEFAULT_TIMEOUT = int(os.getenv('NETMIKO_DEFAULT_TIMEOUT', '20'))
@@ -54,6 +76,80 @@ class Settings:
         self.NETMIKO_DYNAMIC_TIMEOUT_ENABLED = os.getenv('NETMIKO_DYNAMIC_TIMEOUT_ENABLED', 'True').lower() == 'true'
         self.NETMIKO_USE_OPTIMIZED_METHOD = os.getenv('NETMIKO_USE_OPTIMIZED_METHOD', 'True').lower() == 'true'
 
+        # 设备延迟探测（TCP 建连，回写 Device.latency）
+        self.LATENCY_PROBE_ENABLED = os.getenv('LATENCY_PROBE_ENABLED', 'True').lower() == 'true'
+        self.LATENCY_PROBE_INTERVAL_MINUTES = int(os.getenv('LATENCY_PROBE_INTERVAL_MINUTES', '5'))
+        self.LATENCY_PROBE_CONCURRENCY = int(os.getenv('LATENCY_PROBE_CONCURRENCY', '200'))
+        self.LATENCY_PROBE_TIMEOUT = float(os.getenv('LATENCY_PROBE_TIMEOUT', '2'))
+        # 探测结果有效期（秒），采集任务据此跳过不可达设备
+        self.LATENCY_PROBE_MAX_AGE = int(os.getenv('LATENCY_PROBE_MAX_AGE', '900'))
+
+        # 批量采集并发配置（Fan-out）
+        self.COLLECTION_BATCH_CONCURRENCY = int(os.getenv('COLLECTION_BATCH_CONCURRENCY', '20'))
+        self.COLLECTION_GLOBAL_CONCURRENCY = int(os.getenv('COLLECTION_GLOBAL_CONCURRENCY', '50'))
+        # 按厂商并发上限，格式：huawei:10,cisco:20
+        self.COLLECTION_VENDOR_CONCURRENCY = os.getenv('COLLECTION_VENDOR_CONCURRENCY', '')
+        self.COLLECTION_DEFAULT_VENDOR_CONCURRENCY = int(os.getenv('COLLECTION_DEFAULT_VENDOR_CONCURRENCY', '0'))
+        self.COLLECTION_SITE_CONCURRENCY = int(os.getenv('COLLECTION_SITE_CONCURRENCY', '0'))
+        self.COLLECTION_DEVICE_TIMEOUT = int(os.getenv('COLLECTION_DEVICE_TIMEOUT', '300'))
+
+        # SSH 连接池配置
+        self.SSH_POOL_MAX_PER_DEVICE = int(os.getenv('SSH_POOL_MAX_PER_DEVICE', '3'))
+        self.SSH_POOL_MAX_TOTAL = int(os.getenv('SSH_POOL_MAX_TOTAL', '100'))
+        self.SSH_POOL_IDLE_TIMEOUT = int(os.getenv('SSH_POOL_IDLE_TIMEOUT', '300'))
+        self.SSH_POOL_ACQUIRE_TIMEOUT = float(os.getenv('SSH_POOL_ACQUIRE_TIMEOUT', '60'))
+
+        # 设备 SSH 传输驱动：netmiko（线程包装）或 asyncssh（asyncio 原生，需安装 asyncssh）
+        self.SSH_TRANSPORT = os.getenv('SSH_TRANSPORT', 'netmiko').lower()
+
+        # CLI 解析器插件：逗号分隔的模块路径，模块中的 register_parsers(registry) 在首次解析时调用
+        self.CLI_PARSER_PLUGINS = [
+            module.strip() for module in os.getenv('CLI_PARSER_PLUGINS', '').split(',') if module.strip()
+        ]
+
+        # 解析进程池：大输出（MAC 表、接口详情等）在子进程中解析，不阻塞事件循环
+        self.PARSE_PROCESS_POOL_ENABLED = os.getenv('PARSE_PROCESS_POOL_ENABLED', 'False').lower() == 'true'
+        # 进程数，0 表示使用 CPU 核数
+        self.PARSE_PROCESS_WORKERS = int(os.getenv('PARSE_PROCESS_WORKERS', '0'))
+        # 输出达到该字符数才交给进程池，小输出内联解析省去进程间序列化
+        self.PARSE_OFFLOAD_MIN_BYTES = int(os.getenv('PARSE_OFFLOAD_MIN_BYTES', '262144'))
+
+        # 阻塞调用线程池：SSH I/O 与数据库操作分开，互不抢占
+        self.SSH_EXECUTOR_MAX_WORKERS = int(os.getenv('SSH_EXECUTOR_MAX_WORKERS', '128'))
+        # 默认与数据库连接池容量（pool_size + max_overflow）一致
+        self.DB_EXECUTOR_MAX_WORKERS = int(os.getenv('DB_EXECUTOR_MAX_WORKERS', '30'))
+
+        # Git 配置备份本地工作镜像：每个远程仓库（地址 + 分支）一个长期保留的工作副本
+        self.GIT_MIRROR_DIR = os.getenv('GIT_MIRROR_DIR', os.path.join('data', 'git_mirrors'))
+        # 距上次 fetch + rebase 超过该秒数才在打开镜像时同步远程，0 表示每次都同步
+        self.GIT_FETCH_INTERVAL = int(os.getenv('GIT_FETCH_INTERVAL', '300'))
+        # 镜像执行 git gc --auto 的最小间隔（秒），0 表示不执行
+        self.GIT_GC_INTERVAL = int(os.getenv('GIT_GC_INTERVAL', '86400'))
+        # 批量备份之外的提交等待该秒数后合并为一次推送（定时任务同时触发的设备共用一次推送），0 表示立即推送
+        self.GIT_PUSH_DELAY = float(os.getenv('GIT_PUSH_DELAY', '10'))
+        # 推送失败后的重试次数与指数退避基数（秒）
+        self.GIT_PUSH_RETRIES = int(os.getenv('GIT_PUSH_RETRIES', '3'))
+        self.GIT_PUSH_RETRY_BACKOFF = float(os.getenv('GIT_PUSH_RETRY_BACKOFF', '2'))
+
+        # 配置版本存储：delta（关键帧 + 增量）、compressed（每个版本 zlib 压缩全文）、plain（明文）
+        self.CONFIG_STORAGE_MODE = os.getenv('CONFIG_STORAGE_MODE', 'delta').lower()
+        # 每个关键帧之后最多保存的增量版本数
+        self.CONFIG_KEYFRAME_INTERVAL = int(os.getenv('CONFIG_KEYFRAME_INTERVAL', '20'))
+        # 增量超过关键帧压缩大小的该比例时改存新关键帧
+        self.CONFIG_DELTA_MAX_RATIO = float(os.getenv('CONFIG_DELTA_MAX_RATIO', '0.5'))
+
+        # 配置差异结果缓存（按两个版本的配置哈希 + 比对选项缓存）
+        self.CONFIG_DIFF_CACHE_ENABLED = os.getenv('CONFIG_DIFF_CACHE_ENABLED', 'True').lower() == 'true'
+        self.CONFIG_DIFF_CACHE_MAX_ENTRIES = int(os.getenv('CONFIG_DIFF_CACHE_MAX_ENTRIES', '256'))
+        # 待比对区域（两侧行数之和）达到该值时改用 patience 算法
+        self.CONFIG_DIFF_PATIENCE_MIN_LINES = int(os.getenv('CONFIG_DIFF_PATIENCE_MIN_LINES', '2000'))
+
+        # 设备熔断器：连续连接失败后在冷却期内直接跳过设备
+        self.CIRCUIT_BREAKER_ENABLED = os.getenv('CIRCUIT_BREAKER_ENABLED', 'True').lower() == 'true'
+        self.CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '3'))
+        self.CIRCUIT_BREAKER_RECOVERY_TIMEOUT = int(os.getenv('CIRCUIT_BREAKER_RECOVERY_TIMEOUT', '300'))
+        self.CIRCUIT_BREAKER_MAX_RECOVERY_TIMEOUT = int(os.getenv('CIRCUIT_BREAKER_MAX_RECOVERY_TIMEOUT', '3600'))
+
 
 # 创建全局配置实例
 settings = Settings()
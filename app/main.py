@@ -12,6 +12,11 @@ from app.api import api_router
 from app.services.backup_scheduler import backup_scheduler
 from app.services.ip_location_scheduler import ip_location_scheduler
 from app.services.arp_mac_scheduler import arp_mac_scheduler
+from app.services.latency_prober import latency_prober
+from app.services.executors import get_executor_stats, shutdown_executors
+from app.services.parse_stage import get_parse_stage
+from app.services.git_write_behind import get_git_write_behind
+from app.services.config_diff import get_config_diff_service
 from app.models import get_db
 
 # 配置日志
@@ -23,8 +28,8 @@ async def lifespan(app: FastAPI):
     """
     FastAPI 应用生命周期管理
 
-    启动顺序：backup → ip_location → arp_mac
-    关闭顺序：arp_mac → ip_location → backup（反向）
+    启动顺序：backup → ip_location → arp_mac → latency_probe
+    关闭顺序：latency_probe → arp_mac → ip_location → backup（反向）
 
     包含完整的错误处理和回滚机制
     """
@@ -67,6 +72,14 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Could not start ARP/MAC scheduler: {e}")
 
+        # 4. 启动设备延迟探测
+        if settings.LATENCY_PROBE_ENABLED:
+            try:
+                latency_prober.start()
+                logger.info(f"[Startup] Latency prober started (interval: {latency_prober.interval_minutes} minutes)")
+            except Exception as e:
+                logger.warning(f"Could not start latency prober: {e}")
+
         startup_success = True
         logger.info("[Startup] All schedulers started successfully")
 
@@ -77,6 +90,12 @@ async def lifespan(app: FastAPI):
         logger.error(f"Scheduler startup failed: {e}")
 
         # 反向关闭已启动的调度器
+        try:
+            latency_prober.shutdown()
+            logger.info("[Startup Rollback] Latency prober shutdown")
+        except Exception as e2:
+            logger.error(f"[Startup Rollback] Latency prober shutdown failed: {e2}")
+
         try:
             arp_mac_scheduler.shutdown()
             logger.info("[Startup Rollback] ARP/MAC scheduler shutdown")
@@ -101,7 +120,13 @@ async def lifespan(app: FastAPI):
         # ========== Shutdown ==========
         logger.info("[Shutdown] Shutting down all schedulers...")
 
-        # 反向关闭调度器（arp_mac → ip_location → backup）
+        # 反向关闭调度器（latency_probe → arp_mac → ip_location → backup）
+        try:
+            latency_prober.shutdown()
+            logger.info("[Shutdown] Latency prober shutdown complete")
+        except Exception as e:
+            logger.error(f"[Shutdown] Latency prober shutdown failed: {e}")
+
         try:
             arp_mac_scheduler.shutdown()
             logger.info("[Shutdown] ARP/MAC scheduler shutdown complete")
@@ -120,6 +145,27 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"[Shutdown] Backup scheduler shutdown failed: {e}")
 
+        # 推送尚未推送的 Git 配置提交
+        try:
+            await get_git_write_behind().flush()
+            logger.info("[Shutdown] Git write-behind flushed")
+        except Exception as e:
+            logger.error(f"[Shutdown] Git write-behind flush failed: {e}")
+
+        # 关闭阻塞调用线程池（不等待在途任务）
+        try:
+            shutdown_executors()
+            logger.info("[Shutdown] Executors shutdown complete")
+        except Exception as e:
+            logger.error(f"[Shutdown] Executors shutdown failed: {e}")
+
+        # 关闭解析进程池
+        try:
+            get_parse_stage().shutdown()
+            logger.info("[Shutdown] Parse process pool shutdown complete")
+        except Exception as e:
+            logger.error(f"[Shutdown] Parse process pool shutdown failed: {e}")
+
         # 关闭数据库 Session
         db.close()
         logger.info("[Shutdown] All schedulers shutdown complete, database session closed")
@@ -178,3 +224,35 @@ async def health_check():
     健康检查
     """
     return {"status": "healthy"}
+
+
+@app.get("/health/executors")
+async def executor_stats():
+    """
+    阻塞调用线程池统计（SSH I/O / 数据库：排队数、活跃线程数、等待时间）
+    """
+    return get_executor_stats()
+
+
+@app.get("/health/parse")
+async def parse_stats():
+    """
+    CLI 输出解析统计（内联 / 进程池解析次数、解析耗时、输出字节数）
+    """
+    return get_parse_stage().get_stats()
+
+
+@app.get("/health/git")
+async def git_stats():
+    """
+    Git 配置写回统计（提交数、推送次数、待推送提交、重试与失败次数）
+    """
+    return get_git_write_behind().get_stats()
+
+
+@app.get("/health/diff")
+async def diff_stats():
+    """
+    配置差异缓存统计（条目数、命中率、淘汰次数）
+    """
+    return get_config_diff_service().get_stats()
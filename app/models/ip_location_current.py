@@ -7,7 +7,7 @@ IP 定位当前数据表模型
 - MACAddressCurrent: MAC 当前数据表
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -36,7 +36,10 @@ class ARPEntry(Base):
 
     # 复合索引
     __table_args__ = (
-        Index('idx_ip_mac', 'ip_address', 'mac_address'),
+        # 索引名在 SQLite 中全库唯一，避免与 ip_location_current.idx_ip_mac 冲突
+        Index('idx_arp_current_ip_mac', 'ip_address', 'mac_address'),
+        # UPSERT 冲突键（与线上 MySQL 唯一键一致）
+        UniqueConstraint('ip_address', 'arp_device_id', name='uq_arp_current_ip_device'),
     )
 
     def to_dict(self):
@@ -73,6 +76,11 @@ class MACAddressCurrent(Base):
     created_at = Column(DateTime, nullable=False, default=func.now(), comment='创建时间')
     updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now(), comment='更新时间')
 
+    # UPSERT 冲突键
+    __table_args__ = (
+        UniqueConstraint('mac_address', 'mac_device_id', 'mac_interface', name='uq_mac_current_mac_device_interface'),
+    )
+
     def to_dict(self):
         """转换为字典"""
         return {
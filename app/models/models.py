@@ -2,7 +2,8 @@
 数据模型定义
 定义数据库表结构
 """
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON, Boolean, Index
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON, Boolean, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -120,6 +121,13 @@ class Configuration(Base):
     version = Column(String(50), nullable=False, default="1.0")
     change_description = Column(Text, nullable=True)
     git_commit_id = Column(String(64), nullable=True)
+    # 规范化配置内容（忽略厂商易变行）的 SHA-256，用于判断配置是否变化
+    config_hash = Column(String(64), nullable=True, index=True)
+    # 存储格式：plain（config_content 明文）/ full（关键帧，config_data 为压缩全文）/ delta（config_data 为相对关键帧的压缩增量）
+    storage_format = Column(String(10), nullable=False, default="plain")
+    config_data = Column(LargeBinary().with_variant(LONGBLOB(), "mysql"), nullable=True)
+    # 增量版本所属关键帧 ID（不建外键：删除关键帧前由存储服务把依赖它的增量改挂到新关键帧）
+    base_config_id = Column(Integer, nullable=True, index=True)
     created_at = Column(DateTime, nullable=False, default=func.now())
     
     # 关联关系
@@ -244,6 +244,7 @@ class Configuration(ConfigurationBase):
     """配置模型"""
     id: int = Field(..., description="配置ID")
     device_name: Optional[str] = Field(None, description="设备名称")
+    config_hash: Optional[str] = Field(None, description="配置哈希（忽略易变行）")
     created_at: Optional[datetime] = Field(None, description="创建时间")
 
     model_config = ConfigDict(from_attributes=True)
@@ -12,7 +12,13 @@ ARP+MAC 批量采集调度器
 - 移除 _run_async 三层降级逻辑，直接使用 async 方法
 - 在任务内部重新获取 Session，不再复用全局 Session
 - 使用 asyncio.to_thread() 包装同步数据库操作
+- 同步数据库操作改用数据库专用线程池（get_db_executor），不与 SSH I/O 抢占默认线程池
 - start() 方法不再需要 db 参数
+
+并发采集说明：
+- 多台设备并发采集（worker 池），单设备有时间预算
+- 连续超时的慢设备被隔离若干轮，整轮采集有截止时间
+- 每台设备的数据库写入在线程中使用独立 Session 执行
 """
 
 import asyncio
@@ -20,11 +26,9 @@ import logging
 import re
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from sqlalchemy.dialects.mysql import insert as mysql_insert
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
@@ -32,7 +36,12 @@ from app.models import SessionLocal
 from app.models.models import Device
 from app.models.ip_location_current import ARPEntry, MACAddressCurrent
 from app.services.netmiko_service import get_netmiko_service
+from app.services.device_fanout import FanoutLimits, get_fanout_engine
+from app.services.bulk_upsert import BulkUpsertResult, bulk_upsert
 from app.services.ip_location_calculator import get_ip_location_calculator
+from app.services.latency_prober import get_latency_prober
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.executors import get_db_executor
 
 logger = logging.getLogger(__name__)
 
@@ -70,41 +79,6 @@ def validate_arp_entry(entry: dict) -> bool:
     return True
 
 
-
-
-def validate_arp_entry(entry: dict) -> bool:
-    """
-    二次验证 ARP 条目数据完整性
-
-    Args:
-        entry: ARP 条目字典
-
-    Returns:
-        True: 数据有效，False: 数据无效
-    """
-    from loguru import logger
-    
-    required_fields = ['ip_address', 'mac_address']
-    for field in required_fields:
-        if not entry.get(field):
-            logger.warning(f"[ARP 验证] 缺少必要字段：{field}")
-            return False
-
-    # IP 格式检查
-    IP_PATTERN = re.compile(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$')
-    if not IP_PATTERN.match(entry['ip_address']):
-        logger.warning(f"[ARP 验证] 无效 IP 格式：{entry['ip_address']}")
-        return False
-
-    # MAC 格式检查（冒号分隔，已标准化）
-    MAC_PATTERN = re.compile(r'^[0-9A-F]{2}:[0-9A-F]{2}:[0-9A-F]{2}:[0-9A-F]{2}:[0-9A-F]{2}:[0-9A-F]{2}$')
-    if not MAC_PATTERN.match(entry['mac_address']):
-        logger.warning(f"[ARP 验证] 无效 MAC 格式：{entry['mac_address']}")
-        return False
-
-    return True
-
-
 class ARPMACScheduler:
     """
     ARP+MAC 批量采集调度器
@@ -115,16 +89,39 @@ class ARPMACScheduler:
     - 避免 Session 生命周期问题
     """
 
-    def __init__(self, interval_minutes: int = 30):
+    def __init__(
+        self,
+        interval_minutes: int = 30,
+        concurrency: Optional[int] = None,
+        device_timeout: Optional[float] = None,
+        sweep_deadline: Optional[float] = None,
+        quarantine_threshold: Optional[int] = None,
+        quarantine_sweeps: Optional[int] = None
+    ):
         """
         初始化调度器（不启动）
 
         Args:
             interval_minutes: 采集间隔（分钟），默认 30 分钟
+            concurrency: 同时采集的设备数，None 表示使用配置
+            device_timeout: 单设备时间预算（秒），None 表示使用配置
+            sweep_deadline: 整轮采集截止时间（秒），None/0 表示取采集间隔的 90%
+            quarantine_threshold: 连续超时多少次后隔离设备，None 表示使用配置
+            quarantine_sweeps: 隔离的轮数，None 表示使用配置
 
         注意：不在 __init__ 中启动调度器，应在 lifespan 中启动
         """
+        from app.config import settings
+
         self.interval_minutes = interval_minutes
+        self.concurrency = concurrency or settings.ARP_MAC_SWEEP_CONCURRENCY
+        self.device_timeout = device_timeout or settings.ARP_MAC_DEVICE_TIMEOUT
+        self.sweep_deadline = sweep_deadline if sweep_deadline is not None else settings.ARP_MAC_SWEEP_DEADLINE
+        self.quarantine_threshold = quarantine_threshold or settings.ARP_MAC_QUARANTINE_THRESHOLD
+        self.quarantine_sweeps = quarantine_sweeps or settings.ARP_MAC_QUARANTINE_SWEEPS
+        self._sweep_count: int = 0
+        # 慢设备记录：{device_id: {'consecutive_timeouts', 'quarantined_until', 'hostname'}}
+        self._slow_devices: Dict[int, dict] = {}
         self.scheduler = AsyncIOScheduler()
         self._is_running = False
         self._last_run: Optional[datetime] = None
@@ -244,10 +241,10 @@ class ARPMACScheduler:
                     'calculation': {'error': 'ARP collection failed'}
                 }
 
-            # 步骤 2: 触发 IP 定位计算（使用 asyncio.to_thread 包装同步操作）
+            # 步骤 2: 触发 IP 定位计算（使用数据库线程池包装同步操作）
             try:
                 calculator = get_ip_location_calculator(db)
-                calculation_stats = await asyncio.to_thread(calculator.calculate_batch)
+                calculation_stats = await get_db_executor().run(calculator.calculate_incremental)
 
                 logger.info(f"IP 定位计算完成：{calculation_stats}")
 
@@ -280,8 +277,8 @@ class ARPMACScheduler:
         start_time = datetime.now()
         logger.info(f"开始批量采集 ARP 和 MAC 表，时间：{start_time}")
 
-        # 获取所有活跃设备（使用 asyncio.to_thread 包装同步查询）
-        devices = await asyncio.to_thread(
+        # 获取所有活跃设备（使用数据库线程池包装同步查询）
+        devices = await get_db_executor().run(
             lambda: db.query(Device).filter(Device.status == 'active').all()
         )
 
@@ -305,11 +302,80 @@ class ARPMACScheduler:
         # 获取 netmiko 服务
         netmiko = get_netmiko_service()
 
-        # 逐个设备采集
+        # 并发采集：worker 池 + 单设备时间预算 + 慢设备隔离 + 整轮截止时间
+        sweep_deadline = self._get_sweep_deadline()
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + sweep_deadline
+        self._sweep_count += 1
+        stats.update({
+            'timed_out': 0, 'quarantined': 0, 'skipped_deadline': 0, 'unreachable': 0,
+            'circuit_open': 0,
+            'upsert_rows': 0, 'upsert_seconds': 0.0,
+        })
+
+        prober = get_latency_prober()
+        breaker = get_circuit_breaker()
+        runnable = []
         for device in devices:
-            device_stats = await self._collect_device_async(device, db, netmiko)
+            if self._is_quarantined(device.id):
+                stats['quarantined'] += 1
+                stats['arp_failed'] += 1
+                stats['mac_failed'] += 1
+                stats['devices'].append(self._skipped_device_stats(device, '慢设备隔离中，本轮跳过'))
+            elif prober.is_unreachable(device.id):
+                # 最近一次延迟探测不可达，直接跳过，不消耗连接重试
+                stats['unreachable'] += 1
+                stats['arp_failed'] += 1
+                stats['mac_failed'] += 1
+                stats['devices'].append(self._skipped_device_stats(device, '延迟探测不可达，本轮跳过'))
+            elif breaker.is_open(device.id):
+                # 连续连接失败已熔断，冷却期内跳过
+                stats['circuit_open'] += 1
+                stats['arp_failed'] += 1
+                stats['mac_failed'] += 1
+                stats['devices'].append(self._skipped_device_stats(device, '设备熔断中，本轮跳过'))
+            else:
+                runnable.append(device)
+
+        async def worker(device: Device) -> dict:
+            remaining = deadline_at - loop.time()
+            if remaining <= 0:
+                return self._skipped_device_stats(device, '超过整轮采集截止时间，本轮跳过', deadline=True)
+            budget = min(self.device_timeout, remaining)
+            try:
+                device_stats = await asyncio.wait_for(
+                    self._collect_device_async(device, db, netmiko),
+                    timeout=budget
+                )
+            except asyncio.TimeoutError:
+                if budget < self.device_timeout:
+                    # 被整轮截止时间截断，不计入慢设备
+                    logger.warning(f"设备 {device.hostname} 采集被整轮截止时间中断")
+                    return self._skipped_device_stats(device, '超过整轮采集截止时间，采集中断', deadline=True)
+                logger.warning(f"设备 {device.hostname} 采集超过时间预算 {budget:.0f}s，已放弃")
+                device_stats = self._skipped_device_stats(device, f'采集超时（{budget:.0f}s）')
+                device_stats['timed_out'] = True
+            self._record_device_outcome(device, device_stats)
+            return device_stats
+
+        limits = FanoutLimits(batch_concurrency=self.concurrency)
+        async for result in get_fanout_engine().run(runnable, worker, limits):
+            if result.success:
+                device_stats = result.value
+            else:
+                device_stats = self._skipped_device_stats(result.device, result.error)
             stats['devices'].append(device_stats)
 
+            write = device_stats.get('write')
+            if isinstance(write, dict):
+                stats['upsert_rows'] += write.get('rows', 0)
+                stats['upsert_seconds'] += write.get('elapsed_seconds', 0)
+
+            if device_stats.get('timed_out'):
+                stats['timed_out'] += 1
+            if device_stats.get('skipped_deadline'):
+                stats['skipped_deadline'] += 1
+
             if device_stats['arp_success']:
                 stats['arp_success'] += 1
                 stats['total_arp_entries'] += device_stats.get('arp_entries_count', 0)
@@ -322,6 +388,12 @@ class ARPMACScheduler:
             else:
                 stats['mac_failed'] += 1
 
+        if stats['skipped_deadline']:
+            logger.warning(f"整轮采集截止时间 {sweep_deadline}s 已到，{stats['skipped_deadline']} 台设备未采集")
+
+        if stats['upsert_seconds'] > 0:
+            stats['upsert_rows_per_second'] = round(stats['upsert_rows'] / stats['upsert_seconds'], 1)
+
         # 记录总耗时
         end_time = datetime.now()
         stats['start_time'] = start_time.isoformat()
@@ -331,13 +403,65 @@ class ARPMACScheduler:
         logger.info(f"批量采集完成：{stats}")
         return stats
 
+    def _get_sweep_deadline(self) -> float:
+        """整轮采集截止时间（秒），未配置时取采集间隔的 90%"""
+        if self.sweep_deadline:
+            return self.sweep_deadline
+        return self.interval_minutes * 60 * 0.9
+
+    def _is_quarantined(self, device_id: int) -> bool:
+        """设备是否处于慢设备隔离期"""
+        record = self._slow_devices.get(device_id)
+        return bool(record and record.get('quarantined_until', 0) >= self._sweep_count)
+
+    def _record_device_outcome(self, device: Device, device_stats: dict):
+        """
+        记录设备采集结果，连续超时达到阈值的设备进入隔离期
+
+        Args:
+            device: 设备对象
+            device_stats: 单设备采集结果
+        """
+        if not device_stats.get('timed_out'):
+            if device.id in self._slow_devices:
+                logger.info(f"设备 {device.hostname} 采集恢复，解除慢设备标记")
+                del self._slow_devices[device.id]
+            return
+
+        record = self._slow_devices.setdefault(device.id, {'consecutive_timeouts': 0})
+        record['consecutive_timeouts'] += 1
+        record['hostname'] = device.hostname
+        if record['consecutive_timeouts'] >= self.quarantine_threshold:
+            record['quarantined_until'] = self._sweep_count + self.quarantine_sweeps
+            logger.warning(
+                f"设备 {device.hostname} 连续 {record['consecutive_timeouts']} 次采集超时，"
+                f"隔离 {self.quarantine_sweeps} 轮"
+            )
+
+    @staticmethod
+    def _skipped_device_stats(device: Device, error: str, deadline: bool = False) -> dict:
+        """构建未完成采集的设备结果"""
+        return {
+            'device_id': device.id,
+            'device_hostname': device.hostname,
+            'arp_success': False,
+            'mac_success': False,
+            'arp_entries_count': 0,
+            'mac_entries_count': 0,
+            'error': error,
+            'skipped_deadline': deadline,
+        }
+
     async def _collect_device_async(self, device: Device, db: Session, netmiko) -> dict:
         """
         异步采集单个设备的 ARP 和 MAC 表
 
+        设备 I/O 在事件循环中并发执行，数据库写入在线程中使用独立 Session 完成，
+        多台设备并发时互不共享 Session
+
         Args:
             device: 设备对象
-            db: 数据库会话
+            db: 数据库会话（仅用于兼容，写入使用独立 Session）
             netmiko: Netmiko 服务实例
 
         Returns:
@@ -353,113 +477,142 @@ class ARPMACScheduler:
         }
 
         try:
-            # 并行采集 ARP 和 MAC 表
-            arp_task = netmiko.collect_arp_table(device)
-            mac_task = netmiko.collect_mac_table(device)
-
-            arp_table, mac_table = await asyncio.gather(
-                arp_task,
-                mac_task,
-                return_exceptions=True
-            )
+            # ARP 和 MAC 表在同一个会话上依次采集，每台设备只登录一次
+            arp_table, mac_table = await netmiko.collect_arp_mac_tables(device)
 
-            # 处理 ARP 表 - 使用 UPSERT 策略避免唯一键冲突
-            if arp_table and not isinstance(arp_table, Exception):
-                batch_id = f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
-                now = datetime.now()
+            if not arp_table:
+                logger.warning(f"设备 {device.hostname} ARP 采集返回空结果")
 
-                # 二次数据验证
-                valid_entries = [e for e in arp_table if validate_arp_entry(e)]
-                invalid_count = len(arp_table) - len(valid_entries)
-                if invalid_count > 0:
-                    logger.warning(f"[ARP 采集] 设备 {device.hostname} 过滤无效条目：{invalid_count} 条")
-                logger.info(f"[ARP 采集] 设备 {device.hostname} 有效条目：{len(valid_entries)}/{len(arp_table)}")
-
-                for entry in valid_entries:
-                    # 使用 MySQL INSERT ... ON DUPLICATE KEY UPDATE (UPSERT)
-                    stmt = mysql_insert(ARPEntry).values(
-                        ip_address=entry['ip_address'],
-                        mac_address=entry['mac_address'],
-                        arp_device_id=device.id,
-                        vlan_id=entry.get('vlan_id'),
-                        arp_interface=entry.get('interface'),
-                        last_seen=now,
-                        collection_batch_id=batch_id,
-                        created_at=now,
-                        updated_at=now
-                    )
-                    # 唯一键: uq_arp_current_ip_device (ip_address + arp_device_id)
-                    stmt = stmt.on_duplicate_key_update(
-                        mac_address=stmt.inserted.mac_address,
-                        vlan_id=stmt.inserted.vlan_id,
-                        arp_interface=stmt.inserted.arp_interface,
-                        last_seen=stmt.inserted.last_seen,
-                        collection_batch_id=stmt.inserted.collection_batch_id,
-                        updated_at=func.now()
-                    )
-                    db.execute(stmt)
+            if not mac_table:
+                logger.warning(f"设备 {device.hostname} MAC 采集返回空结果")
+
+            # 数据库写入放到数据库线程池中执行，不阻塞事件循环
+            if arp_table or mac_table:
+                device_stats['write'] = await get_db_executor().run(
+                    self._save_device_tables, device.id, device.hostname, arp_table, mac_table
+                )
 
+            if arp_table:
                 device_stats['arp_success'] = True
                 device_stats['arp_entries_count'] = len(arp_table)
                 logger.info(f"设备 {device.hostname} ARP 采集成功：{len(arp_table)} 条")
-            elif isinstance(arp_table, Exception):
-                logger.error(f"设备 {device.hostname} ARP 采集失败：{arp_table}")
-                device_stats['error'] = str(arp_table)
-            else:
-                logger.warning(f"设备 {device.hostname} ARP 采集返回空结果")
-
-            # 处理 MAC 表 - 使用 UPSERT 策略避免唯一键冲突
-            if mac_table and not isinstance(mac_table, Exception):
-                batch_id = f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
-                now = datetime.now()
-
-                for entry in mac_table:
-                    # 使用 MySQL INSERT ... ON DUPLICATE KEY UPDATE (UPSERT)
-                    stmt = mysql_insert(MACAddressCurrent).values(
-                        mac_address=entry['mac_address'],
-                        mac_device_id=device.id,
-                        vlan_id=entry.get('vlan_id'),
-                        mac_interface=entry['interface'],
-                        is_trunk=entry.get('is_trunk', False),
-                        interface_description=entry.get('description'),
-                        last_seen=now,
-                        collection_batch_id=batch_id,
-                        created_at=now,
-                        updated_at=now
-                    )
-                    # 唯一键假设: (mac_address + mac_device_id + mac_interface)
-                    stmt = stmt.on_duplicate_key_update(
-                        vlan_id=stmt.inserted.vlan_id,
-                        is_trunk=stmt.inserted.is_trunk,
-                        interface_description=stmt.inserted.interface_description,
-                        last_seen=stmt.inserted.last_seen,
-                        collection_batch_id=stmt.inserted.collection_batch_id,
-                        updated_at=func.now()
-                    )
-                    db.execute(stmt)
 
+            if mac_table:
                 device_stats['mac_success'] = True
                 device_stats['mac_entries_count'] = len(mac_table)
                 logger.info(f"设备 {device.hostname} MAC 采集成功：{len(mac_table)} 条")
-            elif isinstance(mac_table, Exception):
-                logger.error(f"设备 {device.hostname} MAC 采集失败：{mac_table}")
-                if 'error' not in device_stats:
-                    device_stats['error'] = str(mac_table)
-            else:
-                logger.warning(f"设备 {device.hostname} MAC 采集返回空结果")
-
-            # 提交事务（使用 asyncio.to_thread 包装同步操作）
-            await asyncio.to_thread(db.commit)
-            logger.debug(f"设备 {device.hostname} 数据库事务提交成功")
 
         except Exception as e:
             logger.error(f"设备 {device.hostname} 采集失败：{str(e)}", exc_info=True)
-            await asyncio.to_thread(db.rollback)
-            logger.warning(f"设备 {device.hostname} 数据库事务已回滚")
             device_stats['error'] = str(e)
 
         return device_stats
 
+    def _save_device_tables(
+        self,
+        device_id: int,
+        hostname: str,
+        arp_table: Optional[List[dict]],
+        mac_table: Optional[List[dict]]
+    ) -> dict:
+        """
+        保存单个设备的 ARP 和 MAC 表（同步方法，在线程中执行）
+
+        使用独立 Session，单设备一个事务，按块批量 UPSERT，失败时回滚并抛出异常
+
+        Args:
+            device_id: 设备 ID
+            hostname: 设备名称（用于日志）
+            arp_table: ARP 条目列表
+            mac_table: MAC 条目列表
+
+        Returns:
+            写入统计 {'rows', 'chunks', 'elapsed_seconds', 'rows_per_second'}
+        """
+        from app.config import settings
+
+        chunk_size = settings.ARP_MAC_UPSERT_CHUNK_SIZE
+        batch_id = f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        now = datetime.now()
+        write = BulkUpsertResult()
+
+        db = SessionLocal()
+        try:
+            # 处理 ARP 表 - 批量 UPSERT，唯一键: uq_arp_current_ip_device (ip_address + arp_device_id)
+            if arp_table:
+                # 二次数据验证
+                valid_entries = [e for e in arp_table if validate_arp_entry(e)]
+                invalid_count = len(arp_table) - len(valid_entries)
+                if invalid_count > 0:
+                    logger.warning(f"[ARP 采集] 设备 {hostname} 过滤无效条目：{invalid_count} 条")
+                logger.info(f"[ARP 采集] 设备 {hostname} 有效条目：{len(valid_entries)}/{len(arp_table)}")
+
+                rows = [
+                    {
+                        'ip_address': entry['ip_address'],
+                        'mac_address': entry['mac_address'],
+                        'arp_device_id': device_id,
+                        'vlan_id': entry.get('vlan_id'),
+                        'arp_interface': entry.get('interface'),
+                        'last_seen': now,
+                        'collection_batch_id': batch_id,
+                        'created_at': now,
+                        'updated_at': now,
+                    }
+                    for entry in valid_entries
+                ]
+                result = bulk_upsert(
+                    db, ARPEntry, rows,
+                    conflict_columns=('ip_address', 'arp_device_id'),
+                    update_columns=('mac_address', 'vlan_id', 'arp_interface', 'last_seen',
+                                    'collection_batch_id', 'updated_at'),
+                    chunk_size=chunk_size
+                )
+                write.rows += result.rows
+                write.chunks += result.chunks
+                write.elapsed += result.elapsed
+
+            # 处理 MAC 表 - 批量 UPSERT，唯一键: (mac_address + mac_device_id + mac_interface)
+            if mac_table:
+                rows = [
+                    {
+                        'mac_address': entry['mac_address'],
+                        'mac_device_id': device_id,
+                        'vlan_id': entry.get('vlan_id'),
+                        'mac_interface': entry['interface'],
+                        'is_trunk': entry.get('is_trunk', False),
+                        'interface_description': entry.get('description'),
+                        'last_seen': now,
+                        'collection_batch_id': batch_id,
+                        'created_at': now,
+                        'updated_at': now,
+                    }
+                    for entry in mac_table
+                ]
+                result = bulk_upsert(
+                    db, MACAddressCurrent, rows,
+                    conflict_columns=('mac_address', 'mac_device_id', 'mac_interface'),
+                    update_columns=('vlan_id', 'is_trunk', 'interface_description', 'last_seen',
+                                    'collection_batch_id', 'updated_at'),
+                    chunk_size=chunk_size
+                )
+                write.rows += result.rows
+                write.chunks += result.chunks
+                write.elapsed += result.elapsed
+
+            db.commit()
+            logger.info(
+                f"设备 {hostname} 写入 {write.rows} 行（{write.chunks} 块），"
+                f"{write.rows_per_second:.0f} 行/秒"
+            )
+            return write.to_dict()
+        except Exception:
+            db.rollback()
+            logger.warning(f"设备 {hostname} 数据库事务已回滚")
+            raise
+        finally:
+            db.close()
+
     def get_status(self) -> dict:
         """
         获取调度器状态
@@ -489,6 +642,14 @@ class ARPMACScheduler:
             'consecutive_failures': self._consecutive_failures,
             'health_status': health_status,
             'scheduler_type': 'AsyncIOScheduler',  # 新增：标识调度器类型
+            'concurrency': self.concurrency,
+            'device_timeout': self.device_timeout,
+            'sweep_deadline': self._get_sweep_deadline(),
+            'quarantined_devices': [
+                {'device_id': device_id, **record}
+                for device_id, record in self._slow_devices.items()
+                if record.get('quarantined_until', 0) >= self._sweep_count
+            ],
         }
 
 
@@ -10,9 +10,11 @@ from sqlalchemy.orm import Session
 
 from app.models.models import Device
 from app.models.backup_task import BackupTask, BackupTaskStatus
+from app.services.circuit_breaker import get_circuit_breaker
 from app.services.config_collection_service import collect_device_config
 from app.services.netmiko_service import NetmikoService
 from app.services.git_service import GitService
+from app.services.git_write_behind import get_git_write_behind
 
 logger = logging.getLogger(__name__)
 
@@ -95,8 +97,10 @@ class BackupExecutor:
                 
                 return {"device_id": device_id, "success": False, "error_message": "未知错误"}
         
+        # 整次运行的配置提交只推送一次（批次结束时）
         tasks = [execute_with_retry(device_id) for device_id in device_ids]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async with get_git_write_behind().batch():
+            results = await asyncio.gather(*tasks, return_exceptions=True)
         
         processed_results = []
         errors = []
@@ -154,6 +158,16 @@ class BackupExecutor:
                 "error_message": f"设备不存在: {device_id}",
                 "error_code": "DEVICE_NOT_FOUND"
             }
+
+        # 熔断中的设备直接失败，不建连、不重试
+        if get_circuit_breaker().is_open(device_id):
+            return {
+                "device_id": device_id,
+                "device_name": device.hostname or device.name,
+                "success": False,
+                "error_message": "设备连续连接失败，熔断中",
+                "error_code": "CIRCUIT_OPEN"
+            }
         
         start_time = datetime.now()
 
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+批量 UPSERT 写入层
+
+功能：
+1. 将多行数据按块合并为多 VALUES 的 UPSERT 语句，替代逐行 INSERT
+2. 按数据库方言生成语句：
+   - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+   - SQLite / PostgreSQL: INSERT ... ON CONFLICT (...) DO UPDATE
+3. 块内按冲突键去重（后出现的行覆盖先出现的行）
+4. 返回写入行数、块数、耗时和每秒行数
+
+说明：
+- 只负责执行语句，不提交事务，由调用方控制事务边界
+"""
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句绑定参数上限（3.32 之前为 999）
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+@dataclass
+class BulkUpsertResult:
+    """批量 UPSERT 结果"""
+    rows: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return float(self.rows)
+        return self.rows / self.elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'elapsed_seconds': round(self.elapsed, 4),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def _dedupe_rows(rows: Iterable[Dict[str, Any]], conflict_columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """按冲突键去重，保留最后出现的行"""
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        unique[tuple(row.get(column) for column in conflict_columns)] = row
+    return list(unique.values())
+
+
+def _build_statement(dialect: str, table, chunk: List[Dict[str, Any]],
+                     conflict_columns: Sequence[str], update_columns: Sequence[str]):
+    """
+    按方言构建多 VALUES UPSERT 语句
+
+    Args:
+        dialect: 数据库方言名称
+        table: SQLAlchemy Table
+        chunk: 本块数据行
+        conflict_columns: 冲突键列
+        update_columns: 冲突时更新的列
+
+    Returns:
+        可执行语句
+    """
+    if dialect == 'mysql':
+        stmt = mysql_insert(table).values(chunk)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        stmt = insert(table).values(chunk)
+        return stmt.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+
+    raise ValueError(f"不支持的数据库方言：{dialect}")
+
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: Iterable[Dict[str, Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    chunk_size: int = 1000
+) -> BulkUpsertResult:
+    """
+    批量 UPSERT（不提交事务）
+
+    Args:
+        db: 数据库会话
+        model: ORM 模型类
+        rows: 数据行（列名 -> 值），所有行需包含相同的列
+        conflict_columns: 冲突键列（需有对应唯一索引）
+        update_columns: 冲突时更新的列
+        chunk_size: 每条语句的最大行数
+
+    Returns:
+        BulkUpsertResult
+    """
+    start = time.monotonic()
+    rows = _dedupe_rows(rows, conflict_columns)
+    result = BulkUpsertResult(rows=len(rows))
+    if not rows:
+        return result
+
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        chunk_size = min(chunk_size, max(1, SQLITE_MAX_VARIABLES // len(rows[0])))
+    chunk_size = max(1, chunk_size)
+
+    for offset in range(0, len(rows), chunk_size):
+        chunk = rows[offset:offset + chunk_size]
+        db.execute(_build_statement(dialect, table, chunk, conflict_columns, update_columns))
+        result.chunks += 1
+
+    result.elapsed = time.monotonic() - start
+    logger.debug(
+        f"[批量写入] {table.name}: {result.rows} 行，{result.chunks} 块，"
+        f"{result.elapsed:.3f}s，{result.rows_per_second:.0f} 行/秒"
+    )
+    return result
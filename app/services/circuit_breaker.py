@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+设备熔断器（负缓存）
+
+功能：
+1. 按设备维护 closed / open / half_open 三态
+2. 连续连接失败达到阈值（认证失败立即）进入 open，期间所有调用方直接跳过该设备
+3. 冷却期结束后进入 half_open，只放行一次探测连接：成功则关闭，失败则重新打开并加倍冷却期
+4. 连接池、ARP/MAC 调度器、备份执行器、批量命令共用同一实例
+
+说明：
+- allow_request() 会占用 half_open 的探测名额，只应在真正建立连接前调用
+- is_open() 不占用名额，供上层快速判断是否跳过设备
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    """熔断器状态"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class DeviceCircuit:
+    """单台设备的熔断状态"""
+    device_id: int
+    state: CircuitState = CircuitState.CLOSED
+    failures: int = 0
+    # 累计失败次数（连接成功后不清零），用于判断某次调用期间是否新增了失败
+    total_failures: int = 0
+    trips: int = 0
+    open_until: float = 0.0
+    probe_in_flight: bool = False
+    last_failure_reason: Optional[str] = None
+    last_failure_at: Optional[datetime] = None
+    opened_at: Optional[datetime] = None
+
+
+class CircuitBreaker:
+    """按设备的熔断器"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 300,
+        max_recovery_timeout: float = 3600,
+        enabled: bool = True
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后打开
+            recovery_timeout: 首次打开后的冷却时间（秒）
+            max_recovery_timeout: 冷却时间上限（秒），半开探测失败时冷却时间加倍
+            enabled: 是否启用
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.enabled = enabled
+        self._circuits: Dict[int, DeviceCircuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, device_id: int) -> DeviceCircuit:
+        circuit = self._circuits.get(device_id)
+        if circuit is None:
+            circuit = self._circuits[device_id] = DeviceCircuit(device_id)
+        return circuit
+
+    def is_open(self, device_id: int) -> bool:
+        """
+        设备当前是否应被跳过（不占用半开探测名额）
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            处于 open 冷却期，或 half_open 且探测进行中时返回 True
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            if circuit is None or circuit.state == CircuitState.CLOSED:
+                return False
+            if circuit.state == CircuitState.OPEN:
+                return time.monotonic() < circuit.open_until
+            return circuit.probe_in_flight
+
+    def allow_request(self, device_id: int) -> bool:
+        """
+        建立连接前调用：是否允许连接该设备
+
+        冷却期结束的 open 设备转为 half_open 并放行一次探测。
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            是否允许
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            if circuit is None or circuit.state == CircuitState.CLOSED:
+                return True
+            if circuit.state == CircuitState.OPEN:
+                if time.monotonic() < circuit.open_until:
+                    return False
+                circuit.state = CircuitState.HALF_OPEN
+                logger.info(f"设备 {device_id} 熔断冷却结束，进入半开状态")
+            if circuit.probe_in_flight:
+                return False
+            circuit.probe_in_flight = True
+            return True
+
+    def is_half_open(self, device_id: int) -> bool:
+        """设备是否处于半开状态"""
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            return bool(circuit and circuit.state == CircuitState.HALF_OPEN)
+
+    def has_failures(self, device_id: int) -> bool:
+        """
+        设备自上次连接成功以来是否有连接失败记录
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            有未恢复的失败时返回 True
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            return bool(circuit and circuit.failures)
+
+    def failure_count(self, device_id: int) -> int:
+        """
+        设备累计连接失败次数（连接成功后不清零）
+
+        调用前后各取一次，差值大于 0 表示调用期间发生了连接失败
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            累计失败次数
+        """
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            return circuit.total_failures if circuit else 0
+
+    def record_success(self, device_id: int):
+        """
+        记录连接成功，关闭熔断
+
+        Args:
+            device_id: 设备 ID
+        """
+        with self._lock:
+            circuit = self._circuits.get(device_id)
+            if circuit is None:
+                return
+            if circuit.state != CircuitState.CLOSED:
+                logger.info(f"设备 {device_id} 连接恢复，熔断关闭")
+            circuit.state = CircuitState.CLOSED
+            circuit.failures = 0
+            circuit.trips = 0
+            circuit.probe_in_flight = False
+            circuit.opened_at = None
+
+    def record_failure(self, device_id: int, reason: str = "", auth_failure: bool = False):
+        """
+        记录连接失败
+
+        Args:
+            device_id: 设备 ID
+            reason: 失败原因
+            auth_failure: 是否认证失败（认证失败不会自行恢复，立即打开）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            circuit = self._circuit(device_id)
+            circuit.failures += 1
+            circuit.total_failures += 1
+            circuit.last_failure_reason = reason
+            circuit.last_failure_at = datetime.now()
+            circuit.probe_in_flight = False
+
+            should_open = (
+                circuit.state == CircuitState.HALF_OPEN
+                or auth_failure
+                or circuit.failures >= self.failure_threshold
+            )
+            if not should_open:
+                return
+
+            cooldown = min(self.recovery_timeout * (2 ** circuit.trips), self.max_recovery_timeout)
+            circuit.trips += 1
+            circuit.state = CircuitState.OPEN
+            circuit.open_until = time.monotonic() + cooldown
+            circuit.opened_at = datetime.now()
+        logger.warning(f"设备 {device_id} 熔断打开 {cooldown:.0f}s：{reason}")
+
+    def reset(self, device_id: Optional[int] = None):
+        """
+        手动重置熔断状态
+
+        Args:
+            device_id: 设备 ID，None 表示全部
+        """
+        with self._lock:
+            if device_id is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(device_id, None)
+
+    def _to_dict(self, circuit: DeviceCircuit, now: float) -> Dict[str, Any]:
+        retry_in = max(circuit.open_until - now, 0) if circuit.state == CircuitState.OPEN else 0
+        return {
+            'device_id': circuit.device_id,
+            'state': circuit.state.value,
+            'failures': circuit.failures,
+            'trips': circuit.trips,
+            'retry_in_seconds': round(retry_in, 1),
+            'last_failure_reason': circuit.last_failure_reason,
+            'last_failure_at': circuit.last_failure_at.isoformat() if circuit.last_failure_at else None,
+            'opened_at': circuit.opened_at.isoformat() if circuit.opened_at else None,
+        }
+
+    def get_state(self, device_id: int) -> Dict[str, Any]:
+        """
+        获取单台设备的熔断状态
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            状态字典
+        """
+        with self._lock:
+            circuit = self._circuits.get(device_id) or DeviceCircuit(device_id)
+            return self._to_dict(circuit, time.monotonic())
+
+    def get_all_states(self) -> List[Dict[str, Any]]:
+        """
+        获取全部有记录设备的熔断状态
+
+        Returns:
+            状态字典列表
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [self._to_dict(c, now) for c in self._circuits.values()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器汇总统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            states = [c.state for c in self._circuits.values()]
+        return {
+            'enabled': self.enabled,
+            'failure_threshold': self.failure_threshold,
+            'recovery_timeout': self.recovery_timeout,
+            'max_recovery_timeout': self.max_recovery_timeout,
+            'tracked_devices': len(states),
+            'open': states.count(CircuitState.OPEN),
+            'half_open': states.count(CircuitState.HALF_OPEN),
+        }
+
+
+def _create_breaker() -> CircuitBreaker:
+    """根据全局配置创建熔断器"""
+    from app.config import settings
+
+    return CircuitBreaker(
+        failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+        max_recovery_timeout=settings.CIRCUIT_BREAKER_MAX_RECOVERY_TIMEOUT,
+        enabled=settings.CIRCUIT_BREAKER_ENABLED,
+    )
+
+
+# 全局熔断器实例
+circuit_breaker = _create_breaker()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    获取设备熔断器实例
+
+    Returns:
+        CircuitBreaker 实例
+    """
+    return circuit_breaker
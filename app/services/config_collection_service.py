@@ -14,7 +14,10 @@ from typing import Dict, Any
 from sqlalchemy.orm import Session
 from app.models.models import Configuration, Device, GitConfig
 from app.services.netmiko_service import NetmikoService
+from app.services.config_hash import compute_config_hash
+from app.services.config_storage import get_config_content, store_config_content
 from app.services.git_service import GitService
+from app.services.git_write_behind import get_git_write_behind
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +35,7 @@ async def collect_device_config(
         device_id: 设备 ID
         db: 数据库 Session（由调用方管理生命周期）
         netmiko_service: Netmiko 服务实例
-        git_service: Git 服务实例
+        git_service: Git 服务实例（保留以兼容调用方；配置提交经 Git 写回阶段，推送按批次合并）
 
     Returns:
         Dict[str, Any]: 采集结果，包含：
@@ -55,13 +58,26 @@ async def collect_device_config(
         if not config_content:
             return {"success": False, "message": "Failed to get config from device"}
 
-        # 获取设备最新配置
-        latest_config = db.query(Configuration).filter(
+        # 规范化哈希（忽略时间戳等易变行）
+        config_hash = compute_config_hash(config_content, device.vendor)
+
+        # 获取设备最新配置（只取版本与哈希，不读取配置全文）
+        latest_config = db.query(
+            Configuration.id, Configuration.version, Configuration.config_hash
+        ).filter(
             Configuration.device_id == device_id
         ).order_by(Configuration.config_time.desc()).first()
 
+        latest_hash = latest_config.config_hash if latest_config else None
+        if latest_config and latest_hash is None:
+            # 历史记录没有哈希：读取一次全文计算并回填，之后只比较哈希
+            legacy_config = db.query(Configuration).filter(Configuration.id == latest_config.id).first()
+            latest_hash = compute_config_hash(get_config_content(db, legacy_config), device.vendor)
+            legacy_config.config_hash = latest_hash
+            db.commit()
+
         # 检查配置是否有变化
-        if latest_config and latest_config.config_content == config_content:
+        if latest_config and latest_hash == config_hash:
             return {
                 "success": True,
                 "message": "配置无变化，已成功登录并验证",
@@ -83,28 +99,25 @@ async def collect_device_config(
         # 创建新的配置记录
         new_config = Configuration(
             device_id=device_id,
-            config_content=config_content,
             version=new_version,
-            change_description="Auto-collected from device"
+            change_description="Auto-collected from device",
+            config_hash=config_hash
         )
+        # 按存储策略写入（关键帧 / 压缩增量）
+        store_config_content(db, new_config, config_content)
 
         # 检查是否有 Git 配置，如果有则提交到 Git
         git_commit_id = None
         try:
             git_config = db.query(GitConfig).filter(GitConfig.is_active == True).first()
             if git_config:
-                # 为每个设备创建新的 GitService 实例，避免单例模式下的资源冲突
-                device_git_service = GitService()
-                if device_git_service.init_repo(git_config):
-                    commit_id = device_git_service.commit_config(
-                        device.hostname,
-                        config_content,
-                        f"Auto-update config for {device.hostname} at {datetime.now()}"
-                    )
-                    if commit_id:
-                        device_git_service.push_to_remote()
-                        git_commit_id = commit_id
-                    device_git_service.close()
+                # 提交落本地镜像，推送由写回阶段按批次 / 时间窗合并
+                git_commit_id = await get_git_write_behind().commit(
+                    git_config,
+                    device.hostname,
+                    config_content,
+                    f"Auto-update config for {device.hostname} at {datetime.now()}"
+                )
         except Exception as git_error:
             logger.warning(f"Git operation error: {str(git_error)}")
             # Git 操作失败不影响配置获取，继续执行
@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+"""
+配置差异服务
+
+功能：
+1. 行级比对：每行先映射为整数 ID；两侧行数之和小于 CONFIG_DIFF_PATIENCE_MIN_LINES 时
+   直接用 difflib.SequenceMatcher 比对，结果与 difflib.unified_diff 逐字节一致
+2. 大输入去掉公共前后缀后用 patience 算法比对中间区域
+   （以两侧各只出现一次的公共行为锚点、取最长递增子序列分段，段内递归），避免大配置多处变化时的平方级开销；
+   此时 hunk 划分可能与 difflib 不同，但编辑操作总能由旧版本还原出新版本
+3. 按段比对（可选）：以 interface / vlan 等顶格行为段头切分配置，只对内容变化的段生成差异，段顺序调整不算变化
+4. 结果按 (配置哈希1, 配置哈希2, 比对选项) 缓存在进程内 LRU 中，重复打开同一对版本直接命中
+
+说明：
+- 输出格式与 difflib.unified_diff(lineterm="") 相同；文件头（版本、时间）由调用方在取结果后拼接，不进入缓存
+- 原文比对时，配置哈希相同的两条记录易变行（时间戳等）可能不同，键中带上记录 ID；忽略易变行比对时只用哈希
+- 缓存值由调用方共享，调用方不得修改返回的对象
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Configuration
+from app.services.config_hash import normalize_config
+from app.services.config_storage import load_config_contents
+
+Opcode = Tuple[str, int, int, int, int]
+
+# 不作为段头的顶格行：分隔符与注释
+_SECTION_SEPARATORS = ('!', '#')
+
+
+def _add_block(blocks: List[List[int]], i: int, j: int, size: int):
+    """追加匹配块，与前一个首尾相接的块合并"""
+    if size <= 0:
+        return
+    if blocks:
+        last = blocks[-1]
+        if last[0] + last[2] == i and last[1] + last[2] == j:
+            last[2] += size
+            return
+    blocks.append([i, j, size])
+
+
+def _unique_anchors(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """两侧区间内各只出现一次的公共行，按 a 侧顺序取 b 侧位置的最长递增子序列"""
+    positions_a: Dict[int, int] = {}
+    for i in range(alo, ahi):
+        positions_a[a[i]] = -1 if a[i] in positions_a else i
+    positions_b: Dict[int, int] = {}
+    for j in range(blo, bhi):
+        positions_b[b[j]] = -1 if b[j] in positions_b else j
+
+    pairs = sorted(
+        (i, positions_b[line]) for line, i in positions_a.items()
+        if i >= 0 and positions_b.get(line, -1) >= 0
+    )
+
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous: List[Optional[int]] = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        previous[k] = tail_index[pos - 1] if pos else None
+
+    anchors = []
+    k = tail_index[-1] if tail_index else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+
+def _match(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+           blocks: List[List[int]], patience_min_lines: int):
+    """递归求区间内的匹配块（按顺序写入 blocks）"""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        _add_block(blocks, alo, blo, 1)
+        alo += 1
+        blo += 1
+    suffix = 0
+    while alo < ahi - suffix and blo < bhi - suffix and a[ahi - 1 - suffix] == b[bhi - 1 - suffix]:
+        suffix += 1
+    ahi -= suffix
+    bhi -= suffix
+
+    if alo < ahi and blo < bhi:
+        large = (ahi - alo) + (bhi - blo) >= patience_min_lines
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi) if large else []
+        if anchors:
+            for i, j in anchors:
+                _match(a, b, alo, i, blo, j, blocks, patience_min_lines)
+                _add_block(blocks, i, j, 1)
+                alo, blo = i + 1, j + 1
+            _match(a, b, alo, ahi, blo, bhi, blocks, patience_min_lines)
+        else:
+            # 没有唯一公共行的大区域（大量重复行）打开 autojunk，限制比对开销
+            matcher = SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=large)
+            for i, j, size in matcher.get_matching_blocks():
+                _add_block(blocks, alo + i, blo + j, size)
+
+    _add_block(blocks, ahi, bhi, suffix)
+
+
+def diff_opcodes(a_lines: List[str], b_lines: List[str], patience_min_lines: int = 2000) -> List[Opcode]:
+    """
+    计算两组行的编辑操作（格式同 SequenceMatcher.get_opcodes）
+
+    Args:
+        a_lines: 旧版本行
+        b_lines: 新版本行
+        patience_min_lines: 两侧行数之和达到该值时裁剪前后缀并使用 patience 算法，否则整体用 SequenceMatcher（与 difflib 一致）
+
+    Returns:
+        (tag, i1, i2, j1, j2) 列表
+    """
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(line, len(ids)) for line in a_lines]
+    b = [ids.setdefault(line, len(ids)) for line in b_lines]
+
+    if len(a) + len(b) < patience_min_lines:
+        # 小输入直接在未裁剪的整体上比对：裁剪公共前后缀在行重复（!、 shutdown）时会选出与 difflib 不同的对齐
+        return SequenceMatcher(None, a, b).get_opcodes()
+
+    blocks: List[List[int]] = []
+    _match(a, b, 0, len(a), 0, len(b), blocks, patience_min_lines)
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in blocks + [[len(a), len(b), 0]]:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def _grouped(opcodes: List[Opcode], context: int) -> Iterator[List[Opcode]]:
+    """按上下文行数把编辑操作分组为 hunk（逻辑同 SequenceMatcher.get_grouped_opcodes）"""
+    codes = list(opcodes) or [('equal', 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    """hunk 头中的行范围（同 difflib）"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def unified_lines(a_lines: List[str], b_lines: List[str], context: int = 3,
+                  patience_min_lines: int = 2000) -> Tuple[List[str], int, int]:
+    """
+    生成 unified diff 的 hunk 行（不含 ---/+++ 文件头）
+
+    Returns:
+        (hunk 行列表, 新增行数, 删除行数)
+    """
+    opcodes = diff_opcodes(a_lines, b_lines, patience_min_lines)
+    added = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ('replace', 'insert'))
+    removed = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ('replace', 'delete'))
+
+    lines: List[str] = []
+    for group in _grouped(opcodes, context):
+        first, last = group[0], group[-1]
+        lines.append(f'@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@')
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend(' ' + line for line in a_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                lines.extend('-' + line for line in a_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                lines.extend('+' + line for line in b_lines[j1:j2])
+    return lines, added, removed
+
+
+def split_sections(lines: List[str]) -> "OrderedDict[Tuple[str, int], List[str]]":
+    """
+    按段切分配置：顶格行为段头，其后的缩进行属于该段；分隔符 / 注释行不属于任何段
+
+    Returns:
+        (段头, 同名段序号) 到段内各行（含段头）的有序映射
+    """
+    sections: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+    occurrences: Dict[str, int] = {}
+    current: Optional[List[str]] = None
+    for line in lines:
+        if line[:1].isspace():
+            if current is None:
+                current = sections.setdefault(('', 0), [])
+            current.append(line)
+        elif not line.strip() or line.startswith(_SECTION_SEPARATORS):
+            current = None
+        else:
+            index = occurrences.get(line, 0)
+            occurrences[line] = index + 1
+            current = sections[(line, index)] = [line]
+    return sections
+
+
+class ConfigDiffService:
+    """配置差异计算与结果缓存"""
+
+    def __init__(self, max_entries: int = 256, patience_min_lines: int = 2000, enabled: bool = True):
+        """
+        初始化差异服务
+
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            patience_min_lines: 待比对区域达到该行数时使用 patience 算法
+            enabled: 是否启用缓存
+        """
+        self.max_entries = max_entries
+        self.patience_min_lines = patience_min_lines
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def diff_text(self, content1: str, content2: str, context: int = 3,
+                  section_aware: bool = False) -> Dict[str, Any]:
+        """
+        比对两段配置文本（不经过缓存）
+
+        Args:
+            content1: 旧版本配置
+            content2: 新版本配置
+            context: 上下文行数
+            section_aware: 是否同时按段比对
+
+        Returns:
+            {"lines": hunk 行, "added": 新增行数, "removed": 删除行数, "sections": 按段差异或 None}
+        """
+        a_lines = content1.splitlines()
+        b_lines = content2.splitlines()
+        lines, added, removed = unified_lines(a_lines, b_lines, context, self.patience_min_lines)
+        result = {"lines": lines, "added": added, "removed": removed, "sections": None}
+        if section_aware:
+            result["sections"] = self._diff_sections(a_lines, b_lines, context)
+        return result
+
+    def _diff_sections(self, a_lines: List[str], b_lines: List[str], context: int) -> List[Dict[str, Any]]:
+        """按段比对：只对内容变化的段生成差异（新增 / 修改按新版本顺序，删除的段排在最后）"""
+        old = split_sections(a_lines)
+        new = split_sections(b_lines)
+
+        sections = []
+        for key, lines in new.items():
+            old_lines = old.get(key)
+            if old_lines == lines:
+                continue
+            status = "added" if old_lines is None else "modified"
+            sections.append(self._section_entry(key[0], status, old_lines or [], lines, context))
+        for key, lines in old.items():
+            if key not in new:
+                sections.append(self._section_entry(key[0], "removed", lines, [], context))
+        return sections
+
+    def _section_entry(self, header: str, status: str, a_lines: List[str], b_lines: List[str],
+                       context: int) -> Dict[str, Any]:
+        lines, added, removed = unified_lines(a_lines, b_lines, context, self.patience_min_lines)
+        return {
+            "section": header,
+            "status": status,
+            "added": added,
+            "removed": removed,
+            "diff": "\n".join(lines),
+        }
+
+    @staticmethod
+    def _content_key(config: Configuration, ignore_volatile: bool) -> Optional[Hashable]:
+        """缓存键中代表一侧配置的部分（没有配置哈希的旧记录不缓存）"""
+        if not config.config_hash:
+            return None
+        return config.config_hash if ignore_volatile else (config.id, config.config_hash)
+
+    def diff_configurations(
+        self,
+        db: Session,
+        config1: Configuration,
+        config2: Configuration,
+        vendor: Optional[str] = None,
+        context: int = 3,
+        section_aware: bool = False,
+        ignore_volatile: bool = False
+    ) -> Dict[str, Any]:
+        """
+        比对两个配置版本（优先读缓存，未命中才还原配置全文）
+
+        Args:
+            db: 数据库 Session
+            config1: 旧版本
+            config2: 新版本
+            vendor: 设备厂商（忽略易变行时用于选择规则）
+            context: 上下文行数
+            section_aware: 是否同时按段比对
+            ignore_volatile: 是否忽略时间戳等易变行
+
+        Returns:
+            diff_text 的结果
+        """
+        key1 = self._content_key(config1, ignore_volatile)
+        key2 = self._content_key(config2, ignore_volatile)
+        key = (key1, key2, context, section_aware, ignore_volatile) if key1 and key2 else None
+
+        if key is not None:
+            hit, value = self.get(key)
+            if hit:
+                return value
+
+        contents = load_config_contents(db, [config1, config2])
+        content1 = contents[config1.id] or ""
+        content2 = contents[config2.id] or ""
+        if ignore_volatile:
+            content1 = normalize_config(content1, vendor)
+            content2 = normalize_config(content2, vendor)
+
+        result = self.diff_text(content1, content2, context, section_aware)
+        if key is not None:
+            self.put(key, result)
+        return result
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Dict[str, Any]) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 差异结果
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'patience_min_lines': self.patience_min_lines,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+            }
+
+
+def format_unified_diff(lines: List[str], fromfile: str, tofile: str) -> str:
+    """
+    拼接文件头，生成与 difflib.unified_diff(lineterm="") 相同的文本（无差异时为空字符串）
+
+    Args:
+        lines: hunk 行
+        fromfile: 旧版本描述
+        tofile: 新版本描述
+
+    Returns:
+        unified diff 文本
+    """
+    if not lines:
+        return ""
+    return "\n".join([f"--- {fromfile}", f"+++ {tofile}"] + lines)
+
+
+def _create_service() -> ConfigDiffService:
+    """根据全局配置创建差异服务实例"""
+    from app.config import settings
+
+    return ConfigDiffService(
+        max_entries=settings.CONFIG_DIFF_CACHE_MAX_ENTRIES,
+        patience_min_lines=settings.CONFIG_DIFF_PATIENCE_MIN_LINES,
+        enabled=settings.CONFIG_DIFF_CACHE_ENABLED,
+    )
+
+
+# 全局差异服务实例
+config_diff_service = _create_service()
+
+
+def get_config_diff_service() -> ConfigDiffService:
+    """
+    获取配置差异服务实例
+
+    Returns:
+        ConfigDiffService 实例
+    """
+    return config_diff_service
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+配置内容哈希
+
+功能：
+1. 按厂商去掉运行配置中每次采集都会变化、但不代表配置变更的行
+   （如 Cisco 的 "! Last configuration change at"、ntp clock-period，华为的 "!Last configuration was updated at"）
+2. 统一换行与行尾空白后计算 SHA-256，作为 Configuration.config_hash
+3. 配置是否变化只比较哈希，不再读取并比较完整配置文本
+
+说明：
+- 易变行规则按 Netmiko 设备类型登记，厂商名称到设备类型的映射沿用 NetmikoService.DEVICE_TYPE_MAPPING
+- 规则调整后旧哈希不再可比，采集时发现最新记录哈希为空会按当前规则重新计算并回填
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Pattern
+
+# Cisco 系（IOS / NX-OS / ASA）与沿用 Cisco 风格的锐捷
+_CISCO_VOLATILE = [
+    r'^Building configuration\.\.\.',
+    r'^Current configuration\s*:\s*\d+ bytes',
+    r'^! Last configuration change at ',
+    r'^! NVRAM config last updated at ',
+    r'^! No configuration change since last restart',
+    r'^!Time: ',
+    r'^ntp clock-period \d+',
+    r'^Cryptochecksum:',
+    r'^: Written by .* at ',
+]
+
+# 华为 / 华三
+_HUAWEI_VOLATILE = [
+    r'^!Last configuration was (?:updated|saved) at ',
+    r'^!Time: ',
+]
+
+VOLATILE_LINE_PATTERNS: Dict[str, List[str]] = {
+    "cisco_ios": _CISCO_VOLATILE,
+    "cisco_nxos": _CISCO_VOLATILE,
+    "cisco_asa": _CISCO_VOLATILE,
+    "ruijie_os": _CISCO_VOLATILE,
+    "huawei": _HUAWEI_VOLATILE,
+    "hp_comware": _HUAWEI_VOLATILE,
+}
+
+_compiled: Dict[str, Optional[Pattern]] = {}
+
+
+def _device_type(vendor: Optional[str]) -> Optional[str]:
+    """厂商名称转设备类型（未知厂商返回None）"""
+    from app.services.netmiko_service import NetmikoService
+
+    return NetmikoService.parser_device_type(vendor)
+
+
+def _volatile_pattern(device_type: Optional[str]) -> Optional[Pattern]:
+    """获取设备类型的易变行正则（合并为一个多行正则，缓存编译结果）"""
+    if device_type not in _compiled:
+        rules = VOLATILE_LINE_PATTERNS.get(device_type)
+        _compiled[device_type] = re.compile('|'.join(f'(?:{rule})' for rule in rules)) if rules else None
+    return _compiled[device_type]
+
+
+def normalize_config(config_content: str, vendor: Optional[str] = None) -> str:
+    """
+    规范化配置文本：统一换行、去掉行尾空白、首尾空行与厂商易变行
+
+    Args:
+        config_content: 原始配置文本
+        vendor: 设备厂商（未知厂商只做通用规范化）
+
+    Returns:
+        规范化后的配置文本
+    """
+    pattern = _volatile_pattern(_device_type(vendor))
+    lines = []
+    for line in config_content.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        line = line.rstrip()
+        if pattern is not None and pattern.match(line):
+            continue
+        lines.append(line)
+    return '\n'.join(lines).strip('\n')
+
+
+def compute_config_hash(config_content: Optional[str], vendor: Optional[str] = None) -> str:
+    """
+    计算配置哈希（忽略厂商易变行）
+
+    Args:
+        config_content: 原始配置文本
+        vendor: 设备厂商
+
+    Returns:
+        64 位十六进制 SHA-256
+    """
+    normalized = normalize_config(config_content or "", vendor)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+配置版本存储编码
+
+功能：
+1. 配置版本按"关键帧 + 增量"存储：关键帧为 zlib 压缩的全文，其余版本只存相对关键帧的行级增量（同样 zlib 压缩）
+2. 增量始终相对所属关键帧而不是上一版本，任一版本最多解压一个关键帧、应用一次增量即可还原
+3. 关键帧之后的增量数达到 CONFIG_KEYFRAME_INTERVAL，或增量超过关键帧压缩大小的 CONFIG_DELTA_MAX_RATIO 时，改存新关键帧
+4. API 读取时透明还原；批量读取时同一关键帧只查询、解压一次
+
+存储格式（Configuration.storage_format）：
+- plain: 明文存于 config_content（旧数据及 CONFIG_STORAGE_MODE=plain）
+- full: 关键帧，config_data = zlib(全文)
+- delta: 增量，config_data = zlib(JSON 操作列表)，base_config_id 指向关键帧；
+  操作 [i, j] 表示复制关键帧第 i 到 j 行（不含 j），字符串表示新增文本
+"""
+
+import json
+import logging
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import Configuration
+
+logger = logging.getLogger(__name__)
+
+STORAGE_PLAIN = "plain"
+STORAGE_FULL = "full"
+STORAGE_DELTA = "delta"
+
+_COMPRESS_LEVEL = 6
+
+
+def compress_config(content: str) -> bytes:
+    """压缩配置全文"""
+    return zlib.compress(content.encode('utf-8'), _COMPRESS_LEVEL)
+
+
+def decompress_config(data: bytes) -> str:
+    """解压配置全文"""
+    return zlib.decompress(data).decode('utf-8')
+
+
+def _append_copy(ops: List[Union[List[int], str]], start: int, end: int):
+    """追加复制操作，与前一个相邻的复制操作合并"""
+    if start >= end:
+        return
+    if ops and isinstance(ops[-1], list) and ops[-1][1] == start:
+        ops[-1][1] = end
+    else:
+        ops.append([start, end])
+
+
+def encode_delta(base: str, content: str) -> bytes:
+    """
+    计算 content 相对 base 的行级增量
+
+    Args:
+        base: 关键帧全文
+        content: 当前版本全文
+
+    Returns:
+        压缩后的增量
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = content.splitlines(keepends=True)
+
+    # 相邻版本通常只有少量行变化：先去掉公共前后缀，只对中间区域做序列比对
+    limit = min(len(base_lines), len(lines))
+    prefix = 0
+    while prefix < limit and base_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and base_lines[-1 - suffix] == lines[-1 - suffix]:
+        suffix += 1
+
+    ops: List[Union[List[int], str]] = []
+    _append_copy(ops, 0, prefix)
+
+    base_middle = base_lines[prefix:len(base_lines) - suffix]
+    middle = lines[prefix:len(lines) - suffix]
+    if base_middle and middle:
+        matcher = SequenceMatcher(None, base_middle, middle)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                _append_copy(ops, prefix + i1, prefix + i2)
+            elif j2 > j1:
+                ops.append(''.join(middle[j1:j2]))
+    elif middle:
+        ops.append(''.join(middle))
+
+    _append_copy(ops, len(base_lines) - suffix, len(base_lines))
+
+    payload = json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(payload.encode('utf-8'), _COMPRESS_LEVEL)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """
+    由关键帧和增量还原配置全文
+
+    Args:
+        base: 关键帧全文
+        delta: encode_delta 生成的增量
+
+    Returns:
+        配置全文
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta).decode('utf-8')):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def encode_version(
+    content: Optional[str],
+    keyframe_content: Optional[str] = None,
+    keyframe_size: int = 0,
+    deltas_since_keyframe: int = 0,
+    mode: Optional[str] = None
+) -> Tuple[str, Optional[bytes]]:
+    """
+    按存储策略编码一个配置版本（ORM 写入与迁移脚本共用）
+
+    Args:
+        content: 配置全文
+        keyframe_content: 设备当前关键帧全文（没有关键帧时为 None）
+        keyframe_size: 关键帧压缩后字节数
+        deltas_since_keyframe: 已挂在该关键帧上的增量版本数
+        mode: 存储模式，默认取 CONFIG_STORAGE_MODE
+
+    Returns:
+        (storage_format, config_data)，plain 格式的 config_data 为 None
+    """
+    mode = mode or settings.CONFIG_STORAGE_MODE
+    if content is None or mode not in ("delta", "compressed"):
+        return STORAGE_PLAIN, None
+
+    if (mode == "delta" and keyframe_content is not None
+            and deltas_since_keyframe < settings.CONFIG_KEYFRAME_INTERVAL):
+        delta = encode_delta(keyframe_content, content)
+        if len(delta) <= keyframe_size * settings.CONFIG_DELTA_MAX_RATIO:
+            return STORAGE_DELTA, delta
+
+    return STORAGE_FULL, compress_config(content)
+
+
+def store_config_content(db: Session, config: Configuration, content: Optional[str], mode: Optional[str] = None):
+    """
+    按存储策略写入配置内容（新版本入库前调用，config.device_id 须已设置）
+
+    Args:
+        db: 数据库 Session
+        config: 待写入的配置记录
+        content: 配置全文
+        mode: 存储模式，默认取 CONFIG_STORAGE_MODE
+    """
+    mode = mode or settings.CONFIG_STORAGE_MODE
+    keyframe = None
+    keyframe_content = None
+    deltas = 0
+    if content is not None and mode == "delta":
+        keyframe = db.query(Configuration.id, Configuration.config_data).filter(
+            Configuration.device_id == config.device_id,
+            Configuration.storage_format == STORAGE_FULL
+        ).order_by(Configuration.id.desc()).first()
+        if keyframe:
+            keyframe_content = decompress_config(keyframe.config_data)
+            deltas = db.query(func.count(Configuration.id)).filter(
+                Configuration.base_config_id == keyframe.id
+            ).scalar()
+
+    storage_format, data = encode_version(
+        content, keyframe_content, len(keyframe.config_data) if keyframe else 0, deltas, mode
+    )
+    config.storage_format = storage_format
+    config.config_data = data
+    config.config_content = content if storage_format == STORAGE_PLAIN else None
+    config.base_config_id = keyframe.id if storage_format == STORAGE_DELTA else None
+
+
+def load_config_contents(db: Session, configs: Iterable[Configuration]) -> Dict[int, Optional[str]]:
+    """
+    批量还原配置全文（同一关键帧只查询、解压一次）
+
+    Args:
+        db: 数据库 Session
+        configs: 配置记录
+
+    Returns:
+        配置 ID 到全文的映射
+    """
+    configs = list(configs)
+    keyframe_data = {c.id: c.config_data for c in configs if c.storage_format == STORAGE_FULL}
+    missing = {
+        c.base_config_id for c in configs
+        if c.storage_format == STORAGE_DELTA and c.base_config_id not in keyframe_data
+    }
+    if missing:
+        rows = db.query(Configuration.id, Configuration.config_data).filter(
+            Configuration.id.in_(missing)
+        ).all()
+        keyframe_data.update({row.id: row.config_data for row in rows})
+
+    keyframes: Dict[int, str] = {}
+
+    def keyframe_text(keyframe_id: int, owner_id: int) -> str:
+        if keyframe_id not in keyframes:
+            if keyframe_data.get(keyframe_id) is None:
+                raise ValueError(f"配置 {owner_id} 的关键帧 {keyframe_id} 不存在")
+            keyframes[keyframe_id] = decompress_config(keyframe_data[keyframe_id])
+        return keyframes[keyframe_id]
+
+    contents: Dict[int, Optional[str]] = {}
+    for config in configs:
+        if config.storage_format == STORAGE_FULL:
+            contents[config.id] = keyframe_text(config.id, config.id)
+        elif config.storage_format == STORAGE_DELTA:
+            contents[config.id] = apply_delta(keyframe_text(config.base_config_id, config.id), config.config_data)
+        else:
+            contents[config.id] = config.config_content
+    return contents
+
+
+def get_config_content(db: Session, config: Configuration) -> Optional[str]:
+    """
+    还原单个配置版本的全文
+
+    Args:
+        db: 数据库 Session
+        config: 配置记录
+
+    Returns:
+        配置全文
+    """
+    if config.storage_format in (STORAGE_FULL, STORAGE_DELTA):
+        return load_config_contents(db, [config])[config.id]
+    return config.config_content
+
+
+def release_keyframe(db: Session, config: Configuration):
+    """
+    删除配置记录前调用：若它是关键帧，把依赖它的增量版本改挂到新关键帧
+    （最早的依赖版本升级为关键帧，其余版本相对它重新计算增量）
+
+    Args:
+        db: 数据库 Session
+        config: 将被删除的配置记录
+    """
+    if config.storage_format != STORAGE_FULL:
+        return
+
+    # 同批次中已标记删除但尚未 flush 的依赖版本不参与改挂，否则会把它升级为关键帧后随即删掉
+    dependents = [
+        dependent for dependent in db.query(Configuration).filter(
+            Configuration.base_config_id == config.id
+        ).order_by(Configuration.id).all()
+        if dependent not in db.deleted
+    ]
+    if not dependents:
+        return
+
+    base = decompress_config(config.config_data)
+    contents = [apply_delta(base, dependent.config_data) for dependent in dependents]
+
+    new_keyframe = dependents[0]
+    new_keyframe.storage_format = STORAGE_FULL
+    new_keyframe.config_data = compress_config(contents[0])
+    new_keyframe.base_config_id = None
+    for dependent, content in zip(dependents[1:], contents[1:]):
+        dependent.config_data = encode_delta(contents[0], content)
+        dependent.base_config_id = new_keyframe.id
+
+    # Session 未开启 autoflush：立即落库，后续删除新关键帧时才能查到改挂后的依赖
+    db.flush()
+    logger.info(f"关键帧 {config.id} 删除前已将 {len(dependents)} 个增量版本改挂到 {new_keyframe.id}")
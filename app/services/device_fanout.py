@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+设备并发采集（Fan-out）引擎
+
+功能：
+1. 单批次并发上限 + 全局并发上限（跨批次共享）
+2. 按厂商 / 站点（Device.location）的并发上限
+3. 单设备截止时间（超时即放弃该设备，不影响其他设备）
+4. 以异步生成器流式返回结果，设备完成即产出
+
+说明：
+- 总耗时取决于最慢的设备，而不是所有设备耗时之和
+- 沿用 SSHConnectionPool 的懒初始化模式：asyncio 对象在首次使用时创建，
+  并在事件循环变化时重建，避免模块导入时无事件循环的问题
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.models.models import Device
+
+logger = logging.getLogger(__name__)
+
+
+def parse_concurrency_caps(raw: Optional[str]) -> Dict[str, int]:
+    """
+    解析按键并发上限配置
+
+    Args:
+        raw: 形如 "huawei:10,cisco:20" 的字符串
+
+    Returns:
+        {键(小写): 上限} 字典，非法项被忽略
+    """
+    caps: Dict[str, int] = {}
+    if not raw:
+        return caps
+
+    for item in raw.split(','):
+        if ':' not in item:
+            continue
+        key, _, value = item.partition(':')
+        key = key.strip().lower()
+        try:
+            limit = int(value.strip())
+        except ValueError:
+            logger.warning(f"[Fan-out] 忽略非法并发配置项：{item}")
+            continue
+        if key and limit > 0:
+            caps[key] = limit
+    return caps
+
+
+@dataclass
+class FanoutLimits:
+    """单次 Fan-out 的并发限制"""
+    batch_concurrency: int = 20
+    vendor_caps: Dict[str, int] = field(default_factory=dict)
+    default_vendor_cap: int = 0  # 0 表示不限制
+    site_cap: int = 0  # 0 表示不限制
+    device_timeout: Optional[float] = None  # None 表示不设截止时间
+
+    @classmethod
+    def from_settings(cls) -> "FanoutLimits":
+        """从全局配置构建默认限制"""
+        from app.config import settings
+
+        return cls(
+            batch_concurrency=settings.COLLECTION_BATCH_CONCURRENCY,
+            vendor_caps=parse_concurrency_caps(settings.COLLECTION_VENDOR_CONCURRENCY),
+            default_vendor_cap=settings.COLLECTION_DEFAULT_VENDOR_CONCURRENCY,
+            site_cap=settings.COLLECTION_SITE_CONCURRENCY,
+            device_timeout=settings.COLLECTION_DEVICE_TIMEOUT or None,
+        )
+
+
+@dataclass
+class FanoutResult:
+    """单设备执行结果"""
+    device: Device
+    value: Any = None
+    error: Optional[str] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class DeviceFanoutEngine:
+    """
+    设备并发执行引擎
+
+    全局信号量在所有批次间共享，用于限制整个进程同时操作的设备数；
+    批次、厂商、站点信号量在每次 run() 内创建。
+    """
+
+    def __init__(self, global_concurrency: int = 50):
+        """
+        初始化引擎（懒初始化模式）
+
+        Args:
+            global_concurrency: 全局最大并发设备数
+        """
+        self.global_concurrency = max(1, global_concurrency)
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+
+    def _ensure_initialized(self):
+        """确保全局信号量已在当前事件循环中创建"""
+        loop = asyncio.get_running_loop()
+        if self._global_semaphore is None or self._loop is not loop:
+            self._global_semaphore = asyncio.Semaphore(self.global_concurrency)
+            self._loop = loop
+            self._in_flight = 0
+
+    @staticmethod
+    def _vendor_key(device: Device) -> str:
+        return (getattr(device, 'vendor', None) or '').lower().strip()
+
+    @staticmethod
+    def _site_key(device: Device) -> Optional[str]:
+        location = getattr(device, 'location', None)
+        return location.strip() if isinstance(location, str) and location.strip() else None
+
+    async def run(
+        self,
+        devices: List[Device],
+        worker: Callable[[Device], Awaitable[Any]],
+        limits: Optional[FanoutLimits] = None
+    ) -> AsyncIterator[FanoutResult]:
+        """
+        并发执行 worker，按完成顺序产出结果
+
+        Args:
+            devices: 设备列表
+            worker: 针对单设备的协程函数
+            limits: 并发限制，None 时使用全局配置
+
+        Yields:
+            FanoutResult
+        """
+        self._ensure_initialized()
+        limits = limits or FanoutLimits.from_settings()
+
+        batch_semaphore = asyncio.Semaphore(max(1, limits.batch_concurrency))
+        vendor_semaphores: Dict[str, asyncio.Semaphore] = {}
+        site_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        def keyed_semaphores(device: Device) -> List[asyncio.Semaphore]:
+            semaphores = []
+            if limits.site_cap > 0:
+                site = self._site_key(device)
+                if site is not None:
+                    if site not in site_semaphores:
+                        site_semaphores[site] = asyncio.Semaphore(limits.site_cap)
+                    semaphores.append(site_semaphores[site])
+
+            vendor = self._vendor_key(device)
+            vendor_cap = limits.vendor_caps.get(vendor, limits.default_vendor_cap)
+            if vendor_cap > 0:
+                if vendor not in vendor_semaphores:
+                    vendor_semaphores[vendor] = asyncio.Semaphore(vendor_cap)
+                semaphores.append(vendor_semaphores[vendor])
+            return semaphores
+
+        async def run_one(device: Device) -> FanoutResult:
+            # 获取顺序固定（站点 → 厂商 → 批次 → 全局），先等最窄的限制，避免空占全局名额
+            semaphores = keyed_semaphores(device) + [batch_semaphore, self._global_semaphore]
+            acquired = []
+            try:
+                for semaphore in semaphores:
+                    await semaphore.acquire()
+                    acquired.append(semaphore)
+
+                self._in_flight += 1
+                start = time.monotonic()
+                try:
+                    if limits.device_timeout:
+                        value = await asyncio.wait_for(worker(device), timeout=limits.device_timeout)
+                    else:
+                        value = await worker(device)
+                    return FanoutResult(device=device, value=value, elapsed=time.monotonic() - start)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"[Fan-out] 设备 {device.hostname} 超过截止时间 {limits.device_timeout}s，已放弃"
+                    )
+                    return FanoutResult(
+                        device=device,
+                        error=f"采集超时（{limits.device_timeout}s）",
+                        timed_out=True,
+                        elapsed=time.monotonic() - start
+                    )
+                except Exception as e:
+                    logger.error(f"[Fan-out] 设备 {device.hostname} 执行失败：{e}")
+                    return FanoutResult(device=device, error=str(e), elapsed=time.monotonic() - start)
+                finally:
+                    self._in_flight -= 1
+            finally:
+                for semaphore in reversed(acquired):
+                    semaphore.release()
+
+        tasks = [asyncio.ensure_future(run_one(device)) for device in devices]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前退出时取消未完成的任务
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取引擎统计信息"""
+        return {
+            "global_concurrency": self.global_concurrency,
+            "in_flight": self._in_flight,
+        }
+
+
+_fanout_engine: Optional[DeviceFanoutEngine] = None
+
+
+def get_fanout_engine() -> DeviceFanoutEngine:
+    """
+    获取全局 Fan-out 引擎实例
+
+    Returns:
+        DeviceFanoutEngine: 全局引擎（跨批次共享全局并发上限）
+    """
+    global _fanout_engine
+    if _fanout_engine is None:
+        from app.config import settings
+        _fanout_engine = DeviceFanoutEngine(settings.COLLECTION_GLOBAL_CONCURRENCY)
+    return _fanout_engine
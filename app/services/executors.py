@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+阻塞调用专用线程池
+
+功能：
+1. SSH I/O 线程池：承载所有阻塞的 Netmiko 调用（ConnectHandler / send_command / 分页读取 / is_alive）
+2. 数据库线程池：承载 asyncio 中包装的同步数据库操作
+3. 两者互相隔离，大规模采集不会占满默认线程池而拖住数据库提交，反之亦然
+4. 统计排队数、活跃线程数、排队等待时间，便于按设备规模调优
+
+说明：
+- 线程池懒创建，模块导入时不创建线程
+- run() 与 asyncio.to_thread 一样复制 contextvars
+- 数据库线程池默认与 SQLAlchemy 连接池容量（pool_size + max_overflow）一致，
+  更多线程只会阻塞在连接池上
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedExecutor:
+    """带统计的线程池"""
+
+    # 用于计算等待时间分位数的最近样本数
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        初始化线程池（不创建线程）
+
+        Args:
+            name: 线程池名称（同时作为线程名前缀）
+            max_workers: 最大线程数
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._peak_queued = 0
+        self._peak_active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """懒创建底层线程池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+                logger.info(f"线程池 {self.name} 已创建，最大线程数: {self.max_workers}")
+            return self._executor
+
+    def _instrument(self, func: Callable[[], Any], submitted_at: float) -> Any:
+        """在工作线程中执行，记录等待与执行耗时"""
+        started = time.monotonic()
+        wait = started - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._peak_active = max(self._peak_active, self._active)
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._recent_waits.append(wait)
+
+        failed = False
+        try:
+            return func()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._total_run += elapsed
+                if failed:
+                    self._failed += 1
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞调用
+
+        Args:
+            func: 阻塞函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        executor = self._get_executor()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        try:
+            future = loop.run_in_executor(executor, self._instrument, call, time.monotonic())
+        except RuntimeError:
+            # 线程池已关闭，任务未进入队列
+            with self._lock:
+                self._submitted -= 1
+                self._queued -= 1
+            raise
+        return await future
+
+    def shutdown(self, wait: bool = False):
+        """
+        关闭线程池（再次调用 run() 时会重新创建）
+
+        Args:
+            wait: 是否等待已提交任务完成
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info(f"线程池 {self.name} 已关闭")
+
+    def reset_stats(self):
+        """重置累计统计（不影响当前排队 / 活跃数）"""
+        with self._lock:
+            self._peak_queued = self._queued
+            self._peak_active = self._active
+            self._submitted = 0
+            self._completed = 0
+            self._failed = 0
+            self._total_wait = 0.0
+            self._max_wait = 0.0
+            self._total_run = 0.0
+            self._recent_waits.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取线程池统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            completed = self._completed
+            started = self._submitted - self._queued
+            stats = {
+                'name': self.name,
+                'max_workers': self.max_workers,
+                'started': self._executor is not None,
+                'queued': self._queued,
+                'active': self._active,
+                'peak_queued': self._peak_queued,
+                'peak_active': self._peak_active,
+                'submitted': self._submitted,
+                'completed': completed,
+                'failed': self._failed,
+                'avg_wait_ms': round(self._total_wait / started * 1000, 2) if started else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 2),
+                'avg_run_ms': round(self._total_run / completed * 1000, 2) if completed else 0.0,
+            }
+        stats['p95_wait_ms'] = round(waits[int(len(waits) * 0.95) - 1] * 1000, 2) if waits else 0.0
+        return stats
+
+
+def _create_executors():
+    """根据全局配置创建线程池"""
+    from app.config import settings
+
+    return (
+        InstrumentedExecutor('ssh-io', settings.SSH_EXECUTOR_MAX_WORKERS),
+        InstrumentedExecutor('db', settings.DB_EXECUTOR_MAX_WORKERS),
+    )
+
+
+# 全局线程池实例
+ssh_executor, db_executor = _create_executors()
+
+
+def get_ssh_executor() -> InstrumentedExecutor:
+    """
+    获取 SSH I/O 线程池
+
+    Returns:
+        InstrumentedExecutor 实例
+    """
+    return ssh_executor
+
+
+def get_db_executor() -> InstrumentedExecutor:
+    """
+    获取数据库线程池
+
+    Returns:
+        InstrumentedExecutor 实例
+    """
+    return db_executor
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """
+    获取全部线程池统计
+
+    Returns:
+        {线程池名称: 统计信息}
+    """
+    return {executor.name: executor.get_stats() for executor in (ssh_executor, db_executor)}
+
+
+def shutdown_executors(wait: bool = False):
+    """
+    关闭全部线程池
+
+    Args:
+        wait: 是否等待已提交任务完成
+    """
+    for executor in (ssh_executor, db_executor):
+        executor.shutdown(wait=wait)
@@ -1,15 +1,60 @@
 """
 Git服务模块
 提供基于Git的配置文件版本管理服务
+
+本地工作镜像：
+- 每个远程仓库（地址 + 分支）在 GIT_MIRROR_DIR 下保留一个长期的工作副本，首次使用时克隆，
+  之后的备份只写文件、提交、推送，不再每次完整克隆
+- 打开镜像时按 GIT_FETCH_INTERVAL 决定是否 fetch + merge 远程更新；推送被拒绝时同步后重推一次。
+  使用 merge 而不是 rebase：本地尚未推送的提交 ID 已写入数据库（Configuration.git_commit_id），不能改写
+- 同一镜像的索引操作（写文件、add、commit、merge、push）由进程内锁串行化，
+  多个 GitService 实例共用同一把锁；崩溃遗留的 index.lock 超时后自动清理
+- 按 GIT_GC_INTERVAL 定期执行 git gc --auto，避免松散对象随备份次数增长
+- 镜像的 origin 只保存不含认证信息的地址；访问令牌通过 GIT_CONFIG_* 环境变量以 http.extraHeader
+  传给每次 clone / fetch / push，不写入 .git/config。镜像根目录权限为 0700
 """
+import base64
+import hashlib
 import os
 import shutil
 import tempfile
+import threading
+import time
 from typing import Optional, Dict, Any
-from git import Repo, GitCommandError
+from git import Repo, GitCommandError, PushInfo
 
+from app.config import settings
 from app.models.models import GitConfig
 
+# 遗留 index.lock 超过该秒数视为崩溃残留
+STALE_INDEX_LOCK_SECONDS = 60
+
+# 推送失败的标志位（被拒绝 / 远程拒绝 / 远程失败 / 其他错误）
+PUSH_ERROR_FLAGS = PushInfo.REJECTED | PushInfo.REMOTE_REJECTED | PushInfo.REMOTE_FAILURE | PushInfo.ERROR
+
+# 镜像目录 -> 索引锁 / 同步与 gc 时间（进程内共享）
+_mirror_locks: Dict[str, threading.RLock] = {}
+_mirror_state: Dict[str, Dict[str, float]] = {}
+_mirror_registry_lock = threading.Lock()
+
+
+def _get_mirror_lock(repo_path: str) -> threading.RLock:
+    """
+    获取镜像目录对应的索引锁
+
+    Args:
+        repo_path: 镜像目录
+
+    Returns:
+        可重入锁（同一目录始终返回同一把锁）
+    """
+    key = os.path.abspath(repo_path)
+    with _mirror_registry_lock:
+        if key not in _mirror_locks:
+            _mirror_locks[key] = threading.RLock()
+            _mirror_state[key] = {'last_sync': 0.0, 'last_gc': time.monotonic()}
+        return _mirror_locks[key]
+
 
 class GitService:
     """
@@ -17,68 +62,174 @@ class GitService:
     提供Git仓库初始化、配置提交、推送等功能
     """
 
-    def __init__(self):
-        """初始化Git服务"""
-        self.temp_repo_dir = None
+    def __init__(self, mirror_root: Optional[str] = None):
+        """
+        初始化Git服务
+
+        Args:
+            mirror_root: 本地镜像根目录，默认使用 settings.GIT_MIRROR_DIR
+        """
+        self.mirror_root = mirror_root or settings.GIT_MIRROR_DIR
         self.repo = None
+        self.branch = None
+        self._lock = None
+        self._state = None
+        self._env: Dict[str, str] = {}
 
-    def _get_temp_dir(self) -> str:
+    @staticmethod
+    def _auth_env(git_config: GitConfig) -> Dict[str, str]:
         """
-        获取临时目录
+        构造只对单次 git 命令生效的认证环境变量（不写入镜像的 .git/config，也不出现在命令行参数中）
+
+        Args:
+            git_config: Git配置对象
 
         Returns:
-            临时目录路径
+            环境变量，无认证信息时为空
         """
-        if not self.temp_repo_dir:
-            self.temp_repo_dir = tempfile.mkdtemp()
-        return self.temp_repo_dir
+        if not (git_config.username and git_config.password):
+            return {}
+        # 使用 Personal Access Token 认证（推荐），与 https://oauth2:<token>@ 等价
+        token = base64.b64encode(f"oauth2:{git_config.password}".encode('utf-8')).decode('ascii')
+        return {
+            'GIT_CONFIG_COUNT': '1',
+            'GIT_CONFIG_KEY_0': 'http.extraHeader',
+            'GIT_CONFIG_VALUE_0': f'Authorization: Basic {token}',
+        }
 
-    def _cleanup_temp_dir(self):
+    def _ensure_mirror_root(self):
+        """创建镜像根目录并限制为仅属主可访问"""
+        os.makedirs(self.mirror_root, mode=0o700, exist_ok=True)
+        os.chmod(self.mirror_root, 0o700)
+
+    def mirror_path(self, git_config: GitConfig) -> str:
         """
-        清理临时目录
+        获取远程仓库对应的本地镜像目录
+
+        Args:
+            git_config: Git配置对象
+
+        Returns:
+            镜像目录（按不含认证信息的仓库地址 + 分支区分）
         """
-        if self.temp_repo_dir and os.path.exists(self.temp_repo_dir):
-            shutil.rmtree(self.temp_repo_dir)
-            self.temp_repo_dir = None
-        self.repo = None
+        repo_name = git_config.repo_url.rstrip('/').split('/')[-1].replace('.git', '') or 'repo'
+        digest = hashlib.sha1(f"{git_config.repo_url}#{git_config.branch}".encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.mirror_root, f"{repo_name}-{digest}")
 
     def init_repo(self, git_config: GitConfig, local_path: Optional[str] = None) -> bool:
         """
-        初始化Git仓库
+        打开（首次使用时克隆）本地工作镜像
 
         Args:
             git_config: Git配置对象
-            local_path: 本地仓库路径，默认使用临时目录
+            local_path: 本地仓库路径，默认使用 mirror_path(git_config)
 
         Returns:
             初始化是否成功
         """
-        try:
-            repo_path = local_path or self._get_temp_dir()
-            
-            # 如果目录存在且是git仓库，直接返回
-            if os.path.exists(os.path.join(repo_path, '.git')):
-                self.repo = Repo(repo_path)
+        repo_path = local_path or self.mirror_path(git_config)
+        repo_url = git_config.repo_url
+        self.branch = git_config.branch
+        self._env = self._auth_env(git_config)
+        self._lock = _get_mirror_lock(repo_path)
+        self._state = _mirror_state[os.path.abspath(repo_path)]
+
+        with self._lock:
+            cloning = False
+            try:
+                # 已有镜像：远程地址与配置不一致时更新（同时清除旧版本写入地址中的令牌），按需同步
+                if os.path.exists(os.path.join(repo_path, '.git')):
+                    self.repo = Repo(repo_path)
+                    origin = self.repo.remote(name='origin')
+                    if origin.url != repo_url:
+                        origin.set_url(repo_url)
+                    self._clear_stale_index_lock()
+                    self.sync(force=False)
+                    return True
+
+                # 首次使用：克隆到镜像目录（清理上次中断的半成品）
+                if os.path.exists(repo_path):
+                    shutil.rmtree(repo_path, ignore_errors=True)
+                if local_path is None:
+                    self._ensure_mirror_root()
+                else:
+                    os.makedirs(os.path.dirname(os.path.abspath(repo_path)), exist_ok=True)
+                cloning = True
+                self.repo = Repo.clone_from(repo_url, repo_path, branch=git_config.branch, env=self._env)
+                self._ensure_identity()
+                self._state['last_sync'] = time.monotonic()
                 return True
-            
-            # 克隆远程仓库
-            if git_config.username and git_config.password:
-                # 使用 Personal Access Token 认证（推荐）
-                repo_url = git_config.repo_url.replace('https://', f'https://oauth2:{git_config.password}@')
-            else:
-                repo_url = git_config.repo_url
-            
-            self.repo = Repo.clone_from(repo_url, repo_path, branch=git_config.branch)
-            return True
-        except GitCommandError as e:
-            print(f"Git初始化失败: {e}")
-            self._cleanup_temp_dir()
+            except GitCommandError as e:
+                print(f"Git初始化失败: {e}")
+            except Exception as e:
+                print(f"初始化Git仓库时发生错误: {e}")
+            self.close()
+            if cloning:
+                shutil.rmtree(repo_path, ignore_errors=True)
             return False
-        except Exception as e:
-            print(f"初始化Git仓库时发生错误: {e}")
-            self._cleanup_temp_dir()
+
+    def _ensure_identity(self):
+        """未配置提交者身份时为镜像设置仓库级身份（合并提交需要）"""
+        reader = self.repo.config_reader()
+        if reader.has_option('user', 'name') and reader.has_option('user', 'email'):
+            return
+        with self.repo.config_writer() as writer:
+            writer.set_value('user', 'name', settings.APP_NAME)
+            writer.set_value('user', 'email', 'config-backup@localhost')
+
+    def _clear_stale_index_lock(self):
+        """清理崩溃遗留的 index.lock（进程内锁已保证没有并发的索引操作）"""
+        lock_file = os.path.join(self.repo.git_dir, 'index.lock')
+        try:
+            if time.time() - os.path.getmtime(lock_file) > STALE_INDEX_LOCK_SECONDS:
+                os.remove(lock_file)
+                print(f"已清理遗留的Git索引锁: {lock_file}")
+        except FileNotFoundError:
+            pass
+
+    def sync(self, force: bool = True) -> bool:
+        """
+        fetch 远程分支并合并（无本地提交时为快进，否则生成合并提交，本地提交 ID 不变）
+
+        Args:
+            force: 为 False 时距上次同步不足 GIT_FETCH_INTERVAL 秒则跳过
+
+        Returns:
+            同步是否成功（跳过也视为成功）
+        """
+        if not self.repo:
+            print("Git仓库未初始化")
             return False
 
+        with self._lock:
+            if not force and time.monotonic() - self._state['last_sync'] < settings.GIT_FETCH_INTERVAL:
+                return True
+            try:
+                with self.repo.git.custom_environment(**self._env):
+                    self.repo.remote(name='origin').fetch(self.branch)
+                self.repo.git.merge(f"origin/{self.branch}", '--no-edit')
+                self._state['last_sync'] = time.monotonic()
+                return True
+            except GitCommandError as e:
+                print(f"Git同步失败: {e}")
+                # 合并冲突时恢复原状，本地提交保留，等待下次同步或人工处理
+                try:
+                    self.repo.git.merge('--abort')
+                except GitCommandError:
+                    pass
+                return False
+
+    def _maybe_gc(self):
+        """距上次 gc 超过 GIT_GC_INTERVAL 秒时执行 git gc --auto"""
+        interval = settings.GIT_GC_INTERVAL
+        if interval <= 0 or time.monotonic() - self._state['last_gc'] < interval:
+            return
+        self._state['last_gc'] = time.monotonic()
+        try:
+            self.repo.git.gc('--auto', '--quiet')
+        except GitCommandError as e:
+            print(f"Git gc 失败: {e}")
+
     def commit_config(self, device_name: str, config_content: str, commit_message: str) -> Optional[str]:
         """
         提交配置文件
@@ -96,21 +247,23 @@ class GitService:
             return None
 
         try:
-            # 创建设备配置目录
-            device_dir = os.path.join(self.repo.working_dir, device_name)
-            os.makedirs(device_dir, exist_ok=True)
-            
-            # 写入配置文件
-            config_file = os.path.join(device_dir, f"{device_name}.config")
-            with open(config_file, 'w', encoding='utf-8') as f:
-                f.write(config_content)
-            
-            # 添加到暂存区
-            self.repo.index.add([config_file])
-            
-            # 提交
-            commit = self.repo.index.commit(commit_message)
-            return str(commit)
+            with self._lock:
+                # 创建设备配置目录
+                device_dir = os.path.join(self.repo.working_dir, device_name)
+                os.makedirs(device_dir, exist_ok=True)
+
+                # 写入配置文件
+                config_file = os.path.join(device_dir, f"{device_name}.config")
+                with open(config_file, 'w', encoding='utf-8') as f:
+                    f.write(config_content)
+
+                # 添加到暂存区
+                self.repo.index.add([config_file])
+
+                # 提交
+                commit = self.repo.index.commit(commit_message)
+                self._maybe_gc()
+                return str(commit)
         except GitCommandError as e:
             print(f"Git提交失败: {e}")
             return None
@@ -118,9 +271,15 @@ class GitService:
             print(f"提交配置时发生错误: {e}")
             return None
 
+    def _push_once(self) -> bool:
+        """推送一次，返回是否被远程接受"""
+        with self.repo.git.custom_environment(**self._env):
+            infos = self.repo.remote(name='origin').push(f"HEAD:refs/heads/{self.branch}")
+        return bool(infos) and not any(info.flags & PUSH_ERROR_FLAGS for info in infos)
+
     def push_to_remote(self) -> bool:
         """
-        推送到远程仓库
+        推送到远程仓库（被拒绝时 fetch + merge 后重推一次）
 
         Returns:
             推送是否成功
@@ -130,10 +289,14 @@ class GitService:
             return False
 
         try:
-            # 推送当前分支
-            origin = self.repo.remote(name='origin')
-            origin.push()
-            return True
+            with self._lock:
+                if self._push_once():
+                    return True
+                print("Git推送被拒绝，同步远程后重试")
+                if self.sync(force=True) and self._push_once():
+                    return True
+                print("Git推送失败: 远程拒绝")
+                return False
         except GitCommandError as e:
             print(f"Git推送失败: {e}")
             return False
@@ -234,9 +397,11 @@ class GitService:
 
     def close(self):
         """
-        关闭Git服务，清理资源
+        关闭Git服务，释放仓库句柄（本地镜像保留，供下次备份复用）
         """
-        self._cleanup_temp_dir()
+        if self.repo:
+            self.repo.close()
+        self.repo = None
 
 
 # 创建全局GitService实例
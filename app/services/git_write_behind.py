@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Git 配置写回阶段
+
+功能：
+1. 采集到的配置按设备提交到本地工作镜像（每台设备一个提交，提交 ID 照常写入数据库）
+2. 推送延后合并：
+   - 批量备份（BackupExecutor）在 batch() 范围内只提交不推送，整次运行结束时推送一次
+   - 独立触发的备份（定时任务、单台采集）在 GIT_PUSH_DELAY 秒的时间窗内合并为一次推送
+3. 推送失败按 GIT_PUSH_RETRIES 次数指数退避重试；仍失败时提交保留在本地镜像，下次推送一并带上
+4. 统计提交数、推送次数、重试与失败次数
+
+说明：
+- Git 操作是阻塞调用，通过 asyncio.to_thread 执行；同一镜像的索引操作由 GitService 的镜像锁串行化
+- 内部字典锁只在读写字典时持有，clone / fetch / gc 不在锁内执行，事件循环不会因此阻塞
+- 每个远程仓库（镜像）在一个推送周期内共用一个 GitService 实例，推送成功后释放
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set
+
+from app.models.models import GitConfig
+from app.services.git_service import GitService
+
+logger = logging.getLogger(__name__)
+
+
+class GitWriteBehind:
+    """Git 写回阶段：提交即时落本地镜像，推送按批次 / 时间窗合并"""
+
+    def __init__(self, push_delay: float, push_retries: int, retry_backoff: float):
+        """
+        初始化写回阶段
+
+        Args:
+            push_delay: 批次外的提交等待多少秒后合并推送，0 表示提交后立即推送
+            push_retries: 推送失败后的重试次数
+            retry_backoff: 重试退避基数（秒），第 n 次重试等待 retry_backoff * 2^(n-1)
+        """
+        self.push_delay = max(0.0, push_delay)
+        self.push_retries = max(0, push_retries)
+        self.retry_backoff = max(0.0, retry_backoff)
+        self._services: Dict[str, GitService] = {}
+        self._pending: Dict[str, int] = {}
+        # 只保护 _services / _pending / _busy 字典本身，任何 Git 操作都不在锁内执行
+        self._services_lock = threading.Lock()
+        # 每个镜像一把锁，串行化同一镜像的打开与提交（只在工作线程中获取）
+        self._path_locks: Dict[str, threading.Lock] = {}
+        # 正在打开或提交的镜像，推送完成后不释放其实例
+        self._busy: Set[str] = set()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_depth = 0
+        self._stats = {
+            'commits': 0, 'commit_failures': 0, 'pushes': 0, 'push_failures': 0,
+            'push_retries': 0, 'last_push_at': None, 'last_push_commits': 0,
+        }
+
+    def _commit_sync(self, git_config: GitConfig, device_name: str, config_content: str,
+                     commit_message: str) -> Optional[str]:
+        """
+        打开（本推送周期首次时）镜像并提交，在线程中调用
+
+        打开与提交只持有该镜像的路径锁；_services_lock 仅在读写字典时短暂持有，
+        clone / fetch / gc 期间事件循环上的 flush 与 get_stats 不会被阻塞
+        """
+        path = GitService().mirror_path(git_config)
+        with self._services_lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+
+        with path_lock:
+            with self._services_lock:
+                service = self._services.get(path)
+                self._busy.add(path)
+
+            commit_id = None
+            try:
+                if service is None:
+                    service = GitService()
+                    if not service.init_repo(git_config):
+                        return None
+                    with self._services_lock:
+                        self._services[path] = service
+                commit_id = service.commit_config(device_name, config_content, commit_message)
+            finally:
+                with self._services_lock:
+                    self._busy.discard(path)
+                    if commit_id:
+                        self._pending[path] = self._pending.get(path, 0) + 1
+                    released = self._release_idle(path)
+                if released is not None:
+                    released.close()
+            return commit_id
+
+    def _release_idle(self, path: str) -> Optional[GitService]:
+        """
+        镜像没有待推送提交且未在使用时移出实例（调用方需持有 _services_lock）
+
+        Returns:
+            被移出、需要关闭的实例
+        """
+        if self._pending.get(path) or path in self._busy:
+            return None
+        self._pending.pop(path, None)
+        return self._services.pop(path, None)
+
+    async def commit(self, git_config: GitConfig, device_name: str, config_content: str,
+                     commit_message: str) -> Optional[str]:
+        """
+        提交设备配置到本地镜像，推送延后合并
+
+        Args:
+            git_config: Git配置对象
+            device_name: 设备名称
+            config_content: 配置内容
+            commit_message: 提交信息
+
+        Returns:
+            提交ID，失败返回None
+        """
+        commit_id = await asyncio.to_thread(
+            self._commit_sync, git_config, device_name, config_content, commit_message
+        )
+        if not commit_id:
+            self._stats['commit_failures'] += 1
+            return None
+
+        self._stats['commits'] += 1
+        if self._batch_depth == 0:
+            if self.push_delay == 0:
+                await self.flush()
+            elif self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._delayed_flush())
+        return commit_id
+
+    async def _delayed_flush(self):
+        """时间窗结束后推送"""
+        await asyncio.sleep(self.push_delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Git 延迟推送失败：{e}")
+
+    @asynccontextmanager
+    async def batch(self):
+        """
+        批次范围：范围内的提交不推送，最外层批次结束时推送一次
+
+        用法：
+            async with get_git_write_behind().batch():
+                ...  # 多台设备 collect_device_config
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                await self.flush()
+
+    async def _push_with_retry(self, service: GitService) -> bool:
+        """推送一个镜像，失败时指数退避重试"""
+        for attempt in range(self.push_retries + 1):
+            if attempt:
+                self._stats['push_retries'] += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            if await asyncio.to_thread(service.push_to_remote):
+                return True
+            logger.warning(f"Git 推送失败（第 {attempt + 1} 次）")
+        return False
+
+    async def flush(self) -> bool:
+        """
+        推送所有有未推送提交的镜像
+
+        Returns:
+            是否全部推送成功（没有待推送提交时为 True）
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            with self._services_lock:
+                pending = {
+                    path: (self._services[path], count)
+                    for path, count in self._pending.items() if count
+                }
+            success = True
+            for path, (service, count) in pending.items():
+                if await self._push_with_retry(service):
+                    self._stats['pushes'] += 1
+                    self._stats['last_push_at'] = time.time()
+                    self._stats['last_push_commits'] = count
+                    logger.info(f"Git 推送完成，包含 {count} 个提交")
+                    with self._services_lock:
+                        self._pending[path] -= count
+                        released = self._release_idle(path)
+                    if released is not None:
+                        released.close()
+                else:
+                    # 提交保留在本地镜像，下次推送一并带上
+                    self._stats['push_failures'] += 1
+                    success = False
+                    logger.error(f"Git 推送重试 {self.push_retries} 次后仍失败，{count} 个提交留待下次推送")
+            return success
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取写回统计
+
+        Returns:
+            配置、待推送提交数与累计统计
+        """
+        with self._services_lock:
+            pending = sum(self._pending.values())
+        return {
+            'push_delay': self.push_delay,
+            'push_retries': self.push_retries,
+            'pending_commits': pending,
+            'in_batch': self._batch_depth > 0,
+            **self._stats,
+        }
+
+
+def _create_git_write_behind() -> GitWriteBehind:
+    """根据全局配置创建写回阶段"""
+    from app.config import settings
+
+    return GitWriteBehind(
+        push_delay=settings.GIT_PUSH_DELAY,
+        push_retries=settings.GIT_PUSH_RETRIES,
+        retry_backoff=settings.GIT_PUSH_RETRY_BACKOFF,
+    )
+
+
+# 全局写回阶段实例
+git_write_behind = _create_git_write_behind()
+
+
+def get_git_write_behind() -> GitWriteBehind:
+    """
+    获取 Git 写回阶段实例
+
+    Returns:
+        GitWriteBehind 实例
+    """
+    return git_write_behind
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位查询缓存
+
+功能：
+1. 进程内 LRU + TTL 缓存，按 IP 与列表查询参数缓存查询结果
+2. 新计算批次生效时整体失效（代数递增，旧代数写入的结果直接丢弃）
+3. 命中 / 未命中 / 淘汰统计，供监控接口查询
+
+说明：
+- 失效与写入均在锁内比较代数：失效前开始、失效后才完成的查询结果不会写入缓存
+- 缓存值由调用方共享，调用方不得修改返回的对象
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IPLocationCache:
+    """IP 定位查询结果的 LRU + TTL 缓存"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300, enabled: bool = True):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl_seconds: 条目存活时间（秒）
+            enabled: 是否启用缓存
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._batch_id: Optional[str] = None
+        self._invalidated_at: Optional[float] = None
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """当前缓存代数，查询数据库前读取并在写入时传回"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        if not self.enabled:
+            return False, None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> bool:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            generation: 查询开始时读取的缓存代数
+
+        Returns:
+            是否写入（查询期间缓存已失效时不写入）
+        """
+        if not self.enabled:
+            return False
+
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, batch_id: Optional[str] = None) -> None:
+        """
+        整体失效（新计算批次生效时调用）
+
+        Args:
+            batch_id: 生效的批次 ID，仅用于统计展示
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._invalidations += 1
+            self._invalidated_at = time.time()
+            if batch_id:
+                self._batch_id = batch_id
+        logger.debug(f"IP 定位缓存已失效，批次: {batch_id}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'expirations': self._expirations,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'generation': self._generation,
+                'batch_id': self._batch_id,
+                'invalidated_at': self._invalidated_at,
+            }
+
+    def reset_stats(self) -> None:
+        """清零命中统计（不影响缓存内容）"""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._expirations = 0
+            self._evictions = 0
+
+
+def _create_cache() -> IPLocationCache:
+    """根据全局配置创建缓存实例"""
+    from app.config import settings
+
+    return IPLocationCache(
+        max_entries=settings.IP_LOCATION_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.IP_LOCATION_CACHE_TTL_SECONDS,
+        enabled=settings.IP_LOCATION_CACHE_ENABLED,
+    )
+
+
+# 全局缓存实例
+ip_location_cache = _create_cache()
+
+
+def get_ip_location_cache() -> IPLocationCache:
+    """
+    获取 IP 定位缓存实例
+
+    Returns:
+        IPLocationCache 实例
+    """
+    return ip_location_cache
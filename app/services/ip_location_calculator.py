@@ -7,6 +7,7 @@ IP 定位预计算服务
 2. 预计算 IP 定位结果
 3. 冗余设备信息避免 N+1 查询
 4. 下线检测与历史归档
+5. 增量计算：只重算 ARP/MAC 变化的 IP，支持回退全量重建
 """
 
 import logging
@@ -17,14 +18,105 @@ from decimal import Decimal
 from dataclasses import dataclass, field
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import (
+    Column, DateTime, MetaData, String, Table, bindparam, exists, func, insert, literal, select, text, update
+)
 
 from app.models.models import Device
 from app.models.ip_location import IPLocationCurrent, IPLocationHistory, IPLocationSettings
+from app.models.ip_location_current import ARPEntry as ARPCurrentRow, MACAddressCurrent as MACCurrentRow
+from app.services.ip_location_cache import get_ip_location_cache
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 当前 ARP 数据（按最后发现时间倒序，每个 IP 取第一条）
+# last_seen 显式声明类型，SQLite 下同样返回 datetime
+ARP_CURRENT_SQL = text("""
+    SELECT ip_address, mac_address, arp_device_id, vlan_id,
+           arp_interface, last_seen
+    FROM arp_current
+    WHERE mac_address IS NOT NULL AND mac_address != ''
+    ORDER BY last_seen DESC
+""").columns(last_seen=DateTime)
+
+# 当前 MAC 数据（按最后发现时间倒序）
+MAC_CURRENT_SQL = text("""
+    SELECT mac_address, mac_device_id, mac_interface, vlan_id,
+           is_trunk, interface_description, last_seen
+    FROM mac_current
+    ORDER BY last_seen DESC
+""").columns(last_seen=DateTime)
+
+# 增量计算：水位线之后变化的 ARP / MAC 行
+ARP_CHANGED_SQL = text("""
+    SELECT ip_address, mac_address, collection_batch_id
+    FROM arp_current
+    WHERE updated_at > :since
+""").bindparams(bindparam('since', type_=DateTime))
+MAC_CHANGED_SQL = text("""
+    SELECT mac_address, collection_batch_id
+    FROM mac_current
+    WHERE updated_at > :since
+""").bindparams(bindparam('since', type_=DateTime))
+
+# 增量计算：按 MAC 反查受影响的 IP
+ARP_IPS_BY_MACS_SQL = text("""
+    SELECT DISTINCT ip_address
+    FROM arp_current
+    WHERE mac_address IN :macs
+""").bindparams(bindparam('macs', expanding=True))
+
+# 增量计算：受影响 IP 的 ARP 数据 / 相关 MAC 数据（排序与全量查询一致）
+ARP_BY_IPS_SQL = text("""
+    SELECT ip_address, mac_address, arp_device_id, vlan_id,
+           arp_interface, last_seen
+    FROM arp_current
+    WHERE mac_address IS NOT NULL AND mac_address != ''
+      AND ip_address IN :ips
+    ORDER BY last_seen DESC
+""").bindparams(bindparam('ips', expanding=True)).columns(last_seen=DateTime)
+MAC_BY_MACS_SQL = text("""
+    SELECT mac_address, mac_device_id, mac_interface, vlan_id,
+           is_trunk, interface_description, last_seen
+    FROM mac_current
+    WHERE mac_address IN :macs
+    ORDER BY last_seen DESC
+""").bindparams(bindparam('macs', expanding=True)).columns(last_seen=DateTime)
+
+# 当前 ARP 表中的全部 IP（用于下线检测）
+ARP_CURRENT_IPS_SQL = text("""
+    SELECT DISTINCT ip_address
+    FROM arp_current
+    WHERE mac_address IS NOT NULL AND mac_address != ''
+""")
+
+# 下线归档：当前 ARP 表中在线 IP 的临时表（连接级，归档结束即删除）
+LIVE_IPS_TABLE = Table(
+    'tmp_ip_location_live_ips', MetaData(),
+    Column('ip_address', String(50), primary_key=True),
+    prefixes=['TEMPORARY'],
+)
+
+# 归档时从 ip_location_current 复制到 ip_location_history 的列
+ARCHIVE_COLUMNS = [
+    'ip_address', 'mac_address',
+    'arp_source_device_id', 'arp_device_hostname', 'arp_device_ip', 'arp_device_location',
+    'mac_hit_device_id', 'mac_device_hostname', 'mac_device_ip', 'mac_device_location',
+    'access_interface', 'vlan_id', 'confidence', 'is_uplink', 'is_core_switch', 'match_type',
+    'last_seen',
+]
+
+# 增量计算状态（存放在 ip_location_settings 中）
+WATERMARK_KEY = 'incremental_watermark'
+LAST_FULL_REBUILD_KEY = 'last_full_rebuild_at'
+
+
+def _chunked(items: List, size: int):
+    """按固定大小切分列表"""
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
 
 @dataclass
 class ARPEntry:
@@ -95,6 +187,14 @@ class IPLocationCalculator:
     CORE_SWITCH_KEYWORDS = ['core', '核心', 'CORE', 'Core']
     # 上行链路接口关键词
     UPLINK_KEYWORDS = ['uplink', '上行', 'Uplink', 'Eth-Trunk', 'Aggregate']
+    # 批量写入每块行数
+    SAVE_CHUNK_SIZE = 1000
+    # 下线归档每个事务处理的行数
+    ARCHIVE_CHUNK_SIZE = 1000
+    # 历史清理每个事务删除的行数
+    CLEANUP_CHUNK_SIZE = 5000
+    # 增量计算变化窗口的重叠时间（秒），避免遗漏水位线附近提交的数据
+    INCREMENTAL_OVERLAP_SECONDS = 120
 
     def __init__(self, db: Session):
         """
@@ -109,6 +209,8 @@ class IPLocationCalculator:
         self._mac_entries: List[MACEntry] = []
         self._batch_id: str = ""
         self._settings: Dict[str, str] = {}
+        # 列式引擎不构建 ARPEntry 列表，直接记录当前 ARP 表中的 IP
+        self._current_ips: Optional[Set[str]] = None
 
     def _load_settings(self) -> Dict[str, str]:
         """
@@ -167,20 +269,27 @@ class IPLocationCalculator:
         """
         logger.info("加载 ARP 数据...")
 
-        sql = text("""
-            SELECT ip_address, mac_address, arp_device_id, vlan_id,
-                   arp_interface, last_seen
-            FROM arp_current
-            WHERE mac_address IS NOT NULL AND mac_address != ''
-            ORDER BY last_seen DESC
-        """)
+        entries = self._build_arp_entries(self.db.execute(ARP_CURRENT_SQL))
 
-        result = self.db.execute(sql)
-        entries = []
+        self._arp_entries = entries
+        logger.info(f"已加载 {len(entries)} 条 ARP 记录")
+        return entries
 
+    @staticmethod
+    def _build_arp_entries(rows) -> List[ARPEntry]:
+        """
+        将 ARP 查询结果转换为条目列表（输入按 last_seen 倒序，每个 IP 只保留第一条）
+
+        Args:
+            rows: 查询结果行
+
+        Returns:
+            ARP 条目列表
+        """
+        entries = []
         seen_ips = set()  # 去重：每个 IP 只保留最新记录
 
-        for row in result:
+        for row in rows:
             ip = row.ip_address
             if ip in seen_ips:
                 continue
@@ -194,9 +303,6 @@ class IPLocationCalculator:
                 arp_interface=row.arp_interface,
                 last_seen=row.last_seen
             ))
-
-        self._arp_entries = entries
-        logger.info(f"已加载 {len(entries)} 条 ARP 记录")
         return entries
 
     def _load_mac_entries(self) -> Dict[str, List[MACEntry]]:
@@ -208,17 +314,29 @@ class IPLocationCalculator:
         """
         logger.info("加载 MAC 数据...")
 
-        sql = text("""
-            SELECT mac_address, mac_device_id, mac_interface, vlan_id,
-                   is_trunk, interface_description, last_seen
-            FROM mac_current
-            ORDER BY last_seen DESC
-        """)
+        mac_map = self._build_mac_map(self.db.execute(MAC_CURRENT_SQL))
 
-        result = self.db.execute(sql)
-        mac_map: Dict[str, List[MACEntry]] = {}
+        self._mac_entries = []
+        for entries in mac_map.values():
+            self._mac_entries.extend(entries)
 
-        for row in result:
+        logger.info(f"已加载 {len(mac_map)} 个 MAC 地址，共 {len(self._mac_entries)} 条记录")
+        return mac_map
+
+    @staticmethod
+    def _build_mac_map(rows, mac_map: Optional[Dict[str, List[MACEntry]]] = None) -> Dict[str, List[MACEntry]]:
+        """
+        将 MAC 查询结果转换为 MAC 地址 -> 条目列表的映射（保持输入顺序）
+
+        Args:
+            rows: 查询结果行
+            mac_map: 可选，追加到已有映射
+
+        Returns:
+            MAC 地址映射
+        """
+        mac_map = mac_map if mac_map is not None else {}
+        for row in rows:
             mac = row.mac_address.upper()
             if mac not in mac_map:
                 mac_map[mac] = []
@@ -232,12 +350,6 @@ class IPLocationCalculator:
                 interface_description=row.interface_description,
                 last_seen=row.last_seen
             ))
-
-        self._mac_entries = []
-        for entries in mac_map.values():
-            self._mac_entries.extend(entries)
-
-        logger.info(f"已加载 {len(mac_map)} 个 MAC 地址，共 {len(self._mac_entries)} 条记录")
         return mac_map
 
     def _is_core_switch(self, device_info: Optional[DeviceInfo]) -> bool:
@@ -399,27 +511,40 @@ class IPLocationCalculator:
                 result.mac_device_ip = mac_device.ip_address
                 result.mac_device_location = mac_device.location
 
-    def calculate_batch(self) -> Dict:
+    def _get_engine(self) -> str:
         """
-        执行批量预计算
+        获取预计算引擎
 
         Returns:
-            计算结果统计
+            'python'（逐行匹配）或 'vectorized'（pandas 列式计算）
         """
-        start_time = datetime.now()
-        self._batch_id = f"batch_{start_time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        from app.config import settings
 
-        logger.info(f"开始 IP 定位预计算，批次 ID: {self._batch_id}")
+        engine = (settings.IP_LOCATION_ENGINE or 'python').lower()
+        if engine not in ('python', 'vectorized'):
+            logger.warning(f"未知的 IP 定位引擎 {engine}，使用 python")
+            return 'python'
+        return engine
 
-        # 加载配置
-        self._load_settings()
+    def _calculate_python(
+        self,
+        arp_entries: List[ARPEntry],
+        mac_map: Dict[str, List[MACEntry]],
+        device_cache: Dict[int, DeviceInfo],
+        start_time: datetime
+    ) -> Tuple[List[CalculationResult], Dict]:
+        """
+        逐行匹配 ARP 与 MAC 并计算结果
 
-        # 批量加载数据
-        device_cache = self._load_devices()
-        arp_entries = self._load_arp_entries()
-        mac_map = self._load_mac_entries()
+        Args:
+            arp_entries: ARP 条目列表
+            mac_map: MAC 地址映射
+            device_cache: 设备缓存
+            start_time: 本次计算开始时间
 
-        # 计算结果
+        Returns:
+            (计算结果列表, 统计信息)
+        """
         results: List[CalculationResult] = []
         stats = {
             'total_arp': len(arp_entries),
@@ -476,6 +601,61 @@ class IPLocationCalculator:
             stats['matched'] += 1
             stats[match_type] = stats.get(match_type, 0) + 1
 
+        return results, stats
+
+    def _calculate_vectorized(self, start_time: datetime) -> Tuple[List[CalculationResult], Dict]:
+        """
+        使用 pandas 列式引擎计算结果
+
+        Args:
+            start_time: 本次计算开始时间
+
+        Returns:
+            (计算结果列表, 统计信息)
+        """
+        from app.services.ip_location_vectorized import calculate_vectorized, load_frame
+
+        device_cache = self._load_devices()
+        arp_df = load_frame(self.db, ARP_CURRENT_SQL)
+        mac_df = load_frame(self.db, MAC_CURRENT_SQL)
+        logger.info(f"列式引擎已加载 ARP {len(arp_df)} 条、MAC {len(mac_df)} 条记录")
+
+        results, stats, current_ips = calculate_vectorized(
+            arp_df, mac_df, device_cache, start_time,
+            self.CORE_SWITCH_KEYWORDS, self.UPLINK_KEYWORDS
+        )
+        self._current_ips = current_ips
+        return results, stats
+
+    def calculate_batch(self) -> Dict:
+        """
+        执行批量预计算
+
+        Returns:
+            计算结果统计
+        """
+        start_time = datetime.now()
+        self._batch_id = f"batch_{start_time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+        logger.info(f"开始 IP 定位预计算，批次 ID: {self._batch_id}")
+
+        # 加载配置
+        self._load_settings()
+
+        # 在加载数据之前记录水位线，计算期间写入的数据留给下一次增量计算
+        watermark = self._current_watermark()
+
+        # 计算结果（按配置选择逐行引擎或列式引擎）
+        engine = self._get_engine()
+        if engine == 'vectorized':
+            results, stats = self._calculate_vectorized(start_time)
+        else:
+            device_cache = self._load_devices()
+            arp_entries = self._load_arp_entries()
+            mac_map = self._load_mac_entries()
+            results, stats = self._calculate_python(arp_entries, mac_map, device_cache, start_time)
+        stats['engine'] = engine
+
         # 保存到数据库
         self._save_results(results)
 
@@ -485,9 +665,14 @@ class IPLocationCalculator:
         # 清理过期历史
         cleaned = self._cleanup_history()
 
+        # 记录增量计算状态
+        self._save_state(WATERMARK_KEY, watermark)
+        self._save_state(LAST_FULL_REBUILD_KEY, start_time)
+
         # 更新统计
         end_time = datetime.now()
         stats.update({
+            'mode': 'full',
             'batch_id': self._batch_id,
             'start_time': start_time.isoformat(),
             'end_time': end_time.isoformat(),
@@ -499,12 +684,291 @@ class IPLocationCalculator:
         logger.info(f"预计算完成: {stats}")
         return stats
 
-    def _save_results(self, results: List[CalculationResult]) -> int:
+    def _current_watermark(self) -> Optional[datetime]:
+        """
+        获取 arp_current / mac_current 当前最大的 updated_at
+
+        Returns:
+            水位线时间，两表均为空时返回 None
+        """
+        arp_max = self.db.query(func.max(ARPCurrentRow.updated_at)).scalar()
+        mac_max = self.db.query(func.max(MACCurrentRow.updated_at)).scalar()
+        values = [v for v in (arp_max, mac_max) if isinstance(v, datetime)]
+        return max(values) if values else None
+
+    def _get_state(self, key: str) -> Optional[datetime]:
+        """读取增量计算状态时间（来自 ip_location_settings）"""
+        value = self._settings.get(key)
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            logger.warning(f"忽略无效的增量计算状态 {key}={value}")
+            return None
+
+    def _save_state(self, key: str, value: Optional[datetime]) -> None:
+        """写入增量计算状态时间（存放在 ip_location_settings 中）"""
+        if value is None:
+            return
+        record = self.db.query(IPLocationSettings).filter(IPLocationSettings.key == key).first()
+        if record:
+            record.value = value.isoformat()
+        else:
+            self.db.add(IPLocationSettings(key=key, value=value.isoformat(), description='增量计算状态（内部使用）'))
+        self.db.commit()
+        self._settings[key] = value.isoformat()
+
+    def _full_rebuild_reason(self, force_full: bool) -> Optional[str]:
+        """
+        判断是否需要全量重建
+
+        Args:
+            force_full: 是否强制全量
+
+        Returns:
+            需要全量重建的原因，不需要时返回 None
+        """
+        from app.config import settings
+
+        if force_full:
+            return 'forced'
+        if not settings.IP_LOCATION_INCREMENTAL_ENABLED:
+            return 'incremental_disabled'
+        if self._get_state(WATERMARK_KEY) is None:
+            return 'no_watermark'
+
+        rebuild_minutes = settings.IP_LOCATION_FULL_REBUILD_MINUTES
+        last_full = self._get_state(LAST_FULL_REBUILD_KEY)
+        if rebuild_minutes > 0 and (last_full is None or datetime.now() - last_full >= timedelta(minutes=rebuild_minutes)):
+            return 'periodic'
+        return None
+
+    def _find_affected_ips(self, since: datetime) -> Tuple[Set[str], Dict]:
+        """
+        查找自水位线以来 ARP 或 MAC 发生变化的 IP
+
+        1. ARP 行变化：该 IP 受影响
+        2. MAC 行变化：ARP 表中使用该 MAC 的所有 IP 受影响
+
+        Args:
+            since: 水位线（已减去重叠窗口）
+
+        Returns:
+            (受影响的 IP 集合, 变化统计)
+        """
+        affected_ips: Set[str] = set()
+        changed_macs: Set[str] = set()
+        batches: Set[str] = set()
+        arp_rows = 0
+
+        for row in self.db.execute(ARP_CHANGED_SQL, {'since': since}):
+            arp_rows += 1
+            affected_ips.add(row.ip_address)
+            if row.mac_address:
+                changed_macs.add(row.mac_address.upper())
+            if row.collection_batch_id:
+                batches.add(row.collection_batch_id)
+
+        mac_rows = 0
+        for row in self.db.execute(MAC_CHANGED_SQL, {'since': since}):
+            mac_rows += 1
+            changed_macs.add(row.mac_address.upper())
+            if row.collection_batch_id:
+                batches.add(row.collection_batch_id)
+
+        for chunk in _chunked(sorted(changed_macs), self.SAVE_CHUNK_SIZE):
+            for row in self.db.execute(ARP_IPS_BY_MACS_SQL, {'macs': self._mac_forms(chunk)}):
+                affected_ips.add(row.ip_address)
+
+        return affected_ips, {
+            'changed_arp_rows': arp_rows,
+            'changed_mac_rows': mac_rows,
+            'changed_macs': len(changed_macs),
+            'changed_collection_batches': len(batches),
+        }
+
+    @staticmethod
+    def _mac_forms(macs: List[str]) -> List[str]:
+        """MAC 地址的大小写形式（mac_current 可能存储小写 MAC）"""
+        forms = set()
+        for mac in macs:
+            forms.add(mac.upper())
+            forms.add(mac.lower())
+        return sorted(forms)
+
+    def _load_delta_inputs(self, affected_ips: Set[str]) -> Tuple[List[ARPEntry], Dict[str, List[MACEntry]]]:
+        """
+        加载受影响 IP 的 ARP 数据及其相关 MAC 数据
+
+        Args:
+            affected_ips: 受影响的 IP 集合
+
+        Returns:
+            (ARP 条目列表, MAC 地址映射)
+        """
+        arp_entries: List[ARPEntry] = []
+        for chunk in _chunked(sorted(affected_ips), self.SAVE_CHUNK_SIZE):
+            arp_entries.extend(self._build_arp_entries(self.db.execute(ARP_BY_IPS_SQL, {'ips': chunk})))
+
+        mac_map: Dict[str, List[MACEntry]] = {}
+        macs = sorted({entry.mac_address.upper() for entry in arp_entries})
+        for chunk in _chunked(macs, self.SAVE_CHUNK_SIZE):
+            self._build_mac_map(self.db.execute(MAC_BY_MACS_SQL, {'macs': self._mac_forms(chunk)}), mac_map)
+
+        return arp_entries, mac_map
+
+    def calculate_incremental(self, force_full: bool = False) -> Dict:
+        """
+        增量预计算：只重算自上次计算以来 ARP 或 MAC 变化的 IP，并合并到 ip_location_current
+
+        以下情况回退为全量重建（calculate_batch）：
+        - force_full=True（手动触发全量）
+        - 未启用增量计算或尚无水位线（首次运行）
+        - 距上次全量重建超过 IP_LOCATION_FULL_REBUILD_MINUTES
+        - 受影响 IP 占比超过 IP_LOCATION_INCREMENTAL_MAX_RATIO
+
+        增量数据量小，固定使用逐行引擎。
+
+        Args:
+            force_full: 是否强制全量重建
+
+        Returns:
+            计算结果统计（mode 为 full 或 incremental）
+        """
+        from app.config import settings
+
+        self._load_settings()
+        reason = self._full_rebuild_reason(force_full)
+        if reason:
+            logger.info(f"IP 定位执行全量重建，原因：{reason}")
+            stats = self.calculate_batch()
+            stats['full_rebuild_reason'] = reason
+            return stats
+
+        start_time = datetime.now()
+        self._batch_id = f"batch_{start_time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        watermark = self._current_watermark()
+        since = self._get_state(WATERMARK_KEY) - timedelta(seconds=self.INCREMENTAL_OVERLAP_SECONDS)
+
+        logger.info(f"开始 IP 定位增量计算，批次 ID: {self._batch_id}，变化起点: {since}")
+
+        affected_ips, change_stats = self._find_affected_ips(since)
+
+        # 变化量过大时全量重建更划算
+        total_ips = self.db.query(func.count(IPLocationCurrent.id)).scalar() or 0
+        if total_ips and len(affected_ips) > total_ips * settings.IP_LOCATION_INCREMENTAL_MAX_RATIO:
+            logger.info(f"受影响 IP {len(affected_ips)} 个，超过阈值，执行全量重建")
+            stats = self.calculate_batch()
+            stats['full_rebuild_reason'] = 'churn'
+            return stats
+
+        results: List[CalculationResult] = []
+        stats: Dict = {
+            'total_arp': 0,
+            'matched': 0,
+            'no_mac_found': 0,
+            'single_match': 0,
+            'cross_device': 0,
+        }
+        if affected_ips:
+            arp_entries, mac_map = self._load_delta_inputs(affected_ips)
+            device_cache = self._load_devices()
+            results, stats = self._calculate_python(arp_entries, mac_map, device_cache, start_time)
+            self._save_results(results, scope_ips=affected_ips)
+
+        # 下线检测需要完整的当前 ARP IP 集合
+        self._current_ips = {row.ip_address for row in self.db.execute(ARP_CURRENT_IPS_SQL)}
+        archived = self._archive_offline_ips()
+        cleaned = self._cleanup_history()
+
+        self._save_state(WATERMARK_KEY, watermark)
+
+        end_time = datetime.now()
+        stats.update(change_stats)
+        stats.update({
+            'mode': 'incremental',
+            'engine': 'python',
+            'affected_ips': len(affected_ips),
+            'batch_id': self._batch_id,
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'duration_seconds': (end_time - start_time).total_seconds(),
+            'archived': archived,
+            'history_cleaned': cleaned,
+        })
+
+        logger.info(f"增量计算完成: {stats}")
+        return stats
+
+    def _load_existing_keys(self, scope_ips: Optional[Set[str]] = None) -> Dict[Tuple[str, str], int]:
         """
-        保存计算结果到数据库
+        一次性加载当前表中已存在的 (ip, mac) 键
+
+        只查询 id/ip/mac 三列，不构建 ORM 对象
+
+        Args:
+            scope_ips: 可选，只加载这些 IP 的记录（增量计算使用）
+
+        Returns:
+            (ip_address, mac_address) -> 记录 ID 的映射（重复键保留最小 ID）
+        """
+        existing: Dict[Tuple[str, str], int] = {}
+        query = self.db.query(
+            IPLocationCurrent.id,
+            IPLocationCurrent.ip_address,
+            IPLocationCurrent.mac_address
+        )
+
+        if scope_ips is None:
+            batches = [query.order_by(IPLocationCurrent.id).yield_per(self.SAVE_CHUNK_SIZE)]
+        else:
+            batches = (
+                query.filter(IPLocationCurrent.ip_address.in_(chunk)).order_by(IPLocationCurrent.id).all()
+                for chunk in _chunked(sorted(scope_ips), self.SAVE_CHUNK_SIZE)
+            )
+
+        for rows in batches:
+            for row in rows:
+                existing.setdefault((row.ip_address, row.mac_address), row.id)
+        return existing
+
+    def _result_to_row(self, result: CalculationResult, calculated_at: datetime) -> Dict:
+        """将计算结果转换为 ip_location_current 的列值"""
+        return {
+            'ip_address': result.ip_address,
+            'mac_address': result.mac_address,
+            'arp_source_device_id': result.arp_source_device_id,
+            'mac_hit_device_id': result.mac_hit_device_id,
+            'access_interface': result.access_interface,
+            'vlan_id': result.vlan_id,
+            'confidence': result.confidence,
+            'is_uplink': result.is_uplink,
+            'is_core_switch': result.is_core_switch,
+            'match_type': result.match_type,
+            'last_seen': result.last_seen,
+            'calculated_at': calculated_at,
+            'calculate_batch_id': self._batch_id,
+            'batch_status': 'active',
+            'arp_device_hostname': result.arp_device_hostname,
+            'arp_device_ip': result.arp_device_ip,
+            'arp_device_location': result.arp_device_location,
+            'mac_device_hostname': result.mac_device_hostname,
+            'mac_device_ip': result.mac_device_ip,
+            'mac_device_location': result.mac_device_location,
+        }
+
+    def _save_results(self, results: List[CalculationResult], scope_ips: Optional[Set[str]] = None) -> int:
+        """
+        保存计算结果到数据库（集合式批量写入）
+
+        1. 一次查询加载已存在的 (ip, mac) 键
+        2. 按块拆分为批量 UPDATE（按 ID）和批量 INSERT，使用 Core executemany
+        3. 不经过 ORM 身份映射，内存占用与块大小相关
 
         Args:
             results: 计算结果列表
+            scope_ips: 可选，增量计算时只加载这些 IP 的已有键
 
         Returns:
             保存的记录数
@@ -514,65 +978,43 @@ class IPLocationCalculator:
 
         logger.info(f"保存 {len(results)} 条计算结果...")
 
-        # 使用批量 upsert
+        # 同一 (ip, mac) 只保留最后一条结果
+        unique: Dict[Tuple[str, str], CalculationResult] = {}
         for result in results:
-            # 检查是否已存在
-            existing = self.db.query(IPLocationCurrent).filter(
-                IPLocationCurrent.ip_address == result.ip_address,
-                IPLocationCurrent.mac_address == result.mac_address
-            ).first()
-
-            if existing:
-                # 更新现有记录
-                existing.arp_source_device_id = result.arp_source_device_id
-                existing.mac_hit_device_id = result.mac_hit_device_id
-                existing.access_interface = result.access_interface
-                existing.vlan_id = result.vlan_id
-                existing.confidence = result.confidence
-                existing.is_uplink = result.is_uplink
-                existing.is_core_switch = result.is_core_switch
-                existing.match_type = result.match_type
-                existing.last_seen = result.last_seen
-                existing.calculated_at = datetime.now()
-                existing.calculate_batch_id = self._batch_id
-                existing.batch_status = 'active'
-
-                # 更新冗余字段
-                existing.arp_device_hostname = result.arp_device_hostname
-                existing.arp_device_ip = result.arp_device_ip
-                existing.arp_device_location = result.arp_device_location
-                existing.mac_device_hostname = result.mac_device_hostname
-                existing.mac_device_ip = result.mac_device_ip
-                existing.mac_device_location = result.mac_device_location
-            else:
-                # 创建新记录
-                new_record = IPLocationCurrent(
-                    ip_address=result.ip_address,
-                    mac_address=result.mac_address,
-                    arp_source_device_id=result.arp_source_device_id,
-                    mac_hit_device_id=result.mac_hit_device_id,
-                    access_interface=result.access_interface,
-                    vlan_id=result.vlan_id,
-                    confidence=result.confidence,
-                    is_uplink=result.is_uplink,
-                    is_core_switch=result.is_core_switch,
-                    match_type=result.match_type,
-                    last_seen=result.last_seen,
-                    calculated_at=datetime.now(),
-                    calculate_batch_id=self._batch_id,
-                    batch_status='active',
-                    arp_device_hostname=result.arp_device_hostname,
-                    arp_device_ip=result.arp_device_ip,
-                    arp_device_location=result.arp_device_location,
-                    mac_device_hostname=result.mac_device_hostname,
-                    mac_device_ip=result.mac_device_ip,
-                    mac_device_location=result.mac_device_location
-                )
-                self.db.add(new_record)
+            unique[(result.ip_address, result.mac_address)] = result
+        keys = list(unique.keys())
+
+        existing = self._load_existing_keys(scope_ips)
+        table = IPLocationCurrent.__table__
+        update_stmt = update(table).where(table.c.id == bindparam('_id'))
+        insert_stmt = insert(table)
+        calculated_at = datetime.now()
+        updated = inserted = 0
+
+        for offset in range(0, len(keys), self.SAVE_CHUNK_SIZE):
+            update_rows = []
+            insert_rows = []
+            for key in keys[offset:offset + self.SAVE_CHUNK_SIZE]:
+                row = self._result_to_row(unique[key], calculated_at)
+                record_id = existing.get(key)
+                if record_id is None:
+                    insert_rows.append(row)
+                else:
+                    row['_id'] = record_id
+                    update_rows.append(row)
+
+            if update_rows:
+                self.db.execute(update_stmt, update_rows)
+                updated += len(update_rows)
+            if insert_rows:
+                self.db.execute(insert_stmt, insert_rows)
+                inserted += len(insert_rows)
 
         self.db.commit()
-        logger.info(f"已保存 {len(results)} 条记录")
-        return len(results)
+        # 新批次结果已提交，查询缓存整体失效
+        get_ip_location_cache().invalidate(self._batch_id)
+        logger.info(f"已保存 {len(unique)} 条记录（更新 {updated}，新增 {inserted}）")
+        return len(unique)
 
     def _archive_offline_ips(self) -> int:
         """
@@ -585,6 +1027,10 @@ class IPLocationCalculator:
         注意：此方法在 _save_results() 之后调用，刚计算的记录
         calculated_at 为当前时间，不会被步骤 1 筛选。
 
+        在线 IP 写入连接级临时表，下线记录按 id 分块以
+        INSERT ... SELECT 复制到历史表后 DELETE，每块一个事务，
+        锁持有时间与单事务 binlog 大小与总行数无关。
+
         Returns:
             归档的记录数
         """
@@ -593,66 +1039,65 @@ class IPLocationCalculator:
 
         logger.info(f"检测下线 IP，阈值: {threshold_minutes} 分钟，截止时间: {threshold_time}")
 
-        # 步骤 1：按 calculated_at 筛选候选记录（修正：使用 calculated_at 替代 last_seen）
-        candidate_records = self.db.query(IPLocationCurrent).filter(
-            IPLocationCurrent.calculated_at < threshold_time
-        ).all()
-
-        if not candidate_records:
-            logger.info("没有需要归档的候选记录")
-            return 0
-
-        # 步骤 2：获取当前 ARP 表中的所有 IP
-        # 优化：复用已加载的 self._arp_entries，避免重复查询数据库
-        # 注意：_load_arp_entries() 在 calculate_batch() 中已调用
-        current_ips = {entry.ip_address for entry in self._arp_entries}
-
-        # 步骤 3：筛选出真正下线的 IP（不在当前 ARP 表中）
-        offline_records = [
-            record for record in candidate_records
-            if record.ip_address not in current_ips
-        ]
+        # 在线 IP：优先使用本次计算记录的当前 ARP IP 集合，否则复用已加载的 ARP 条目
+        if self._current_ips is not None:
+            current_ips = self._current_ips
+        else:
+            current_ips = {entry.ip_address for entry in self._arp_entries}
 
-        if not offline_records:
-            logger.info(f"候选记录 {len(candidate_records)} 条均在 ARP 表中，无需归档")
-            return 0
+        current = IPLocationCurrent.__table__
+        history = IPLocationHistory.__table__
+        live = LIVE_IPS_TABLE
 
-        logger.info(f"发现 {len(offline_records)} 条下线 IP 记录，开始归档...")
-
-        # 步骤 4：移动到历史表
-        for record in offline_records:
-            history = IPLocationHistory(
-                ip_address=record.ip_address,
-                mac_address=record.mac_address,
-                arp_source_device_id=record.arp_source_device_id,
-                arp_device_hostname=record.arp_device_hostname,
-                arp_device_ip=record.arp_device_ip,
-                arp_device_location=record.arp_device_location,
-                mac_hit_device_id=record.mac_hit_device_id,
-                mac_device_hostname=record.mac_device_hostname,
-                mac_device_ip=record.mac_device_ip,
-                mac_device_location=record.mac_device_location,
-                access_interface=record.access_interface,
-                vlan_id=record.vlan_id,
-                confidence=record.confidence,
-                is_uplink=record.is_uplink,
-                is_core_switch=record.is_core_switch,
-                match_type=record.match_type,
-                first_seen=record.calculated_at,  # 使用 calculated_at 作为 first_seen
-                last_seen=record.last_seen,
-                archived_at=datetime.now()
-            )
-            self.db.add(history)
-            self.db.delete(record)
+        # 计算过期且不在 ARP 表中的记录
+        offline_ids = select(current.c.id).where(
+            current.c.calculated_at < threshold_time,
+            ~exists().where(live.c.ip_address == current.c.ip_address)
+        ).order_by(current.c.id).limit(self.ARCHIVE_CHUNK_SIZE)
 
+        # 临时表只对创建它的连接可见，归档全程固定使用同一连接
         self.db.commit()
-        logger.info(f"已归档 {len(offline_records)} 条下线 IP 记录")
-        return len(offline_records)
+        archived = 0
+        with self.db.get_bind().connect() as conn:
+            live.drop(conn, checkfirst=True)
+            live.create(conn)
+            try:
+                with conn.begin():
+                    for chunk in _chunked(sorted(current_ips), self.SAVE_CHUNK_SIZE):
+                        conn.execute(live.insert(), [{'ip_address': ip} for ip in chunk])
+
+                while True:
+                    with conn.begin():
+                        ids = [row[0] for row in conn.execute(offline_ids)]
+                        if not ids:
+                            break
+                        archive_rows = select(
+                            *[current.c[name] for name in ARCHIVE_COLUMNS],
+                            current.c.calculated_at,  # 使用 calculated_at 作为 first_seen
+                            literal(datetime.now(), DateTime),
+                        ).where(current.c.id.in_(ids))
+                        conn.execute(history.insert().from_select(
+                            ARCHIVE_COLUMNS + ['first_seen', 'archived_at'], archive_rows
+                        ))
+                        conn.execute(current.delete().where(current.c.id.in_(ids)))
+                    archived += len(ids)
+            finally:
+                live.drop(conn, checkfirst=True)
+
+        self.db.expire_all()
+        if archived:
+            get_ip_location_cache().invalidate(self._batch_id)
+            logger.info(f"已归档 {archived} 条下线 IP 记录")
+        else:
+            logger.info("没有需要归档的下线 IP 记录")
+        return archived
 
     def _cleanup_history(self) -> int:
         """
         清理过期的历史记录
 
+        按 id 分块删除，每块一个事务，避免大表上的长事务。
+
         Returns:
             删除的记录数
         """
@@ -661,11 +1106,20 @@ class IPLocationCalculator:
 
         logger.info(f"清理历史记录，保留天数: {retention_days}，截止日期: {cutoff_date}")
 
-        deleted = self.db.query(IPLocationHistory).filter(
-            IPLocationHistory.archived_at < cutoff_date
-        ).delete()
+        history = IPLocationHistory.__table__
+        expired_ids = select(history.c.id).where(
+            history.c.archived_at < cutoff_date
+        ).order_by(history.c.id).limit(self.CLEANUP_CHUNK_SIZE)
+
+        deleted = 0
+        while True:
+            ids = [row[0] for row in self.db.execute(expired_ids)]
+            if not ids:
+                break
+            self.db.execute(history.delete().where(history.c.id.in_(ids)))
+            self.db.commit()
+            deleted += len(ids)
 
-        self.db.commit()
         logger.info(f"已清理 {deleted} 条过期历史记录")
         return deleted
 
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位快照候选索引
+
+快照构建前一次性预加载 MAC 条目、设备和配置，候选生成全部在内存中完成，
+查询次数与 ARP 条目数无关。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.models.models import Device, MACAddress
+
+# 每个 MAC 最多保留的候选条目数
+MAX_MAC_ENTRIES = 10
+# 按 MAC 列表加载时每次 IN 查询的最大数量
+MAC_QUERY_CHUNK_SIZE = 1000
+
+
+@dataclass
+class CandidateIndex:
+    """
+    快照构建预加载索引
+
+    一次快照构建内复用，候选生成全部在内存中完成。
+
+    Attributes:
+        mac_index: MAC 地址 -> MAC 条目列表（按 last_seen 倒序）
+        devices: 设备 ID -> 设备
+        config: 本次构建使用的配置快照
+    """
+    mac_index: Dict[str, List[MACAddress]] = field(default_factory=dict)
+    devices: Dict[int, Device] = field(default_factory=dict)
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    def mac_entries(self, mac_address: str) -> List[MACAddress]:
+        """返回 MAC 地址的候选条目（按 last_seen 倒序），无记录时为空列表"""
+        return self.mac_index.get(mac_address, [])
+
+    def device(self, device_id: Optional[int]) -> Optional[Device]:
+        """按 ID 返回设备，不存在时为 None"""
+        return self.devices.get(device_id)
+
+
+def load_candidate_index(
+    db: Session,
+    config: Dict[str, Any],
+    mac_addresses: Optional[Iterable[str]] = None,
+    max_mac_entries: int = MAX_MAC_ENTRIES,
+    chunk_size: int = MAC_QUERY_CHUNK_SIZE
+) -> CandidateIndex:
+    """
+    预加载候选生成所需的 MAC 条目、设备和配置
+
+    未指定 MAC 时一次加载全部 MAC 条目，指定时按 MAC 分块 IN 查询。
+
+    Args:
+        db: 数据库会话
+        config: 本次构建使用的配置快照
+        mac_addresses: 可选，只加载这些 MAC 的条目
+        max_mac_entries: 每个 MAC 保留的最多条目数
+        chunk_size: 每次 IN 查询的最大 MAC 数
+
+    Returns:
+        候选索引
+    """
+    query = db.query(MACAddress)
+    if mac_addresses is None:
+        mac_rows = query.order_by(MACAddress.mac_address, desc(MACAddress.last_seen)).all()
+    else:
+        macs = sorted(set(mac_addresses))
+        mac_rows = []
+        for offset in range(0, len(macs), chunk_size):
+            chunk = macs[offset:offset + chunk_size]
+            mac_rows.extend(query.filter(MACAddress.mac_address.in_(chunk)).all())
+
+    mac_index: Dict[str, List[MACAddress]] = {}
+    for mac_entry in mac_rows:
+        mac_index.setdefault(mac_entry.mac_address, []).append(mac_entry)
+    for mac_address, entries in mac_index.items():
+        entries.sort(key=lambda item: item.last_seen, reverse=True)
+        mac_index[mac_address] = entries[:max_mac_entries]
+
+    devices = {device.id: device for device in db.query(Device).all()}
+    return CandidateIndex(mac_index=mac_index, devices=devices, config=config)
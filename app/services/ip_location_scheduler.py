@@ -6,11 +6,13 @@ IP 定位调度器服务
 1. 管理预计算定时任务
 2. 每 10 分钟执行一次预计算
 3. 支持手动触发
+4. 定时任务执行增量计算，手动触发默认全量重建
 
 修复说明（M5）：
 - 将 BackgroundScheduler 替换为 AsyncIOScheduler（支持 async 任务）
 - 在任务内部重新获取 Session，不再复用全局 Session
 - 使用 asyncio.to_thread() 包装同步数据库操作
+- 同步数据库操作改用数据库专用线程池（get_db_executor），不与 SSH I/O 抢占默认线程池
 """
 
 import asyncio
@@ -22,6 +24,7 @@ from typing import Optional
 
 from app.models import SessionLocal
 from app.services.ip_location_calculator import IPLocationCalculator
+from app.services.executors import get_db_executor
 
 # 使用模块级 logger（logging.basicConfig 应在应用入口统一配置）
 logger = logging.getLogger(__name__)
@@ -99,8 +102,8 @@ class IPLocationScheduler:
 
         try:
             calculator = IPLocationCalculator(db)
-            # 使用 asyncio.to_thread 包装同步操作
-            stats = await asyncio.to_thread(calculator.calculate_batch)
+            # 使用数据库线程池包装同步操作（增量计算，必要时自动回退全量）
+            stats = await get_db_executor().run(calculator.calculate_incremental)
 
             self._last_run = datetime.now()
             self._last_stats = stats
@@ -109,7 +112,9 @@ class IPLocationScheduler:
             matched = stats.get('matched', 0)
             archived = stats.get('archived', 0)
 
-            if matched == 0 and archived == 0:
+            # 增量计算没有变化时不计为失败
+            no_change = stats.get('mode') == 'incremental' and stats.get('affected_ips', 0) == 0
+            if matched == 0 and archived == 0 and not no_change:
                 self._consecutive_failures += 1
                 logger.warning(f"IP 定位预计算无结果，连续失败次数：{self._consecutive_failures}")
             else:
@@ -130,10 +135,13 @@ class IPLocationScheduler:
             db.close()
             logger.debug("Session closed for IP location calculation task")
 
-    async def trigger_now_async(self) -> dict:
+    async def trigger_now_async(self, force_full: bool = True) -> dict:
         """
         手动触发一次预计算（异步版本）
 
+        Args:
+            force_full: 是否全量重建，默认 True；False 时执行增量计算
+
         Returns:
             计算结果统计
         """
@@ -144,8 +152,8 @@ class IPLocationScheduler:
 
         try:
             calculator = IPLocationCalculator(db)
-            # 使用 asyncio.to_thread 包装同步操作
-            stats = await asyncio.to_thread(calculator.calculate_batch)
+            # 使用数据库线程池包装同步操作
+            stats = await get_db_executor().run(calculator.calculate_incremental, force_full)
 
             self._last_run = datetime.now()
             self._last_stats = stats
@@ -9,6 +9,7 @@ import logging
 
 from app.models.models import Device, MACAddress
 from app.schemas.ip_location_schemas import CollectionStatus
+from app.services.ip_location_cache import get_ip_location_cache
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +47,17 @@ class IPLocationService:
         """
         定位 IP 地址
         
-        从 ip_location_current 表查询预计算结果
+        从 ip_location_current 表查询预计算结果，结果经进程内缓存
         """
         from app.models.ip_location import IPLocationCurrent
         
+        cache = get_ip_location_cache()
+        cache_key = ('ip', ip_address)
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+        generation = cache.generation
+
         try:
             # 查询预计算结果
             entries = self.db.query(IPLocationCurrent).filter(
@@ -74,6 +82,7 @@ class IPLocationService:
                     "match_type": entry.match_type
                 })
             
+            cache.put(cache_key, results, generation)
             return results
         except Exception as e:
             logger.error(f"IP 定位失败 {ip_address}: {e}", exc_info=True)
@@ -83,12 +92,19 @@ class IPLocationService:
         """
         获取 IP 列表
         
-        从 ip_location_current 表查询预计算结果
+        从 ip_location_current 表查询预计算结果，结果经进程内缓存
         
         返回：(总数，列表项)
         """
         from app.models.ip_location import IPLocationCurrent
         
+        cache = get_ip_location_cache()
+        cache_key = ('list', page, page_size, search or '')
+        hit, cached = cache.get(cache_key)
+        if hit:
+            return cached
+        generation = cache.generation
+
         try:
             query = self.db.query(IPLocationCurrent)
             
@@ -123,6 +139,7 @@ class IPLocationService:
                     "match_type": entry.match_type
                 })
             
+            cache.put(cache_key, (total, results), generation)
             return total, results
         except Exception as e:
             logger.error(f"获取 IP 列表失败：{e}", exc_info=True)
@@ -17,11 +17,18 @@ from uuid import uuid4
 from sqlalchemy import and_, desc, func
 from sqlalchemy.orm import Session
 
-from app.models.models import ARPEntry, MACAddress, Device, IPLocationCurrent
+from app.models.models import ARPEntry, Device, IPLocationCurrent
 from app.services.confidence_calculator import ConfidenceCalculator
 from app.services.interface_recognizer import InterfaceRecognizer
 from app.services.core_switch_recognizer import CoreSwitchRecognizer
 from app.services.ip_location_config_manager import IPLocationConfigManager
+from app.services.ip_location_cache import get_ip_location_cache
+from app.services.ip_location_candidate_index import (
+    MAC_QUERY_CHUNK_SIZE,
+    MAX_MAC_ENTRIES,
+    CandidateIndex,
+    load_candidate_index,
+)
 
 
 class IPLocationSnapshotService:
@@ -31,6 +38,11 @@ class IPLocationSnapshotService:
     管理 IP 定位结果的批次，支持事务性的批次切换操作。
     """
 
+    # 每个 MAC 最多保留的候选条目数
+    MAX_MAC_ENTRIES = MAX_MAC_ENTRIES
+    # 按 MAC 列表加载时每次 IN 查询的最大数量
+    MAC_QUERY_CHUNK_SIZE = MAC_QUERY_CHUNK_SIZE
+
     def __init__(self, db: Session):
         """
         初始化快照服务
@@ -109,6 +121,9 @@ class IPLocationSnapshotService:
                 IPLocationCurrent.calculate_batch_id == batch_id
             ).update({"batch_status": "active"}, synchronize_session=False)
 
+        # 批次切换已提交，查询缓存整体失效
+        get_ip_location_cache().invalidate(batch_id)
+
     def rollback_to_batch(self, batch_id: str) -> bool:
         """
         回滚到指定的历史批次
@@ -157,21 +172,51 @@ class IPLocationSnapshotService:
             )
         ).all()
 
-    def _build_candidates(self, arp_entry: ARPEntry, max_candidates: int = 3) -> List[Dict[str, Any]]:
+    def _load_candidate_index(self, arp_entries: Optional[List[ARPEntry]] = None) -> CandidateIndex:
+        """
+        预加载候选生成所需的 MAC 条目、设备和配置
+
+        查询次数与 ARP 条目数无关：全量构建时一次加载全部 MAC 条目，
+        指定 ARP 条目时按 MAC 分块加载。
+
+        Args:
+            arp_entries: 可选，只加载这些 ARP 条目涉及的 MAC
+
+        Returns:
+            候选索引
+        """
+        mac_addresses = None
+        if arp_entries is not None:
+            mac_addresses = [entry.mac_address for entry in arp_entries]
+        return load_candidate_index(
+            self.db,
+            self.config,
+            mac_addresses,
+            max_mac_entries=self.MAX_MAC_ENTRIES,
+            chunk_size=self.MAC_QUERY_CHUNK_SIZE
+        )
+
+    def _build_candidates(
+        self,
+        arp_entry: ARPEntry,
+        index: Optional[CandidateIndex] = None,
+        max_candidates: int = 3
+    ) -> List[Dict[str, Any]]:
         """
         为单个 ARP 条目构建定位候选列表
 
         Args:
             arp_entry: ARP 条目
+            index: 预加载索引，未提供时只为该条目加载
             max_candidates: 最大返回候选数，默认 3
 
         Returns:
             定位候选列表，按可信度降序排序
         """
-        candidates = self.db.query(MACAddress).filter(
-            MACAddress.mac_address == arp_entry.mac_address
-        ).order_by(desc(MACAddress.last_seen)).limit(10).all()
-        arp_device = self.db.query(Device).filter(Device.id == arp_entry.device_id).first()
+        if index is None:
+            index = self._load_candidate_index([arp_entry])
+        candidates = index.mac_entries(arp_entry.mac_address)
+        arp_device = index.device(arp_entry.device_id)
         results: List[Dict[str, Any]] = []
         if not candidates:
             interface_name = arp_entry.interface or "Unknown"
@@ -197,13 +242,13 @@ class IPLocationSnapshotService:
                 "vlan_id": arp_entry.vlan_id,
                 "confidence": confidence,
                 "is_uplink": is_uplink,
-                "is_core_switch": CoreSwitchRecognizer.is_core_switch(arp_device, self.config) if arp_device else False,
+                "is_core_switch": CoreSwitchRecognizer.is_core_switch(arp_device, index.config) if arp_device else False,
                 "match_type": "arp_only",
                 "last_seen": arp_entry.last_seen
             })
             return results
         for mac_entry in candidates:
-            hit_device = self.db.query(Device).filter(Device.id == mac_entry.device_id).first()
+            hit_device = index.device(mac_entry.device_id)
             is_uplink = InterfaceRecognizer.is_uplink_interface(
                 interface_name=mac_entry.interface,
                 interface_description=None,
@@ -226,7 +271,7 @@ class IPLocationSnapshotService:
                 "vlan_id": mac_entry.vlan_id if mac_entry.vlan_id is not None else arp_entry.vlan_id,
                 "confidence": confidence,
                 "is_uplink": is_uplink,
-                "is_core_switch": CoreSwitchRecognizer.is_core_switch(hit_device, self.config) if hit_device else False,
+                "is_core_switch": CoreSwitchRecognizer.is_core_switch(hit_device, index.config) if hit_device else False,
                 "match_type": "same_device" if mac_entry.device_id == arp_entry.device_id else "cross_device",
                 "last_seen": max(arp_entry.last_seen, mac_entry.last_seen)
             })
@@ -246,12 +291,13 @@ class IPLocationSnapshotService:
         batch_id = self._new_batch_id()
         now = datetime.now()
         arp_entries = self._latest_arp_entries(changed_ips)
+        index = self._load_candidate_index(arp_entries if changed_ips else None)
         output_count = 0
         seen_keys = set()
 
         with self.db.no_autoflush:
             for arp_entry in arp_entries:
-                candidates = self._build_candidates(arp_entry)
+                candidates = self._build_candidates(arp_entry, index)
                 for candidate in candidates:
                     key = (
                         candidate["ip_address"],
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位预计算列式引擎（pandas/NumPy）
+
+功能：
+1. 将 arp_current / mac_current 加载为 DataFrame
+2. ARP ↔ MAC 连接、最佳匹配选择、置信度计算均为向量化操作
+3. 结果与 IPLocationCalculator 逐行引擎完全一致
+
+规则与逐行引擎保持一致：
+- ARP 按 last_seen 倒序，每个 IP 取第一条
+- 多个 MAC 命中时按评分选择：VLAN 一致 +10，非 trunk +5，有 last_seen +1，
+  同分取 mac_current 查询顺序中靠前的一条
+- 置信度 = 0.50 + VLAN 一致 0.20 + 非 trunk 0.15 + 有接口描述 0.10 + 时间差 1 小时内 0.05
+"""
+
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.services.ip_location_calculator import CalculationResult, DeviceInfo
+
+logger = logging.getLogger(__name__)
+
+ARP_COLUMNS = ['ip_address', 'mac_address', 'arp_device_id', 'vlan_id', 'arp_interface', 'last_seen']
+MAC_COLUMNS = ['mac_address', 'mac_device_id', 'mac_interface', 'vlan_id',
+               'is_trunk', 'interface_description', 'last_seen']
+
+# 置信度以百分点计算，转换时保持两位小数（与 Decimal('0.50') 等写法一致）
+_CONFIDENCE = {points: Decimal(points).scaleb(-2) for points in range(0, 101)}
+
+
+def load_frame(db: Session, sql) -> pd.DataFrame:
+    """
+    执行查询并加载为 DataFrame（保持查询返回顺序）
+
+    Args:
+        db: 数据库会话
+        sql: 查询语句
+
+    Returns:
+        DataFrame
+    """
+    result = db.execute(sql)
+    return pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
+
+
+def _keyword_mask(values: pd.Series, keywords: Sequence[str]) -> np.ndarray:
+    """值中包含任一关键词（区分大小写，空值为 False）"""
+    pattern = '|'.join(re.escape(keyword) for keyword in keywords)
+    return values.fillna('').astype(str).str.contains(pattern, regex=True).to_numpy(dtype=bool)
+
+
+def _truthy_int(values: pd.Series) -> pd.Series:
+    """将可空整数列转换为 0 表示空值"""
+    return pd.to_numeric(values, errors='coerce').fillna(0)
+
+
+def _to_int(value) -> Optional[int]:
+    return None if pd.isna(value) else int(value)
+
+
+def _to_datetime(value) -> Optional[datetime]:
+    if value is None or pd.isna(value):
+        return None
+    return value.to_pydatetime() if isinstance(value, pd.Timestamp) else value
+
+
+def _to_str(value) -> Optional[str]:
+    return None if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+
+def calculate_vectorized(
+    arp_df: pd.DataFrame,
+    mac_df: pd.DataFrame,
+    device_cache: Dict[int, DeviceInfo],
+    start_time: datetime,
+    core_keywords: Sequence[str],
+    uplink_keywords: Sequence[str]
+) -> Tuple[List[CalculationResult], Dict, Set[str]]:
+    """
+    列式计算 IP 定位结果
+
+    Args:
+        arp_df: arp_current 查询结果（按 last_seen 倒序）
+        mac_df: mac_current 查询结果（按 last_seen 倒序）
+        device_cache: 设备 ID -> 设备信息
+        start_time: 本次计算开始时间
+        core_keywords: 核心交换机主机名关键词
+        uplink_keywords: 上行接口关键词
+
+    Returns:
+        (计算结果列表, 统计信息, 当前 ARP 表中的 IP 集合)
+    """
+    arp = arp_df.reindex(columns=ARP_COLUMNS)
+    arp = arp.drop_duplicates('ip_address', keep='first').reset_index(drop=True)
+    current_ips = set(arp['ip_address'])
+
+    stats = {
+        'total_arp': len(arp),
+        'matched': 0,
+        'no_mac_found': len(arp),
+        'single_match': 0,
+        'cross_device': 0,
+    }
+    if arp.empty or mac_df.empty:
+        return [], stats, current_ips
+
+    arp['arp_idx'] = np.arange(len(arp))
+    arp['mac_key'] = arp['mac_address'].str.upper()
+
+    mac = mac_df.reindex(columns=MAC_COLUMNS).copy()
+    mac['mac_order'] = np.arange(len(mac))
+    mac['mac_key'] = mac['mac_address'].str.upper()
+    mac = mac.drop(columns=['mac_address'])
+
+    # ARP ↔ MAC 连接
+    merged = arp.merge(mac, on='mac_key', how='inner', suffixes=('_arp', '_mac'))
+    if merged.empty:
+        return [], stats, current_ips
+
+    arp_vlan = _truthy_int(merged['vlan_id_arp'])
+    mac_vlan = _truthy_int(merged['vlan_id_mac'])
+    same_vlan = ((arp_vlan != 0) & (mac_vlan != 0) & (arp_vlan == mac_vlan)).to_numpy()
+    not_trunk = ~merged['is_trunk'].fillna(False).astype(bool).to_numpy()
+    arp_seen = pd.to_datetime(merged['last_seen_arp'])
+    mac_seen = pd.to_datetime(merged['last_seen_mac'])
+
+    # 最佳匹配：评分高者优先，同分按 MAC 查询顺序
+    merged['score'] = same_vlan * 10 + not_trunk * 5 + mac_seen.notna().to_numpy() * 1
+    merged['match_count'] = merged.groupby('arp_idx')['arp_idx'].transform('size')
+    merged = merged.sort_values(['arp_idx', 'score', 'mac_order'], ascending=[True, False, True], kind='mergesort')
+    best = merged.drop_duplicates('arp_idx', keep='first').reset_index(drop=True)
+
+    # 置信度（百分点）
+    arp_vlan = _truthy_int(best['vlan_id_arp'])
+    mac_vlan = _truthy_int(best['vlan_id_mac'])
+    same_vlan = ((arp_vlan != 0) & (mac_vlan != 0) & (arp_vlan == mac_vlan)).to_numpy()
+    not_trunk = ~best['is_trunk'].fillna(False).astype(bool).to_numpy()
+    description = best['interface_description']
+    has_description = (description.notna() & (description.astype(str) != '')).to_numpy()
+    arp_seen = pd.to_datetime(best['last_seen_arp'])
+    mac_seen = pd.to_datetime(best['last_seen_mac'])
+    fresh = ((mac_seen - arp_seen).abs().dt.total_seconds() < 3600).fillna(False).to_numpy(dtype=bool)
+    points = np.minimum(50 + same_vlan * 20 + not_trunk * 15 + has_description * 10 + fresh * 5, 100)
+
+    # 设备与接口属性
+    hostnames = best['mac_device_id'].map(
+        {device_id: info.hostname for device_id, info in device_cache.items()}
+    )
+    is_core = _keyword_mask(hostnames, core_keywords)
+    is_uplink = _keyword_mask(best['mac_interface'], uplink_keywords)
+
+    # 最后发现时间：ARP 时间（缺失时取开始时间），MAC 更新时取 MAC 时间
+    last_seen = arp_seen.fillna(pd.Timestamp(start_time))
+    last_seen = last_seen.where(~(mac_seen.notna() & (mac_seen > last_seen)), mac_seen)
+
+    # VLAN：ARP 有效时取 ARP，否则取 MAC
+    vlan = best['vlan_id_arp'].where(arp_vlan != 0, best['vlan_id_mac'])
+
+    match_type = np.where(best['match_count'].to_numpy() == 1, 'single_match', 'cross_device')
+
+    results: List[CalculationResult] = []
+    for i, row in enumerate(best.itertuples(index=False)):
+        arp_device_id = _to_int(row.arp_device_id)
+        mac_device_id = _to_int(row.mac_device_id)
+        result = CalculationResult(
+            ip_address=row.ip_address,
+            mac_address=row.mac_address,
+            arp_source_device_id=arp_device_id,
+            mac_hit_device_id=mac_device_id,
+            access_interface=_to_str(row.mac_interface),
+            vlan_id=_to_int(vlan.iat[i]),
+            confidence=_CONFIDENCE[int(points[i])],
+            is_uplink=bool(is_uplink[i]),
+            is_core_switch=bool(is_core[i]),
+            match_type=str(match_type[i]),
+            last_seen=_to_datetime(last_seen.iat[i]),
+        )
+
+        arp_device = device_cache.get(arp_device_id)
+        if arp_device:
+            result.arp_device_hostname = arp_device.hostname
+            result.arp_device_ip = arp_device.ip_address
+            result.arp_device_location = arp_device.location
+
+        mac_device = device_cache.get(mac_device_id) if mac_device_id else None
+        if mac_device:
+            result.mac_device_hostname = mac_device.hostname
+            result.mac_device_ip = mac_device.ip_address
+            result.mac_device_location = mac_device.location
+
+        results.append(result)
+
+    single = int((match_type == 'single_match').sum())
+    stats.update({
+        'matched': len(results),
+        'no_mac_found': len(arp) - len(results),
+        'single_match': single,
+        'cross_device': len(results) - single,
+    })
+    return results, stats, current_ips
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+设备延迟探测服务
+
+功能：
+1. asyncio TCP 建连探测（默认 SSH 端口），并发数受限，可覆盖数千台设备
+2. 定时探测并批量回写 Device.latency / last_latency_check
+3. 记录最近一次探测结果，采集任务据此跳过不可达设备，
+   不再为死设备消耗 connect_to_device 的重试与退避
+
+说明：
+- 只探测 latency_check_enabled 为真的设备
+- 不可达设备的 latency 写为 NULL，last_latency_check 照常更新
+- 沿用 IPLocationScheduler 的 AsyncIOScheduler 模式：在 lifespan 中启动，
+  任务内部自行获取 Session
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.models import SessionLocal
+from app.models.models import Device
+from app.services.executors import get_db_executor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_PORT = 22
+
+
+@dataclass
+class ProbeTarget:
+    """探测目标（与 ORM 对象解耦，可跨线程使用）"""
+    device_id: int
+    host: str
+    port: int = DEFAULT_PROBE_PORT
+
+
+@dataclass
+class ProbeResult:
+    """单台设备探测结果"""
+    device_id: int
+    reachable: bool
+    latency_ms: Optional[int]
+    checked_at: datetime
+    error: Optional[str] = None
+
+
+async def probe_tcp(host: str, port: int, timeout: float) -> Tuple[bool, Optional[float], Optional[str]]:
+    """
+    TCP 建连探测
+
+    Args:
+        host: 目标地址
+        port: 目标端口
+        timeout: 超时（秒）
+
+    Returns:
+        (是否可达, 建连耗时（秒）, 错误信息)
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except asyncio.TimeoutError:
+        return False, None, f"timeout after {timeout}s"
+    except OSError as e:
+        return False, None, f"{type(e).__name__}: {e}"
+
+    elapsed = loop.time() - started
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True, elapsed, None
+
+
+class LatencyProber:
+    """
+    设备延迟探测器
+
+    使用 AsyncIOScheduler 定时探测全部设备并批量回写结果。
+    """
+
+    def __init__(
+        self,
+        interval_minutes: int = 5,
+        concurrency: int = 200,
+        timeout: float = 2.0,
+        max_age_seconds: int = 900
+    ):
+        """
+        初始化探测器（不启动）
+
+        Args:
+            interval_minutes: 探测间隔（分钟）
+            concurrency: 同时进行的探测数上限
+            timeout: 单台设备建连超时（秒）
+            max_age_seconds: 探测结果有效期（秒），过期后不再据此跳过设备
+        """
+        self.interval_minutes = interval_minutes
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_age_seconds = max_age_seconds
+        self.scheduler = AsyncIOScheduler()
+        self._is_running = False
+        self._last_run: Optional[datetime] = None
+        self._last_stats: Optional[dict] = None
+        # device_id -> (是否可达, 探测时间 monotonic)
+        self._reachability: Dict[int, Tuple[bool, float]] = {}
+
+    def start(self):
+        """启动定时探测"""
+        if self._is_running:
+            logger.warning("延迟探测器已在运行中")
+            return
+
+        self.scheduler.add_job(
+            func=self._run_probe_async,
+            trigger=IntervalTrigger(minutes=self.interval_minutes),
+            id='latency_probe',
+            name='设备延迟探测',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=60
+        )
+        self.scheduler.start()
+        self._is_running = True
+        logger.info(f"延迟探测器已启动，间隔: {self.interval_minutes} 分钟，并发: {self.concurrency}")
+
+    def shutdown(self):
+        """关闭定时探测"""
+        if self._is_running:
+            self.scheduler.shutdown()
+            self._is_running = False
+            logger.info("延迟探测器已关闭")
+
+    @staticmethod
+    def build_targets(devices: Iterable[Device]) -> List[ProbeTarget]:
+        """
+        将设备转换为探测目标（SSH 登录的设备使用其登录端口）
+
+        Args:
+            devices: 设备列表
+
+        Returns:
+            探测目标列表
+        """
+        targets = []
+        for device in devices:
+            if not device.ip_address:
+                continue
+            port = DEFAULT_PROBE_PORT
+            if (device.login_method or 'ssh').lower() == 'ssh' and device.login_port:
+                port = device.login_port
+            targets.append(ProbeTarget(device.id, device.ip_address, port))
+        return targets
+
+    async def probe_targets(self, targets: List[ProbeTarget]) -> List[ProbeResult]:
+        """
+        并发探测（并发数受 concurrency 限制）
+
+        Args:
+            targets: 探测目标列表
+
+        Returns:
+            探测结果列表（与输入顺序一致）
+        """
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def probe(target: ProbeTarget) -> ProbeResult:
+            async with semaphore:
+                reachable, elapsed, error = await probe_tcp(target.host, target.port, self.timeout)
+            result = ProbeResult(
+                device_id=target.device_id,
+                reachable=reachable,
+                latency_ms=max(1, round(elapsed * 1000)) if reachable else None,
+                checked_at=datetime.now(),
+                error=error,
+            )
+            self._reachability[target.device_id] = (reachable, time.monotonic())
+            return result
+
+        return list(await asyncio.gather(*(probe(target) for target in targets)))
+
+    @staticmethod
+    def save_results(db: Session, results: List[ProbeResult]) -> int:
+        """
+        批量回写探测结果（单条 executemany UPDATE）
+
+        Args:
+            db: 数据库会话
+            results: 探测结果列表
+
+        Returns:
+            更新行数
+        """
+        if not results:
+            return 0
+        table = Device.__table__
+        stmt = update(table).where(table.c.id == bindparam('_id')).values(
+            latency=bindparam('_latency'),
+            last_latency_check=bindparam('_checked_at'),
+        )
+        db.execute(stmt, [
+            {'_id': r.device_id, '_latency': r.latency_ms, '_checked_at': r.checked_at}
+            for r in results
+        ])
+        db.commit()
+        return len(results)
+
+    async def probe_all_async(self) -> dict:
+        """
+        探测全部启用延迟检查的设备并回写
+
+        Returns:
+            探测统计
+        """
+        started = time.monotonic()
+
+        def load_targets() -> List[ProbeTarget]:
+            db = SessionLocal()
+            try:
+                devices = db.query(Device).filter(Device.latency_check_enabled.is_(True)).all()
+                return self.build_targets(devices)
+            finally:
+                db.close()
+
+        targets = await get_db_executor().run(load_targets)
+        results = await self.probe_targets(targets)
+
+        def save() -> int:
+            db = SessionLocal()
+            try:
+                return self.save_results(db, results)
+            finally:
+                db.close()
+
+        saved = await get_db_executor().run(save)
+        reachable = [r.latency_ms for r in results if r.reachable]
+        stats = {
+            'total': len(results),
+            'reachable': len(reachable),
+            'unreachable': len(results) - len(reachable),
+            'saved': saved,
+            'avg_latency_ms': round(sum(reachable) / len(reachable), 1) if reachable else None,
+            'duration_seconds': round(time.monotonic() - started, 3),
+        }
+        self._last_run = datetime.now()
+        self._last_stats = stats
+        logger.info(f"延迟探测完成：{stats}")
+        return stats
+
+    async def _run_probe_async(self):
+        """定时任务回调"""
+        try:
+            await self.probe_all_async()
+        except Exception as e:
+            logger.error(f"延迟探测失败: {e}", exc_info=True)
+
+    def is_unreachable(self, device_id: int) -> bool:
+        """
+        最近一次有效探测是否判定设备不可达
+
+        Args:
+            device_id: 设备 ID
+
+        Returns:
+            探测结果在有效期内且不可达时返回 True
+        """
+        record = self._reachability.get(device_id)
+        if record is None:
+            return False
+        reachable, checked_at = record
+        return not reachable and time.monotonic() - checked_at <= self.max_age_seconds
+
+    def get_status(self) -> dict:
+        """
+        获取探测器状态
+
+        Returns:
+            状态信息字典
+        """
+        job = self.scheduler.get_job('latency_probe') if self._is_running else None
+        return {
+            'scheduler': 'latency_probe',
+            'is_running': self._is_running,
+            'interval_minutes': self.interval_minutes,
+            'concurrency': self.concurrency,
+            'timeout': self.timeout,
+            'last_run': self._last_run.isoformat() if self._last_run else None,
+            'last_stats': self._last_stats,
+            'next_run': job.next_run_time.isoformat() if job and job.next_run_time else None,
+            'unreachable_devices': sum(1 for device_id in self._reachability if self.is_unreachable(device_id)),
+        }
+
+
+def _create_prober() -> LatencyProber:
+    """根据全局配置创建探测器"""
+    from app.config import settings
+
+    return LatencyProber(
+        interval_minutes=settings.LATENCY_PROBE_INTERVAL_MINUTES,
+        concurrency=settings.LATENCY_PROBE_CONCURRENCY,
+        timeout=settings.LATENCY_PROBE_TIMEOUT,
+        max_age_seconds=settings.LATENCY_PROBE_MAX_AGE,
+    )
+
+
+# 全局探测器实例
+latency_prober = _create_prober()
+
+
+def get_latency_prober() -> LatencyProber:
+    """
+    获取延迟探测器实例
+
+    Returns:
+        LatencyProber 实例
+    """
+    return latency_prober
@@ -3,9 +3,13 @@ Netmiko服务模块
 提供基于Netmiko的网络设备操作服务
 """
 import asyncio
+import ipaddress
 import re
-from typing import Dict, List, Optional, Any
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Any, Sequence, Tuple, Union
 from datetime import datetime
+from weakref import WeakKeyDictionary
 
 try:
     from netmiko import ConnectHandler, NetmikoTimeoutException, NetmikoAuthenticationException
@@ -14,7 +18,283 @@ except ImportError:
     NETMIKO_AVAILABLE = False
     ConnectHandler = None
 
+    class NetmikoTimeoutException(Exception):
+        """未安装 Netmiko 时的占位异常"""
+
+    class NetmikoAuthenticationException(Exception):
+        """未安装 Netmiko 时的占位异常"""
+
+from app.config import settings
 from app.models.models import Device
+from app.services.device_fanout import FanoutLimits, get_fanout_engine
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.cli_parsers import get_parser, interface_key
+from app.services.executors import get_ssh_executor
+from app.services.parse_stage import get_parse_stage
+from app.services.ssh_transport import (
+    SSHTransport,
+    TransportAuthenticationError,
+    TransportTimeoutError,
+    build_prompt_regex,
+    get_transport,
+    has_pager,
+    last_line,
+    register_transport,
+    strip_command_output,
+)
+from app.services.timeout_engine import get_timeout_engine
+
+
+class NetmikoTransport(SSHTransport):
+    """Netmiko 驱动（阻塞调用在 SSH I/O 线程池中执行）"""
+
+    name = "netmiko"
+
+    def supports(self, device: Device, device_type: str) -> bool:
+        return NETMIKO_AVAILABLE
+
+    async def connect(self, device_params: Dict[str, Any]) -> Any:
+        return await get_ssh_executor().run(lambda: ConnectHandler(**device_params))
+
+
+register_transport(NetmikoTransport())
+
+
+class CommandSession:
+    """
+    设备命令会话
+
+    首次执行命令时借出一个会话（优先连接池，连接池不可用时直连），之后的命令全部复用该会话，
+    关闭时归还连接池。一次采集中多个采集项共用同一个会话，每台设备只登录一次。
+
+    说明：
+    - 会话只尝试借出一次，借出失败后所有命令直接返回 None
+    - 命令执行异常后会话状态不可信，后续命令不再执行，关闭时直接断开而不归还连接池
+    - run_bundle() 按命令缓存输出，多个采集项共用同一条命令（如 version 与 serial）时只执行一次
+    """
+
+    def __init__(self, service: "NetmikoService", device: Device):
+        """
+        初始化会话（不建立连接）
+
+        Args:
+            service: Netmiko 服务实例
+            device: 设备对象
+        """
+        self.service = service
+        self.device = device
+        self._pool = None
+        self._ssh_connection = None
+        self._connection = None
+        self._opened = False
+        self._failed = False
+        self._outputs: Dict[str, Optional[str]] = {}
+
+    async def __aenter__(self) -> "CommandSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def connected(self) -> bool:
+        """会话是否已借出且可用"""
+        return self._connection is not None and not self._failed
+
+    async def _open(self) -> bool:
+        """
+        借出会话（每个 CommandSession 只尝试一次）
+
+        Returns:
+            会话是否可用
+        """
+        if self._opened:
+            return self.connected
+        self._opened = True
+
+        from app.services.ssh_connection_pool import get_ssh_connection_pool
+
+        service = self.service
+        device = self.device
+
+        # 熔断中的设备直接失败，连接池与直连回退都不再尝试
+        if service.circuit_breaker.is_open(device.id):
+            print(f"[WARNING] Circuit open for device {device.hostname}, skipping session")
+            return False
+
+        self._pool = get_ssh_connection_pool()
+        breaker = service.circuit_breaker
+        try:
+            # 从连接池获取连接
+            failures_before = breaker.failure_count(device.id)
+            self._ssh_connection = await self._pool.get_connection(device)
+            if self._ssh_connection:
+                self._connection = self._ssh_connection.connection
+                print(f"[INFO] Got connection from pool for device {device.hostname}")
+            elif breaker.is_open(device.id) or breaker.failure_count(device.id) > failures_before:
+                # 连接池刚建连失败或设备已熔断时直连也必然失败，不再重试；
+                # 等待超时、连接池名额耗尽等原因仍回退直连
+                print(f"[WARNING] Connection to device {device.hostname} just failed, skipping direct connection")
+            else:
+                print(f"[INFO] Failed to get connection from pool, trying direct connection")
+                self._connection = await service.connect_to_device(device)
+
+        except (NetmikoTimeoutException, TransportTimeoutError):
+            print(f"[ERROR] Connection timeout for device {device.hostname} ({device.ip_address})")
+            print(f"[ERROR] Connection timeout: {service.conn_timeout}s")
+            print(f"[ERROR] Possible causes:")
+            print(f"[ERROR]   1. Network unreachable")
+            print(f"[ERROR]   2. Firewall blocking connection")
+            print(f"[ERROR]   3. Wrong IP address or port")
+            print(f"[ERROR]   4. Device SSH service not running")
+            return False
+
+        except (NetmikoAuthenticationException, TransportAuthenticationError):
+            print(f"[ERROR] Authentication failed for device {device.hostname} ({device.ip_address})")
+            print(f"[ERROR] Possible causes:")
+            print(f"[ERROR]   1. Invalid username: {device.username}")
+            print(f"[ERROR]   2. Invalid password")
+            print(f"[ERROR]   3. Account locked or disabled")
+            print(f"[ERROR]   4. Device requires special authentication method")
+            return False
+
+        except Exception as e:
+            print(f"[ERROR] Unexpected error opening session on device {device.hostname} ({device.ip_address}): {e}")
+            print(f"[ERROR] Error type: {type(e).__name__}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        if not self._connection:
+            print(f"[ERROR] Failed to connect to device {device.hostname} ({device.ip_address}) for command execution")
+            print(f"[ERROR] Please check:")
+            print(f"[ERROR]   1. Device IP address: {device.ip_address}")
+            print(f"[ERROR]   2. Device SSH port: {device.login_port}")
+            print(f"[ERROR]   3. Device username: {device.username}")
+            print(f"[ERROR]   4. Device password: {'*' * len(device.password) if device.password else 'Not set'}")
+            print(f"[ERROR]   5. Network connectivity (try: ping {device.ip_address})")
+            print(f"[ERROR]   6. Device SSH service status")
+            print(f"[ERROR]   7. Firewall rules")
+            return False
+        return True
+
+    async def run(
+        self,
+        command: str,
+        expect_string: Optional[str] = None,
+        read_timeout: Optional[float] = None,
+        command_type: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        在会话上执行单条命令
+
+        Args:
+            command: 要执行的命令
+            expect_string: 预期的提示符字符串，用于判断命令执行完成
+            read_timeout: 命令执行超时时间（秒），None 表示由超时引擎按设备延迟与历史耗时计算
+            command_type: 命令类型（arp_table / mac_table / ...），None 表示按命令反查
+
+        Returns:
+            命令输出，失败返回None
+        """
+        service = self.service
+        device = self.device
+
+        if command_type is None:
+            command_type = service.get_command_type(command, device.vendor)
+        if read_timeout is None:
+            read_timeout = service.timeout_engine.read_timeout(device, command_type)
+
+        if self._failed:
+            print(f"[WARNING] Session on device {device.hostname} failed earlier, skipping command '{command}'")
+            return None
+        if not await self._open():
+            return None
+
+        print(f"[INFO] Executing command '{command}' on device {device.hostname} ({device.ip_address})")
+        print(f"[INFO] Command timeout: {read_timeout}s, Expect string: {expect_string}")
+
+        started = time.monotonic()
+        try:
+            output = await service._dispatch_command(
+                self._connection, device, command, expect_string, read_timeout
+            )
+        except (NetmikoTimeoutException, TransportTimeoutError):
+            self._failed = True
+            service.timeout_engine.record_timeout(device.id, command_type, read_timeout)
+            print(f"[ERROR] Timeout executing command '{command}' on device {device.hostname} ({device.ip_address})")
+            print(f"[ERROR] Timeout value: {read_timeout}s")
+            print(f"[ERROR] Possible causes:")
+            print(f"[ERROR]   1. Command execution takes too long")
+            print(f"[ERROR]   2. Device is busy")
+            print(f"[ERROR]   3. Network latency")
+            print(f"[ERROR]   4. Prompt pattern not detected (try using expect_string)")
+            return None
+        except Exception as e:
+            self._failed = True
+            print(f"[ERROR] Error sending command '{command}' to device {device.hostname}: {e}")
+            print(f"[ERROR] Error type: {type(e).__name__}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+        service.timeout_engine.record(
+            device.id, command_type, time.monotonic() - started, len(output or "")
+        )
+
+        if output:
+            print(f"[SUCCESS] Command '{command}' executed successfully on device {device.hostname}")
+            print(f"[INFO] Output length: {len(output)} characters")
+        else:
+            print(f"[WARNING] Command '{command}' returned empty output on device {device.hostname}")
+
+        return output
+
+    async def run_bundle(
+        self,
+        commands: Sequence[Union[str, Tuple[str, Optional[str]]]]
+    ) -> Dict[str, Optional[str]]:
+        """
+        按顺序执行一组查询命令，返回全部输出
+
+        Args:
+            commands: 命令列表，元素为命令字符串或 (命令, 命令类型) 元组
+
+        Returns:
+            {命令: 输出}，按命令顺序排列，失败的命令输出为 None
+        """
+        outputs: Dict[str, Optional[str]] = {}
+        for item in commands:
+            command, command_type = (item, None) if isinstance(item, str) else item
+            if not command or command in outputs:
+                continue
+            if command not in self._outputs:
+                self._outputs[command] = await self.run(command, command_type=command_type)
+            outputs[command] = self._outputs[command]
+        return outputs
+
+    async def close(self):
+        """归还或关闭会话（可重复调用）"""
+        device = self.device
+        ssh_connection, connection = self._ssh_connection, self._connection
+        self._ssh_connection = None
+        self._connection = None
+
+        if ssh_connection and self._failed:
+            # 命令执行失败的连接直接关闭，避免下一个借用者读到残留输出
+            await self._pool.close_connection(ssh_connection)
+            print(f"[INFO] Closed failed pooled connection for device {device.hostname}")
+        elif ssh_connection:
+            # 如果是从连接池获取的连接，归还连接池供其他协程借用
+            await self._pool.release_connection(ssh_connection)
+            print(f"[INFO] Released connection back to pool for device {device.hostname}")
+        elif connection:
+            # 如果是直接创建的连接，需要关闭
+            try:
+                connection.disconnect()
+                print(f"[INFO] Disconnected from device {device.hostname} after command execution")
+            except Exception as e:
+                print(f"[WARNING] Error disconnecting from device {device.hostname}: {e}")
 
 
 class NetmikoService:
@@ -49,6 +329,7 @@ class NetmikoService:
             "interfaces": "show interfaces",
             "interfaces_status": "show interfaces status",
             "mac_table": "show mac address-table",
+            "arp_table": "show ip arp",
             "inventory": "show inventory",
             "running_config": "show running-config",
         },
@@ -57,6 +338,7 @@ class NetmikoService:
             "interfaces": "display interface",
             "interfaces_status": "display interface brief",
             "mac_table": "display mac-address",
+            "arp_table": "display arp",
             "inventory": "display elabel",
             "running_config": "display current-configuration",
         },
@@ -65,6 +347,7 @@ class NetmikoService:
             "interfaces": "display interface",
             "interfaces_status": "display interface brief",
             "mac_table": "display mac-address",
+            "arp_table": "display arp",
             "inventory": "display device",
             "running_config": "display current-configuration",
         },
@@ -73,16 +356,40 @@ class NetmikoService:
             "interfaces": "show interface",
             "interfaces_status": "show interface status",
             "mac_table": "show mac-address-table",
+            "arp_table": "show arp",
             "inventory": "show inventory",
             "running_config": "show running-config",
         },
     }
 
+    # 关闭终端分页的命令（按 Netmiko 设备类型，依次尝试）
+    DISABLE_PAGING_COMMANDS = {
+        "huawei": ["screen-length 0 temporary", "screen-length disable"],
+        "hp_comware": ["screen-length disable"],
+    }
+    # 关闭分页命令被拒绝的输出特征
+    PAGING_REJECTED_PATTERN = re.compile(r"error|unrecognized|invalid|incomplete|^\s*%|\^", re.IGNORECASE | re.MULTILINE)
+    # 提示符驱动读取的轮询间隔（秒），有数据时立即继续读取
+    PROMPT_POLL_INTERVAL = 0.02
+
+    # 标准化后的MAC地址
+    MAC_ADDRESS_PATTERN = re.compile(r'^[0-9A-F]{2}(:[0-9A-F]{2}){5}$')
+    # 接口名称（GE1/0/1、Vlanif10、Eth-Trunk1、Gi1/0/1 等），至少两个字母开头
+    INTERFACE_NAME_PATTERN = re.compile(r'^[A-Za-z]{2}[A-Za-z\-]*\d[\d/:.]*$')
+    # VLAN 接口名称（华为 Vlanif10、华三 Vlan-interface10、Cisco Vlan10）
+    VLAN_INTERFACE_PATTERN = re.compile(r'vlan-?(?:if|interface)?\s*(\d+)$', re.IGNORECASE)
+
+    # 每个会话的分页状态（True 已关闭 / False 设备不支持），会话对象释放后自动清除
+    _paging_state: "WeakKeyDictionary[Any, bool]" = WeakKeyDictionary()
+
     def __init__(self):
         """初始化Netmiko服务"""
-        self.timeout = 60  # 增加默认超时时间到60秒
         self.max_retries = 3
-        self.conn_timeout = 30  # 增加连接超时时间到30秒
+        self.conn_timeout = 30  # 增加连接超时时间到30秒（无延迟数据时的连接超时）
+        self.timeout_engine = get_timeout_engine()
+        self.circuit_breaker = get_circuit_breaker()
+        self.ssh_executor = get_ssh_executor()
+        self.parse_stage = get_parse_stage()
 
     def get_device_type(self, vendor: str) -> str:
         """
@@ -100,6 +407,23 @@ class NetmikoService:
         vendor_lower = vendor.lower().strip()
         return self.DEVICE_TYPE_MAPPING.get(vendor_lower, "cisco_ios")
 
+    @classmethod
+    def parser_device_type(cls, vendor: Optional[str]) -> Optional[str]:
+        """
+        获取解析器注册表 / 配置哈希规则使用的设备类型（未知厂商返回None，不套用 Cisco 模板）
+
+        Args:
+            vendor: 设备厂商名称（不区分大小写）
+
+        Returns:
+            Netmiko设备类型
+        """
+        vendor_lower = vendor.lower().strip() if vendor else ""
+        device_type = cls.DEVICE_TYPE_MAPPING.get(vendor_lower)
+        if device_type is None and vendor_lower.startswith("cisco"):
+            device_type = "cisco_ios"
+        return device_type
+
     def get_commands(self, vendor: str, command_type: str) -> str:
         """
         获取对应厂商的命令
@@ -118,6 +442,49 @@ class NetmikoService:
         vendor_commands = self.COMMAND_MAPPING.get(vendor_lower, self.COMMAND_MAPPING["cisco"])
         return vendor_commands.get(command_type, "")
 
+    def get_command_type(self, command: str, vendor: str) -> Optional[str]:
+        """
+        根据命令字符串反查命令类型（用于超时计算）
+
+        Args:
+            command: 命令字符串
+            vendor: 设备厂商
+
+        Returns:
+            命令类型，无法识别返回None
+        """
+        command_lower = command.lower().strip()
+        if not command_lower:
+            return None
+        if command_lower.split()[-1] == "arp" or " arp" in command_lower:
+            return "arp_table"
+
+        vendor_lower = vendor.lower().strip() if vendor else "cisco"
+        vendor_commands = self.COMMAND_MAPPING.get(vendor_lower, self.COMMAND_MAPPING["cisco"])
+        for command_type, vendor_command in vendor_commands.items():
+            if command_lower == vendor_command:
+                return command_type
+        return None
+
+    def select_transport(self, device: Device, device_type: str) -> SSHTransport:
+        """
+        选择设备使用的传输驱动
+
+        优先使用 SSH_TRANSPORT 配置的驱动，驱动不支持该设备（未安装、非 SSH 登录、
+        厂商未适配）时退回 Netmiko。
+
+        Args:
+            device: 设备对象
+            device_type: Netmiko 设备类型
+
+        Returns:
+            传输驱动
+        """
+        preferred = get_transport(settings.SSH_TRANSPORT)
+        if preferred is not None and preferred.supports(device, device_type):
+            return preferred
+        return get_transport("netmiko")
+
     async def connect_to_device(self, device: Device, retry_count: int = None) -> Optional[Any]:
         """
         连接到设备（带重试机制）
@@ -127,17 +494,27 @@ class NetmikoService:
             retry_count: 重试次数，None表示使用默认值
 
         Returns:
-            Netmiko连接对象，失败返回None
+            连接对象（Netmiko 连接或 AsyncCLISession），失败返回None
         """
-        if not NETMIKO_AVAILABLE:
+        device_type = self.get_device_type(device.vendor)
+        transport = self.select_transport(device, device_type)
+        if not transport.supports(device, device_type):
             print("[ERROR] Netmiko is not installed")
             return None
 
-        device_type = self.get_device_type(device.vendor)
+        # 熔断中的设备直接失败，不再消耗重试与退避
+        breaker = self.circuit_breaker
+        if not breaker.allow_request(device.id):
+            print(f"[WARNING] Circuit open for device {device.hostname}, skipping connection")
+            return None
+
         max_retries = retry_count if retry_count is not None else self.max_retries
+        # 半开状态只做一次探测连接
+        if breaker.is_half_open(device.id):
+            max_retries = 1
 
         print(f"[INFO] Attempting to connect to device {device.hostname} ({device.ip_address})")
-        print(f"[INFO] Device type: {device_type}, Max retries: {max_retries}")
+        print(f"[INFO] Device type: {device_type}, Transport: {transport.name}, Max retries: {max_retries}")
 
         for attempt in range(1, max_retries + 1):
             try:
@@ -145,32 +522,30 @@ class NetmikoService:
                 
                 print(f"[INFO] Connection attempt {attempt}/{max_retries} for device {device.hostname}")
                 
-                # 在异步环境中运行同步的netmiko连接
-                loop = asyncio.get_event_loop()
-                connection = await loop.run_in_executor(
-                    None,
-                    lambda: ConnectHandler(**device_params)
-                )
+                connection = await transport.connect(device_params)
                 
                 print(f"[SUCCESS] Successfully connected to device {device.hostname} on attempt {attempt}")
+                breaker.record_success(device.id)
                 return connection
                 
-            except NetmikoAuthenticationException as e:
+            except (NetmikoAuthenticationException, TransportAuthenticationError) as e:
                 print(f"[ERROR] Authentication failed for device {device.hostname} on attempt {attempt}: {e}")
                 print(f"[ERROR] Common causes: 1) Invalid username/password, 2) Incorrect SSH key, 3) Wrong device")
                 
                 # 认证失败不需要重试
                 if attempt == max_retries:
                     print(f"[ERROR] All {max_retries} authentication attempts failed for device {device.hostname}")
+                breaker.record_failure(device.id, f"authentication failed: {e}", auth_failure=True)
                 return None
                 
-            except NetmikoTimeoutException as e:
+            except (NetmikoTimeoutException, TransportTimeoutError) as e:
                 print(f"[ERROR] Connection timeout for device {device.hostname} on attempt {attempt}: {e}")
                 print(f"[ERROR] Common causes: 1) Network unreachable, 2) Firewall blocking, 3) Wrong IP/port")
                 
                 # 最后一次尝试失败
                 if attempt == max_retries:
                     print(f"[ERROR] All {max_retries} connection attempts timed out for device {device.hostname}")
+                    breaker.record_failure(device.id, f"connection timeout: {e}")
                     return None
                 
                 # 等待一段时间后重试（指数退避）
@@ -187,6 +562,7 @@ class NetmikoService:
                     print(f"[ERROR] All {max_retries} connection attempts failed for device {device.hostname}")
                     import traceback
                     traceback.print_exc()
+                    breaker.record_failure(device.id, f"{type(e).__name__}: {e}")
                     return None
                 
                 # 等待一段时间后重试
@@ -212,8 +588,9 @@ class NetmikoService:
             "host": device.ip_address,
             "username": device.username,
             "port": device.login_port,
-            "timeout": self.timeout,
-            "conn_timeout": self.conn_timeout,
+            # 会话超时由超时引擎按各命令类型的读取超时计算（上限 NETMIKO_MAX_TIMEOUT）
+            "timeout": self.timeout_engine.session_timeout(device),
+            "conn_timeout": self.timeout_engine.connect_timeout(device, self.conn_timeout),
             "session_log": None,  # 禁用会话日志以提高性能
             "allow_agent": False,  # 禁用SSH代理
             "global_delay_factor": 2,  # 增加全局延迟因子
@@ -328,11 +705,87 @@ class NetmikoService:
         # 清理分页标记
         return re.sub(r'\s*---- More ----\s*', '\n', full_output)
 
+    def _read_until_prompt(self, connection, command: str, read_timeout: float, device_type: str) -> str:
+        """
+        发送命令并读取到提示符出现立即返回（同步方法，由异步包装调用）
+
+        没有固定 sleep：有数据时立即继续读取，无数据时短暂轮询；
+        仍遇到分页标记时立即发送空格翻页。
+
+        Args:
+            connection: Netmiko 连接对象
+            command: 要执行的命令
+            read_timeout: 超时时间（秒）
+            device_type: Netmiko 设备类型
+
+        Returns:
+            命令输出（不含回显、提示符与分页标记）
+        """
+        prompt_regex = build_prompt_regex(device_type, getattr(connection, "base_prompt", None))
+        connection.write_channel(command + "\n")
+        deadline = time.monotonic() + read_timeout
+        parts: List[str] = []
+        tail = ""
+        while time.monotonic() < deadline:
+            chunk = connection.read_channel()
+            if not chunk:
+                time.sleep(self.PROMPT_POLL_INTERVAL)
+                continue
+            parts.append(chunk)
+            tail = (tail + chunk)[-512:]
+            if has_pager(tail):
+                connection.write_channel(" ")
+                tail = ""
+            elif prompt_regex.search(last_line(tail)):
+                return strip_command_output("".join(parts), command, prompt_regex)
+        raise TransportTimeoutError(f"等待设备提示符超时（{read_timeout}s）: {command}")
+
+    def _disable_paging(self, connection, device_type: str) -> bool:
+        """
+        关闭会话的终端分页（同步方法，由异步包装调用）
+
+        Args:
+            connection: Netmiko 连接对象
+            device_type: Netmiko 设备类型
+
+        Returns:
+            是否关闭成功
+        """
+        for command in self.DISABLE_PAGING_COMMANDS.get(device_type, []):
+            try:
+                output = self._read_until_prompt(connection, command, 10, device_type)
+            except Exception as e:
+                print(f"[WARNING] Disable paging command '{command}' failed: {e}")
+                return False
+            if not self.PAGING_REJECTED_PATTERN.search(output):
+                return True
+            print(f"[WARNING] Device rejected disable paging command '{command}': {output.strip()}")
+        return False
+
+    async def ensure_paging_disabled(self, connection, device: Device) -> bool:
+        """
+        每个会话只关闭一次终端分页（连接池复用的会话不再重复下发）
+
+        Args:
+            connection: Netmiko 连接对象
+            device: 设备对象
+
+        Returns:
+            会话分页是否已关闭；设备不支持时返回 False，调用方退回翻页读取
+        """
+        state = self._paging_state.get(connection)
+        if state is None:
+            device_type = self.get_device_type(device.vendor)
+            state = await self.ssh_executor.run(self._disable_paging, connection, device_type)
+            self._paging_state[connection] = state
+            print(f"[INFO] Paging {'disabled' if state else 'not supported'} for session on device {device.hostname}")
+        return state
+
     async def _send_command_with_pagination(
         self,
         connection,
         command: str,
-        read_timeout: int = 20,
+        read_timeout: float = 20,
         delay_factor: float = 2.0,
         cleanup_prompt: bool = True
     ) -> str:
@@ -361,20 +814,18 @@ class NetmikoService:
         print(f"[INFO] Using send_command_timing for pagination-prone device, command: {command}")
 
         # 使用 send_command_timing（基于时间判断，不依赖正则匹配）
-        output = await asyncio.get_event_loop().run_in_executor(
-            None,
+        output = await self.ssh_executor.run(
             lambda: connection.send_command_timing(
                 command,
                 delay_factor=delay_factor,
-                max_loops=read_timeout * 10  # max_loops = read_timeout * 10
+                max_loops=int(read_timeout * 10)  # max_loops = read_timeout * 10
             )
         )
 
         # 分页处理（包装为异步执行，防止阻塞事件循环）
         if '---- More ----' in output:
             print(f"[INFO] Pagination detected, handling...")
-            output = await asyncio.get_event_loop().run_in_executor(
-                None,
+            output = await self.ssh_executor.run(
                 lambda: self._handle_pagination(connection, output)
             )
 
@@ -383,8 +834,7 @@ class NetmikoService:
             try:
                 connection.write_channel("\n")
                 await asyncio.sleep(0.2)
-                await asyncio.get_event_loop().run_in_executor(
-                    None,
+                await self.ssh_executor.run(
                     lambda: connection.read_channel()
                 )
             except Exception as e:
@@ -392,175 +842,202 @@ class NetmikoService:
 
         return output
 
-    async def execute_command(self, device: Device, command: str, expect_string: Optional[str] = None, read_timeout: int = 20) -> Optional[str]:
+    @staticmethod
+    def _is_async_connection(connection: Any) -> bool:
+        """连接是否为 asyncio 原生会话（AsyncCLISession）"""
+        return getattr(connection, "is_async", False) is True
+
+    async def _send_command(
+        self,
+        connection: Any,
+        command: str,
+        read_timeout: float,
+        expect_string: Optional[str] = None
+    ) -> str:
         """
-        在设备上执行命令（带增强的错误处理）
+        按连接类型发送单条查询命令
+
+        asyncio 会话直接在事件循环中执行，Netmiko 连接放到 SSH I/O 线程池执行。
+
+        Args:
+            connection: 连接对象
+            command: 命令
+            read_timeout: 超时（秒）
+            expect_string: 结束标记正则
+
+        Returns:
+            命令输出
+        """
+        if self._is_async_connection(connection):
+            return await connection.send_command(command, read_timeout=read_timeout, expect_string=expect_string)
+        if expect_string:
+            return await self.ssh_executor.run(
+                lambda: connection.send_command(command, expect_string=expect_string, read_timeout=read_timeout)
+            )
+        return await self.ssh_executor.run(lambda: connection.send_command(command, read_timeout=read_timeout))
+
+    async def _dispatch_command(
+        self,
+        connection: Any,
+        device: Device,
+        command: str,
+        expect_string: Optional[str],
+        read_timeout: float
+    ) -> str:
+        """
+        在已借出的会话上按命令类别选择发送方式并执行（异常由调用方处理）
 
         Args:
+            connection: 设备会话
             device: 设备对象
             command: 要执行的命令
-            expect_string: 预期的提示符字符串，用于判断命令执行完成
+            expect_string: 预期的提示符字符串
             read_timeout: 命令执行超时时间（秒）
 
         Returns:
-            命令输出，失败返回None
+            命令输出
         """
-        from app.services.ssh_connection_pool import get_ssh_connection_pool
-
-        print(f"[INFO] Executing command '{command}' on device {device.hostname} ({device.ip_address})")
-        print(f"[INFO] Command timeout: {read_timeout}s, Expect string: {expect_string}")
-
-        ssh_conn_pool = get_ssh_connection_pool()
-        connection = None
-        ssh_connection = None
+        # 获取厂商特定的expect字符串
+        vendor_expects = self._get_vendor_expect_strings(device.vendor)
+
+        # 判断是否为配置命令
+        is_config_cmd = self._is_config_command(command, device.vendor)
+
+        # 评审建议 P0: 添加分页判断（华为/H3C 查询命令）
+        vendor_lower = device.vendor.lower().strip() if device.vendor else ""
+        needs_pagination = vendor_lower in ['huawei', 'h3c', '华为', '华三']
+
+        # 评审建议 P0: 分支优先级明确
+        # 优先级：asyncio 会话 > 分页查询 > expect_string > 配置命令 > 默认查询
+        if self._is_async_connection(connection):
+            # asyncio 原生会话：已关闭分页，按提示符读取，直接在事件循环中执行
+            if is_config_cmd and not expect_string:
+                return await connection.send_config_set(
+                    [command], read_timeout=read_timeout, exit_config_mode=False
+                )
+            return await connection.send_command(
+                command, read_timeout=read_timeout, expect_string=expect_string
+            )
+        if needs_pagination and not is_config_cmd \
+                and await self.ensure_paging_disabled(connection, device):
+            # 华为/H3C 查询命令：会话已关闭分页，读到提示符立即返回
+            return await self.ssh_executor.run(
+                self._read_until_prompt, connection, command, read_timeout,
+                self.get_device_type(device.vendor)
+            )
+        if needs_pagination and not is_config_cmd:
+            # 华为/H3C 设备不支持关闭分页：使用 send_command_timing + 分页处理
+            print(f"[INFO] Huawei/H3C query command detected, using send_command_timing with pagination")
+            return await self._send_command_with_pagination(
+                connection, command, read_timeout
+            )
+        if expect_string:
+            # 如果用户提供了expect_string，使用用户提供的
+            print(f"[INFO] Sending command with user-provided expect_string: {expect_string}")
+            return await self.ssh_executor.run(
+                lambda: connection.send_command(command, expect_string=expect_string, read_timeout=read_timeout)
+            )
+        if is_config_cmd:
+            # 对于配置命令，使用send_config_set方法
+            print(f"[INFO] Detected config command, using send_config_set")
+            try:
+                # 尝试使用send_config_set执行配置命令
+                return await self.ssh_executor.run(
+                    lambda: connection.send_config_set(
+                        [command],
+                        exit_config_mode=False,  # 不自动退出配置模式
+                        read_timeout=read_timeout
+                    )
+                )
+            except Exception as config_e:
+                print(f"[WARNING] send_config_set failed: {config_e}, trying send_command with expect_string")
+                # 如果send_config_set失败，回退到send_command
+                return await self.ssh_executor.run(
+                    lambda: connection.send_command(
+                        command,
+                        expect_string=vendor_expects['any_view'],
+                        read_timeout=read_timeout
+                    )
+                )
+        # 其他厂商查询命令，使用默认方式
+        print(f"[INFO] Sending command without expect_string (query command)")
+        return await self.ssh_executor.run(
+            lambda: connection.send_command(command, read_timeout=read_timeout)
+        )
 
-        try:
-            # 从连接池获取连接
-            ssh_connection = await ssh_conn_pool.get_connection(device)
-            if ssh_connection:
-                connection = ssh_connection.connection
-                print(f"[INFO] Got connection from pool for device {device.hostname}")
-            else:
-                # 连接池获取失败，尝试直接连接
-                print(f"[INFO] Failed to get connection from pool, trying direct connection")
-                connection = await self.connect_to_device(device)
-
-            if not connection:
-                print(f"[ERROR] Failed to connect to device {device.hostname} ({device.ip_address}) for command execution")
-                print(f"[ERROR] Please check:")
-                print(f"[ERROR]   1. Device IP address: {device.ip_address}")
-                print(f"[ERROR]   2. Device SSH port: {device.login_port}")
-                print(f"[ERROR]   3. Device username: {device.username}")
-                print(f"[ERROR]   4. Device password: {'*' * len(device.password) if device.password else 'Not set'}")
-                print(f"[ERROR]   5. Network connectivity (try: ping {device.ip_address})")
-                print(f"[ERROR]   6. Device SSH service status")
-                print(f"[ERROR]   7. Firewall rules")
-                return None
+    def open_session(self, device: Device) -> "CommandSession":
+        """
+        创建设备命令会话（首次执行命令时才借出连接），可作为 async with 使用
 
-            loop = asyncio.get_event_loop()
+        Args:
+            device: 设备对象
 
-            # 获取厂商特定的expect字符串
-            vendor_expects = self._get_vendor_expect_strings(device.vendor)
+        Returns:
+            CommandSession 实例
+        """
+        return CommandSession(self, device)
 
-            # 判断是否为配置命令
-            is_config_cmd = self._is_config_command(command, device.vendor)
+    @asynccontextmanager
+    async def _session_scope(self, device: Device, session: Optional["CommandSession"] = None):
+        """
+        复用调用方传入的会话；未传入时创建新会话并在退出时关闭
 
-            # 评审建议 P0: 添加分页判断（华为/H3C 查询命令）
-            vendor_lower = device.vendor.lower().strip() if device.vendor else ""
-            needs_pagination = vendor_lower in ['huawei', 'h3c', '华为', '华三']
+        Args:
+            device: 设备对象
+            session: 调用方已打开的会话
+        """
+        if session is not None:
+            yield session
+            return
+        async with self.open_session(device) as own_session:
+            yield own_session
 
-            try:
-                # 评审建议 P0: 分支优先级明确
-                # 优先级：分页查询 > expect_string > 配置命令 > 默认查询
-                if needs_pagination and not is_config_cmd:
-                    # 华为/H3C 查询命令：使用 send_command_timing + 分页处理
-                    print(f"[INFO] Huawei/H3C query command detected, using send_command_timing with pagination")
-                    output = await self._send_command_with_pagination(
-                        connection, command, read_timeout
-                    )
-                elif expect_string:
-                    # 如果用户提供了expect_string，使用用户提供的
-                    print(f"[INFO] Sending command with user-provided expect_string: {expect_string}")
-                    output = await loop.run_in_executor(
-                        None,
-                        lambda: connection.send_command(command, expect_string=expect_string, read_timeout=read_timeout)
-                    )
-                elif is_config_cmd:
-                    # 对于配置命令，使用send_config_set方法
-                    print(f"[INFO] Detected config command, using send_config_set")
-                    try:
-                        # 尝试使用send_config_set执行配置命令
-                        output = await loop.run_in_executor(
-                            None,
-                            lambda: connection.send_config_set(
-                                [command],
-                                exit_config_mode=False,  # 不自动退出配置模式
-                                read_timeout=read_timeout
-                            )
-                        )
-                    except Exception as config_e:
-                        print(f"[WARNING] send_config_set failed: {config_e}, trying send_command with expect_string")
-                        # 如果send_config_set失败，回退到send_command
-                        output = await loop.run_in_executor(
-                            None,
-                            lambda: connection.send_command(
-                                command,
-                                expect_string=vendor_expects['any_view'],
-                                read_timeout=read_timeout
-                            )
-                        )
-                else:
-                    # 其他厂商查询命令，使用默认方式
-                    print(f"[INFO] Sending command without expect_string (query command)")
-                    output = await loop.run_in_executor(
-                        None,
-                        lambda: connection.send_command(command, read_timeout=read_timeout)
-                    )
+    async def execute_command(
+        self,
+        device: Device,
+        command: str,
+        expect_string: Optional[str] = None,
+        read_timeout: Optional[float] = None,
+        command_type: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        在设备上执行命令（带增强的错误处理）
 
-                if output:
-                    print(f"[SUCCESS] Command '{command}' executed successfully on device {device.hostname}")
-                    print(f"[INFO] Output length: {len(output)} characters")
-                else:
-                    print(f"[WARNING] Command '{command}' returned empty output on device {device.hostname}")
-
-                return output
-
-            except NetmikoTimeoutException as e:
-                print(f"[ERROR] Timeout executing command '{command}' on device {device.hostname} ({device.ip_address})")
-                print(f"[ERROR] Timeout value: {read_timeout}s")
-                print(f"[ERROR] Possible causes:")
-                print(f"[ERROR]   1. Command execution takes too long")
-                print(f"[ERROR]   2. Device is busy")
-                print(f"[ERROR]   3. Network latency")
-                print(f"[ERROR]   4. Prompt pattern not detected (try using expect_string)")
-                return None
+        Args:
+            device: 设备对象
+            command: 要执行的命令
+            expect_string: 预期的提示符字符串，用于判断命令执行完成
+            read_timeout: 命令执行超时时间（秒），None 表示由超时引擎按设备延迟与历史耗时计算
+            command_type: 命令类型（arp_table / mac_table / ...），None 表示按命令反查
 
-            except Exception as e:
-                print(f"[ERROR] Error sending command '{command}' to device {device.hostname}: {e}")
-                print(f"[ERROR] Error type: {type(e).__name__}")
-                import traceback
-                traceback.print_exc()
-                return None
+        Returns:
+            命令输出，失败返回None
+        """
+        async with self.open_session(device) as session:
+            return await session.run(
+                command, expect_string=expect_string, read_timeout=read_timeout, command_type=command_type
+            )
 
-        except NetmikoTimeoutException as e:
-            print(f"[ERROR] Connection timeout for device {device.hostname} ({device.ip_address})")
-            print(f"[ERROR] Connection timeout: {self.conn_timeout}s")
-            print(f"[ERROR] Possible causes:")
-            print(f"[ERROR]   1. Network unreachable")
-            print(f"[ERROR]   2. Firewall blocking connection")
-            print(f"[ERROR]   3. Wrong IP address or port")
-            print(f"[ERROR]   4. Device SSH service not running")
-            return None
+    async def execute_command_bundle(
+        self,
+        device: Device,
+        commands: Sequence[Union[str, Tuple[str, Optional[str]]]]
+    ) -> Dict[str, Optional[str]]:
+        """
+        命令包：在同一个会话上按顺序执行多条查询命令，一次返回全部输出
 
-        except NetmikoAuthenticationException as e:
-            print(f"[ERROR] Authentication failed for device {device.hostname} ({device.ip_address})")
-            print(f"[ERROR] Possible causes:")
-            print(f"[ERROR]   1. Invalid username: {device.username}")
-            print(f"[ERROR]   2. Invalid password")
-            print(f"[ERROR]   3. Account locked or disabled")
-            print(f"[ERROR]   4. Device requires special authentication method")
-            return None
+        整个命令包只借出一次会话（一次登录）；重复命令只执行一次。
+        某条命令失败后会话不再可信，剩余命令不再执行，输出为 None
 
-        except Exception as e:
-            print(f"[ERROR] Unexpected error executing command '{command}' on device {device.hostname} ({device.ip_address}): {e}")
-            print(f"[ERROR] Error type: {type(e).__name__}")
-            print(f"[ERROR] Error message: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+        Args:
+            device: 设备对象
+            commands: 命令列表，元素为命令字符串或 (命令, 命令类型) 元组
 
-        finally:
-            if ssh_connection:
-                # 如果是从连接池获取的连接，只需释放回连接池
-                await ssh_conn_pool.release_connection(ssh_connection)
-                print(f"[INFO] Released connection back to pool for device {device.hostname}")
-            elif connection:
-                # 如果是直接创建的连接，需要关闭
-                try:
-                    connection.disconnect()
-                    print(f"[INFO] Disconnected from device {device.hostname} after command execution")
-                except Exception as e:
-                    print(f"[WARNING] Error disconnecting from device {device.hostname}: {e}")
+        Returns:
+            {命令: 输出}，按命令顺序排列，失败的命令输出为 None
+        """
+        async with self.open_session(device) as session:
+            return await session.run_bundle(commands)
 
     def parse_version_info(self, output: str, vendor: str) -> Dict[str, Any]:
         """
@@ -586,108 +1063,15 @@ class NetmikoService:
             "collected_at": datetime.now(),
         }
 
-        vendor_lower = vendor.lower().strip()
-
+        parser = get_parser(self.parser_device_type(vendor), "version")
         try:
-            if vendor_lower.startswith("cisco"):
-                version_info.update(self._parse_cisco_version(output))
-            elif vendor_lower in ["huawei", "h3c"]:
-                version_info.update(self._parse_huawei_version(output))
-            elif vendor_lower == "ruijie":
-                version_info.update(self._parse_ruijie_version(output))
+            if parser:
+                version_info.update(parser.parse_one(output))
         except Exception as e:
             print(f"Error parsing version info: {e}")
 
         return version_info
 
-    def _parse_cisco_version(self, output: str) -> Dict[str, Any]:
-        """解析Cisco版本信息"""
-        result = {}
-
-        # 潯件版本 - 支持多种格式
-        # Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), Version 15.0(2)SE11
-        # Cisco IOS XE Software, Version 17.3.5
-        # 先尝试匹配完整的版本行
-        version_match = re.search(r'Cisco IOS Software[,\s]+Version\s+([^\n\(]+)\s*\)?[^\n]*', output, re.IGNORECASE)
-        if version_match:
-            result["software_version"] = "Cisco IOS Software, Version " + version_match.group(1).strip()
-        else:
-            # 备用：只匹配版本号
-            ios_match = re.search(r'Version\s+([^\s,\n]+)', output, re.IGNORECASE)
-            if ios_match:
-                result["software_version"] = "Cisco IOS Software, Version " + ios_match.group(1)
-
-        # 系统镜像
-        image_match = re.search(r'System image file is\s+"?([^"\n]+)"?', output)
-        if image_match:
-            result["system_image"] = image_match.group(1)
-
-        # 硬件版本
-        hw_match = re.search(r'Hardware is\s+([^\n]+)', output)
-        if hw_match:
-            result["hardware_version"] = hw_match.group(1)
-
-        # 运行时间
-        uptime_match = re.search(r'uptime is\s+([^\n]+)', output)
-        if uptime_match:
-            result["uptime"] = uptime_match.group(1)
-
-        return result
-
-    def _parse_huawei_version(self, output: str) -> Dict[str, Any]:
-        """解析华为/H3C版本信息"""
-        result = {}
-
-        # 软件版本
-        version_match = re.search(r'Version\s+([^\s\n]+)', output)
-        if not version_match:
-            version_match = re.search(r'VRP.*Version\s+([^\s\n]+)', output)
-        if version_match:
-            result["software_version"] = version_match.group(1)
-
-        # 硬件版本
-        hw_match = re.search(r'Hardware Version\s+([^\s\n]+)', output)
-        if hw_match:
-            result["hardware_version"] = hw_match.group(1)
-
-        # 启动版本
-        boot_match = re.search(r'Bootrom Version\s+([^\s\n]+)', output)
-        if boot_match:
-            result["boot_version"] = boot_match.group(1)
-
-        # 系统镜像
-        image_match = re.search(r'Software Name\s+([^\s\n]+)', output)
-        if image_match:
-            result["system_image"] = image_match.group(1)
-
-        # 运行时间
-        uptime_match = re.search(r'Uptime is\s+([^\n]+)', output)
-        if uptime_match:
-            result["uptime"] = uptime_match.group(1)
-
-        return result
-
-    def _parse_ruijie_version(self, output: str) -> Dict[str, Any]:
-        """解析锐捷版本信息"""
-        result = {}
-
-        # 软件版本
-        version_match = re.search(r'Software Version\s+([^\s\n]+)', output)
-        if version_match:
-            result["software_version"] = version_match.group(1)
-
-        # 系统镜像
-        image_match = re.search(r'Boot image\s+([^\s\n]+)', output)
-        if image_match:
-            result["system_image"] = image_match.group(1)
-
-        # 运行时间
-        uptime_match = re.search(r'System uptime\s+([^\n]+)', output)
-        if uptime_match:
-            result["uptime"] = uptime_match.group(1)
-
-        return result
-
     def parse_serial_from_version(self, output: str, vendor: str) -> Optional[str]:
         """
         从版本命令输出中解析序列号
@@ -761,102 +1145,90 @@ class NetmikoService:
         if not output:
             return []
 
-        mac_entries = []
-        vendor_lower = vendor.lower().strip()
+        parser = get_parser(self.parser_device_type(vendor), "mac_table")
+        if not parser:
+            return []
 
         try:
-            if vendor_lower.startswith("cisco"):
-                mac_entries = self._parse_cisco_mac_table(output)
-            elif vendor_lower in ["huawei", "h3c"]:
-                mac_entries = self._parse_huawei_mac_table(output)
-            elif vendor_lower == "ruijie":
-                mac_entries = self._parse_ruijie_mac_table(output)
+            return parser.parse(output)
         except Exception as e:
             print(f"Error parsing MAC table: {e}")
+            return []
 
-        return mac_entries
-
-    def _parse_cisco_mac_table(self, output: str) -> List[Dict[str, Any]]:
-        """解析Cisco MAC地址表"""
-        mac_entries = []
-
-        # Cisco MAC地址表格式：
-        # Vlan    Mac Address       Type        Ports
-        # ----    -----------       --------    -----
-        #   1    0011.2233.4455    DYNAMIC     Gi1/0/1
-
-        lines = output.strip().split('\n')
-        for line in lines:
-            # 跳过标题行
-            if not line.strip() or re.match(r'Vlan\s+Mac\s+Address', line, re.IGNORECASE):
-                continue
-
-            # 匹配MAC地址行 - 使用更精确的正则
-            # 匹配格式: VLAN号 + 空格 + MAC地址(12位十六进制) + 空格 + 类型 + 空格 + 接口名
-            match = re.search(r'(\d+)\s+([0-9A-Fa-f.:\-]+)\s+(\w+)\s+(.+)', line)
-            if match:
-                mac_raw = match.group(2)
-                mac_entries.append({
-                    "mac_address": mac_raw.upper(),
-                    "vlan_id": int(match.group(1)),
-                    "interface": match.group(3),
-                    "address_type": match.group(4).lower()
-                })
-
-        return mac_entries
-
-    def _parse_huawei_mac_table(self, output: str) -> List[Dict[str, Any]]:
-        """解析华为/H3C MAC地址表"""
-        mac_entries = []
-
-        # 华为/H3C MAC地址表格式：
-        # MAC Address    VLAN/VSI    Learned-From        Type
-        # 0011-2233-4455 1/-         GE1/0/1             dynamic
-
-        lines = output.strip().split('\n')
-        for line in lines:
-            # 跳过标题行和空行
-            if not line.strip() or re.match(r'MAC\s+Address', line, re.IGNORECASE):
-                continue
-
-            # 匹配MAC地址行 - 使用更灵活的正则（支持GE1/0/1格式）
-            # 华为格式：MAC地址 VLAN/VSI 接口 类型
-            match = re.search(r'([0-9A-Fa-f-]+)\s*(?:[/-]\s*(\d+)/\S*\s*(\S+))', line)
-            if match:
-                mac_raw = match.group(1)
-                mac_entries.append({
-                    "mac_address": mac_raw.upper(),
-                    "vlan_id": int(match.group(2)),
-                    "interface": match.group(3).strip(),
-                    "address_type": match.group(4).lower()
-                })
+    def _normalize_mac_address(self, mac: str) -> str:
+        """
+        标准化MAC地址格式为 XX:XX:XX:XX:XX:XX（支持点分、横线、冒号及无分隔格式）
 
-        return mac_entries
+        Args:
+            mac: 原始MAC地址字符串
 
-    def _parse_ruijie_mac_table(self, output: str) -> List[Dict[str, Any]]:
-        """解析锐捷MAC地址表（使用类似Cisco格式）"""
-        return self._parse_cisco_mac_table(output)
+        Returns:
+            标准化后的MAC地址，无法识别时返回原值大写
+        """
+        mac_clean = re.sub(r'[.:\-]', '', mac.strip()).upper()
+        if re.fullmatch(r'[0-9A-F]{12}', mac_clean):
+            return ':'.join(mac_clean[i:i + 2] for i in range(0, 12, 2))
+        return mac.strip().upper()
 
-    def _normalize_mac_address(self, mac: str) -> str:
+    def _parse_arp_table(self, output: str, vendor: str) -> List[Dict[str, Any]]:
         """
-        标准化MAC地址格式为 xx:xx:xx:xx:xx:xx
-        保留原始格式（Cisco用点分隔，华为用横线分隔）
+        解析ARP表（厂商名称不区分大小写，无效 IP / MAC 的行被过滤）
 
         Args:
-            mac: 原始MAC地址字符串
+            output: ARP表命令输出
+            vendor: 设备厂商
 
         Returns:
-            标准化后的MAC地址
+            ARP条目列表，MAC 统一为 XX:XX:XX:XX:XX:XX 格式
         """
-        # 移除所有分隔符并转为大写
-        mac_clean = re.sub(r'[^0-9A-Fa-f]', '', mac.upper())
+        if not output:
+            return []
+
+        parser = get_parser(self.parser_device_type(vendor), "arp_table")
+        if not parser:
+            return []
 
-        # 如果已经是12位十六进制，保持原始格式（添加原始分隔符）
-        if len(mac_clean) == 12:
-            return mac
+        try:
+            arp_entries = []
+            for row in parser.iter_parse(output):
+                entry = self._build_arp_entry(row["ip_address"], row["mac_address"])
+                if entry:
+                    self._fill_arp_location(entry, row)
+                    arp_entries.append(entry)
+            return arp_entries
+        except Exception as e:
+            print(f"Error parsing ARP table: {e}")
+            return []
+
+    def _build_arp_entry(self, ip: str, mac: str) -> Optional[Dict[str, Any]]:
+        """校验 IP / MAC 并构造ARP条目，无效时返回None"""
+        try:
+            ipaddress.IPv4Address(ip)
+        except ValueError:
+            return None
+        mac_address = self._normalize_mac_address(mac)
+        if not self.MAC_ADDRESS_PATTERN.match(mac_address):
+            return None
+        return {"ip_address": ip, "mac_address": mac_address, "vlan_id": None, "interface": None}
 
-        # 如果格式不正确，尝试添加冒号分隔符
-        return mac
+    def _fill_arp_location(self, entry: Dict[str, Any], row: Dict[str, Any]):
+        """
+        按解析行填充ARP条目的接口与 VLAN
+
+        VLAN 取值顺序：接口前的 VLAN 列、VLAN 接口编号（Vlanif10 / Vlan10）、华为的 VLAN 续行
+        """
+        interface = row.get("interface")
+        if interface and self.INTERFACE_NAME_PATTERN.match(interface):
+            entry["interface"] = interface
+
+        vlan_id = row.get("vlan_id")
+        if vlan_id is None and entry["interface"]:
+            vlanif = self.VLAN_INTERFACE_PATTERN.match(entry["interface"])
+            if vlanif:
+                vlan_id = int(vlanif.group(1))
+        if vlan_id is None:
+            vlan_id = row.get("vlan_continuation")
+        entry["vlan_id"] = vlan_id
 
     def parse_interfaces_info(self, interfaces_output: str, status_output: Optional[str], vendor: str) -> List[Dict[str, Any]]:
         """
@@ -873,138 +1245,51 @@ class NetmikoService:
         if not interfaces_output:
             return []
 
-        interfaces = []
-        vendor_lower = vendor.lower().strip()
+        device_type = self.parser_device_type(vendor)
+        parser = get_parser(device_type, "interfaces")
+        if not parser:
+            return []
 
         try:
-            if vendor_lower.startswith("cisco"):
-                interfaces = self._parse_cisco_interfaces(interfaces_output, status_output)
-            elif vendor_lower in ["huawei", "h3c"]:
-                interfaces = self._parse_huawei_interfaces(interfaces_output, status_output)
-            elif vendor_lower == "ruijie":
-                interfaces = self._parse_ruijie_interfaces(interfaces_output, status_output)
+            interfaces = parser.parse(interfaces_output)
+            status_parser = get_parser(device_type, "interfaces_status")
+            if status_output and status_parser:
+                self._merge_interface_status(interfaces, status_parser.iter_parse(status_output))
         except Exception as e:
             print(f"Error parsing interfaces info: {e}")
+            return []
 
         return interfaces
 
-    def _parse_cisco_interfaces(self, interfaces_output: str, status_output: Optional[str]) -> List[Dict[str, Any]]:
-        """解析Cisco接口信息"""
-        interfaces = []
-
-        # 解析详细接口信息
-        # GigabitEthernet1/0/1 is up, line protocol is up
-        #   Description: Uplink to Core
-        #   MTU 1500 bytes, BW 1000000 Kbit
-
-        interface_blocks = re.split(r'\n(?=[A-Za-z]+\d+/\d+)', interfaces_output)
-
-        for block in interface_blocks:
-            block = block.strip()
-            if not block or re.match(r'^(Line|Cabling|Dampening|Last)', block):
-                continue
-
-            interface_match = re.match(r'([A-Za-z]+\d+(?:/\d+)*)\s+is\s+(\w+)', block)
-            if not interface_match:
-                continue
-
-            interface_name = interface_match.group(1)
-            status = interface_match.group(2)
-
-            # 解析描述
-            desc_match = re.search(r'Description:\s+([^\n]+)', block)
-            description = desc_match.group(1).strip() if desc_match else ""
-
-            # 解析速率
-            speed_match = re.search(r'BW\s+(\d+)\s*Kbit', block)
-            speed = f"{speed_match.group(1)} Kbit" if speed_match else ""
-
-            interfaces.append({
-                "port_name": interface_name,
-                "status": status,
-                "description": description,
-                "speed": speed
-            })
-
-        # 如果有状态输出，合并状态信息
-        if status_output:
-            self._merge_cisco_interface_status(interfaces, status_output)
-
-        return interfaces
-
-    def _merge_cisco_interface_status(self, interfaces: List[Dict[str, Any]], status_output: str):
-        """合并Cisco接口状态信息"""
-        # Port      Name               Status       Vlan
-        # Gi1/0/1   Uplink             connected    1
-        lines = status_output.split('\n')
-
-        for line in lines:
-            # 跳过标题行
-            if re.match(r'Port\s+Name', line):
-                continue
+    def _merge_interface_status(self, interfaces: List[Dict[str, Any]], status_rows: Iterable[Dict[str, Any]]):
+        """
+        合并接口状态表（状态表使用缩写接口名，按归一化名称匹配）
 
-            # 匹配状态行
-            match = re.match(r'(\S+)\s+(.*?)\s+(\w+)', line)
-            if match:
-                port_short = match.group(1)
-                status = match.group(2)
-
-                # 查找对应的接口
-                for interface in interfaces:
-                    if port_short in interface["port_name"]:
-                        interface["status"] = status
-                        break
-
-    def _parse_huawei_interfaces(self, interfaces_output: str, status_output: Optional[str]) -> List[Dict[str, Any]]:
-        """解析华为/H3C接口信息"""
-        interfaces = []
-
-        # Huawei接口格式：
-        # GigabitEthernet1/0/1
-        #   Description: Uplink
-        #   Line protocol state: up
-        #   Line protocol state (physical): up
-
-        interface_blocks = re.split(r'\n(?=[A-Za-z]+\d+/\d+)', interfaces_output)
-
-        for block in interface_blocks:
-            block = block.strip()
-            if not block:
-                continue
+        接口状态以详情输出为准，状态表补充 VLAN 与缺失的描述
 
-            interface_match = re.match(r'([A-Za-z]+\d+(?:/\d+)*)', block)
-            if not interface_match:
+        Args:
+            interfaces: 接口详情列表（原地更新）
+            status_rows: 接口状态记录（port / name / status / vlan）
+        """
+        by_key = {interface_key(interface["port_name"]): interface for interface in interfaces}
+        for row in status_rows:
+            interface = by_key.get(interface_key(row["port"]))
+            if interface is None:
                 continue
-
-            interface_name = interface_match.group(1)
-
-            # 解析状态
-            state_match = re.search(r'(?:Line protocol state|Physical state):\s+(\w+)', block)
-            status = state_match.group(1).lower() if state_match else "unknown"
-
-            # 解析描述
-            desc_match = re.search(r'Description:\s+([^\n]+)', block)
-            description = desc_match.group(1).strip() if desc_match else ""
-
-            interfaces.append({
-                "port_name": interface_name,
-                "status": status,
-                "description": description,
-                "speed": ""
-            })
-
-        return interfaces
-
-    def _parse_ruijie_interfaces(self, interfaces_output: str, status_output: Optional[str]) -> List[Dict[str, Any]]:
-        """解析锐捷接口信息（使用类似Cisco格式）"""
-        return self._parse_cisco_interfaces(interfaces_output, status_output)
-
-    async def collect_device_version(self, device: Device) -> Optional[Dict[str, Any]]:
+            if row.get("vlan", "").isdigit():
+                interface["vlan_id"] = int(row["vlan"])
+            if row.get("name") and not interface.get("description"):
+                interface["description"] = row["name"].strip()
+
+    async def collect_device_version(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         采集设备版本信息
 
         Args:
             device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
 
         Returns:
             版本信息字典，失败返回None
@@ -1017,106 +1302,83 @@ class NetmikoService:
         if not command:
             return None
 
-        output = await self.execute_command(device, command)
+        async with self._session_scope(device, session) as scope:
+            outputs = await scope.run_bundle([(command, "version")])
+        output = outputs.get(command)
         if not output:
             return None
 
-        version_info = self.parse_version_info(output, device.vendor)
+        version_info = await self.parse_stage.run("parse_version_info", output, device.vendor)
         version_info["device_id"] = device.id
         return version_info
 
-    async def collect_device_serial(self, device: Device) -> Optional[str]:
+    async def collect_device_serial(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[str]:
         """
-        采集设备序列号
+        采集设备序列号（先查版本输出，未找到再查 inventory，两条命令共用一个会话）
 
         Args:
             device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
 
         Returns:
             序列号字符串，失败返回None
         """
         print(f"[INFO] Starting serial collection for device {device.hostname} ({device.ip_address})")
-        
+
         if not device.username or not device.password:
             print(f"[ERROR] Device {device.hostname} ({device.ip_address}) missing credentials")
             return None
 
-        connection = None
         try:
-            # 建立一次连接，执行多个命令
-            connection = await self.connect_to_device(device)
-            if not connection:
-                print(f"[ERROR] Failed to connect to device {device.hostname} ({device.ip_address}) for serial collection")
-                return None
-
-            loop = asyncio.get_event_loop()
-            
-            # 先从版本命令中尝试获取
-            version_command = self.get_commands(device.vendor, "version")
-            if version_command:
-                print(f"[INFO] Executing version command on {device.hostname}: {version_command}")
-                try:
-                    output = await loop.run_in_executor(
-                        None,
-                        lambda: connection.send_command(version_command, read_timeout=20)
-                    )
+            async with self._session_scope(device, session) as scope:
+                # 先从版本命令中尝试获取（与版本采集同会话时直接复用输出）
+                version_command = self.get_commands(device.vendor, "version")
+                if version_command:
+                    output = (await scope.run_bundle([(version_command, "version")])).get(version_command)
                     if output:
                         print(f"[INFO] Version command output received from {device.hostname}")
                         serial = self.parse_serial_from_version(output, device.vendor)
                         if serial:
                             print(f"[SUCCESS] Found serial from version output: {serial} for {device.hostname}")
                             return serial
-                        else:
-                            print(f"[INFO] Serial not found in version output for {device.hostname}")
+                        print(f"[INFO] Serial not found in version output for {device.hostname}")
                     else:
                         print(f"[WARNING] Version command returned empty output for {device.hostname}")
-                except Exception as e:
-                    print(f"[ERROR] Error executing version command on {device.hostname}: {e}")
-
-            # 如果版本命令中没有，尝试inventory命令
-            inventory_command = self.get_commands(device.vendor, "inventory")
-            if inventory_command:
-                print(f"[INFO] Executing inventory command on {device.hostname}: {inventory_command}")
-                try:
-                    output = await loop.run_in_executor(
-                        None,
-                        lambda: connection.send_command(inventory_command, read_timeout=20)
-                    )
+
+                # 如果版本命令中没有，尝试inventory命令
+                inventory_command = self.get_commands(device.vendor, "inventory")
+                if inventory_command:
+                    output = (await scope.run_bundle([(inventory_command, "inventory")])).get(inventory_command)
                     if output:
                         print(f"[INFO] Inventory command output received from {device.hostname}")
                         serial = self.parse_serial_from_inventory(output, device.vendor)
                         if serial:
                             print(f"[SUCCESS] Found serial from inventory output: {serial} for {device.hostname}")
                             return serial
-                        else:
-                            print(f"[INFO] Serial not found in inventory output for {device.hostname}")
+                        print(f"[INFO] Serial not found in inventory output for {device.hostname}")
                     else:
                         print(f"[WARNING] Inventory command returned empty output for {device.hostname}")
-                except Exception as e:
-                    print(f"[ERROR] Error executing inventory command on {device.hostname}: {e}")
 
             print(f"[ERROR] No serial found for device {device.hostname} ({device.ip_address})")
             return None
-            
+
         except Exception as e:
             print(f"[ERROR] Unexpected error collecting serial for device {device.hostname} ({device.ip_address}): {e}")
             import traceback
             traceback.print_exc()
             return None
-        finally:
-            if connection:
-                try:
-                    connection.disconnect()
-                    print(f"[INFO] Disconnected from device {device.hostname}")
-                except Exception as e:
-                    print(f"[WARNING] Error disconnecting from device {device.hostname}: {e}")
 
-    async def collect_interfaces_info(self, device: Device) -> Optional[List[Dict[str, Any]]]:
+    async def collect_interfaces_info(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[List[Dict[str, Any]]]:
         """
-        采集设备接口信息
+        采集设备接口信息（接口详情与状态命令作为一个命令包执行）
 
         Args:
             device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
 
         Returns:
             接口信息列表，失败返回None
@@ -1128,39 +1390,25 @@ class NetmikoService:
         interfaces_command = self.get_commands(device.vendor, "interfaces")
         if not interfaces_command:
             return None
+        status_command = self.get_commands(device.vendor, "interfaces_status")
 
-        connection = None
         try:
-            # 建立一次连接，执行多个命令
-            connection = await self.connect_to_device(device)
-            if not connection:
-                print(f"Failed to connect to device {device.hostname} for interface collection")
-                return None
+            async with self._session_scope(device, session) as scope:
+                outputs = await scope.run_bundle([
+                    (interfaces_command, "interfaces"),
+                    (status_command, "interfaces_status"),
+                ])
 
-            loop = asyncio.get_event_loop()
-            
-            # 获取接口详细信息
-            print(f"Executing interfaces command on {device.hostname}: {interfaces_command}")
-            interfaces_output = await loop.run_in_executor(
-                None,
-                lambda: connection.send_command(interfaces_command, read_timeout=30)
-            )
-            
+            interfaces_output = outputs.get(interfaces_command)
             if not interfaces_output:
                 print(f"No interfaces output received from {device.hostname}")
                 return None
 
-            # 如果有状态命令，也获取状态信息
-            status_output = None
-            status_command = self.get_commands(device.vendor, "interfaces_status")
-            if status_command and status_command != interfaces_command:
-                print(f"Executing interfaces status command on {device.hostname}: {status_command}")
-                status_output = await loop.run_in_executor(
-                    None,
-                    lambda: connection.send_command(status_command, read_timeout=30)
-                )
-
-            interfaces_info = self.parse_interfaces_info(interfaces_output, status_output, device.vendor)
+            # 状态命令与详情命令相同时不重复解析
+            status_output = outputs.get(status_command) if status_command != interfaces_command else None
+            interfaces_info = await self.parse_stage.run(
+                "parse_interfaces_info", interfaces_output, status_output, device.vendor
+            )
 
             # 添加device_id到每个接口
             for interface in interfaces_info:
@@ -1168,24 +1416,20 @@ class NetmikoService:
 
             print(f"Collected {len(interfaces_info)} interfaces from {device.hostname}")
             return interfaces_info if interfaces_info else None
-            
+
         except Exception as e:
             print(f"Error collecting interfaces for device {device.hostname}: {e}")
             return None
-        finally:
-            if connection:
-                try:
-                    connection.disconnect()
-                    print(f"Disconnected from device {device.hostname}")
-                except:
-                    pass
 
-    async def collect_mac_table(self, device: Device) -> Optional[List[Dict[str, Any]]]:
+    async def collect_mac_table(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[List[Dict[str, Any]]]:
         """
         采集设备MAC地址表
 
         Args:
             device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
 
         Returns:
             MAC地址条目列表，失败返回None
@@ -1198,11 +1442,13 @@ class NetmikoService:
         if not mac_command:
             return None
 
-        output = await self.execute_command(device, mac_command)
+        async with self._session_scope(device, session) as scope:
+            outputs = await scope.run_bundle([(mac_command, "mac_table")])
+        output = outputs.get(mac_command)
         if not output:
             return None
 
-        mac_table = self.parse_mac_table(output, device.vendor)
+        mac_table = await self.parse_stage.run("parse_mac_table", output, device.vendor)
 
         # 添加device_id到每个MAC条目
         for mac_entry in mac_table:
@@ -1210,12 +1456,67 @@ class NetmikoService:
 
         return mac_table if mac_table else None
 
-    async def collect_running_config(self, device: Device) -> Optional[str]:
+    async def collect_arp_table(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        采集设备ARP表
+
+        Args:
+            device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
+
+        Returns:
+            ARP条目列表，失败返回None
+        """
+        if not device.username or not device.password:
+            print(f"Device {device.hostname} missing credentials")
+            return None
+
+        arp_command = self.get_commands(device.vendor, "arp_table")
+        if not arp_command:
+            return None
+
+        async with self._session_scope(device, session) as scope:
+            outputs = await scope.run_bundle([(arp_command, "arp_table")])
+        output = outputs.get(arp_command)
+        if not output:
+            return None
+
+        arp_table = await self.parse_stage.run("_parse_arp_table", output, device.vendor)
+
+        # 添加device_id到每个ARP条目
+        for arp_entry in arp_table:
+            arp_entry["device_id"] = device.id
+
+        return arp_table if arp_table else None
+
+    async def collect_arp_mac_tables(
+        self, device: Device
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]:
+        """
+        在同一个会话上依次采集ARP表与MAC地址表（每台设备只登录一次）
+
+        Args:
+            device: 设备对象
+
+        Returns:
+            (ARP条目列表, MAC地址条目列表)，失败的一项为None
+        """
+        async with self.open_session(device) as session:
+            arp_table = await self.collect_arp_table(device, session=session)
+            mac_table = await self.collect_mac_table(device, session=session)
+        return arp_table, mac_table
+
+    async def collect_running_config(
+        self, device: Device, session: Optional[CommandSession] = None
+    ) -> Optional[str]:
         """
         采集设备运行配置
 
         Args:
             device: 设备对象
+            session: 已打开的设备会话，None 时单独借出会话
 
         Returns:
             运行配置字符串，失败返回None
@@ -1228,87 +1529,168 @@ class NetmikoService:
         if not command:
             return None
 
-        output = await self.execute_command(device, command)
+        async with self._session_scope(device, session) as scope:
+            outputs = await scope.run_bundle([(command, "running_config")])
+        output = outputs.get(command)
         return output if output else None
 
-    async def batch_collect_device_info(
-        self,
-        devices: List[Device],
-        collect_types: List[str]
-    ) -> Dict[str, Any]:
+    async def _collect_single_device(self, device: Device, collect_types: List[str]) -> Dict[str, Any]:
         """
-        批量采集设备信息
+        采集单台设备的各类信息（所有采集项共用同一个会话，每台设备只登录一次）
 
         Args:
-            devices: 设备对象列表
-            collect_types: 采集类型列表，如 ["version", "serial", "interfaces", "mac_table", "running_config"]
+            device: 设备对象
+            collect_types: 采集类型列表
 
         Returns:
-            批量采集结果字典
+            单设备采集明细字典
         """
-        results = {
-            "total": len(devices),
-            "success": 0,
-            "failed": 0,
-            "details": []
+        detail = {
+            "device_id": device.id,
+            "hostname": device.hostname,
+            "success": False,
+            "data": {},
+            "error": None
         }
 
-        for device in devices:
-            detail = {
-                "device_id": device.id,
-                "hostname": device.hostname,
-                "success": False,
-                "data": {},
-                "error": None
-            }
-
-            try:
+        try:
+            async with self.open_session(device) as session:
                 # 采集版本信息
                 if "version" in collect_types:
-                    version_info = await self.collect_device_version(device)
+                    version_info = await self.collect_device_version(device, session=session)
                     if version_info:
                         detail["data"]["version"] = version_info
 
                 # 采集序列号
                 if "serial" in collect_types:
-                    serial = await self.collect_device_serial(device)
+                    serial = await self.collect_device_serial(device, session=session)
                     if serial:
                         detail["data"]["serial"] = serial
 
                 # 采集接口信息
                 if "interfaces" in collect_types:
-                    interfaces = await self.collect_interfaces_info(device)
+                    interfaces = await self.collect_interfaces_info(device, session=session)
                     if interfaces:
                         detail["data"]["interfaces"] = interfaces
 
                 # 采集MAC地址表
                 if "mac_table" in collect_types:
-                    mac_table = await self.collect_mac_table(device)
+                    mac_table = await self.collect_mac_table(device, session=session)
                     if mac_table:
                         detail["data"]["mac_table"] = mac_table
-                        
+
+                # 采集ARP表
+                if "arp_table" in collect_types:
+                    arp_table = await self.collect_arp_table(device, session=session)
+                    if arp_table:
+                        detail["data"]["arp_table"] = arp_table
+
                 # 采集运行配置
                 if "running_config" in collect_types:
-                    running_config = await self.collect_running_config(device)
+                    running_config = await self.collect_running_config(device, session=session)
                     if running_config:
                         detail["data"]["running_config"] = running_config
 
-                # 判断是否至少有一种数据采集成功
-                if detail["data"]:
-                    detail["success"] = True
-                    results["success"] += 1
-                else:
-                    detail["error"] = "未采集到任何有效数据"
-                    results["failed"] += 1
+            # 判断是否至少有一种数据采集成功
+            if detail["data"]:
+                detail["success"] = True
+            else:
+                detail["error"] = "未采集到任何有效数据"
 
-            except Exception as e:
-                detail["error"] = str(e)
-                results["failed"] += 1
+        except Exception as e:
+            detail["error"] = str(e)
+
+        return detail
+
+    async def iter_batch_collect_device_info(
+        self,
+        devices: List[Device],
+        collect_types: List[str],
+        limits: Optional[FanoutLimits] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发批量采集设备信息，按设备完成顺序流式返回明细
+
+        并发受批次/全局/厂商/站点上限约束，单设备超过截止时间即返回超时明细
+
+        Args:
+            devices: 设备对象列表
+            collect_types: 采集类型列表
+            limits: 并发限制，None 时使用全局配置
+
+        Yields:
+            单设备采集明细字典
+        """
+        async def worker(device: Device) -> Dict[str, Any]:
+            return await self._collect_single_device(device, collect_types)
+
+        async for result in get_fanout_engine().run(devices, worker, limits):
+            if result.success:
+                detail = result.value
+            else:
+                detail = {
+                    "device_id": result.device.id,
+                    "hostname": result.device.hostname,
+                    "success": False,
+                    "data": {},
+                    "error": result.error
+                }
+            detail["elapsed_seconds"] = round(result.elapsed, 3)
+            yield detail
+
+    async def batch_collect_device_info(
+        self,
+        devices: List[Device],
+        collect_types: List[str],
+        limits: Optional[FanoutLimits] = None
+    ) -> Dict[str, Any]:
+        """
+        批量采集设备信息（并发执行，总耗时取决于最慢的设备）
 
+        Args:
+            devices: 设备对象列表
+            collect_types: 采集类型列表，如 ["version", "serial", "interfaces", "mac_table", "running_config"]
+            limits: 并发限制，None 时使用全局配置
+
+        Returns:
+            批量采集结果字典（details 保持输入设备顺序）
+        """
+        results = {
+            "total": len(devices),
+            "success": 0,
+            "failed": 0,
+            "details": []
+        }
+
+        async for detail in self.iter_batch_collect_device_info(devices, collect_types, limits):
+            if detail["success"]:
+                results["success"] += 1
+            else:
+                results["failed"] += 1
             results["details"].append(detail)
 
+        # 流式结果按完成顺序到达，汇总结果恢复为输入设备顺序
+        order = {device.id: index for index, device in enumerate(devices)}
+        results["details"].sort(key=lambda d: order.get(d["device_id"], len(order)))
         return results
 
+    async def batch_collect_arp_table(
+        self,
+        devices: List[Device],
+        limits: Optional[FanoutLimits] = None
+    ) -> Dict[str, Any]:
+        """
+        批量采集ARP表（明细中 data.arp_table 为ARP条目列表）
+
+        Args:
+            devices: 设备对象列表
+            limits: 并发限制，None 时使用全局配置
+
+        Returns:
+            批量采集结果字典
+        """
+        return await self.batch_collect_device_info(devices, ["arp_table"], limits)
+
 
 # 创建全局NetmikoService实例
 netmiko_service = NetmikoService()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+CLI 输出解析阶段
+
+功能：
+1. 采集流水线中的解析步骤统一经过 ParseStage.run()
+2. 输出小于阈值时在事件循环中直接解析（省去进程间序列化开销）
+3. 输出达到阈值且启用进程池时在子进程中解析，大输出的正则解析不再阻塞事件循环，
+   多台设备的解析可以同时使用多个 CPU 核
+4. 按解析类型统计调用次数、内联 / 子进程次数、解析耗时与输出字节数
+
+说明：
+- 进程池默认关闭（PARSE_PROCESS_POOL_ENABLED），懒创建，模块导入时不创建进程
+- 子进程中通过 get_netmiko_service() 调用同名解析方法，解析器注册表与插件在子进程中同样生效
+- 进程池异常（子进程崩溃等）时本次改为内联解析，进程池在下次使用时重建
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_in_worker(method: str, args: tuple) -> Any:
+    """子进程入口：调用 NetmikoService 的解析方法"""
+    from app.services.netmiko_service import get_netmiko_service
+
+    return getattr(get_netmiko_service(), method)(*args)
+
+
+class ParseStage:
+    """解析阶段（内联 / 进程池）"""
+
+    def __init__(self, enabled: bool, max_workers: int, min_offload_bytes: int):
+        """
+        初始化解析阶段（不创建进程）
+
+        Args:
+            enabled: 是否启用进程池
+            max_workers: 进程数，0 表示使用 CPU 核数
+            min_offload_bytes: 输出达到该字节数（字符数）才交给进程池
+        """
+        self.enabled = enabled
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_offload_bytes = max(0, min_offload_bytes)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """懒创建进程池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"解析进程池已创建，进程数: {self.max_workers}")
+            return self._executor
+
+    def _discard_executor(self):
+        """丢弃已损坏的进程池，下次使用时重建"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def should_offload(self, size: int) -> bool:
+        """
+        判断输出是否交给进程池解析
+
+        Args:
+            size: 输出字符数
+
+        Returns:
+            是否在子进程中解析
+        """
+        return self.enabled and size >= self.min_offload_bytes
+
+    def _record(self, kind: str, size: int, elapsed: float, offloaded: bool, failed: bool = False,
+                fallback: bool = False):
+        """记录一次解析"""
+        stats = self._stats.setdefault(kind, {
+            'calls': 0, 'inline': 0, 'offloaded': 0, 'fallbacks': 0, 'failed': 0,
+            'bytes': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+        })
+        elapsed_ms = elapsed * 1000
+        stats['calls'] += 1
+        stats['offloaded' if offloaded else 'inline'] += 1
+        stats['fallbacks'] += int(fallback)
+        stats['failed'] += int(failed)
+        stats['bytes'] += size
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    async def run(self, method: str, *args: Any) -> Any:
+        """
+        执行解析（按输出大小选择内联或子进程）
+
+        Args:
+            method: NetmikoService 解析方法名（如 parse_mac_table）
+            *args: 解析方法参数，其中的字符串参数计入输出大小
+
+        Returns:
+            解析结果
+        """
+        from app.services.netmiko_service import get_netmiko_service
+
+        size = sum(len(arg) for arg in args if isinstance(arg, str))
+        started = time.monotonic()
+
+        if self.should_offload(size):
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._get_executor(), _parse_in_worker, method, args)
+                self._record(method, size, time.monotonic() - started, offloaded=True)
+                return result
+            except BrokenProcessPool as e:
+                logger.error(f"解析进程池异常，改为内联解析 {method}：{e}")
+                self._discard_executor()
+            except Exception:
+                self._record(method, size, time.monotonic() - started, offloaded=True, failed=True)
+                raise
+            started = time.monotonic()
+            fallback = True
+        else:
+            fallback = False
+
+        try:
+            result = getattr(get_netmiko_service(), method)(*args)
+        except Exception:
+            self._record(method, size, time.monotonic() - started, offloaded=False, failed=True, fallback=fallback)
+            raise
+        self._record(method, size, time.monotonic() - started, offloaded=False, fallback=fallback)
+        return result
+
+    def shutdown(self, wait: bool = False):
+        """
+        关闭进程池（再次调用 run() 时会重新创建）
+
+        Args:
+            wait: 是否等待在途解析完成
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+            logger.info("解析进程池已关闭")
+
+    def reset_stats(self):
+        """重置统计"""
+        self._stats.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取解析统计
+
+        Returns:
+            配置与按解析方法汇总的统计
+        """
+        methods = {}
+        for method, stats in self._stats.items():
+            calls = stats['calls']
+            methods[method] = {
+                **stats,
+                'total_ms': round(stats['total_ms'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'avg_ms': round(stats['total_ms'] / calls, 2) if calls else 0.0,
+            }
+        return {
+            'process_pool_enabled': self.enabled,
+            'process_pool_started': self._executor is not None,
+            'max_workers': self.max_workers,
+            'min_offload_bytes': self.min_offload_bytes,
+            'methods': methods,
+        }
+
+
+def _create_parse_stage() -> ParseStage:
+    """根据全局配置创建解析阶段"""
+    from app.config import settings
+
+    return ParseStage(
+        enabled=settings.PARSE_PROCESS_POOL_ENABLED,
+        max_workers=settings.PARSE_PROCESS_WORKERS,
+        min_offload_bytes=settings.PARSE_OFFLOAD_MIN_BYTES,
+    )
+
+
+# 全局解析阶段实例
+parse_stage = _create_parse_stage()
+
+
+def get_parse_stage() -> ParseStage:
+    """
+    获取解析阶段实例
+
+    Returns:
+        ParseStage 实例
+    """
+    return parse_stage
@@ -7,14 +7,24 @@ SSH连接池管理模块
 - 在 __init__ 中不调用 asyncio.Lock() 和 asyncio.create_task()
 - 在 _ensure_initialized() 方法中延迟创建这些对象
 - 所有使用 _lock 和 _cleanup_task 的方法都需要调用 _ensure_initialized()
+
+独占借出说明：
+- get_connection 借出的连接在 release_connection 归还前不会再借给其他协程
+- 单设备 / 全局连接数上限，无可用连接时 FIFO 排队并支持超时
+- 借出空闲连接前执行健康探测（is_alive）
 """
 
 import asyncio
 import logging
 import time
-from typing import Dict, Optional, Any, List
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Any, List, Tuple
 from datetime import datetime, timedelta
+from app.config import settings
 from app.models.models import Device
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.executors import get_ssh_executor
 from app.services.netmiko_service import get_netmiko_service
 
 # 配置日志
@@ -24,6 +34,10 @@ logger = logging.getLogger(__name__)
 class SSHConnection:
     """
     SSH连接类，封装Netmiko连接对象和连接元数据
+
+    连接有两种状态：
+    - 空闲（in_use=False）：位于连接池中，可被借出
+    - 借出（in_use=True）：被某个协程独占使用，归还前不会再被借出
     """
     def __init__(self, device: Device, connection: Any):
         self.device = device
@@ -32,6 +46,7 @@ class SSHConnection:
         self.last_used_at = datetime.now()
         self.is_active = True
         self.use_count = 0
+        self.in_use = False
 
     def mark_used(self):
         """标记连接为已使用"""
@@ -50,6 +65,21 @@ class SSHConnection:
         """
         return (datetime.now() - self.last_used_at).total_seconds() > timeout
 
+    def is_alive(self) -> bool:
+        """
+        健康探测：检查底层 SSH 会话是否仍可用（同步方法，可能阻塞）
+
+        Returns:
+            bool: 会话是否可用
+        """
+        if not self.is_active:
+            return False
+        try:
+            return bool(self.connection.is_alive())
+        except Exception as e:
+            logger.debug(f"Health probe failed for device {self.device.hostname}: {e}")
+            return False
+
     def close(self):
         """关闭连接"""
         if self.is_active:
@@ -62,10 +92,23 @@ class SSHConnection:
                 self.is_active = False
 
 
+class _Waiter:
+    """等待借出连接的协程（FIFO 队列元素）"""
+
+    def __init__(self, device: Device, future: asyncio.Future):
+        self.device = device
+        self.future = future
+
+
 class SSHConnectionPool:
     """
     SSH连接池管理类
-    提供高效的SSH连接管理功能
+    提供独占借出/归还语义的SSH连接管理
+
+    - 每个连接同一时刻只会借给一个协程
+    - 单设备最大连接数（max_connections）与全局最大连接数（max_total_connections）
+    - 无可用连接时按 FIFO 排队等待，超时返回 None
+    - 借出空闲连接前进行健康探测，失效连接被关闭并替换
 
     使用懒初始化模式：
     - __init__ 中不创建 asyncio 对象（Lock、Task）
@@ -73,13 +116,21 @@ class SSHConnectionPool:
     - 所有使用 asyncio 对象的方法调用 _ensure_initialized()
     """
 
-    def __init__(self, max_connections: int = 10, connection_timeout: int = 300):
+    def __init__(
+        self,
+        max_connections: int = 10,
+        connection_timeout: int = 300,
+        max_total_connections: int = 100,
+        acquire_timeout: float = 60
+    ):
         """
         初始化SSH连接池（懒初始化模式）
 
         Args:
-            max_connections: 最大连接数
-            connection_timeout: 连接超时时间（秒）
+            max_connections: 单设备最大连接数
+            connection_timeout: 空闲连接过期时间（秒）
+            max_total_connections: 全局最大连接数（所有设备合计）
+            acquire_timeout: 借出连接的默认等待超时（秒）
 
         注意：
             不在 __init__ 中创建 asyncio.Lock() 和 asyncio.create_task()
@@ -87,8 +138,15 @@ class SSHConnectionPool:
         """
         self.max_connections = max_connections
         self.connection_timeout = connection_timeout
+        self.max_total_connections = max_total_connections
+        self.acquire_timeout = acquire_timeout
         self.connections: Dict[int, List[SSHConnection]] = {}
 
+        # 正在创建中的连接数（已占用名额但尚未加入连接池）
+        self._pending: Dict[int, int] = {}
+        # FIFO 等待队列
+        self._waiters: Deque[_Waiter] = deque()
+
         # 懒初始化属性：延迟创建 asyncio 对象
         self._lock: Optional[asyncio.Lock] = None
         self._cleanup_task: Optional[asyncio.Task] = None
@@ -141,14 +199,17 @@ class SSHConnectionPool:
         """
         清理过期连接
 
-        检查所有连接是否过期，关闭并移除过期连接
+        只关闭并移除过期的空闲连接，借出中的连接不受影响
         """
         # 调用 _ensure_initialized 确保 _lock 已创建
         self._ensure_initialized()
 
         async with self._lock:
             for device_id, conn_list in list(self.connections.items()):
-                expired_conns = [conn for conn in conn_list if conn.is_expired(self.connection_timeout)]
+                expired_conns = [
+                    conn for conn in conn_list
+                    if not conn.in_use and conn.is_expired(self.connection_timeout)
+                ]
                 for conn in expired_conns:
                     conn.close()
                     conn_list.remove(conn)
@@ -159,62 +220,279 @@ class SSHConnectionPool:
                     del self.connections[device_id]
                     logger.debug(f"Removed empty connection list for device {device_id}")
 
-    async def get_connection(self, device: Device) -> Optional[SSHConnection]:
+            self._wake_waiters()
+
+    def _total_connections(self) -> int:
+        """全局已占用连接名额（含创建中）"""
+        return sum(len(conns) for conns in self.connections.values()) + sum(self._pending.values())
+
+    def _device_connections(self, device_id: int) -> int:
+        """单设备已占用连接名额（含创建中）"""
+        return len(self.connections.get(device_id, [])) + self._pending.get(device_id, 0)
+
+    def _take_idle(self, device_id: int) -> Optional[SSHConnection]:
+        """取出一个空闲连接并标记为借出（调用方需持有 _lock）"""
+        for conn in self.connections.get(device_id, []):
+            if conn.is_active and not conn.in_use:
+                conn.in_use = True
+                conn.mark_used()
+                return conn
+        return None
+
+    def _reserve_slot(self, device_id: int) -> bool:
+        """在名额允许时预占一个新建连接名额（调用方需持有 _lock）"""
+        if self._device_connections(device_id) >= self.max_connections:
+            return False
+        if self._total_connections() >= self.max_total_connections:
+            return False
+        self._pending[device_id] = self._pending.get(device_id, 0) + 1
+        return True
+
+    def _release_slot(self, device_id: int):
+        """释放预占名额（调用方需持有 _lock）"""
+        remaining = self._pending.get(device_id, 0) - 1
+        if remaining > 0:
+            self._pending[device_id] = remaining
+        else:
+            self._pending.pop(device_id, None)
+
+    def _try_acquire(self, device_id: int) -> Tuple[Optional[SSHConnection], bool]:
+        """
+        尝试立即获得连接（调用方需持有 _lock）
+
+        Returns:
+            (空闲连接, 是否获得新建名额)；两者都为空表示需要等待
+        """
+        conn = self._take_idle(device_id)
+        if conn is not None:
+            return conn, False
+
+        if self._reserve_slot(device_id):
+            return None, True
+
+        # 全局名额已满但本设备仍有余量时，回收其他设备的空闲连接
+        if self._device_connections(device_id) < self.max_connections \
+                and self._total_connections() >= self.max_total_connections \
+                and self._evict_idle_for(device_id):
+            return None, self._reserve_slot(device_id)
+
+        return None, False
+
+    def _wake_waiters(self):
+        """
+        按 FIFO 顺序唤醒可以继续的等待者（调用方需持有 _lock）
+
+        等待者被唤醒时直接获得空闲连接，或获得一个新建连接名额（结果为 None）
+        """
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+
+            conn, may_create = self._try_acquire(waiter.device.id)
+            if conn is not None or may_create:
+                self._waiters.remove(waiter)
+                waiter.future.set_result(conn)
+                continue
+
+            # 全局名额已满且没有任何空闲连接时，后续等待者同样无法继续
+            if self._total_connections() >= self.max_total_connections and not self._has_idle():
+                break
+
+    def _has_idle(self) -> bool:
+        """是否存在任何空闲连接"""
+        return any(not conn.in_use for conns in self.connections.values() for conn in conns)
+
+    def _evict_idle_for(self, device_id: int) -> bool:
         """
-        获取设备的SSH连接
+        关闭其他设备最久未用的空闲连接以腾出全局名额（调用方需持有 _lock）
+
+        Returns:
+            bool: 是否腾出了名额
+        """
+        candidates = [
+            conn for dev_id, conns in self.connections.items() if dev_id != device_id
+            for conn in conns if not conn.in_use
+        ]
+        if not candidates:
+            return False
+
+        victim = min(candidates, key=lambda conn: conn.last_used_at)
+        victim.close()
+        self._discard(victim)
+        logger.debug(f"Evicted idle connection for device {victim.device.hostname} to free a global slot")
+        return True
+
+    def _discard(self, connection: SSHConnection):
+        """从连接池移除连接（调用方需持有 _lock）"""
+        conn_list = self.connections.get(connection.device.id)
+        if conn_list is None:
+            return
+        if connection in conn_list:
+            conn_list.remove(connection)
+        if not conn_list:
+            del self.connections[connection.device.id]
+
+    def _abandon_waiter(self, waiter: _Waiter):
+        """
+        等待超时或被取消时撤销等待（同步执行）
+
+        所有持锁的临界区内都没有 await，因此在事件循环线程中同步修改状态是原子的，
+        被取消的协程无需再等待 _lock
+        """
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if waiter.future.done() and not waiter.future.cancelled():
+            # 超时/取消瞬间已被唤醒，归还获得的资源
+            self._give_back(waiter.device.id, waiter.future.result())
+        else:
+            waiter.future.cancel()
+
+    def _give_back(self, device_id: int, conn: Optional[SSHConnection]):
+        """归还借出的空闲连接或新建名额，并唤醒等待者（同步执行）"""
+        if conn is not None:
+            conn.in_use = False
+        else:
+            self._release_slot(device_id)
+        self._wake_waiters()
+
+    async def _check_health(self, conn: SSHConnection) -> bool:
+        """借出前的健康探测（在 SSH I/O 线程池中执行，避免阻塞事件循环）"""
+        if conn.is_expired(self.connection_timeout):
+            return False
+        if getattr(conn.connection, "is_async", False) is True:
+            # asyncio 原生会话的探测不阻塞，无需占用线程
+            return conn.is_alive()
+        return await get_ssh_executor().run(conn.is_alive)
+
+    async def get_connection(self, device: Device, timeout: Optional[float] = None) -> Optional[SSHConnection]:
+        """
+        借出设备的SSH连接（独占，使用完毕需调用 release_connection 归还）
 
         Args:
             device: 设备对象
+            timeout: 等待超时（秒），None 表示使用连接池默认值
 
         Returns:
-            Optional[SSHConnection]: SSH连接对象，失败返回None
+            Optional[SSHConnection]: SSH连接对象，创建失败、等待超时或设备熔断中返回None
         """
         # 调用 _ensure_initialized 确保 _lock 已创建
         self._ensure_initialized()
 
-        async with self._lock:
-            # 检查是否已有可用连接
-            if device.id in self.connections:
-                # 查找活跃的连接
-                for conn in self.connections[device.id]:
-                    if conn.is_active and not conn.is_expired(self.connection_timeout):
-                        conn.mark_used()
-                        logger.debug(f"Reusing existing connection for device {device.hostname}")
-                        return conn
-
-            # 如果没有可用连接，且连接数未达到上限，创建新连接
-            current_connections = len(self.connections.get(device.id, []))
-            if current_connections < self.max_connections:
+        # 熔断中的设备不排队、不占名额
+        if get_circuit_breaker().is_open(device.id):
+            logger.warning(f"设备 {device.hostname} 熔断中，跳过获取连接")
+            return None
+
+        wait_timeout = self.acquire_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_timeout
+
+        while True:
+            waiter = None
+            async with self._lock:
+                conn, may_create = None, False
+                # 同一设备内 FIFO：该设备已有人排队时不插队，其他设备不受影响
+                if not any(w.device.id == device.id for w in self._waiters):
+                    conn, may_create = self._try_acquire(device.id)
+                if conn is None and not may_create:
+                    waiter = _Waiter(device, loop.create_future())
+                    self._waiters.append(waiter)
+
+            if waiter is not None:
                 try:
-                    # 创建新连接
-                    connection = await self.netmiko_service.connect_to_device(device)
-                    if connection:
-                        ssh_conn = SSHConnection(device, connection)
-                        ssh_conn.mark_used()
-
-                        # 添加到连接池
-                        if device.id not in self.connections:
-                            self.connections[device.id] = []
-                        self.connections[device.id].append(ssh_conn)
-
-                        logger.info(f"Created new connection for device {device.hostname}")
-                        return ssh_conn
-                except Exception as e:
-                    logger.error(f"Failed to create connection for device {device.hostname}: {e}")
+                    conn = await asyncio.wait_for(
+                        asyncio.shield(waiter.future),
+                        timeout=max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    self._abandon_waiter(waiter)
+                    logger.warning(
+                        f"Timed out after {wait_timeout}s waiting for connection to device {device.hostname}"
+                    )
+                    return None
+                except asyncio.CancelledError:
+                    self._abandon_waiter(waiter)
+                    raise
+                may_create = conn is None
+
+            if may_create:
+                return await self._create_connection(device)
+
+            # 借出前健康探测
+            try:
+                healthy = await self._check_health(conn)
+            except BaseException:
+                self._give_back(device.id, conn)
+                raise
 
-        return None
+            if healthy:
+                logger.debug(f"Reusing existing connection for device {device.hostname}")
+                return conn
+
+            logger.info(f"Discarding unhealthy connection for device {device.hostname}")
+            await self.close_connection(conn)
+            if loop.time() >= deadline:
+                return None
+
+    async def _create_connection(self, device: Device) -> Optional[SSHConnection]:
+        """
+        使用已预占的名额新建连接（在锁外建立 SSH 会话，不阻塞其他设备）
+        """
+        ssh_conn = None
+        try:
+            connection = await self.netmiko_service.connect_to_device(device)
+            if connection:
+                ssh_conn = SSHConnection(device, connection)
+                ssh_conn.in_use = True
+                ssh_conn.mark_used()
+                logger.info(f"Created new connection for device {device.hostname}")
+        except Exception as e:
+            logger.error(f"Failed to create connection for device {device.hostname}: {e}")
+        finally:
+            # 同步完成名额交接，保证被取消时名额也会归还
+            self._release_slot(device.id)
+            if ssh_conn is not None:
+                self.connections.setdefault(device.id, []).append(ssh_conn)
+            self._wake_waiters()
+
+        return ssh_conn
 
     async def release_connection(self, connection: SSHConnection):
         """
-        释放连接回连接池
+        归还连接到连接池
+
+        归还后连接变为空闲，优先交给排队中的等待者
 
         Args:
-            connection: 要释放的连接
+            connection: 要归还的连接
         """
-        # 连接不需要显式释放，只需要标记为已使用
-        connection.mark_used()
+        self._ensure_initialized()
+
+        async with self._lock:
+            connection.mark_used()
+            connection.in_use = False
+            if not connection.is_active:
+                self._discard(connection)
+            self._wake_waiters()
         logger.debug(f"Released connection for device {connection.device.hostname}")
 
+    @asynccontextmanager
+    async def connection(self, device: Device, timeout: Optional[float] = None):
+        """
+        借出连接的上下文管理器，退出时自动归还
+
+        用法：
+            async with pool.connection(device) as ssh_conn:
+                if ssh_conn: ...
+        """
+        ssh_conn = await self.get_connection(device, timeout=timeout)
+        try:
+            yield ssh_conn
+        finally:
+            if ssh_conn is not None:
+                await self.release_connection(ssh_conn)
+
     async def close_connection(self, connection: SSHConnection):
         """
         关闭并移除连接
@@ -237,6 +515,9 @@ class SSHConnectionPool:
                     del self.connections[connection.device.id]
                     logger.debug(f"Removed empty connection list for device {connection.device.id}")
 
+            # 释放出的名额交给等待者
+            self._wake_waiters()
+
     async def close_all_connections(self):
         """
         关闭所有连接
@@ -269,17 +550,25 @@ class SSHConnectionPool:
         Returns:
             Dict[str, Any]: 连接池统计信息
         """
+        all_conns = [conn for conns in self.connections.values() for conn in conns]
         stats = {
             "total_devices": len(self.connections),
-            "total_connections": sum(len(conns) for conns in self.connections.values()),
+            "total_connections": len(all_conns),
+            "busy_connections": len([conn for conn in all_conns if conn.in_use]),
+            "idle_connections": len([conn for conn in all_conns if not conn.in_use]),
+            "pending_connections": sum(self._pending.values()),
+            "waiters": len(self._waiters),
             "max_connections": self.max_connections,
+            "max_total_connections": self.max_total_connections,
             "connection_timeout": self.connection_timeout,
+            "acquire_timeout": self.acquire_timeout,
             "device_stats": {}
         }
         
         for device_id, conn_list in self.connections.items():
             stats["device_stats"][device_id] = {
                 "active_connections": len([conn for conn in conn_list if conn.is_active]),
+                "busy_connections": len([conn for conn in conn_list if conn.in_use]),
                 "total_connections": len(conn_list),
                 "avg_use_count": sum(conn.use_count for conn in conn_list) / len(conn_list) if conn_list else 0
             }
@@ -288,7 +577,12 @@ class SSHConnectionPool:
 
 
 # 创建全局SSH连接池实例
-ssh_connection_pool = SSHConnectionPool()
+ssh_connection_pool = SSHConnectionPool(
+    max_connections=settings.SSH_POOL_MAX_PER_DEVICE,
+    connection_timeout=settings.SSH_POOL_IDLE_TIMEOUT,
+    max_total_connections=settings.SSH_POOL_MAX_TOTAL,
+    acquire_timeout=settings.SSH_POOL_ACQUIRE_TIMEOUT
+)
 
 
 def get_ssh_connection_pool() -> SSHConnectionPool:
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+设备 SSH 传输层
+
+功能：
+1. 可插拔传输层：NetmikoService 通过 get_transport() 选择驱动，默认 Netmiko，
+   可用 register_transport() 注册自定义驱动
+2. asyncio 原生 SSH 驱动（asyncssh）：会话读写在事件循环中完成，
+   设备 I/O 并发受 socket 数量约束，不再每个会话占用一个线程
+3. AsyncCLISession：与传输无关的 CLI 会话，提供与 Netmiko 连接一致的
+   send_command / send_config_set / is_alive / disconnect 语义，支持华为 / 华三 / 思科 / 锐捷：
+   - 会话初始化时关闭分页（screen-length 0 temporary / terminal length 0）
+   - 按提示符判断命令结束，仍出现分页标记时自动发送空格翻页
+   - 去除命令回显、提示符、分页标记与终端控制字符
+
+说明：
+- asyncssh 为可选依赖，未安装时 asyncssh 驱动不可用，自动退回 Netmiko
+- AsyncCLISession 只依赖 reader.read() / writer.write()，测试时可直接接到进程内的假设备服务
+- Telnet / Console 登录与未适配厂商始终使用 Netmiko
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import asyncssh
+    ASYNCSSH_AVAILABLE = True
+except ImportError:
+    asyncssh = None
+    ASYNCSSH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class TransportError(Exception):
+    """传输层错误（会话已关闭等）"""
+
+
+class TransportTimeoutError(TransportError):
+    """建连或等待提示符超时"""
+
+
+class TransportAuthenticationError(TransportError):
+    """认证失败"""
+
+
+@dataclass(frozen=True)
+class CLIProfile:
+    """厂商 CLI 特征"""
+    prompt_pattern: str
+    disable_paging: Optional[str]
+    config_enter: str
+    config_exit: str
+
+
+# 按 Netmiko device_type 区分的 CLI 特征
+CLI_PROFILES: Dict[str, CLIProfile] = {
+    "huawei": CLIProfile(r"^[<\[][^\r\n<>\[\]]+[>\]]\s*$", "screen-length 0 temporary", "system-view", "return"),
+    "hp_comware": CLIProfile(r"^[<\[][^\r\n<>\[\]]+[>\]]\s*$", "screen-length disable", "system-view", "return"),
+    "cisco_ios": CLIProfile(r"^[\w.\-@/:]+(?:\([\w.\-/:]+\))?[>#]\s*$", "terminal length 0", "configure terminal", "end"),
+    "ruijie_os": CLIProfile(r"^[\w.\-@/:]+(?:\([\w.\-/:]+\))?[>#]\s*$", "terminal length 0", "configure terminal", "end"),
+}
+
+# 分页标记：华为 "  ---- More ----"，思科 / 锐捷 " --More-- "
+PAGER_PATTERN = re.compile(r"[ \t]*-{2,}[ \t]*More[ \t]*-{2,}[ \t]*$")
+PAGER_CLEAN_PATTERN = re.compile(r"[ \t]*-{2,}[ \t]*More[ \t]*-{2,}[ \t]*")
+# 终端控制字符：ANSI 光标移动（华为翻页后的 \x1b[42D）与退格
+ANSI_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+BACKSPACE_PATTERN = re.compile(r"[ \t]*\x08+[ \t]*(?:\x08+)?")
+
+# 判断提示符 / 分页时只检查输出末尾
+TAIL_SIZE = 512
+
+
+def clean_output(text: str) -> str:
+    """
+    去除终端控制字符、分页标记并统一换行
+
+    Args:
+        text: 原始输出
+
+    Returns:
+        清理后的输出
+    """
+    text = ANSI_PATTERN.sub("", text)
+    text = BACKSPACE_PATTERN.sub("", text)
+    text = PAGER_CLEAN_PATTERN.sub("", text)
+    return text.replace("\r\n", "\n").replace("\r", "")
+
+
+def has_pager(tail: str) -> bool:
+    """
+    输出末尾是否停在分页标记上
+
+    Args:
+        tail: 输出末尾
+
+    Returns:
+        是否需要翻页
+    """
+    return bool(PAGER_PATTERN.search(ANSI_PATTERN.sub("", tail)))
+
+
+def last_line(text: str) -> str:
+    """清理后的最后一行（用于提示符匹配）"""
+    return clean_output(text).rsplit("\n", 1)[-1]
+
+
+def strip_command_output(raw: str, command: str, prompt_regex: "re.Pattern") -> str:
+    """
+    清理输出并去除首行命令回显与末行提示符
+
+    Args:
+        raw: 原始输出
+        command: 发送的命令
+        prompt_regex: 提示符正则
+
+    Returns:
+        命令输出
+    """
+    lines = clean_output(raw).split("\n")
+    if lines and command.strip() and command.strip() in lines[0]:
+        lines = lines[1:]
+    if lines and prompt_regex.search(lines[-1]):
+        lines = lines[:-1]
+    return "\n".join(lines)
+
+
+def build_prompt_regex(device_type: str, base_prompt: Optional[str] = None) -> "re.Pattern":
+    """
+    构建提示符正则：有 base_prompt（设备名）时精确匹配，否则使用厂商通用正则
+
+    Args:
+        device_type: Netmiko 设备类型
+        base_prompt: 设备名（Netmiko 连接的 base_prompt，不含 <> [] # >）
+
+    Returns:
+        编译后的正则
+    """
+    profile = CLI_PROFILES.get(device_type, CLI_PROFILES["cisco_ios"])
+    if not base_prompt:
+        return re.compile(profile.prompt_pattern)
+    name = re.escape(base_prompt.strip("<>[]#> "))
+    if profile.config_enter == "system-view":
+        # 华为 / 华三：<SW1>、[SW1]、[SW1-GigabitEthernet0/0/1]、[~SW1]
+        return re.compile(r"^[<\[][~*]?" + name + r"[^\r\n<>\[\]]*[>\]]\s*$")
+    return re.compile(r"^" + name + r"(?:\([^\r\n)]*\))?[>#]\s*$")
+
+
+class AsyncCLISession:
+    """
+    基于 asyncio 流的设备 CLI 会话
+
+    与 Netmiko 连接对象接口保持一致（is_alive / disconnect 为同步方法，
+    命令方法为协程），由 is_async 标识供调用方区分。
+    """
+
+    is_async = True
+    READ_CHUNK = 65536
+
+    def __init__(
+        self,
+        reader: Any,
+        writer: Any,
+        device_type: str,
+        close_callback: Optional[Callable[[], None]] = None,
+        encoding: Optional[str] = None
+    ):
+        """
+        初始化会话（不读写）
+
+        Args:
+            reader: 提供 read(n) 协程的读端
+            writer: 提供 write(data) 的写端
+            device_type: Netmiko 设备类型（huawei / hp_comware / cisco_ios / ruijie_os）
+            close_callback: 断开会话时额外执行的清理（如关闭 SSH 连接）
+            encoding: 读写端为字节流时的编码，None 表示读写端直接收发 str（asyncssh 文本模式）
+        """
+        self.reader = reader
+        self.writer = writer
+        self.device_type = device_type
+        self.profile = CLI_PROFILES[device_type]
+        self.prompt_regex = re.compile(self.profile.prompt_pattern)
+        self.base_prompt: Optional[str] = None
+        self._close_callback = close_callback
+        self.encoding = encoding
+        self._closed = False
+
+    def _write(self, data: str):
+        self.writer.write(data.encode(self.encoding) if self.encoding else data)
+
+    async def _read_until(self, matcher: Callable[[str], bool], timeout: float) -> str:
+        """
+        读取直到 matcher(输出末尾) 为真，期间遇到分页标记自动翻页
+
+        Args:
+            matcher: 判断是否读取完成
+            timeout: 超时（秒）
+
+        Returns:
+            原始输出
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        parts: List[str] = []
+        tail = ""
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TransportTimeoutError(f"等待设备提示符超时（{timeout}s）")
+            try:
+                chunk = await asyncio.wait_for(self.reader.read(self.READ_CHUNK), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise TransportTimeoutError(f"等待设备提示符超时（{timeout}s）")
+            if not chunk:
+                self._closed = True
+                raise TransportError("设备会话已关闭")
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode(self.encoding or "utf-8", errors="replace")
+
+            parts.append(chunk)
+            tail = (tail + chunk)[-TAIL_SIZE:]
+            if has_pager(tail):
+                self._write(" ")
+                tail = ""
+                continue
+            if matcher(tail):
+                return "".join(parts)
+
+    def _prompt_matcher(self, tail: str) -> bool:
+        return bool(self.prompt_regex.search(last_line(tail)))
+
+    def _ensure_open(self):
+        if not self.is_alive():
+            raise TransportError("设备会话已关闭")
+
+    async def initialize(self, timeout: float = 30):
+        """
+        等待首个提示符，按设备名收紧提示符正则并关闭分页
+
+        Args:
+            timeout: 超时（秒）
+        """
+        self._write("\n")
+        output = await self._read_until(self._prompt_matcher, timeout)
+        self.base_prompt = last_line(output).strip()
+        # 此后只认本设备的提示符，避免输出中形如 <...> / [...] / xxx# 的行被误判为命令结束
+        self.prompt_regex = build_prompt_regex(self.device_type, self.base_prompt)
+        if self.profile.disable_paging:
+            await self.send_command(self.profile.disable_paging, read_timeout=timeout)
+        logger.debug(f"会话初始化完成，提示符: {self.base_prompt}")
+
+    async def send_command(
+        self,
+        command: str,
+        read_timeout: float = 60,
+        expect_string: Optional[str] = None
+    ) -> str:
+        """
+        发送命令并读取到提示符（或 expect_string）出现
+
+        Args:
+            command: 命令
+            read_timeout: 超时（秒）
+            expect_string: 自定义结束标记正则，None 表示使用厂商提示符
+
+        Returns:
+            命令输出（不含回显与提示符）
+        """
+        self._ensure_open()
+        if expect_string:
+            expect_regex = re.compile(expect_string)
+
+            def matcher(tail: str) -> bool:
+                return bool(expect_regex.search(clean_output(tail)))
+        else:
+            matcher = self._prompt_matcher
+
+        self._write(command + "\n")
+        raw = await self._read_until(matcher, read_timeout)
+
+        return strip_command_output(raw, command, self.prompt_regex)
+
+    async def send_config_set(
+        self,
+        commands: List[str],
+        read_timeout: float = 60,
+        exit_config_mode: bool = True
+    ) -> str:
+        """
+        进入配置模式执行一组命令
+
+        Args:
+            commands: 配置命令列表
+            read_timeout: 单条命令超时（秒）
+            exit_config_mode: 执行完成后是否退出配置模式
+
+        Returns:
+            全部命令输出
+        """
+        outputs = [await self.send_command(self.profile.config_enter, read_timeout=read_timeout)]
+        for command in commands:
+            outputs.append(await self.send_command(command, read_timeout=read_timeout))
+        if exit_config_mode:
+            outputs.append(await self.send_command(self.profile.config_exit, read_timeout=read_timeout))
+        return "\n".join(output for output in outputs if output)
+
+    def is_alive(self) -> bool:
+        """会话是否仍可用（不阻塞）"""
+        if self._closed:
+            return False
+        is_closing = getattr(self.writer, "is_closing", None)
+        return not (callable(is_closing) and is_closing())
+
+    def disconnect(self):
+        """断开会话（不阻塞）"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.writer.close()
+        finally:
+            if self._close_callback:
+                self._close_callback()
+
+
+class SSHTransport:
+    """传输驱动基类"""
+
+    name = "base"
+
+    def supports(self, device: Any, device_type: str) -> bool:
+        """
+        驱动是否支持该设备
+
+        Args:
+            device: 设备对象
+            device_type: Netmiko 设备类型
+
+        Returns:
+            是否支持
+        """
+        return True
+
+    async def connect(self, device_params: Dict[str, Any]) -> Any:
+        """
+        建立会话
+
+        Args:
+            device_params: NetmikoService._build_device_params() 生成的连接参数
+
+        Returns:
+            连接对象（Netmiko 连接或 AsyncCLISession）
+        """
+        raise NotImplementedError
+
+
+class AsyncSSHTransport(SSHTransport):
+    """asyncio 原生 SSH 驱动（asyncssh）"""
+
+    name = "asyncssh"
+    # 终端宽度足够大，避免设备折行
+    TERM_SIZE = (511, 24)
+
+    def supports(self, device: Any, device_type: str) -> bool:
+        login_method = (getattr(device, "login_method", None) or "ssh").lower()
+        return ASYNCSSH_AVAILABLE and login_method == "ssh" and device_type in CLI_PROFILES
+
+    async def connect(self, device_params: Dict[str, Any]) -> AsyncCLISession:
+        if not ASYNCSSH_AVAILABLE:
+            raise TransportError("asyncssh 未安装")
+
+        options: Dict[str, Any] = {
+            "port": device_params.get("port") or 22,
+            "username": device_params.get("username"),
+            "password": device_params.get("password"),
+            "known_hosts": None,
+            "agent_path": None,
+        }
+        if device_params.get("use_keys") and device_params.get("key_file"):
+            options["client_keys"] = [device_params["key_file"]]
+            options["passphrase"] = device_params.get("passphrase")
+        else:
+            options["client_keys"] = None
+
+        conn_timeout = device_params.get("conn_timeout", 30)
+        try:
+            conn = await asyncio.wait_for(
+                asyncssh.connect(device_params["host"], **options), timeout=conn_timeout
+            )
+        except asyncio.TimeoutError:
+            raise TransportTimeoutError(f"SSH 建连超时（{conn_timeout}s）")
+        except asyncssh.PermissionDenied as e:
+            raise TransportAuthenticationError(str(e))
+
+        try:
+            process = await conn.create_process(
+                term_type="vt100", term_size=self.TERM_SIZE, encoding="utf-8", errors="replace"
+            )
+            session = AsyncCLISession(process.stdout, process.stdin, device_params["device_type"], conn.close)
+            await session.initialize(timeout=device_params.get("timeout", 60))
+        except BaseException:
+            conn.close()
+            raise
+        return session
+
+
+_transports: Dict[str, SSHTransport] = {}
+
+
+def register_transport(transport: SSHTransport):
+    """
+    注册传输驱动（同名覆盖）
+
+    Args:
+        transport: 驱动实例
+    """
+    _transports[transport.name] = transport
+
+
+def get_transport(name: str) -> Optional[SSHTransport]:
+    """
+    按名称获取传输驱动
+
+    Args:
+        name: 驱动名称（netmiko / asyncssh / 自定义）
+
+    Returns:
+        驱动实例，未注册返回 None
+    """
+    return _transports.get((name or "").lower())
+
+
+register_transport(AsyncSSHTransport())
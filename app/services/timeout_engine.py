@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+动态超时引擎
+
+功能：
+1. 按设备实测 RTT（Device.latency）计算连接超时
+2. 按 (设备, 命令类型) 的历史执行耗时与输出大小计算读取超时
+3. 会话超时（Netmiko timeout 参数）取会话内各命令类型读取超时的最大值
+4. 所有超时受 NETMIKO_* 配置约束（上限 NETMIKO_MAX_TIMEOUT）
+
+计算规则：
+- 无历史样本：命令类型基准超时（NETMIKO_ARP_TABLE_TIMEOUT 等）+ RTT 补偿
+- 有历史样本：历史耗时 P95 × 输出增长系数 × 安全系数 + RTT 补偿，
+  快速设备不再承担最坏情况超时
+- 超时的执行按当时的超时值记为样本并放大，慢设备下次获得更长的超时，
+  不再反复超时重试
+- NETMIKO_DYNAMIC_TIMEOUT_ENABLED 关闭时退回基准超时
+"""
+
+import logging
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from app.models.models import Device
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CommandSample:
+    """单次命令执行样本"""
+    duration: float
+    output_size: int
+    timed_out: bool = False
+
+
+class TimeoutEngine:
+    """基于 RTT 与历史耗时的命令超时计算"""
+
+    # 每个 (设备, 命令类型) 保留的样本数
+    HISTORY_SIZE = 20
+    # 使用历史耗时所需的最少成功样本数
+    MIN_SAMPLES = 3
+    # 历史耗时的安全系数
+    SAFETY_FACTOR = 2.0
+    # 超时样本的放大系数
+    TIMEOUT_BACKOFF = 1.5
+    # 读取超时下限（秒）
+    MIN_READ_TIMEOUT = 10.0
+    # 连接超时下限 / 无延迟数据时的默认值（秒）
+    MIN_CONNECT_TIMEOUT = 5.0
+    DEFAULT_CONNECT_TIMEOUT = 30.0
+    # 建立 SSH 会话（TCP + 密钥交换 + 认证）约需的往返次数
+    CONNECT_ROUND_TRIPS = 20
+    # 每屏输出字节数（分页设备每屏一次往返）
+    PAGE_BYTES = 2048
+    # 会话内可能执行的命令类型（连接会被连接池复用，建连时无法确定具体命令）
+    SESSION_COMMAND_TYPES = ('arp_table', 'mac_table', None)
+
+    def __init__(self):
+        self._history: Dict[Tuple[int, str], Deque[CommandSample]] = {}
+        self._lock = threading.Lock()
+
+    def _settings(self):
+        from app.config import settings
+        return settings
+
+    def base_read_timeout(self, command_type: Optional[str]) -> float:
+        """
+        命令类型的基准读取超时
+
+        Args:
+            command_type: 命令类型（arp_table / mac_table / ...）
+
+        Returns:
+            基准超时（秒）
+        """
+        settings = self._settings()
+        base = {
+            'arp_table': settings.NETMIKO_ARP_TABLE_TIMEOUT,
+            'mac_table': settings.NETMIKO_MAC_TABLE_TIMEOUT,
+        }.get(command_type, settings.NETMIKO_DEFAULT_TIMEOUT)
+        return float(min(base, settings.NETMIKO_MAX_TIMEOUT))
+
+    @staticmethod
+    def _rtt_seconds(device: Device) -> Optional[float]:
+        latency = getattr(device, 'latency', None)
+        if latency is None or latency < 0:
+            return None
+        return latency / 1000.0
+
+    def _samples(self, device_id: Optional[int], command_type: Optional[str]) -> Tuple[CommandSample, ...]:
+        with self._lock:
+            return tuple(self._history.get((device_id, command_type or 'default'), ()))
+
+    def read_timeout(self, device: Device, command_type: Optional[str] = None) -> float:
+        """
+        计算命令读取超时
+
+        Args:
+            device: 设备对象
+            command_type: 命令类型
+
+        Returns:
+            读取超时（秒）
+        """
+        settings = self._settings()
+        base = self.base_read_timeout(command_type)
+        if not settings.NETMIKO_DYNAMIC_TIMEOUT_ENABLED:
+            return base
+
+        samples = self._samples(getattr(device, 'id', None), command_type)
+        successes = [s for s in samples if not s.timed_out]
+        rtt = self._rtt_seconds(device) or 0.0
+
+        if len(successes) >= self.MIN_SAMPLES:
+            durations = sorted(s.duration for s in successes)
+            p95 = durations[min(len(durations) - 1, math.ceil(len(durations) * 0.95) - 1)]
+            sizes = sorted(s.output_size for s in successes)
+            median_size = sizes[len(sizes) // 2]
+            # 输出增长时按比例放大（以最近一次为准）
+            growth = max(1.0, successes[-1].output_size / median_size) if median_size else 1.0
+            estimate = p95 * growth * self.SAFETY_FACTOR
+            expected_size = successes[-1].output_size
+        else:
+            estimate = base
+            expected_size = 0
+
+        # 超时样本：至少给到上次超时值的 TIMEOUT_BACKOFF 倍
+        timeouts = [s.duration for s in samples if s.timed_out]
+        if timeouts:
+            estimate = max(estimate, max(timeouts) * self.TIMEOUT_BACKOFF)
+
+        pages = max(1, math.ceil(expected_size / self.PAGE_BYTES))
+        timeout = estimate + rtt * pages + settings.NETMIKO_NETWORK_DELAY_COMPENSATION
+        return float(min(max(timeout, self.MIN_READ_TIMEOUT), settings.NETMIKO_MAX_TIMEOUT))
+
+    def session_timeout(self, device: Device, command_types: Optional[Iterable[Optional[str]]] = None) -> float:
+        """
+        计算会话超时（Netmiko 的 timeout 参数）
+
+        取会话内各命令类型读取超时的最大值，快速设备不再固定使用 60 秒。
+
+        Args:
+            device: 设备对象
+            command_types: 会话内的命令类型，None 表示 SESSION_COMMAND_TYPES
+
+        Returns:
+            会话超时（秒），上限 NETMIKO_MAX_TIMEOUT
+        """
+        types = tuple(command_types) if command_types is not None else self.SESSION_COMMAND_TYPES
+        return max((self.read_timeout(device, command_type) for command_type in types),
+                   default=self.read_timeout(device, None))
+
+    def connect_timeout(self, device: Device, default: Optional[float] = None) -> float:
+        """
+        计算连接超时
+
+        Args:
+            device: 设备对象
+            default: 无延迟数据时使用的超时，None 表示 DEFAULT_CONNECT_TIMEOUT
+
+        Returns:
+            连接超时（秒）
+        """
+        settings = self._settings()
+        fallback = float(default if default is not None else self.DEFAULT_CONNECT_TIMEOUT)
+        rtt = self._rtt_seconds(device)
+        if not settings.NETMIKO_DYNAMIC_TIMEOUT_ENABLED or rtt is None:
+            return min(fallback, settings.NETMIKO_MAX_TIMEOUT)
+
+        timeout = rtt * self.CONNECT_ROUND_TRIPS + settings.NETMIKO_NETWORK_DELAY_COMPENSATION
+        return float(min(max(timeout, self.MIN_CONNECT_TIMEOUT), settings.NETMIKO_MAX_TIMEOUT))
+
+    def record(self, device_id: Optional[int], command_type: Optional[str], duration: float, output_size: int):
+        """
+        记录一次成功执行
+
+        Args:
+            device_id: 设备 ID
+            command_type: 命令类型
+            duration: 执行耗时（秒）
+            output_size: 输出字符数
+        """
+        self._append(device_id, command_type, CommandSample(duration, output_size))
+
+    def record_timeout(self, device_id: Optional[int], command_type: Optional[str], timeout: float):
+        """
+        记录一次超时
+
+        Args:
+            device_id: 设备 ID
+            command_type: 命令类型
+            timeout: 本次使用的读取超时（秒）
+        """
+        self._append(device_id, command_type, CommandSample(timeout, 0, timed_out=True))
+        logger.info(f"命令超时已记录：设备 {device_id}，类型 {command_type}，超时 {timeout:.1f}s")
+
+    def _append(self, device_id: Optional[int], command_type: Optional[str], sample: CommandSample):
+        key = (device_id, command_type or 'default')
+        with self._lock:
+            history = self._history.get(key)
+            if history is None:
+                history = self._history[key] = deque(maxlen=self.HISTORY_SIZE)
+            history.append(sample)
+
+    def reset(self, device_id: Optional[int] = None):
+        """
+        清除历史样本
+
+        Args:
+            device_id: 只清除该设备的样本，None 表示全部
+        """
+        with self._lock:
+            if device_id is None:
+                self._history.clear()
+            else:
+                for key in [k for k in self._history if k[0] == device_id]:
+                    del self._history[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取超时引擎统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                'tracked_keys': len(self._history),
+                'samples': sum(len(h) for h in self._history.values()),
+                'timeouts': sum(1 for h in self._history.values() for s in h if s.timed_out),
+            }
+
+
+# 全局超时引擎实例
+timeout_engine = TimeoutEngine()
+
+
+def get_timeout_engine() -> TimeoutEngine:
+    """
+    获取超时引擎实例
+
+    Returns:
+        TimeoutEngine 实例
+    """
+    return timeout_engine
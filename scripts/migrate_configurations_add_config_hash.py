@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+配置表迁移脚本 - 添加配置哈希字段
+
+功能：
+1. 为 configurations 表添加 config_hash 字段及索引
+2. 按当前规范化规则（忽略厂商易变行）为历史记录分批回填哈希
+3. 支持回滚
+
+使用方式：
+    python scripts/migrate_configurations_add_config_hash.py [--dry-run] [--rollback] [--batch-size N]
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from pymysql import MySQLError
+from dotenv import load_dotenv
+
+from app.services.config_hash import compute_config_hash
+
+# 加载环境变量
+load_dotenv()
+
+INDEX_NAME = 'ix_configurations_config_hash'
+
+
+class ConfigHashMigration:
+    """配置哈希迁移类"""
+
+    def __init__(self, dry_run: bool = False, batch_size: int = 200):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.connection = None
+        self.db_config = {
+            'host': os.getenv('DB_HOST', '10.21.65.20'),
+            'port': int(os.getenv('DB_PORT', '3307')),
+            'user': os.getenv('DB_USER', 'root'),
+            'password': os.getenv('DB_PASSWORD', '1qaz@WSX'),
+            'database': os.getenv('DB_NAME', 'switch_manage'),
+            'charset': 'utf8mb4',
+            'cursorclass': pymysql.cursors.DictCursor
+        }
+
+    def connect(self):
+        """建立数据库连接"""
+        print(f"连接数据库 {self.db_config['host']}:{self.db_config['port']}...")
+        self.connection = pymysql.connect(**self.db_config)
+        print("数据库连接成功")
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.connection:
+            self.connection.close()
+            print("数据库连接已关闭")
+
+    def column_exists(self) -> bool:
+        """检查 config_hash 字段是否已存在"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SHOW COLUMNS FROM configurations LIKE 'config_hash'")
+            return cursor.fetchone() is not None
+
+    def add_column(self):
+        """添加字段与索引"""
+        print("\n=== 添加 config_hash 字段 ===")
+
+        if self.column_exists():
+            print("config_hash 字段已存在，跳过添加")
+            return True
+
+        statements = [
+            "ALTER TABLE configurations ADD COLUMN config_hash VARCHAR(64) NULL "
+            "COMMENT '规范化配置哈希' AFTER git_commit_id",
+            f"CREATE INDEX {INDEX_NAME} ON configurations(config_hash)",
+        ]
+
+        if self.dry_run:
+            for sql in statements:
+                print(f"[DRY-RUN] 将执行 SQL: {sql}")
+            return True
+
+        try:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    print(f"执行 SQL: {sql}")
+                    cursor.execute(sql)
+            self.connection.commit()
+            print("字段与索引添加成功")
+            return True
+        except MySQLError as e:
+            self.connection.rollback()
+            print(f"添加字段失败: {e}")
+            return False
+
+    def backfill(self):
+        """为历史记录分批回填哈希（按 id 递增游标，每批单独提交）"""
+        print("\n=== 回填历史记录哈希 ===")
+
+        if self.dry_run:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) AS cnt FROM configurations")
+                print(f"[DRY-RUN] 将为最多 {cursor.fetchone()['cnt']} 条记录计算哈希")
+            return True
+
+        last_id = 0
+        updated = 0
+        while True:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT c.id, c.config_content, d.vendor
+                    FROM configurations c
+                    LEFT JOIN devices d ON c.device_id = d.id
+                    WHERE c.id > %s AND c.config_hash IS NULL
+                    ORDER BY c.id
+                    LIMIT %s
+                """, (last_id, self.batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+
+            params = [(compute_config_hash(row['config_content'], row['vendor']), row['id']) for row in rows]
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.executemany("UPDATE configurations SET config_hash = %s WHERE id = %s", params)
+                self.connection.commit()
+            except MySQLError as e:
+                self.connection.rollback()
+                print(f"回填失败（id > {last_id}）: {e}")
+                return False
+
+            last_id = rows[-1]['id']
+            updated += len(rows)
+            print(f"已回填 {updated} 条")
+
+        print(f"回填完成，共 {updated} 条")
+        return True
+
+    def rollback(self):
+        """回滚：删除索引与字段"""
+        print("\n=== 回滚：删除 config_hash 字段 ===")
+
+        statements = [
+            f"DROP INDEX {INDEX_NAME} ON configurations",
+            "ALTER TABLE configurations DROP COLUMN config_hash",
+        ]
+
+        if self.dry_run:
+            for sql in statements:
+                print(f"[DRY-RUN] 将执行 SQL: {sql}")
+            return True
+
+        if not self.column_exists():
+            print("config_hash 字段不存在，无需回滚")
+            return True
+
+        try:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    print(f"执行: {sql}")
+                    cursor.execute(sql)
+            self.connection.commit()
+            print("回滚完成")
+            return True
+        except MySQLError as e:
+            self.connection.rollback()
+            print(f"回滚失败: {e}")
+            return False
+
+    def verify(self):
+        """验证迁移结果"""
+        print("\n=== 验证迁移结果 ===")
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS cnt FROM configurations")
+            total = cursor.fetchone()['cnt']
+            cursor.execute("SELECT COUNT(*) AS cnt FROM configurations WHERE config_hash IS NULL")
+            missing = cursor.fetchone()['cnt']
+        print(f"配置记录数: {total}，未回填哈希: {missing}")
+
+        return missing == 0
+
+    def run(self, rollback: bool = False):
+        """执行迁移"""
+        print(f"\n{'='*60}")
+        print("配置哈希迁移脚本")
+        print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"模式: {'DRY-RUN (仅预览)' if self.dry_run else '正式执行'}")
+        print(f"{'='*60}")
+
+        try:
+            self.connect()
+
+            if rollback:
+                return self.rollback()
+
+            success = self.add_column() and self.backfill()
+            if success and not self.dry_run:
+                success = self.verify()
+
+            return success
+
+        finally:
+            self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='配置哈希迁移脚本')
+    parser.add_argument('--dry-run', action='store_true', help='仅预览，不实际执行')
+    parser.add_argument('--rollback', action='store_true', help='回滚迁移')
+    parser.add_argument('--batch-size', type=int, default=200, help='回填每批记录数')
+    args = parser.parse_args()
+
+    migration = ConfigHashMigration(dry_run=args.dry_run, batch_size=args.batch_size)
+    success = migration.run(rollback=args.rollback)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+配置表迁移脚本 - 关键帧 + 压缩增量存储
+
+功能：
+1. 为 configurations 表添加 storage_format、config_data、base_config_id 字段及索引
+2. 按设备、按版本顺序把明文配置转为关键帧 / 压缩增量（规则与采集入库一致），逐条校验可还原后才清空明文
+3. 顺带回填缺失的 config_hash（转换后明文不再保留）
+4. 支持回滚：还原明文后删除新增字段
+
+使用方式：
+    python scripts/migrate_configurations_delta_storage.py [--dry-run] [--rollback] [--mode delta|compressed] [--batch-size N]
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from pymysql import MySQLError
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+from app.services.config_hash import compute_config_hash
+from app.services.config_storage import (STORAGE_DELTA, STORAGE_FULL, STORAGE_PLAIN, apply_delta,
+                                         decompress_config, encode_version)
+
+INDEX_NAME = 'ix_configurations_base_config_id'
+
+
+class DeltaStorageMigration:
+    """配置存储迁移类"""
+
+    def __init__(self, dry_run: bool = False, mode: str = 'delta', batch_size: int = 100):
+        self.dry_run = dry_run
+        self.mode = mode
+        self.batch_size = batch_size
+        self.connection = None
+        self.db_config = {
+            'host': os.getenv('DB_HOST', '10.21.65.20'),
+            'port': int(os.getenv('DB_PORT', '3307')),
+            'user': os.getenv('DB_USER', 'root'),
+            'password': os.getenv('DB_PASSWORD', '1qaz@WSX'),
+            'database': os.getenv('DB_NAME', 'switch_manage'),
+            'charset': 'utf8mb4',
+            'cursorclass': pymysql.cursors.DictCursor
+        }
+
+    def connect(self):
+        """建立数据库连接"""
+        print(f"连接数据库 {self.db_config['host']}:{self.db_config['port']}...")
+        self.connection = pymysql.connect(**self.db_config)
+        print("数据库连接成功")
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.connection:
+            self.connection.close()
+            print("数据库连接已关闭")
+
+    def column_exists(self, column: str) -> bool:
+        """检查字段是否已存在"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SHOW COLUMNS FROM configurations LIKE '{column}'")
+            return cursor.fetchone() is not None
+
+    def add_columns(self):
+        """添加字段与索引"""
+        print("\n=== 添加存储字段 ===")
+
+        if self.column_exists('storage_format'):
+            print("存储字段已存在，跳过添加")
+            return True
+
+        statements = [
+            "ALTER TABLE configurations "
+            "ADD COLUMN storage_format VARCHAR(10) NOT NULL DEFAULT 'plain' COMMENT '存储格式' AFTER config_hash, "
+            "ADD COLUMN config_data LONGBLOB NULL COMMENT '压缩全文或压缩增量' AFTER storage_format, "
+            "ADD COLUMN base_config_id INT NULL COMMENT '增量所属关键帧ID' AFTER config_data",
+            f"CREATE INDEX {INDEX_NAME} ON configurations(base_config_id)",
+        ]
+
+        if self.dry_run:
+            for sql in statements:
+                print(f"[DRY-RUN] 将执行 SQL: {sql}")
+            return True
+
+        try:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    print(f"执行 SQL: {sql}")
+                    cursor.execute(sql)
+            self.connection.commit()
+            print("字段与索引添加成功")
+            return True
+        except MySQLError as e:
+            self.connection.rollback()
+            print(f"添加字段失败: {e}")
+            return False
+
+    def _current_keyframe(self, device_id: int):
+        """设备当前关键帧（全文、压缩大小、已挂增量数），没有时返回 (None, 0, 0)"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, config_data FROM configurations
+                WHERE device_id = %s AND storage_format = %s
+                ORDER BY id DESC LIMIT 1
+            """, (device_id, STORAGE_FULL))
+            row = cursor.fetchone()
+            if not row:
+                return None, None, 0, 0
+            cursor.execute("SELECT COUNT(*) AS cnt FROM configurations WHERE base_config_id = %s", (row['id'],))
+            deltas = cursor.fetchone()['cnt']
+        return row['id'], decompress_config(row['config_data']), len(row['config_data']), deltas
+
+    def encode(self):
+        """按设备、按版本顺序转换明文记录（每批单独提交）"""
+        print(f"\n=== 转换明文配置（模式: {self.mode}） ===")
+
+        if self.dry_run:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*) AS cnt, COALESCE(SUM(LENGTH(config_content)), 0) AS size
+                    FROM configurations WHERE config_content IS NOT NULL
+                """)
+                row = cursor.fetchone()
+            print(f"[DRY-RUN] 将转换 {row['cnt']} 条记录，明文共 {row['size']} 字节")
+            return True
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT c.device_id, d.vendor FROM configurations c
+                LEFT JOIN devices d ON c.device_id = d.id
+                WHERE c.storage_format = %s AND c.config_content IS NOT NULL
+            """, (STORAGE_PLAIN,))
+            devices = cursor.fetchall()
+
+        plain_bytes = 0
+        stored_bytes = 0
+        converted = 0
+        for device in devices:
+            keyframe_id, keyframe_content, keyframe_size, deltas = self._current_keyframe(device['device_id'])
+            last_id = 0
+            while True:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT id, config_content, config_hash FROM configurations
+                        WHERE device_id = %s AND id > %s AND storage_format = %s AND config_content IS NOT NULL
+                        ORDER BY id
+                        LIMIT %s
+                    """, (device['device_id'], last_id, STORAGE_PLAIN, self.batch_size))
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                params = []
+                for row in rows:
+                    content = row['config_content']
+                    storage_format, data = encode_version(
+                        content, keyframe_content, keyframe_size, deltas, self.mode
+                    )
+                    restored = (decompress_config(data) if storage_format == STORAGE_FULL
+                                else apply_delta(keyframe_content, data))
+                    if restored != content:
+                        print(f"配置 {row['id']} 编码后无法还原，停止迁移")
+                        return False
+
+                    base_id = keyframe_id if storage_format == STORAGE_DELTA else None
+                    config_hash = row['config_hash'] or compute_config_hash(content, device['vendor'])
+                    params.append((storage_format, data, base_id, config_hash, row['id']))
+
+                    if storage_format == STORAGE_FULL:
+                        keyframe_id, keyframe_content, keyframe_size, deltas = row['id'], content, len(data), 0
+                    else:
+                        deltas += 1
+                    plain_bytes += len(content.encode('utf-8'))
+                    stored_bytes += len(data)
+
+                try:
+                    with self.connection.cursor() as cursor:
+                        cursor.executemany("""
+                            UPDATE configurations
+                            SET storage_format = %s, config_data = %s, base_config_id = %s,
+                                config_hash = %s, config_content = NULL
+                            WHERE id = %s
+                        """, params)
+                    self.connection.commit()
+                except MySQLError as e:
+                    self.connection.rollback()
+                    print(f"转换失败（设备 {device['device_id']}，id > {last_id}）: {e}")
+                    return False
+
+                last_id = rows[-1]['id']
+                converted += len(rows)
+            print(f"设备 {device['device_id']} 转换完成，累计 {converted} 条")
+
+        ratio = stored_bytes / plain_bytes * 100 if plain_bytes else 0
+        print(f"转换完成，共 {converted} 条；明文 {plain_bytes} 字节 -> 存储 {stored_bytes} 字节（{ratio:.1f}%）")
+        return True
+
+    def rollback(self):
+        """回滚：还原明文后删除索引与字段"""
+        print("\n=== 回滚：还原明文并删除存储字段 ===")
+
+        statements = [
+            f"DROP INDEX {INDEX_NAME} ON configurations",
+            "ALTER TABLE configurations DROP COLUMN base_config_id, DROP COLUMN config_data, DROP COLUMN storage_format",
+        ]
+
+        if self.dry_run:
+            print("[DRY-RUN] 将把关键帧 / 增量记录还原为明文")
+            for sql in statements:
+                print(f"[DRY-RUN] 将执行 SQL: {sql}")
+            return True
+
+        if not self.column_exists('storage_format'):
+            print("存储字段不存在，无需回滚")
+            return True
+
+        try:
+            # 先还原增量（依赖关键帧的压缩全文），再还原关键帧
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT id, config_data FROM configurations WHERE storage_format = %s", (STORAGE_FULL,))
+                keyframes = {row['id']: decompress_config(row['config_data']) for row in cursor.fetchall()}
+
+            last_id = 0
+            while True:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT id, config_data, base_config_id FROM configurations
+                        WHERE id > %s AND storage_format = %s
+                        ORDER BY id
+                        LIMIT %s
+                    """, (last_id, STORAGE_DELTA, self.batch_size))
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+                params = [(apply_delta(keyframes[row['base_config_id']], row['config_data']), row['id'])
+                          for row in rows]
+                with self.connection.cursor() as cursor:
+                    cursor.executemany("UPDATE configurations SET config_content = %s WHERE id = %s", params)
+                last_id = rows[-1]['id']
+
+            with self.connection.cursor() as cursor:
+                cursor.executemany("UPDATE configurations SET config_content = %s WHERE id = %s",
+                                   [(content, config_id) for config_id, content in keyframes.items()])
+                for sql in statements:
+                    print(f"执行: {sql}")
+                    cursor.execute(sql)
+            self.connection.commit()
+            print("回滚完成")
+            return True
+        except (MySQLError, KeyError) as e:
+            self.connection.rollback()
+            print(f"回滚失败: {e}")
+            return False
+
+    def verify(self):
+        """验证迁移结果：增量记录的关键帧均存在，且没有遗留明文"""
+        print("\n=== 验证迁移结果 ===")
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT storage_format, COUNT(*) AS cnt, COALESCE(SUM(LENGTH(config_data)), 0) AS size
+                FROM configurations GROUP BY storage_format
+            """)
+            for row in cursor.fetchall():
+                print(f"{row['storage_format']}: {row['cnt']} 条，压缩数据 {row['size']} 字节")
+            cursor.execute("""
+                SELECT COUNT(*) AS cnt FROM configurations c
+                LEFT JOIN configurations k ON c.base_config_id = k.id AND k.storage_format = %s
+                WHERE c.storage_format = %s AND k.id IS NULL
+            """, (STORAGE_FULL, STORAGE_DELTA))
+            orphans = cursor.fetchone()['cnt']
+            cursor.execute("""
+                SELECT COUNT(*) AS cnt FROM configurations
+                WHERE storage_format = %s AND config_content IS NOT NULL
+            """, (STORAGE_PLAIN,))
+            remaining = cursor.fetchone()['cnt']
+        print(f"缺少关键帧的增量: {orphans}，未转换明文: {remaining}")
+
+        return orphans == 0 and remaining == 0
+
+    def run(self, rollback: bool = False):
+        """执行迁移"""
+        print(f"\n{'='*60}")
+        print("配置存储迁移脚本")
+        print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"模式: {'DRY-RUN (仅预览)' if self.dry_run else '正式执行'}")
+        print(f"{'='*60}")
+
+        try:
+            self.connect()
+
+            if rollback:
+                return self.rollback()
+
+            success = self.add_columns() and self.encode()
+            if success and not self.dry_run:
+                success = self.verify()
+
+            return success
+
+        finally:
+            self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='配置存储迁移脚本（关键帧 + 压缩增量）')
+    parser.add_argument('--dry-run', action='store_true', help='仅预览，不实际执行')
+    parser.add_argument('--rollback', action='store_true', help='回滚迁移')
+    parser.add_argument('--mode', choices=['delta', 'compressed'], default='delta',
+                        help='delta: 关键帧 + 增量；compressed: 每个版本压缩全文')
+    parser.add_argument('--batch-size', type=int, default=100, help='每批转换记录数')
+    args = parser.parse_args()
+
+    migration = DeltaStorageMigration(dry_run=args.dry_run, mode=args.mode, batch_size=args.batch_size)
+    success = migration.run(rollback=args.rollback)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
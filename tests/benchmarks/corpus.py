@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+解析器基准语料
+
+包含两部分：
+1. 录制样本（corpus/*.txt）：真实设备输出脱敏后的片段，
+   期望解析结果保存在 corpus/expected/*.json，作为解析正确性的回归语料
+2. 生成语料：以录制样本的表头 / 接口段为模板，用固定种子生成 1 万 ~ 10 万行的
+   MAC / ARP 表和长接口详情输出，供吞吐与内存基准使用
+
+脱敏约定：MAC 使用本地管理地址段 02:00:5e:xx:xx:xx，IP 使用 10.0.0.0/8，
+主机名与序列号使用占位值。
+"""
+
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+EXPECTED_DIR = os.path.join(CORPUS_DIR, "expected")
+
+# 版本信息中随采集时间变化的字段，不纳入回归比较
+VOLATILE_FIELDS = ("collected_at", "device_id")
+
+
+def load_sample(name: str) -> str:
+    """
+    读取录制样本
+
+    Args:
+        name: 样本文件名（不含 .txt）
+
+    Returns:
+        设备输出文本
+    """
+    with open(os.path.join(CORPUS_DIR, f"{name}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+def load_expected(name: str) -> Any:
+    """
+    读取录制样本的期望解析结果
+
+    Args:
+        name: 样本用例名
+
+    Returns:
+        期望结果（JSON 反序列化后）
+    """
+    with open(os.path.join(EXPECTED_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def normalize_result(result: Any) -> Any:
+    """
+    将解析结果转换为可与 JSON 比较的形式（去掉采集时间等易变字段）
+
+    Args:
+        result: 解析方法返回值
+
+    Returns:
+        规范化后的结果
+    """
+    if isinstance(result, dict):
+        return {k: normalize_result(v) for k, v in result.items() if k not in VOLATILE_FIELDS}
+    if isinstance(result, (list, tuple)):
+        return [normalize_result(item) for item in result]
+    return result
+
+
+# ==================== 录制样本用例 ====================
+
+@dataclass(frozen=True)
+class SampleCase:
+    """录制样本回归用例：method(*样本文本, vendor)，样本名为 None 时传入 None"""
+
+    name: str
+    method: str
+    vendor: str
+    samples: Tuple[Optional[str], ...]
+
+    def args(self) -> tuple:
+        """解析方法参数"""
+        return tuple(load_sample(sample) if sample else None for sample in self.samples) + (self.vendor,)
+
+
+SAMPLE_CASES: List[SampleCase] = [
+    SampleCase("huawei_mac_table", "parse_mac_table", "huawei", ("huawei_mac_table",)),
+    SampleCase("h3c_mac_table", "parse_mac_table", "h3c", ("h3c_mac_table",)),
+    SampleCase("cisco_mac_table", "parse_mac_table", "cisco", ("cisco_mac_table",)),
+    SampleCase("ruijie_mac_table", "parse_mac_table", "ruijie", ("cisco_mac_table",)),
+    SampleCase("huawei_arp_table", "_parse_arp_table", "huawei", ("huawei_arp_table",)),
+    SampleCase("h3c_arp_table", "_parse_arp_table", "h3c", ("h3c_arp_table",)),
+    SampleCase("cisco_arp_table", "_parse_arp_table", "cisco", ("cisco_arp_table",)),
+    SampleCase("ruijie_arp_table", "_parse_arp_table", "ruijie", ("cisco_arp_table",)),
+    SampleCase("huawei_interfaces", "parse_interfaces_info", "huawei", ("huawei_interfaces", None)),
+    SampleCase("cisco_interfaces", "parse_interfaces_info", "cisco",
+               ("cisco_interfaces", "cisco_interfaces_status")),
+    SampleCase("huawei_version", "parse_version_info", "huawei", ("huawei_version",)),
+    SampleCase("cisco_version", "parse_version_info", "cisco", ("cisco_version",)),
+    SampleCase("cisco_serial_from_version", "parse_serial_from_version", "cisco", ("cisco_version",)),
+    SampleCase("cisco_serial_from_inventory", "parse_serial_from_inventory", "cisco", ("cisco_inventory",)),
+]
+
+
+# ==================== 生成语料 ====================
+
+def _mac(rng: random.Random, style: str) -> str:
+    """生成脱敏 MAC（02:00:5e 本地管理地址段）"""
+    value = f"02005e{rng.getrandbits(24):06x}"
+    if style == "cisco":
+        return f"{value[0:4]}.{value[4:8]}.{value[8:12]}"
+    return f"{value[0:4]}-{value[4:8]}-{value[8:12]}"
+
+
+def _ip(index: int) -> str:
+    """按序号生成 10.0.0.0/8 内不重复的地址"""
+    index += 1
+    return f"10.{(index >> 16) & 0xff}.{(index >> 8) & 0xff}.{index & 0xff}"
+
+
+def _port(rng: random.Random, vendor: str) -> str:
+    """生成接口名（物理口为主，少量聚合口）"""
+    if rng.random() < 0.05:
+        return {"huawei": "Eth-Trunk{}", "h3c": "BAGG{}", "cisco": "Po{}"}[vendor].format(rng.randint(1, 8))
+    slot, port = rng.randint(1, 4), rng.randint(1, 48)
+    if vendor == "huawei":
+        return f"GE{slot - 1}/0/{port}"
+    if vendor == "h3c":
+        return f"GE{slot}/0/{port}"
+    return f"Gi{slot}/0/{port}"
+
+
+def _header(sample: str, first_row_marker: str) -> str:
+    """取录制样本中第一条数据行之前的表头"""
+    text = load_sample(sample)
+    return text[:text.index(first_row_marker)]
+
+
+def generate_mac_table(vendor: str, rows: int, seed: int = 0) -> str:
+    """
+    生成 MAC 地址表输出
+
+    Args:
+        vendor: huawei / h3c / cisco
+        rows: 表项数
+        seed: 随机种子
+
+    Returns:
+        设备输出文本（包含 rows 条可解析表项）
+    """
+    rng = random.Random(seed)
+    lines = []
+    if vendor == "huawei":
+        header = _header("huawei_mac_table", "0200-")
+        for _ in range(rows):
+            lines.append(f"{_mac(rng, vendor)} {rng.randint(1, 4000):<11} -      -      "
+                         f"{_port(rng, vendor):<15} {rng.choice(('dynamic', 'dynamic', 'static')):<9} 0/-")
+        footer = f"{'-' * 79}\nTotal matching items on slot 0 displayed = {rows}\n"
+    elif vendor == "h3c":
+        header = _header("h3c_mac_table", "0200-")
+        for _ in range(rows):
+            lines.append(f"{_mac(rng, vendor)}   {rng.randint(1, 4000):<10} "
+                         f"{rng.choice(('Learned', 'Learned', 'Config static')):<16} {_port(rng, vendor):<24} Y")
+        footer = ""
+    else:
+        header = _header("cisco_mac_table", "  10 ")
+        for _ in range(rows):
+            lines.append(f" {rng.randint(1, 4000):>4}    {_mac(rng, vendor)}    "
+                         f"{rng.choice(('DYNAMIC', 'DYNAMIC', 'STATIC')):<11} {_port(rng, vendor)}")
+        footer = f"Total Mac Addresses for this criterion: {rows}\n"
+    return header + "\n".join(lines) + "\n" + footer
+
+
+def generate_arp_table(vendor: str, rows: int, seed: int = 0) -> str:
+    """
+    生成 ARP 表输出
+
+    Args:
+        vendor: huawei / h3c / cisco
+        rows: 表项数
+        seed: 随机种子
+
+    Returns:
+        设备输出文本（包含 rows 条可解析表项）
+    """
+    rng = random.Random(seed)
+    lines = []
+    if vendor == "huawei":
+        header = _header("huawei_arp_table", "10.10.0.1 ")
+        for i in range(rows):
+            vlan = rng.randint(1, 4000)
+            lines.append(f"{_ip(i):<15} {_mac(rng, vendor)}  {rng.randint(1, 20):<9} D-0         "
+                         f"{_port(rng, vendor)}")
+            lines.append(f"{'':42}{vlan}/-")
+        footer = f"{'-' * 78}\nTotal:{rows}         Dynamic:{rows}       Static:0     Interface:0\n"
+    elif vendor == "h3c":
+        header = _header("h3c_arp_table", "10.10.0.31 ")
+        for i in range(rows):
+            lines.append(f"{_ip(i):<15} {_mac(rng, vendor)} {rng.randint(1, 4000):<13} "
+                         f"{_port(rng, vendor):<24} {rng.randint(1, 1200):<5} D")
+        footer = ""
+    else:
+        header = _header("cisco_arp_table", "Internet  10.10.0.1 ")
+        for i in range(rows):
+            lines.append(f"Internet  {_ip(i):<15} {rng.randint(0, 240):>6}   {_mac(rng, vendor)}  ARPA   "
+                         f"Vlan{rng.randint(1, 4000)}")
+        footer = ""
+    return header + "\n".join(lines) + "\n" + footer
+
+
+def generate_interfaces(vendor: str, count: int, seed: int = 0) -> Tuple[str, str]:
+    """
+    生成长接口详情输出（以录制样本的第一个接口段为模板）
+
+    Args:
+        vendor: huawei / cisco
+        count: 接口数
+        seed: 随机种子
+
+    Returns:
+        (接口详情输出, 接口状态表输出)；华为没有状态表，返回空字符串
+    """
+    rng = random.Random(seed)
+    if vendor == "huawei":
+        sample = load_sample("huawei_interfaces")
+        block = sample[:sample.index("GigabitEthernet0/0/2 ")]
+        name, description = "GigabitEthernet0/0/1", "TO-ACCESS-SW01"
+    else:
+        sample = load_sample("cisco_interfaces")
+        block = sample[:sample.index("GigabitEthernet1/0/2 ")]
+        name, description = "GigabitEthernet1/0/1", "TO-AP-01"
+
+    blocks, status_rows = [], [load_sample("cisco_interfaces_status").rstrip("\n").split("\n")[1]]
+    for i in range(count):
+        slot, port = divmod(i, 48)
+        port_name = f"GigabitEthernet{slot}/0/{port + 1}" if vendor == "huawei" \
+            else f"GigabitEthernet{slot + 1}/0/{port + 1}"
+        port_description = f"ACCESS-{rng.randint(1, 9999):04d}"
+        blocks.append(block.replace(name, port_name).replace(description, port_description))
+        status_rows.append(f"Gi{slot + 1}/0/{port + 1:<5} {port_description:<18} connected    "
+                           f"{rng.randint(1, 4000):<10} a-full a-1000 10/100/1000BaseTX")
+    status = "\n".join(status_rows) + "\n" if vendor != "huawei" else ""
+    return "".join(blocks), status
+
+
+# ==================== 基准用例 ====================
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """
+    吞吐 / 内存基准用例
+
+    build 返回解析方法参数；rows 为期望解析出的记录数（None 表示不校验条数）；
+    number 为单次计时内的调用次数（小输出需要多次调用才能得到稳定耗时）。
+    """
+
+    name: str
+    method: str
+    build: Callable[[], tuple] = field(compare=False)
+    rows: Any = None
+    number: int = 1
+
+
+def _sample_args(vendor: str, *samples: str) -> Callable[[], tuple]:
+    return lambda: tuple(load_sample(sample) for sample in samples) + (vendor,)
+
+
+BENCHMARK_CASES: List[BenchmarkCase] = [
+    BenchmarkCase("huawei_mac_table_100k", "parse_mac_table",
+                  lambda: (generate_mac_table("huawei", 100000, seed=1), "huawei"), rows=100000),
+    BenchmarkCase("h3c_mac_table_50k", "parse_mac_table",
+                  lambda: (generate_mac_table("h3c", 50000, seed=2), "h3c"), rows=50000),
+    BenchmarkCase("cisco_mac_table_100k", "parse_mac_table",
+                  lambda: (generate_mac_table("cisco", 100000, seed=3), "cisco"), rows=100000),
+    BenchmarkCase("huawei_arp_table_50k", "_parse_arp_table",
+                  lambda: (generate_arp_table("huawei", 50000, seed=4), "huawei"), rows=50000),
+    BenchmarkCase("h3c_arp_table_50k", "_parse_arp_table",
+                  lambda: (generate_arp_table("h3c", 50000, seed=5), "h3c"), rows=50000),
+    BenchmarkCase("cisco_arp_table_50k", "_parse_arp_table",
+                  lambda: (generate_arp_table("cisco", 50000, seed=6), "cisco"), rows=50000),
+    BenchmarkCase("huawei_interfaces_500", "parse_interfaces_info",
+                  lambda: (generate_interfaces("huawei", 500, seed=7)[0], None, "huawei"), rows=500),
+    BenchmarkCase("cisco_interfaces_500", "parse_interfaces_info",
+                  lambda: generate_interfaces("cisco", 500, seed=8) + ("cisco",), rows=500),
+    BenchmarkCase("huawei_version", "parse_version_info", _sample_args("huawei", "huawei_version"), number=500),
+    BenchmarkCase("cisco_version", "parse_version_info", _sample_args("cisco", "cisco_version"), number=500),
+    BenchmarkCase("cisco_serial_from_version", "parse_serial_from_version",
+                  _sample_args("cisco", "cisco_version"), number=500),
+    BenchmarkCase("cisco_serial_from_inventory", "parse_serial_from_inventory",
+                  _sample_args("cisco", "cisco_inventory"), number=500),
+]
+
+
+@lru_cache(maxsize=None)
+def build_case(name: str) -> tuple:
+    """
+    生成并缓存基准用例的解析参数（同一进程内只生成一次）
+
+    Args:
+        name: 用例名
+
+    Returns:
+        解析方法参数
+    """
+    return next(case for case in BENCHMARK_CASES if case.name == name).build()
+
+
+def input_size(args: tuple) -> Tuple[int, int]:
+    """
+    统计输入规模
+
+    Args:
+        args: 解析方法参数
+
+    Returns:
+        (字符数, 行数)
+    """
+    texts = [arg for arg in args if isinstance(arg, str) and "\n" in arg]
+    return sum(len(text) for text in texts), sum(text.count("\n") for text in texts)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+解析器基准测量
+
+说明：
+- 每轮交替测量解析耗时与同一输入上参照工作量（逐行 splitlines + split）的耗时，
+  取各轮比值的中位数作为与机器快慢无关的相对成本 cost_ratio，基线保存的是该比值而不是绝对耗时
+- 内存取 tracemalloc 记录的单次解析峰值，折算为每输入字符的字节数 peak_ratio
+- 与 baseline.json 比较时，cost_ratio / peak_ratio 超出基线加容差即视为回归
+"""
+
+import gc
+import json
+import os
+import statistics
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from tests.benchmarks.corpus import BenchmarkCase, build_case, input_size
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# 默认容差：耗时允许比基线慢 50%，内存峰值允许高 25%
+DEFAULT_TIME_TOLERANCE = 0.5
+DEFAULT_MEMORY_TOLERANCE = 0.25
+# 小输入的内存峰值以解释器杂项分配为主，给出固定余量
+MEMORY_SLACK_BYTES = 64 * 1024
+
+
+def reference_scan(*args: Any):
+    """参照工作量：对每个文本参数逐行切分字段"""
+    for arg in args:
+        if isinstance(arg, str):
+            for line in arg.splitlines():
+                line.split()
+
+
+def paired_times(func: Callable, args: tuple, number: int, repeats: int) -> List[Tuple[float, float]]:
+    """
+    交替测量被测函数与参照工作量（同一轮内先后执行，抵消机器负载波动）
+
+    Args:
+        func: 被测函数
+        args: 参数
+        number: 每轮调用次数
+        repeats: 轮数
+
+    Returns:
+        [(被测函数单次耗时, 参照工作量单次耗时), ...]，单位秒
+    """
+    parse_timer = timeit.Timer(lambda: func(*args))
+    reference_timer = timeit.Timer(lambda: reference_scan(*args))
+    return [(parse_timer.timeit(number) / number, reference_timer.timeit(number) / number)
+            for _ in range(repeats)]
+
+
+def peak_memory(func: Callable, args: tuple) -> int:
+    """
+    测量单次调用的内存峰值（不含调用前已存在的输入）
+
+    Args:
+        func: 被测函数
+        args: 参数
+
+    Returns:
+        峰值字节数
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_case(service: Any, case: BenchmarkCase, repeats: int = 5) -> Dict[str, Any]:
+    """
+    测量一个基准用例
+
+    Args:
+        service: NetmikoService 实例
+        case: 基准用例
+        repeats: 计时轮数
+
+    Returns:
+        测量结果（耗时、相对成本、吞吐、内存峰值）
+    """
+    args = build_case(case.name)
+    parser = getattr(service, case.method)
+    chars, lines = input_size(args)
+
+    pairs = paired_times(parser, args, case.number, repeats)
+    parse_s = min(parse for parse, _ in pairs)
+    reference_s = min(reference for _, reference in pairs)
+    cost_ratio = statistics.median(parse / reference for parse, reference in pairs)
+    peak = peak_memory(parser, args)
+
+    return {
+        "method": case.method,
+        "chars": chars,
+        "lines": lines,
+        "parse_ms": round(parse_s * 1000, 3),
+        "reference_ms": round(reference_s * 1000, 3),
+        "cost_ratio": round(cost_ratio, 3),
+        "lines_per_s": int(lines / parse_s),
+        "mb_per_s": round(chars / parse_s / 1024 / 1024, 2),
+        "peak_bytes": peak,
+        "peak_ratio": round(peak / chars, 3),
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    读取基线
+
+    Returns:
+        {用例名: 基线测量结果}，文件不存在时返回空字典
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def find_regressions(measured: Dict[str, Any], baseline: Dict[str, Any],
+                     time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+                     memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE) -> List[str]:
+    """
+    与基线比较
+
+    Args:
+        measured: measure_case() 的结果
+        baseline: 同一用例的基线
+        time_tolerance: 相对成本容差
+        memory_tolerance: 内存峰值容差
+
+    Returns:
+        回归说明列表，为空表示未回归
+    """
+    problems = []
+    cost_limit = baseline["cost_ratio"] * (1 + time_tolerance)
+    if measured["cost_ratio"] > cost_limit:
+        problems.append(
+            f"耗时回归：cost_ratio {measured['cost_ratio']} > {cost_limit:.3f}"
+            f"（基线 {baseline['cost_ratio']}，本次 {measured['parse_ms']} ms）"
+        )
+    peak_limit = baseline["peak_ratio"] * (1 + memory_tolerance) * measured["chars"] + MEMORY_SLACK_BYTES
+    if measured["peak_bytes"] > peak_limit:
+        problems.append(
+            f"内存回归：峰值 {measured['peak_bytes']} 字节 > {int(peak_limit)} 字节"
+            f"（基线 peak_ratio {baseline['peak_ratio']}，本次 {measured['peak_ratio']}）"
+        )
+    return problems
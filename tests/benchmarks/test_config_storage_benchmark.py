@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+配置存储基准
+
+测试覆盖:
+1. 生成约 150 KB 的运行配置及 60 个版本的变更历史（每版改动几行），三种存储模式逐版入库后全部可无损还原
+2. 存储体积：compressed / delta 相对明文的比例
+3. 还原延迟：单版本还原（get_config_content）与整页批量还原（load_config_contents）的耗时，
+   以同一版本直接解压全文为参照计算相对开销
+
+环境变量:
+- CONFIG_STORAGE_BENCHMARK_SKIP=1：跳过耗时基准（体积与正确性用例照常执行）
+- CONFIG_STORAGE_BENCHMARK_REPORT=<path>：把本次测量结果写成 JSON
+"""
+import json
+import os
+import random
+import statistics
+import time
+from functools import lru_cache
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Configuration
+from app.services.config_storage import (
+    compress_config,
+    decompress_config,
+    get_config_content,
+    load_config_contents,
+    store_config_content,
+)
+
+SKIP_BENCHMARKS = os.getenv("CONFIG_STORAGE_BENCHMARK_SKIP", "").lower() in ("1", "true", "yes")
+
+VERSIONS = 60
+INTERFACES = 1500
+# 体积上限（相对明文）
+MAX_COMPRESSED_RATIO = 0.25
+MAX_DELTA_RATIO = 0.05
+# 单版本还原（含一次关键帧查询 + 应用增量）相对直接解压全文的耗时上限
+MAX_RECONSTRUCT_COST = 8.0
+
+
+@lru_cache(maxsize=None)
+def build_history(seed: int = 7):
+    """生成配置版本历史：每个版本在上一版基础上修改 / 新增 / 删除几行"""
+    rng = random.Random(seed)
+    lines = ["hostname SW-CORE-01", "!"]
+    for i in range(1, INTERFACES + 1):
+        lines += [
+            f"interface GigabitEthernet{i // 48 + 1}/0/{i % 48 + 1}",
+            f" description ACCESS-{rng.randint(1000, 9999)}",
+            f" switchport access vlan {rng.randint(2, 4000)}",
+            " spanning-tree portfast",
+            "!",
+        ]
+    lines.append("end")
+
+    history = ["\n".join(lines) + "\n"]
+    for _ in range(VERSIONS - 1):
+        for _ in range(rng.randint(1, 5)):
+            index = rng.randrange(2, len(lines) - 1)
+            action = rng.random()
+            if action < 0.6:
+                lines[index] = f" switchport access vlan {rng.randint(2, 4000)}"
+            elif action < 0.8:
+                lines.insert(index, f" description CHANGED-{rng.randint(1000, 9999)}")
+            else:
+                del lines[index]
+        history.append("\n".join(lines) + "\n")
+    return history
+
+
+@pytest.fixture(scope="module")
+def report():
+    results = {}
+    yield results
+    path = os.getenv("CONFIG_STORAGE_BENCHMARK_REPORT")
+    if path and results:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def store_history(mode: str):
+    """按指定模式把整段历史写入内存 SQLite，返回 (session, 配置记录列表)"""
+    engine = create_engine("sqlite:///:memory:")
+    Configuration.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    configs = []
+    for index, content in enumerate(build_history()):
+        config = Configuration(device_id=1, version=f"1.{index}")
+        store_config_content(session, config, content, mode)
+        session.add(config)
+        session.commit()
+        configs.append(config)
+    session.expire_all()
+    return session, session.query(Configuration).order_by(Configuration.id).all()
+
+
+def stored_size(config: Configuration) -> int:
+    if config.config_data is not None:
+        return len(config.config_data)
+    return len((config.config_content or "").encode("utf-8"))
+
+
+def timed(func, repeats: int = 5) -> float:
+    """多次执行取中位数（秒）"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+class TestStorageSize:
+
+    @pytest.mark.parametrize("mode, max_ratio", [
+        ("plain", 1.0),
+        ("compressed", MAX_COMPRESSED_RATIO),
+        ("delta", MAX_DELTA_RATIO),
+    ])
+    def test_size_and_round_trip(self, report, mode, max_ratio):
+        history = build_history()
+        session, configs = store_history(mode)
+        try:
+            contents = load_config_contents(session, configs)
+            assert [contents[c.id] for c in configs] == history
+
+            plain_bytes = sum(len(content.encode("utf-8")) for content in history)
+            ratio = sum(stored_size(c) for c in configs) / plain_bytes
+            report.setdefault("size_ratio", {})[mode] = round(ratio, 4)
+            report.setdefault("keyframes", {})[mode] = sum(c.storage_format == "full" for c in configs)
+            assert ratio <= max_ratio, f"{mode} 存储比例 {ratio:.3f} 超过 {max_ratio}"
+        finally:
+            session.close()
+
+
+@pytest.mark.skipif(SKIP_BENCHMARKS, reason="CONFIG_STORAGE_BENCHMARK_SKIP 已设置")
+class TestReconstructLatency:
+
+    def test_single_version(self, report):
+        session, configs = store_history("delta")
+        try:
+            deltas = [c for c in configs if c.storage_format == "delta"]
+            reference = compress_config(build_history()[-1])
+            rounds = []
+            for config in deltas[-10:]:
+                reconstruct = timed(lambda: get_config_content(session, config))
+                baseline = timed(lambda: decompress_config(reference))
+                rounds.append(reconstruct / baseline)
+            cost = statistics.median(rounds)
+            report["reconstruct_cost"] = round(cost, 2)
+            report["reconstruct_ms"] = round(timed(lambda: get_config_content(session, deltas[-1])) * 1000, 3)
+            assert cost <= MAX_RECONSTRUCT_COST, f"单版本还原耗时为直接解压的 {cost:.1f} 倍"
+        finally:
+            session.close()
+
+    def test_page_reconstruct(self, report):
+        session, configs = store_history("delta")
+        try:
+            elapsed = timed(lambda: load_config_contents(session, configs), repeats=3)
+            report["page_reconstruct_ms"] = round(elapsed * 1000, 3)
+            report["page_versions"] = len(configs)
+            # 整页批量还原：每个关键帧只解压一次，平均每版不超过单版本还原上限
+            per_version = elapsed / len(configs)
+            reference = compress_config(build_history()[-1])
+            baseline = timed(lambda: decompress_config(reference))
+            assert per_version <= baseline * MAX_RECONSTRUCT_COST
+        finally:
+            session.close()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+解析器基准与回归测试
+
+测试覆盖:
+1. 录制样本（华为 / 华三 / Cisco / 锐捷）解析结果与 corpus/expected 完全一致
+2. 生成语料（1 万 ~ 10 万行 MAC / ARP 表、500 个接口的详情输出）解析条数正确
+3. 每个解析方法的相对耗时与内存峰值不超过 baseline.json 加容差，超出即失败
+
+环境变量:
+- PARSER_BENCHMARK_SKIP=1：跳过耗时 / 内存基准（正确性用例照常执行）
+- PARSER_BENCHMARK_TOLERANCE / PARSER_BENCHMARK_MEMORY_TOLERANCE：覆盖默认容差
+- PARSER_BENCHMARK_REPORT=<path>：把本次测量结果写成 JSON，便于与基线对比
+"""
+import json
+import os
+
+import pytest
+
+from app.services.netmiko_service import NetmikoService
+from tests.benchmarks.corpus import (
+    BENCHMARK_CASES,
+    SAMPLE_CASES,
+    build_case,
+    load_expected,
+    normalize_result,
+)
+from tests.benchmarks.harness import (
+    DEFAULT_MEMORY_TOLERANCE,
+    DEFAULT_TIME_TOLERANCE,
+    find_regressions,
+    load_baseline,
+    measure_case,
+)
+
+SKIP_BENCHMARKS = os.getenv("PARSER_BENCHMARK_SKIP", "").lower() in ("1", "true", "yes")
+TIME_TOLERANCE = float(os.getenv("PARSER_BENCHMARK_TOLERANCE", DEFAULT_TIME_TOLERANCE))
+MEMORY_TOLERANCE = float(os.getenv("PARSER_BENCHMARK_MEMORY_TOLERANCE", DEFAULT_MEMORY_TOLERANCE))
+
+
+@pytest.fixture(scope="module")
+def service():
+    return NetmikoService()
+
+
+@pytest.fixture(scope="module")
+def report():
+    results = {}
+    yield results
+    path = os.getenv("PARSER_BENCHMARK_REPORT")
+    if path and results:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"cases": results}, f, ensure_ascii=False, indent=2)
+
+
+class TestRecordedCorpus:
+
+    @pytest.mark.parametrize("case", SAMPLE_CASES, ids=lambda case: case.name)
+    def test_matches_expected(self, service, case):
+        result = getattr(service, case.method)(*case.args())
+
+        assert normalize_result(result) == load_expected(case.name)
+
+
+class TestGeneratedCorpus:
+
+    @pytest.mark.parametrize("case", [c for c in BENCHMARK_CASES if c.rows], ids=lambda case: case.name)
+    def test_row_count(self, service, case):
+        rows = getattr(service, case.method)(*build_case(case.name))
+
+        assert len(rows) == case.rows
+        assert all(row.get("mac_address") or row.get("port_name") for row in rows)
+
+
+@pytest.mark.skipif(SKIP_BENCHMARKS, reason="PARSER_BENCHMARK_SKIP 已设置")
+class TestParserBenchmarks:
+
+    @pytest.mark.parametrize("case", BENCHMARK_CASES, ids=lambda case: case.name)
+    def test_no_regression(self, service, report, case):
+        baseline = load_baseline().get(case.name)
+        measured = measure_case(service, case)
+        report[case.name] = measured
+        print(f"\n{case.name}: {measured['parse_ms']} ms, {measured['lines_per_s']} 行/秒, "
+              f"{measured['mb_per_s']} MB/s, 峰值 {measured['peak_bytes']} 字节")
+
+        assert baseline, f"{case.name} 缺少基线，请执行 python -m tests.benchmarks.update_baseline"
+        problems = find_regressions(measured, baseline, TIME_TOLERANCE, MEMORY_TOLERANCE)
+        assert not problems, "；".join(problems)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+更新解析器基准基线 / 录制样本期望结果
+
+用法（在项目根目录执行）：
+    python -m tests.benchmarks.update_baseline              # 重新测量并写入 baseline.json
+    python -m tests.benchmarks.update_baseline --expected   # 按当前解析器重写 corpus/expected/*.json
+
+解析器有意改变输出或性能特征时再更新，并在提交中说明原因；
+写入期望结果后需逐条核对 diff，确认新结果是正确的。
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+
+from tests.benchmarks.corpus import BENCHMARK_CASES, EXPECTED_DIR, SAMPLE_CASES, normalize_result
+from tests.benchmarks.harness import BASELINE_PATH, measure_case
+
+
+def _dump(path: str, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def write_expected(service):
+    """按当前解析器重写录制样本的期望结果"""
+    os.makedirs(EXPECTED_DIR, exist_ok=True)
+    for case in SAMPLE_CASES:
+        result = normalize_result(getattr(service, case.method)(*case.args()))
+        _dump(os.path.join(EXPECTED_DIR, f"{case.name}.json"), result)
+        print(f"已写入 {case.name}.json")
+
+
+def write_baseline(service, repeats: int):
+    """重新测量全部基准用例并写入基线"""
+    cases = {}
+    for case in BENCHMARK_CASES:
+        cases[case.name] = measure_case(service, case, repeats=repeats)
+        print(f"{case.name}: {cases[case.name]}")
+    _dump(BASELINE_PATH, {
+        "python": platform.python_version(),
+        "reference": "splitlines + split",
+        "cases": cases,
+    })
+    print(f"基线已写入 {BASELINE_PATH}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="更新解析器基准基线")
+    parser.add_argument("--expected", action="store_true", help="重写录制样本期望结果（不测量）")
+    parser.add_argument("--repeats", type=int, default=5, help="计时轮数")
+    args = parser.parse_args(argv)
+
+    from app.services.netmiko_service import NetmikoService
+    service = NetmikoService()
+
+    if args.expected:
+        write_expected(service)
+    else:
+        write_baseline(service, args.repeats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+ARP/MAC 并发采集（worker 池）单元测试
+
+测试覆盖:
+1. 多台设备并发采集，总耗时接近最慢设备
+2. 单设备时间预算，超时不影响其他设备
+3. 连续超时的慢设备被隔离若干轮
+4. 整轮截止时间到达后剩余设备被跳过
+5. 数据库写入在线程中执行
+"""
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.services.arp_mac_scheduler import ARPMACScheduler
+
+
+def make_device(device_id: int) -> MagicMock:
+    """创建模拟设备"""
+    device = MagicMock()
+    device.id = device_id
+    device.hostname = f"switch-{device_id}"
+    device.vendor = "huawei"
+    device.location = None
+    return device
+
+
+def make_db(devices) -> MagicMock:
+    """创建返回指定设备列表的模拟 Session"""
+    db = MagicMock()
+    db.query.return_value.filter.return_value.all.return_value = devices
+    return db
+
+
+def make_netmiko(delays: dict = None) -> MagicMock:
+    """创建模拟 Netmiko 服务，按设备 ID 配置采集耗时"""
+    delays = delays or {}
+    netmiko = MagicMock()
+
+    async def collect_arp_mac(device):
+        await asyncio.sleep(delays.get(device.id, 0.01))
+        return (
+            [{'ip_address': '10.0.0.1', 'mac_address': '00:11:22:33:44:55'}],
+            [{'mac_address': '00:11:22:33:44:55', 'interface': 'GE1/0/1'}],
+        )
+
+    netmiko.collect_arp_mac_tables = collect_arp_mac
+    return netmiko
+
+
+async def run_sweep(scheduler, devices, netmiko, save=None):
+    """执行一轮采集，数据库写入被替换为 save"""
+    save = save or MagicMock()
+    with patch('app.services.arp_mac_scheduler.get_netmiko_service', return_value=netmiko), \
+            patch.object(scheduler, '_save_device_tables', save):
+        return await scheduler.collect_all_devices_async(make_db(devices))
+
+
+class TestSweepConcurrency:
+    """并发采集测试"""
+
+    @pytest.mark.asyncio
+    async def test_devices_collected_concurrently(self):
+        """总耗时接近单台设备耗时，而非所有设备之和"""
+        scheduler = ARPMACScheduler(concurrency=10, device_timeout=5)
+        devices = [make_device(i) for i in range(1, 11)]
+        netmiko = make_netmiko({i: 0.05 for i in range(1, 11)})
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        stats = await run_sweep(scheduler, devices, netmiko)
+        elapsed = loop.time() - start
+
+        assert stats['arp_success'] == 10
+        assert stats['mac_success'] == 10
+        assert stats['total_arp_entries'] == 10
+        assert elapsed < 0.3
+
+    @pytest.mark.asyncio
+    async def test_db_writes_run_off_event_loop(self):
+        """数据库写入在线程中执行"""
+        scheduler = ARPMACScheduler(concurrency=5, device_timeout=5)
+        main_thread = threading.get_ident()
+        threads = []
+        save = MagicMock(side_effect=lambda *args: threads.append(threading.get_ident()))
+
+        await run_sweep(scheduler, [make_device(1), make_device(2)], make_netmiko(), save)
+
+        assert save.call_count == 2
+        assert all(t != main_thread for t in threads)
+
+    @pytest.mark.asyncio
+    async def test_device_timeout_does_not_block_others(self):
+        """超过时间预算的设备计为超时，其余设备正常完成"""
+        scheduler = ARPMACScheduler(concurrency=5, device_timeout=0.1)
+        devices = [make_device(1), make_device(2)]
+
+        stats = await run_sweep(scheduler, devices, make_netmiko({1: 5}))
+
+        assert stats['timed_out'] == 1
+        assert stats['arp_success'] == 1
+        assert stats['arp_failed'] == 1
+        failed = next(d for d in stats['devices'] if d['device_id'] == 1)
+        assert '超时' in failed['error']
+
+
+class TestSlowDeviceQuarantine:
+    """慢设备隔离测试"""
+
+    @pytest.mark.asyncio
+    async def test_slow_device_quarantined_then_retried(self):
+        """连续超时达到阈值后隔离指定轮数，之后重新采集"""
+        scheduler = ARPMACScheduler(
+            concurrency=5, device_timeout=0.05, quarantine_threshold=2, quarantine_sweeps=2
+        )
+        devices = [make_device(1), make_device(2)]
+        netmiko = make_netmiko({1: 5})
+
+        await run_sweep(scheduler, devices, netmiko)
+        assert scheduler.get_status()['quarantined_devices'] == []
+
+        await run_sweep(scheduler, devices, netmiko)
+        assert [d['device_id'] for d in scheduler.get_status()['quarantined_devices']] == [1]
+
+        for _ in range(2):
+            stats = await run_sweep(scheduler, devices, netmiko)
+            assert stats['quarantined'] == 1
+            assert stats['timed_out'] == 0
+
+        # 隔离期结束后设备恢复正常，解除标记
+        stats = await run_sweep(scheduler, devices, make_netmiko())
+        assert stats['quarantined'] == 0
+        assert stats['arp_success'] == 2
+        assert scheduler._slow_devices == {}
+
+
+class TestSweepDeadline:
+    """整轮截止时间测试"""
+
+    @pytest.mark.asyncio
+    async def test_remaining_devices_skipped_after_deadline(self):
+        """截止时间到达后未开始的设备被跳过，且不计入慢设备"""
+        scheduler = ARPMACScheduler(concurrency=1, device_timeout=5, sweep_deadline=0.15)
+        devices = [make_device(i) for i in range(1, 5)]
+
+        stats = await run_sweep(scheduler, devices, make_netmiko({i: 0.1 for i in range(1, 5)}))
+
+        assert stats['arp_success'] >= 1
+        assert stats['skipped_deadline'] >= 1
+        assert stats['arp_success'] + stats['arp_failed'] == 4
+        assert stats['timed_out'] == 0
+        assert scheduler._slow_devices == {}
+
+    def test_default_deadline_derived_from_interval(self):
+        """未配置截止时间时取采集间隔的 90%"""
+        scheduler = ARPMACScheduler(interval_minutes=10, sweep_deadline=0)
+
+        assert scheduler.get_status()['sweep_deadline'] == 540
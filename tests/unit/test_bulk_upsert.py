@@ -0,0 +1,153 @@
+"""
+批量 UPSERT 写入层单元测试
+
+测试覆盖:
+1. SQLite 多 VALUES UPSERT：插入、冲突更新、块内去重
+2. 按块拆分语句
+3. MySQL 方言生成 ON DUPLICATE KEY UPDATE
+4. ARPMACScheduler._save_device_tables 使用批量写入
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+
+from app.models.ip_location_current import ARPEntry, MACAddressCurrent
+from app.services.arp_mac_scheduler import ARPMACScheduler
+from app.services.bulk_upsert import _build_statement, bulk_upsert
+
+
+@pytest.fixture
+def session_factory():
+    """内存 SQLite 数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    ARPEntry.__table__.create(engine)
+    MACAddressCurrent.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    yield factory
+    engine.dispose()
+
+
+def arp_row(ip: str, mac: str, device_id: int = 1, when: datetime = None) -> dict:
+    when = when or datetime(2026, 1, 1, 8, 0, 0)
+    return {
+        'ip_address': ip,
+        'mac_address': mac,
+        'arp_device_id': device_id,
+        'vlan_id': 10,
+        'arp_interface': 'Vlanif10',
+        'last_seen': when,
+        'collection_batch_id': 'batch_1',
+        'created_at': when,
+        'updated_at': when,
+    }
+
+
+ARP_KEYS = ('ip_address', 'arp_device_id')
+ARP_UPDATES = ('mac_address', 'last_seen', 'collection_batch_id', 'updated_at')
+
+
+class TestBulkUpsertSQLite:
+    """SQLite 方言测试"""
+
+    def test_insert_then_update_on_conflict(self, session_factory):
+        """首次插入，再次写入相同键时更新而不是新增"""
+        db = session_factory()
+        first = bulk_upsert(db, ARPEntry, [arp_row('10.0.0.1', 'AA:AA:AA:AA:AA:01')], ARP_KEYS, ARP_UPDATES)
+        db.commit()
+
+        later = datetime(2026, 1, 1, 9, 0, 0)
+        rows = [
+            arp_row('10.0.0.1', 'AA:AA:AA:AA:AA:02', when=later),
+            arp_row('10.0.0.2', 'AA:AA:AA:AA:AA:03', when=later),
+        ]
+        second = bulk_upsert(db, ARPEntry, rows, ARP_KEYS, ARP_UPDATES)
+        db.commit()
+
+        entries = {e.ip_address: e for e in db.query(ARPEntry).all()}
+        assert first.rows == 1 and second.rows == 2
+        assert len(entries) == 2
+        assert entries['10.0.0.1'].mac_address == 'AA:AA:AA:AA:AA:02'
+        assert entries['10.0.0.1'].last_seen == later
+        # created_at 不在更新列中，保持首次写入的值
+        assert entries['10.0.0.1'].created_at == datetime(2026, 1, 1, 8, 0, 0)
+
+    def test_duplicate_keys_in_input_last_wins(self, session_factory):
+        """输入中重复的冲突键只保留最后一行"""
+        db = session_factory()
+        rows = [arp_row('10.0.0.1', 'AA:AA:AA:AA:AA:01'), arp_row('10.0.0.1', 'AA:AA:AA:AA:AA:09')]
+
+        result = bulk_upsert(db, ARPEntry, rows, ARP_KEYS, ARP_UPDATES)
+        db.commit()
+
+        assert result.rows == 1
+        assert db.query(ARPEntry).one().mac_address == 'AA:AA:AA:AA:AA:09'
+
+    def test_rows_split_into_chunks(self, session_factory):
+        """按 chunk_size 拆分为多条语句"""
+        db = session_factory()
+        rows = [arp_row(f'10.0.{i // 250}.{i % 250}', 'AA:AA:AA:AA:AA:01') for i in range(25)]
+
+        result = bulk_upsert(db, ARPEntry, rows, ARP_KEYS, ARP_UPDATES, chunk_size=10)
+        db.commit()
+
+        assert result.chunks == 3
+        assert db.query(ARPEntry).count() == 25
+        assert result.rows_per_second > 0
+        assert result.to_dict()['rows'] == 25
+
+    def test_empty_rows(self, session_factory):
+        """空输入不执行语句"""
+        result = bulk_upsert(session_factory(), ARPEntry, [], ARP_KEYS, ARP_UPDATES)
+
+        assert result.rows == 0
+        assert result.chunks == 0
+
+
+class TestBulkUpsertMySQL:
+    """MySQL 方言语句生成测试"""
+
+    def test_mysql_statement_uses_on_duplicate_key_update(self):
+        rows = [arp_row('10.0.0.1', 'AA:AA:AA:AA:AA:01'), arp_row('10.0.0.2', 'AA:AA:AA:AA:AA:02')]
+        stmt = _build_statement('mysql', ARPEntry.__table__, rows, ARP_KEYS, ARP_UPDATES)
+
+        sql = str(stmt.compile(dialect=mysql.dialect()))
+
+        assert 'ON DUPLICATE KEY UPDATE' in sql
+        assert 'mac_address = VALUES(mac_address)' in sql
+        assert 'created_at = ' not in sql
+        # 多 VALUES：一条语句包含两行
+        assert sql.count('%s, %s, %s') >= 2
+
+    def test_unsupported_dialect(self):
+        with pytest.raises(ValueError):
+            _build_statement('oracle', ARPEntry.__table__, [arp_row('10.0.0.1', 'AA')], ARP_KEYS, ARP_UPDATES)
+
+
+class TestSchedulerSaveDeviceTables:
+    """调度器批量写入测试"""
+
+    def test_save_device_tables_upserts_and_reports_throughput(self, session_factory):
+        scheduler = ARPMACScheduler()
+        arp_table = [
+            {'ip_address': '10.0.0.1', 'mac_address': '00:11:22:33:44:55', 'interface': 'Vlanif10'},
+            {'ip_address': 'bad-ip', 'mac_address': '00:11:22:33:44:56'},
+        ]
+        mac_table = [
+            {'mac_address': '00:11:22:33:44:55', 'interface': 'GE1/0/1', 'vlan_id': 10},
+            {'mac_address': '00:11:22:33:44:66', 'interface': 'GE1/0/2', 'vlan_id': 10},
+        ]
+
+        with patch('app.services.arp_mac_scheduler.SessionLocal', session_factory):
+            write = scheduler._save_device_tables(7, 'switch-7', arp_table, mac_table)
+            # 再次采集相同数据不产生重复行
+            scheduler._save_device_tables(7, 'switch-7', arp_table, mac_table)
+
+        db = session_factory()
+        assert write['rows'] == 3
+        assert write['rows_per_second'] > 0
+        assert db.query(ARPEntry).count() == 1
+        assert db.query(MACAddressCurrent).filter(MACAddressCurrent.mac_device_id == 7).count() == 2
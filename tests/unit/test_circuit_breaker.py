@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+设备熔断器测试
+
+测试覆盖:
+1. 连续失败达到阈值后打开，认证失败立即打开
+2. 冷却期结束后半开只放行一次探测，成功关闭、失败加倍冷却期重新打开
+3. connect_to_device 熔断时不建连，半开时只尝试一次
+4. execute_command 熔断时直接失败；连接池刚建连失败后不再直连重试，
+   连接池因等待超时等原因返回空时即使设备有历史失败仍回退直连
+5. ARP/MAC 采集与备份执行器跳过熔断设备
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.models import Device
+from app.services import netmiko_service as netmiko_module
+from app.services.arp_mac_scheduler import ARPMACScheduler
+from app.services.backup_executor import BackupExecutor
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.latency_prober import LatencyProber
+from app.services.netmiko_service import NetmikoService
+
+
+def make_device(device_id=1) -> Device:
+    return Device(id=device_id, hostname=f'sw{device_id}', ip_address='10.0.0.1', vendor='huawei',
+                  username='admin', password='pw', login_port=22, login_method='ssh')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('app.services.circuit_breaker.time.monotonic', fake):
+        yield fake
+
+
+class TestStateMachine:
+
+    def test_opens_after_threshold(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+
+        breaker.record_failure(1, 'timeout')
+        breaker.record_failure(1, 'timeout')
+        assert not breaker.is_open(1)
+        assert breaker.has_failures(1)
+
+        breaker.record_failure(1, 'timeout')
+        assert breaker.is_open(1)
+        assert not breaker.allow_request(1)
+        assert breaker.get_state(1)['state'] == 'open'
+        assert breaker.get_state(1)['retry_in_seconds'] == 60
+
+    def test_auth_failure_opens_immediately(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3)
+
+        breaker.record_failure(1, 'bad password', auth_failure=True)
+
+        assert breaker.is_open(1)
+
+    def test_half_open_single_probe_then_close(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+        breaker.record_failure(1, 'timeout')
+        clock.now += 61
+
+        assert not breaker.is_open(1)
+        assert breaker.allow_request(1)
+        assert breaker.is_half_open(1)
+        assert breaker.is_open(1)
+        assert not breaker.allow_request(1)
+
+        breaker.record_success(1)
+        assert breaker.get_state(1)['state'] == 'closed'
+        assert not breaker.has_failures(1)
+        assert breaker.allow_request(1)
+
+    def test_failed_probe_doubles_cooldown(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, max_recovery_timeout=100)
+        breaker.record_failure(1, 'timeout')
+        clock.now += 61
+        assert breaker.allow_request(1)
+
+        breaker.record_failure(1, 'timeout')
+        assert breaker.get_state(1)['retry_in_seconds'] == 100
+        clock.now += 99
+        assert breaker.is_open(1)
+
+    def test_reset_and_disabled(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure(1, 'timeout')
+        breaker.reset(1)
+        assert not breaker.is_open(1)
+        assert breaker.get_stats()['tracked_devices'] == 0
+
+        disabled = CircuitBreaker(failure_threshold=1, enabled=False)
+        disabled.record_failure(1, 'timeout')
+        assert not disabled.is_open(1)
+        assert disabled.allow_request(1)
+
+
+@pytest.fixture
+def breaker():
+    instance = CircuitBreaker(failure_threshold=1, recovery_timeout=300)
+    with patch('app.services.netmiko_service.get_circuit_breaker', return_value=instance), \
+            patch('app.services.ssh_connection_pool.get_circuit_breaker', return_value=instance), \
+            patch('app.services.arp_mac_scheduler.get_circuit_breaker', return_value=instance), \
+            patch('app.services.backup_executor.get_circuit_breaker', return_value=instance):
+        yield instance
+
+
+class TestNetmikoIntegration:
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_connection(self, breaker):
+        service = NetmikoService()
+        breaker.record_failure(1, 'timeout')
+        handler = MagicMock()
+
+        with patch.object(netmiko_module, 'NETMIKO_AVAILABLE', True), \
+                patch.object(netmiko_module, 'ConnectHandler', handler, create=True):
+            assert await service.connect_to_device(make_device()) is None
+
+        handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_tries_once(self, breaker):
+        service = NetmikoService()
+        breaker.record_failure(1, 'timeout')
+        breaker._circuits[1].open_until = 0
+        handler = MagicMock(side_effect=RuntimeError('refused'))
+
+        with patch.object(netmiko_module, 'NETMIKO_AVAILABLE', True), \
+                patch.object(netmiko_module, 'ConnectHandler', handler, create=True):
+            assert await service.connect_to_device(make_device()) is None
+
+        assert handler.call_count == 1
+        assert breaker.is_open(1)
+
+    @pytest.mark.asyncio
+    async def test_success_closes_circuit(self, breaker):
+        service = NetmikoService()
+        breaker.record_failure(1, 'timeout')
+        breaker._circuits[1].open_until = 0
+        connection = MagicMock()
+
+        with patch.object(netmiko_module, 'NETMIKO_AVAILABLE', True), \
+                patch.object(netmiko_module, 'ConnectHandler', MagicMock(return_value=connection), create=True):
+            assert await service.connect_to_device(make_device()) is connection
+
+        assert breaker.get_state(1)['state'] == 'closed'
+
+    @pytest.mark.asyncio
+    async def test_execute_command_fails_fast_when_open(self, breaker):
+        service = NetmikoService()
+        breaker.record_failure(1, 'timeout')
+        pool = MagicMock()
+        pool.get_connection = AsyncMock()
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            assert await service.execute_command(make_device(), 'display arp') is None
+
+        pool.get_connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_no_direct_fallback_after_pool_connect_failure(self, breaker):
+        service = NetmikoService()
+        breaker.failure_threshold = 3
+        pool = MagicMock()
+
+        async def failed_pool_connect(device):
+            breaker.record_failure(device.id, 'timeout')
+            return None
+
+        pool.get_connection = failed_pool_connect
+        service.connect_to_device = AsyncMock()
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            assert await service.execute_command(make_device(), 'display arp') is None
+
+        service.connect_to_device.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_direct_fallback_when_pool_times_out_despite_old_failure(self, breaker):
+        service = NetmikoService()
+        breaker.failure_threshold = 3
+        breaker.record_failure(1, 'timeout')
+        pool = MagicMock()
+        # 连接池等待超时 / 名额耗尽：没有新的建连失败
+        pool.get_connection = AsyncMock(return_value=None)
+        connection = MagicMock()
+        connection.send_command.return_value = 'arp output'
+        service.connect_to_device = AsyncMock(return_value=connection)
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            await service.execute_command(make_device(), 'display arp')
+
+        service.connect_to_device.assert_awaited_once()
+
+
+class TestCallersSkipOpenDevices:
+
+    @pytest.mark.asyncio
+    async def test_sweep_skips_open_device(self, breaker):
+        devices = []
+        for device_id in (1, 2):
+            device = MagicMock()
+            device.id = device_id
+            device.hostname = f'switch-{device_id}'
+            device.vendor = 'huawei'
+            device.location = None
+            devices.append(device)
+        db = MagicMock()
+        db.query.return_value.filter.return_value.all.return_value = devices
+        netmiko = MagicMock()
+        collected = []
+
+        async def collect(device):
+            collected.append(device.id)
+            return [], []
+
+        netmiko.collect_arp_mac_tables = collect
+        breaker.record_failure(2, 'timeout')
+        scheduler = ARPMACScheduler(concurrency=5, device_timeout=5)
+
+        with patch('app.services.arp_mac_scheduler.get_netmiko_service', return_value=netmiko), \
+                patch('app.services.arp_mac_scheduler.get_latency_prober', return_value=LatencyProber()), \
+                patch.object(scheduler, '_save_device_tables', MagicMock()):
+            stats = await scheduler.collect_all_devices_async(db)
+
+        assert stats['circuit_open'] == 1
+        assert set(collected) == {1}
+
+    @pytest.mark.asyncio
+    async def test_backup_skips_open_device(self, breaker):
+        breaker.record_failure(1, 'timeout')
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = make_device()
+
+        with patch('app.services.backup_executor.collect_device_config', AsyncMock()) as collect:
+            result = await BackupExecutor()._execute_single_backup(1, db, 'task-1')
+
+        assert result['error_code'] == 'CIRCUIT_OPEN'
+        collect.assert_not_called()
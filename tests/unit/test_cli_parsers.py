@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+CLI 解析引擎测试
+
+测试覆盖:
+1. 表格 / 分段 / 键值三类模板解析
+2. 注册表按 (设备类型, 命令类型) 选择解析器，厂商名不区分大小写，未知厂商不套用模板
+3. 插件模块通过 register_parsers(registry) 注册新厂商
+4. iter_parse 逐条产出；大表解析耗时
+5. ARP 表模板：华为 VLAN 续行、VLAN 接口编号、Cisco 未解析条目过滤
+"""
+import sys
+import time
+import types
+
+import pytest
+
+from app.services.cli_parsers import (
+    BlockParser,
+    ParserRegistry,
+    SearchParser,
+    TableParser,
+    get_parser,
+    interface_key,
+    iter_lines,
+)
+from app.services.netmiko_service import NetmikoService
+
+
+class TestTemplates:
+
+    def test_table_parser_converters_and_defaults(self):
+        parser = TableParser(
+            "demo", r'^(?P<vlan_id>\d+)\s+(?P<mac_address>\S+)(?:\s+(?P<interface>\S+))?',
+            converters={"vlan_id": int, "mac_address": str.upper}, defaults={"interface": ""}
+        )
+
+        rows = parser.parse("header\n10 aa-bb GE1/0/1\n20 cc-dd\n")
+
+        assert rows == [
+            {"vlan_id": 10, "mac_address": "AA-BB", "interface": "GE1/0/1"},
+            {"vlan_id": 20, "mac_address": "CC-DD", "interface": ""},
+        ]
+
+    def test_block_parser_first_match_per_block(self):
+        parser = BlockParser(
+            "demo", r'(?P<port_name>Port\d+)',
+            fields={"description": [r'desc=(\S+)'], "speed": [(r'bw=(\d+)', "{} Kbit")]},
+            defaults={"description": "", "speed": ""}
+        )
+
+        rows = parser.parse("preamble desc=x\nPort1\n desc=a\n desc=b\n bw=10\nPort2\n")
+
+        assert rows == [
+            {"port_name": "Port1", "description": "a", "speed": "10 Kbit"},
+            {"port_name": "Port2", "description": "", "speed": ""},
+        ]
+
+    def test_search_parser_rule_priority(self):
+        parser = SearchParser("demo", {"version": [(r'Release (\S+)', "R{}"), r'Version (\S+)']})
+
+        assert parser.parse_one("Version 1.0\nRelease 2.0") == {"version": "R2.0"}
+        assert parser.parse_one("Version 1.0") == {"version": "1.0"}
+
+    def test_iter_parse_is_lazy(self):
+        parser = get_parser("huawei", "mac_table")
+        rows = parser.iter_parse("0011-2233-4455 1/- GE1/0/1 dynamic\n")
+
+        assert not isinstance(rows, list)
+        assert next(rows)["interface"] == "GE1/0/1"
+
+    def test_iter_lines(self):
+        assert list(iter_lines("a\r\nb\n\nc")) == ["a", "b", "", "c"]
+
+    def test_interface_key(self):
+        assert interface_key("Gi1/0/1") == interface_key("GigabitEthernet1/0/1")
+        assert interface_key("Te1/1/1") != interface_key("Gi1/1/1")
+
+
+class TestVendorTemplates:
+
+    @pytest.fixture
+    def service(self):
+        return NetmikoService()
+
+    def test_h3c_mac_table(self, service):
+        output = """
+MAC Address      VLAN ID    State            Port/NickName            Aging
+0011-2233-4455   1          Learned          GE1/0/1                  Y
+"""
+        rows = service.parse_mac_table(output, "H3C")
+
+        assert rows == [{"mac_address": "0011-2233-4455", "vlan_id": 1,
+                         "address_type": "learned", "interface": "GE1/0/1"}]
+
+    def test_huawei_interfaces(self, service):
+        output = """
+GigabitEthernet1/0/1 current state : UP
+Line protocol current state : UP
+Description: Uplink
+GigabitEthernet1/0/2 current state : DOWN
+"""
+        rows = service.parse_interfaces_info(output, None, "华为")
+
+        assert [(r["port_name"], r["status"], r["description"]) for r in rows] == [
+            ("GigabitEthernet1/0/1", "up", "Uplink"),
+            ("GigabitEthernet1/0/2", "unknown", ""),
+        ]
+
+    def test_cisco_status_table_fills_vlan(self, service):
+        interfaces = service.parse_interfaces_info(
+            "GigabitEthernet1/0/1 is up, line protocol is up\n  MTU 1500 bytes, BW 1000000 Kbit\n",
+            "Port      Name     Status       Vlan\nGi1/0/1   Uplink   connected    10\n",
+            "cisco"
+        )
+
+        assert interfaces[0]["status"] == "up"
+        assert interfaces[0]["vlan_id"] == 10
+        assert interfaces[0]["description"] == "Uplink"
+        assert interfaces[0]["speed"] == "1000000 Kbit"
+
+    def test_arp_templates_registered(self):
+        for device_type in ("huawei", "hp_comware", "cisco_ios", "cisco_nxos", "cisco_asa", "ruijie_os"):
+            assert isinstance(get_parser(device_type, "arp_table"), TableParser)
+
+    def test_huawei_arp_vlan_continuation(self, service):
+        output = (
+            "10.10.0.21      0200-5e10-0001  20        D-0         GE0/0/1\r\n"
+            "                                          10/-\r\n"
+            "10.10.0.22      0200-5e10-0002  20        D-0         Eth-Trunk1\r\n"
+            "10.10.0.1       0200-5e00-0a01            I -         Vlanif30\r\n"
+        )
+        rows = service._parse_arp_table(output, "huawei")
+
+        assert [(r["ip_address"], r["vlan_id"], r["interface"]) for r in rows] == [
+            ("10.10.0.21", 10, "GE0/0/1"),
+            ("10.10.0.22", None, "Eth-Trunk1"),
+            ("10.10.0.1", 30, "Vlanif30"),
+        ]
+
+    def test_cisco_arp_skips_incomplete_and_bad_ip(self, service):
+        output = (
+            "Internet  10.10.0.41             12   0200.5e30.0001  ARPA   GigabitEthernet1/0/1\n"
+            "Internet  10.99.0.43              3   Incomplete      ARPA\n"
+            "Internet  10.99.0.300             3   0200.5e30.0009  ARPA   Vlan10\n"
+        )
+        rows = service._parse_arp_table(output, "Ruijie")
+
+        assert rows == [{"ip_address": "10.10.0.41", "mac_address": "02:00:5E:30:00:01",
+                         "vlan_id": None, "interface": "GigabitEthernet1/0/1"}]
+
+    def test_unknown_vendor_not_parsed(self, service):
+        assert service.parse_mac_table("  1    0011.2233.4455    DYNAMIC     Gi1/0/1", "juniper") == []
+
+    def test_large_mac_table(self, service):
+        output = "".join(
+            f"0011-2233-{i:04x} {i % 4000}/-   GE1/0/{i % 48}   dynamic\n" for i in range(50000)
+        )
+        started = time.perf_counter()
+        rows = service.parse_mac_table(output, "huawei")
+
+        assert len(rows) == 50000
+        assert time.perf_counter() - started < 2
+
+
+class TestRegistry:
+
+    def test_register_and_override(self):
+        registry = ParserRegistry()
+        first = TableParser("a", r'(?P<x>a)')
+        second = TableParser("b", r'(?P<x>b)')
+
+        registry.register("Vendor_X", "mac_table", first)
+        registry.register("vendor_x", "mac_table", second)
+
+        assert registry.get("VENDOR_X", "mac_table") is second
+        assert registry.get("vendor_x", "version") is None
+        assert registry.get(None, "mac_table") is None
+
+    def test_plugin_hook(self, monkeypatch):
+        module = types.ModuleType("fake_parser_plugin")
+
+        def register_parsers(registry):
+            registry.register("fake_os", "mac_table", TableParser("fake", r'^(?P<mac_address>\S+)$'))
+
+        module.register_parsers = register_parsers
+        monkeypatch.setitem(sys.modules, "fake_parser_plugin", module)
+        registry = ParserRegistry()
+
+        registry.load_plugins(["fake_parser_plugin", "missing_parser_plugin"])
+        registry.load_plugins(["fake_parser_plugin"])
+
+        assert registry.get("fake_os", "mac_table").parse("aa\nbb") == [
+            {"mac_address": "aa"}, {"mac_address": "bb"}
+        ]
+        assert registry._loaded_plugins == ["fake_parser_plugin"]
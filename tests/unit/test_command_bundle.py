@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+命令包 / 设备会话测试
+
+测试覆盖:
+1. 命令包在同一个池化会话上顺序执行，重复命令只执行一次，结束后归还连接池
+2. 命令失败后剩余命令不再执行，会话关闭而不归还
+3. 单设备多类型采集只借出一次会话，版本与序列号共用版本命令输出
+4. ARP/MAC 采集共用一个会话；熔断设备不借出会话
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.models import Device
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.netmiko_service import NetmikoService
+
+CISCO_OUTPUTS = {
+    "show version": "Cisco IOS Software, Version 15.2(4)E\nProcessor board ID FOC12345678\n",
+    "show interfaces": "GigabitEthernet1/0/1 is up, line protocol is up\n",
+    "show interfaces status": "Gi1/0/1    connected    1    a-full    a-1000\n",
+    "show ip arp": (
+        "Protocol  Address          Age (min)  Hardware Addr   Type   Interface\n"
+        "Internet  10.0.0.2         5          0011.2233.4455  ARPA   Vlan10\n"
+    ),
+    "show mac address-table": "  10    0011.2233.4455    DYNAMIC     Gi1/0/1\n",
+}
+
+
+def make_device(device_id=1) -> Device:
+    return Device(id=device_id, hostname=f'sw{device_id}', ip_address='10.0.0.1', vendor='cisco',
+                  username='admin', password='pw', login_port=22, login_method='ssh')
+
+
+class FakeConnection:
+    """按命令返回固定输出的 Netmiko 连接"""
+
+    def __init__(self, outputs=None, fail_on=None):
+        self.outputs = outputs or CISCO_OUTPUTS
+        self.fail_on = fail_on
+        self.commands = []
+
+    def send_command(self, command, read_timeout=None, expect_string=None):
+        self.commands.append(command)
+        if command == self.fail_on:
+            raise OSError("socket closed")
+        return self.outputs.get(command, "")
+
+
+def make_pool(connection):
+    pooled = MagicMock()
+    pooled.connection = connection
+    pool = MagicMock()
+    pool.get_connection = AsyncMock(return_value=pooled)
+    pool.release_connection = AsyncMock()
+    pool.close_connection = AsyncMock()
+    return pool
+
+
+@pytest.fixture
+def service():
+    service = NetmikoService()
+    service.circuit_breaker = CircuitBreaker()
+    return service
+
+
+class TestCommandBundle:
+
+    @pytest.mark.asyncio
+    async def test_bundle_runs_on_one_session(self, service):
+        connection = FakeConnection()
+        pool = make_pool(connection)
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            outputs = await service.execute_command_bundle(
+                make_device(), ["show version", ("show interfaces", "interfaces"), "show version"]
+            )
+
+        assert list(outputs) == ["show version", "show interfaces"]
+        assert outputs["show version"] == CISCO_OUTPUTS["show version"]
+        assert connection.commands == ["show version", "show interfaces"]
+        pool.get_connection.assert_awaited_once()
+        pool.release_connection.assert_awaited_once()
+        pool.close_connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failure_stops_bundle_and_discards_session(self, service):
+        connection = FakeConnection(fail_on="show interfaces")
+        pool = make_pool(connection)
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            outputs = await service.execute_command_bundle(
+                make_device(), ["show version", "show interfaces", "show inventory"]
+            )
+
+        assert outputs["show version"]
+        assert outputs["show interfaces"] is None
+        assert outputs["show inventory"] is None
+        assert connection.commands == ["show version", "show interfaces"]
+        pool.close_connection.assert_awaited_once()
+        pool.release_connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_session(self, service):
+        service.circuit_breaker.failure_threshold = 1
+        service.circuit_breaker.record_failure(1, 'timeout')
+        pool = make_pool(FakeConnection())
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            outputs = await service.execute_command_bundle(make_device(), ["show version"])
+
+        assert outputs == {"show version": None}
+        pool.get_connection.assert_not_called()
+
+
+class TestCollectorsShareSession:
+
+    @pytest.mark.asyncio
+    async def test_single_device_collection_logs_in_once(self, service):
+        connection = FakeConnection()
+        pool = make_pool(connection)
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            detail = await service._collect_single_device(
+                make_device(), ["version", "serial", "interfaces", "mac_table", "arp_table"]
+            )
+
+        assert detail["success"]
+        assert detail["data"]["serial"] == "FOC12345678"
+        assert detail["data"]["arp_table"][0]["mac_address"] == "00:11:22:33:44:55"
+        assert detail["data"]["arp_table"][0]["vlan_id"] == 10
+        pool.get_connection.assert_awaited_once()
+        pool.release_connection.assert_awaited_once()
+        # 版本与序列号共用同一次 show version 输出
+        assert connection.commands.count("show version") == 1
+        assert "show inventory" not in connection.commands
+
+    @pytest.mark.asyncio
+    async def test_arp_mac_tables_share_session(self, service):
+        connection = FakeConnection()
+        pool = make_pool(connection)
+
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            arp_table, mac_table = await service.collect_arp_mac_tables(make_device())
+
+        assert arp_table[0]["ip_address"] == "10.0.0.2"
+        assert mac_table
+        assert connection.commands == ["show ip arp", "show mac address-table"]
+        pool.get_connection.assert_awaited_once()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+配置差异服务测试
+
+测试覆盖:
+1. 小输入时输出与 difflib.unified_diff 完全一致（含上下文行数、无差异、空输入、大量重复行）
+2. patience 分段得到的编辑操作可由旧版本还原出新版本
+3. 按段比对：段顺序调整不算变化，新增 / 修改 / 删除的段分别列出
+4. 缓存：同一对版本第二次命中且不再还原配置全文；旧记录（无哈希）不缓存；LRU 淘汰
+5. 忽略易变行比对
+"""
+import difflib
+import random
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Configuration
+from app.services.config_diff import (
+    ConfigDiffService,
+    diff_opcodes,
+    format_unified_diff,
+    split_sections,
+    unified_lines,
+)
+from app.services.config_hash import compute_config_hash
+
+BASE = [
+    "hostname SW-CORE-01",
+    "!",
+    "interface GigabitEthernet1/0/1",
+    " description uplink",
+    " switchport mode trunk",
+    "!",
+    "interface GigabitEthernet1/0/2",
+    " description server",
+    " switchport access vlan 10",
+    "!",
+    "vlan 10",
+    " name SERVERS",
+    "!",
+    "end",
+]
+
+
+def expected_diff(a, b, n=3):
+    return "\n".join(difflib.unified_diff(a, b, fromfile="a", tofile="b", lineterm="", n=n))
+
+
+def apply_opcodes(a, b, opcodes):
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            result.extend(a[i1:i2])
+        else:
+            result.extend(b[j1:j2])
+    return result
+
+
+class TestUnifiedDiff:
+
+    @pytest.mark.parametrize("b", [
+        BASE,
+        BASE[:3] + [" description core-uplink"] + BASE[4:],
+        BASE[:6] + BASE[10:],
+        BASE + ["interface Vlanif10", " ip address 10.0.0.1 255.255.255.0"],
+        [],
+    ], ids=["same", "modify", "delete", "append", "empty"])
+    @pytest.mark.parametrize("context", [0, 1, 3])
+    def test_matches_difflib(self, b, context):
+        lines, _, _ = unified_lines(BASE, b, context)
+
+        assert format_unified_diff(lines, "a", "b") == expected_diff(BASE, b, context)
+
+    @pytest.mark.parametrize("seed", range(300))
+    def test_matches_difflib_with_repeated_lines(self, seed):
+        rng = random.Random(seed)
+        pool = ["!", " shutdown", " undo shutdown", "#", "interface GE1/0/1", " description x"]
+        a = [rng.choice(pool) for _ in range(rng.randint(0, 30))]
+        b = list(a)
+        for _ in range(rng.randint(1, 5)):
+            k = rng.randint(0, len(b))
+            if b and rng.random() < 0.5:
+                del b[min(k, len(b) - 1)]
+            else:
+                b.insert(k, rng.choice(pool))
+
+        lines, _, _ = unified_lines(a, b, 3)
+
+        assert format_unified_diff(lines, "a", "b") == expected_diff(a, b)
+
+    def test_counts(self):
+        b = BASE[:3] + [" description core-uplink"] + BASE[4:] + ["vlan 20"]
+
+        _, added, removed = unified_lines(BASE, b)
+
+        assert (added, removed) == (2, 1)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_patience_round_trip(self, seed):
+        rng = random.Random(seed)
+        a = [f"line {rng.randint(0, 300)}" for _ in range(2000)]
+        b = list(a)
+        for _ in range(100):
+            k = rng.randrange(len(b))
+            action = rng.random()
+            if action < 0.4:
+                b[k] = f"changed {rng.randint(0, 50)}"
+            elif action < 0.7:
+                b.insert(k, f"new {rng.randint(0, 50)}")
+            else:
+                del b[k]
+
+        opcodes = diff_opcodes(a, b, patience_min_lines=10)
+
+        assert apply_opcodes(a, b, opcodes) == b
+
+
+class TestSections:
+
+    def test_split_sections(self):
+        sections = split_sections(BASE)
+
+        assert list(sections)[:2] == [("hostname SW-CORE-01", 0), ("interface GigabitEthernet1/0/1", 0)]
+        assert sections[("vlan 10", 0)] == ["vlan 10", " name SERVERS"]
+
+    def test_reorder_is_not_a_change(self):
+        reordered = BASE[:2] + BASE[6:10] + BASE[2:6] + BASE[10:]
+
+        result = ConfigDiffService().diff_text("\n".join(BASE), "\n".join(reordered), section_aware=True)
+
+        assert result["sections"] == []
+        assert result["lines"]
+
+    def test_section_status(self):
+        changed = (BASE[:4] + [" switchport mode access"] + BASE[5:10]
+                   + ["interface Vlanif10", " ip address 10.0.0.1 255.255.255.0", "!", "end"])
+
+        sections = ConfigDiffService().diff_text("\n".join(BASE), "\n".join(changed), section_aware=True)["sections"]
+
+        assert [(s["section"], s["status"]) for s in sections] == [
+            ("interface GigabitEthernet1/0/1", "modified"),
+            ("interface Vlanif10", "added"),
+            ("vlan 10", "removed"),
+        ]
+        assert "+ switchport mode access" in sections[0]["diff"]
+        assert (sections[2]["added"], sections[2]["removed"]) == (0, 2)
+
+
+@pytest.fixture
+def db():
+    """内存 SQLite 数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    Configuration.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_config(db, content, with_hash=True):
+    config = Configuration(device_id=1, config_content=content, version="1.0",
+                           config_hash=compute_config_hash(content, "cisco") if with_hash else None)
+    db.add(config)
+    db.commit()
+    return config
+
+
+class TestDiffCache:
+
+    def test_second_diff_hits_cache(self, db):
+        service = ConfigDiffService()
+        config1 = add_config(db, "\n".join(BASE))
+        config2 = add_config(db, "\n".join(BASE[:-1]))
+
+        first = service.diff_configurations(db, config1, config2)
+        with patch("app.services.config_diff.load_config_contents") as load:
+            second = service.diff_configurations(db, config1, config2)
+
+        load.assert_not_called()
+        assert second is first
+        stats = service.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_options_are_part_of_key(self, db):
+        service = ConfigDiffService()
+        config1 = add_config(db, "\n".join(BASE))
+        config2 = add_config(db, "\n".join(BASE[:-1]))
+
+        service.diff_configurations(db, config1, config2, context=3)
+        service.diff_configurations(db, config1, config2, context=1)
+        service.diff_configurations(db, config1, config2, section_aware=True)
+
+        assert service.get_stats()["entries"] == 3
+
+    def test_legacy_rows_not_cached(self, db):
+        service = ConfigDiffService()
+        config1 = add_config(db, "\n".join(BASE), with_hash=False)
+        config2 = add_config(db, "\n".join(BASE[:-1]))
+
+        service.diff_configurations(db, config1, config2)
+
+        assert service.get_stats()["entries"] == 0
+
+    def test_lru_eviction(self, db):
+        service = ConfigDiffService(max_entries=1)
+        configs = [add_config(db, "\n".join(BASE[:n])) for n in (14, 13, 12)]
+
+        service.diff_configurations(db, configs[0], configs[1])
+        service.diff_configurations(db, configs[1], configs[2])
+
+        stats = service.get_stats()
+        assert (stats["entries"], stats["evictions"]) == (1, 1)
+
+    def test_ignore_volatile(self, db):
+        service = ConfigDiffService()
+        old = "! Last configuration change at 10:00:00 CST Mon Jan 5 2026\n" + "\n".join(BASE)
+        new = "! Last configuration change at 11:30:00 CST Mon Jan 5 2026\n" + "\n".join(BASE)
+        config1, config2 = add_config(db, old), add_config(db, new)
+
+        raw = service.diff_configurations(db, config1, config2)
+        normalized = service.diff_configurations(db, config1, config2, vendor="cisco", ignore_volatile=True)
+
+        assert (raw["added"], raw["removed"]) == (1, 1)
+        assert normalized["lines"] == []
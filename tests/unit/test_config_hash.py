@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+配置哈希测试
+
+测试覆盖:
+1. Cisco / 华为易变行（时间戳、ntp clock-period）不影响哈希，真实配置变更会改变哈希
+2. 换行符与行尾空白差异不影响哈希；未知厂商只做通用规范化
+3. collect_device_config 只比较哈希：仅易变行变化时不生成新版本、不提交 Git
+4. 历史记录哈希为空时计算并回填
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Configuration, Device, GitConfig
+from app.services.config_collection_service import collect_device_config
+from app.services.config_hash import compute_config_hash, normalize_config
+
+CISCO_CONFIG = """Building configuration...
+
+Current configuration : 1024 bytes
+!
+! Last configuration change at 10:00:00 CST Mon Jan 5 2026 by admin
+! NVRAM config last updated at 10:01:00 CST Mon Jan 5 2026 by admin
+!
+hostname SW-ACCESS-01
+!
+interface GigabitEthernet1/0/1
+ description TO-AP-01
+!
+ntp clock-period 36028797018963968
+end
+"""
+
+HUAWEI_CONFIG = """!Software Version V200R011C10SPC500
+!Last configuration was updated at 2026-01-05 10:00:00+08:00
+!Last configuration was saved at 2026-01-05 10:05:00+08:00
+#
+sysname SW-CORE-01
+#
+return
+"""
+
+
+class TestConfigHash:
+
+    def test_cisco_volatile_lines_ignored(self):
+        later = (CISCO_CONFIG
+                 .replace("10:00:00 CST Mon Jan 5", "23:59:59 CST Tue Jan 6")
+                 .replace("1024 bytes", "1031 bytes")
+                 .replace("36028797018963968", "36028797018963970"))
+
+        assert compute_config_hash(later, "cisco") == compute_config_hash(CISCO_CONFIG, "cisco")
+        assert "Last configuration change" not in normalize_config(CISCO_CONFIG, "Cisco")
+
+    def test_real_change_detected(self):
+        changed = CISCO_CONFIG.replace("TO-AP-01", "TO-AP-02")
+
+        assert compute_config_hash(changed, "cisco") != compute_config_hash(CISCO_CONFIG, "cisco")
+
+    def test_huawei_volatile_lines_ignored(self):
+        later = HUAWEI_CONFIG.replace("2026-01-05 10:0", "2026-02-01 16:5")
+
+        assert compute_config_hash(later, "华为") == compute_config_hash(HUAWEI_CONFIG, "huawei")
+        # 软件版本变化是真实变化
+        upgraded = HUAWEI_CONFIG.replace("SPC500", "SPC600")
+        assert compute_config_hash(upgraded, "huawei") != compute_config_hash(HUAWEI_CONFIG, "huawei")
+
+    def test_whitespace_and_unknown_vendor(self):
+        crlf = "\r\n".join(line + "  " for line in CISCO_CONFIG.split("\n")) + "\r\n\r\n"
+
+        assert compute_config_hash(crlf, "cisco") == compute_config_hash(CISCO_CONFIG, "cisco")
+        assert normalize_config(CISCO_CONFIG, "juniper").startswith("Building configuration...")
+        assert compute_config_hash(None) == compute_config_hash("")
+
+
+@pytest.fixture
+def db():
+    """内存 SQLite 数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    for model in (Device, Configuration, GitConfig):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Device(id=1, hostname="SW-ACCESS-01", ip_address="10.0.0.1", vendor="cisco", model="C9300",
+                       username="admin", password="pw", login_port=22, login_method="ssh"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def make_netmiko(config):
+    netmiko = MagicMock()
+    netmiko.collect_running_config = AsyncMock(return_value=config)
+    return netmiko
+
+
+class TestCollectDeviceConfigHash:
+
+    @pytest.mark.asyncio
+    async def test_volatile_only_change_is_not_a_new_version(self, db):
+        first = await collect_device_config(1, db, make_netmiko(CISCO_CONFIG), MagicMock())
+        later = CISCO_CONFIG.replace("10:00:00 CST Mon Jan 5", "23:59:59 CST Tue Jan 6")
+
+        with patch("app.services.config_collection_service.get_git_write_behind") as write_behind:
+            second = await collect_device_config(1, db, make_netmiko(later), MagicMock())
+
+        assert first["config_changed"] is True
+        assert second["config_changed"] is False
+        assert second["config_id"] == first["config_id"]
+        assert db.query(Configuration).count() == 1
+        write_behind.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_changed_config_stores_hash(self, db):
+        await collect_device_config(1, db, make_netmiko(CISCO_CONFIG), MagicMock())
+        changed = CISCO_CONFIG.replace("TO-AP-01", "TO-AP-02")
+
+        result = await collect_device_config(1, db, make_netmiko(changed), MagicMock())
+
+        assert result["config_changed"] is True
+        assert result["version"] == "1.1"
+        latest = db.query(Configuration).filter(Configuration.id == result["config_id"]).one()
+        assert latest.config_hash == compute_config_hash(changed, "cisco")
+
+    @pytest.mark.asyncio
+    async def test_legacy_row_hash_backfilled(self, db):
+        db.add(Configuration(device_id=1, config_content=CISCO_CONFIG, version="1.0"))
+        db.commit()
+
+        result = await collect_device_config(1, db, make_netmiko(CISCO_CONFIG), MagicMock())
+
+        assert result["config_changed"] is False
+        legacy = db.query(Configuration).one()
+        assert legacy.config_hash == compute_config_hash(CISCO_CONFIG, "cisco")
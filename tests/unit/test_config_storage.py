@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+配置版本存储测试
+
+测试覆盖:
+1. 行级增量编码 / 还原无损（插入、删除、替换、CRLF、无结尾换行）
+2. 首个版本存关键帧，后续存增量；增量数达到间隔或增量过大时改存新关键帧
+3. compressed / plain 模式
+4. 批量还原与单条还原一致，旧明文记录照常读取
+5. 删除关键帧前依赖它的增量改挂到新关键帧，仍可还原；同批次删除的增量不参与改挂
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models.models import BackupExecutionLog, Configuration
+from app.services.config_storage import (
+    apply_delta,
+    encode_delta,
+    get_config_content,
+    load_config_contents,
+    release_keyframe,
+    store_config_content,
+)
+
+BASE = "".join(f"interface GigabitEthernet1/0/{i}\n description port-{i}\n!\n" for i in range(1, 200))
+
+
+@pytest.fixture
+def db():
+    """内存 SQLite 数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    for model in (Configuration, BackupExecutionLog):
+        model.__table__.create(engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def storage_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CONFIG_STORAGE_MODE", "delta")
+    monkeypatch.setattr(settings, "CONFIG_KEYFRAME_INTERVAL", 3)
+    monkeypatch.setattr(settings, "CONFIG_DELTA_MAX_RATIO", 0.5)
+
+
+def add_version(db, content, device_id=1, mode=None):
+    config = Configuration(device_id=device_id, version="1.0")
+    store_config_content(db, config, content, mode)
+    db.add(config)
+    db.commit()
+    return config
+
+
+class TestDeltaEncoding:
+
+    @pytest.mark.parametrize("content", [
+        BASE.replace("port-10\n", "port-10\n shutdown\n"),
+        BASE.replace(" description port-50\n", ""),
+        BASE.replace("port-1\n", "uplink\n").replace("port-199", "downlink"),
+        "hostname SW\n" + BASE + "end",
+        BASE.replace("\n", "\r\n"),
+        "",
+    ], ids=["insert", "delete", "replace", "prefix-suffix", "crlf", "empty"])
+    def test_round_trip(self, content):
+        assert apply_delta(BASE, encode_delta(BASE, content)) == content
+
+    def test_round_trip_from_empty_base(self):
+        assert apply_delta("", encode_delta("", BASE)) == BASE
+
+
+class TestStorePolicy:
+
+    def test_keyframe_then_deltas(self, db, storage_settings):
+        first = add_version(db, BASE)
+        second = add_version(db, BASE.replace("port-10\n", "port-10\n shutdown\n"))
+
+        assert first.storage_format == "full"
+        assert first.config_content is None
+        assert second.storage_format == "delta"
+        assert second.base_config_id == first.id
+        assert len(second.config_data) < len(first.config_data) / 10
+
+    def test_new_keyframe_after_interval(self, db, storage_settings):
+        first = add_version(db, BASE)
+        versions = [add_version(db, BASE + f"! rev {i}\n") for i in range(4)]
+
+        assert [v.storage_format for v in versions] == ["delta", "delta", "delta", "full"]
+        assert all(v.base_config_id == first.id for v in versions[:3])
+
+    def test_large_change_stores_keyframe(self, db, storage_settings):
+        add_version(db, BASE)
+        rewritten = add_version(db, BASE.replace("description", "alias").replace("port-", "p"))
+
+        assert rewritten.storage_format == "full"
+
+    def test_devices_have_separate_keyframes(self, db, storage_settings):
+        add_version(db, BASE, device_id=1)
+        other = add_version(db, BASE, device_id=2)
+
+        assert other.storage_format == "full"
+
+    def test_compressed_and_plain_modes(self, db, storage_settings):
+        add_version(db, BASE)
+        compressed = add_version(db, BASE + "end\n", mode="compressed")
+        plain = add_version(db, BASE + "end\n", mode="plain")
+
+        assert compressed.storage_format == "full"
+        assert plain.storage_format == "plain"
+        assert plain.config_content == BASE + "end\n"
+        assert plain.config_data is None
+
+
+class TestLoadContents:
+
+    def test_batch_matches_single(self, db, storage_settings):
+        legacy = Configuration(device_id=1, version="0.9", config_content="legacy\n")
+        db.add(legacy)
+        db.commit()
+        contents = [BASE, BASE + "a\n", BASE + "b\n", BASE.upper()]
+        configs = [add_version(db, content) for content in contents]
+
+        loaded = load_config_contents(db, [legacy] + configs)
+
+        assert loaded[legacy.id] == "legacy\n"
+        assert [loaded[c.id] for c in configs] == contents
+        db.expire_all()
+        reloaded = db.query(Configuration).order_by(Configuration.id).all()
+        assert [get_config_content(db, c) for c in reloaded] == ["legacy\n"] + contents
+
+    def test_missing_keyframe_raises(self, db, storage_settings):
+        add_version(db, BASE)
+        delta = add_version(db, BASE + "a\n")
+        delta.base_config_id = 999
+
+        with pytest.raises(ValueError):
+            get_config_content(db, delta)
+
+
+class TestReleaseKeyframe:
+
+    def test_dependents_rebased_on_delete(self, db, storage_settings):
+        contents = [BASE, BASE + "a\n", BASE + "b\n", BASE + "c\n"]
+        keyframe, *deltas = [add_version(db, content) for content in contents]
+
+        release_keyframe(db, keyframe)
+        db.delete(keyframe)
+        db.commit()
+
+        assert deltas[0].storage_format == "full"
+        assert all(d.base_config_id == deltas[0].id for d in deltas[1:])
+        assert [get_config_content(db, d) for d in deltas] == contents[1:]
+
+    def test_delete_chain_of_keyframes(self, db, storage_settings):
+        contents = [BASE, BASE + "a\n", BASE + "b\n"]
+        first, second, third = [add_version(db, content) for content in contents]
+
+        for config in (first, second):
+            release_keyframe(db, config)
+            db.delete(config)
+        db.commit()
+
+        assert third.storage_format == "full"
+        assert get_config_content(db, third) == contents[2]
+
+    def test_delete_delta_and_keyframe_in_one_batch(self, db, storage_settings):
+        contents = [BASE, BASE + "a\n", BASE + "b\n"]
+        keyframe, first_delta, second_delta = [add_version(db, content) for content in contents]
+
+        for config in (first_delta, keyframe):
+            release_keyframe(db, config)
+            db.delete(config)
+        db.commit()
+
+        assert db.query(Configuration).count() == 1
+        assert second_delta.storage_format == "full"
+        assert second_delta.base_config_id is None
+        assert get_config_content(db, second_delta) == contents[2]
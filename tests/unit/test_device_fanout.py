@@ -0,0 +1,228 @@
+"""
+设备并发采集（Fan-out）引擎单元测试
+
+测试覆盖:
+1. 批次并发上限 / 全局并发上限
+2. 按厂商并发上限
+3. 单设备截止时间
+4. 结果按完成顺序流式产出
+5. batch_collect_device_info 并发执行且保持输入顺序
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+
+from app.models.models import Device
+from app.services.device_fanout import (
+    DeviceFanoutEngine,
+    FanoutLimits,
+    parse_concurrency_caps,
+)
+from app.services.netmiko_service import NetmikoService
+
+
+def make_device(device_id: int, vendor: str = "cisco", location: str = None) -> Mock:
+    """创建模拟设备"""
+    device = Mock(spec=Device)
+    device.id = device_id
+    device.hostname = f"switch-{device_id}"
+    device.vendor = vendor
+    device.location = location
+    return device
+
+
+class ConcurrencyProbe:
+    """记录 worker 峰值并发数"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.current = 0
+        self.peak = 0
+        self.peak_by_vendor = {}
+        self.current_by_vendor = {}
+
+    async def __call__(self, device):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        vendor = device.vendor
+        self.current_by_vendor[vendor] = self.current_by_vendor.get(vendor, 0) + 1
+        self.peak_by_vendor[vendor] = max(self.peak_by_vendor.get(vendor, 0), self.current_by_vendor[vendor])
+        try:
+            await asyncio.sleep(self.delay)
+            return device.id
+        finally:
+            self.current -= 1
+            self.current_by_vendor[vendor] -= 1
+
+
+class TestParseConcurrencyCaps:
+    """按键并发上限配置解析测试"""
+
+    def test_parse_valid(self):
+        assert parse_concurrency_caps("Huawei:10, cisco:20") == {"huawei": 10, "cisco": 20}
+
+    def test_parse_ignores_invalid(self):
+        assert parse_concurrency_caps("huawei:x,cisco,ruijie:0,h3c:3") == {"h3c": 3}
+
+    def test_parse_empty(self):
+        assert parse_concurrency_caps("") == {}
+        assert parse_concurrency_caps(None) == {}
+
+
+class TestDeviceFanoutEngine:
+    """Fan-out 引擎测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_concurrency_limit(self):
+        """批次并发不超过上限"""
+        engine = DeviceFanoutEngine(global_concurrency=100)
+        probe = ConcurrencyProbe()
+        devices = [make_device(i) for i in range(12)]
+
+        results = [r async for r in engine.run(devices, probe, FanoutLimits(batch_concurrency=3))]
+
+        assert len(results) == 12
+        assert all(r.success for r in results)
+        assert probe.peak == 3
+
+    @pytest.mark.asyncio
+    async def test_global_concurrency_limit(self):
+        """全局并发上限优先于批次上限"""
+        engine = DeviceFanoutEngine(global_concurrency=2)
+        probe = ConcurrencyProbe()
+        devices = [make_device(i) for i in range(8)]
+
+        results = [r async for r in engine.run(devices, probe, FanoutLimits(batch_concurrency=10))]
+
+        assert len(results) == 8
+        assert probe.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_global_limit_shared_across_batches(self):
+        """全局上限在并发批次之间共享"""
+        engine = DeviceFanoutEngine(global_concurrency=3)
+        probe = ConcurrencyProbe()
+        limits = FanoutLimits(batch_concurrency=3)
+
+        async def consume(devices):
+            return [r async for r in engine.run(devices, probe, limits)]
+
+        first, second = await asyncio.gather(
+            consume([make_device(i) for i in range(6)]),
+            consume([make_device(i) for i in range(6, 12)]),
+        )
+
+        assert len(first) + len(second) == 12
+        assert probe.peak == 3
+
+    @pytest.mark.asyncio
+    async def test_vendor_cap(self):
+        """按厂商并发上限"""
+        engine = DeviceFanoutEngine(global_concurrency=100)
+        probe = ConcurrencyProbe()
+        devices = [make_device(i, "huawei") for i in range(6)] + [make_device(i, "cisco") for i in range(6, 12)]
+        limits = FanoutLimits(batch_concurrency=20, vendor_caps={"huawei": 2})
+
+        results = [r async for r in engine.run(devices, probe, limits)]
+
+        assert len(results) == 12
+        assert probe.peak_by_vendor["huawei"] == 2
+        assert probe.peak_by_vendor["cisco"] == 6
+
+    @pytest.mark.asyncio
+    async def test_site_cap(self):
+        """按站点并发上限"""
+        engine = DeviceFanoutEngine(global_concurrency=100)
+        probe = ConcurrencyProbe()
+        devices = [make_device(i, f"vendor-{i}", location="机房A") for i in range(5)]
+
+        results = [r async for r in engine.run(devices, probe, FanoutLimits(batch_concurrency=20, site_cap=1))]
+
+        assert len(results) == 5
+        assert probe.peak == 1
+
+    @pytest.mark.asyncio
+    async def test_device_timeout(self):
+        """超过截止时间的设备返回超时结果，不影响其他设备"""
+        engine = DeviceFanoutEngine(global_concurrency=10)
+
+        async def worker(device):
+            await asyncio.sleep(5 if device.id == 1 else 0)
+            return device.id
+
+        devices = [make_device(1), make_device(2)]
+        results = [r async for r in engine.run(devices, worker, FanoutLimits(device_timeout=0.05))]
+        by_id = {r.device.id: r for r in results}
+
+        assert by_id[2].success and by_id[2].value == 2
+        assert by_id[1].timed_out
+        assert not by_id[1].success
+
+    @pytest.mark.asyncio
+    async def test_results_streamed_in_completion_order(self):
+        """结果按完成顺序产出"""
+        engine = DeviceFanoutEngine(global_concurrency=10)
+
+        async def worker(device):
+            await asyncio.sleep(0.01 * (4 - device.id))
+            return device.id
+
+        devices = [make_device(i) for i in range(1, 4)]
+        order = [r.value async for r in engine.run(devices, worker, FanoutLimits())]
+
+        assert order == [3, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_worker_exception_captured(self):
+        """worker 异常转为失败结果"""
+        engine = DeviceFanoutEngine(global_concurrency=10)
+
+        async def worker(device):
+            raise RuntimeError("boom")
+
+        results = [r async for r in engine.run([make_device(1)], worker, FanoutLimits())]
+
+        assert results[0].error == "boom"
+
+
+class TestBatchCollectFanout:
+    """NetmikoService.batch_collect_device_info 并发测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_collect_runs_concurrently_and_keeps_order(self):
+        """多设备并发采集，汇总结果保持输入顺序"""
+        service = NetmikoService()
+        devices = [make_device(i) for i in range(1, 6)]
+
+        async def slow_version(device, session=None):
+            await asyncio.sleep(0.1 if device.id == 1 else 0.05)
+            return {"device_id": device.id, "software_version": "15.0"}
+
+        with patch.object(service, 'collect_device_version', side_effect=slow_version):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = await service.batch_collect_device_info(
+                devices, ["version"], FanoutLimits(batch_concurrency=10)
+            )
+            elapsed = loop.time() - start
+
+        assert results["success"] == 5
+        assert [d["device_id"] for d in results["details"]] == [1, 2, 3, 4, 5]
+        # 总耗时接近最慢设备，而非所有设备之和（0.3s）
+        assert elapsed < 0.25
+
+    @pytest.mark.asyncio
+    async def test_batch_collect_device_timeout_reported(self):
+        """单设备超时计为失败"""
+        service = NetmikoService()
+
+        async def hang(device, session=None):
+            await asyncio.sleep(5)
+
+        with patch.object(service, 'collect_device_version', side_effect=hang):
+            results = await service.batch_collect_device_info(
+                [make_device(1)], ["version"], FanoutLimits(device_timeout=0.05)
+            )
+
+        assert results["failed"] == 1
+        assert "超时" in results["details"][0]["error"]
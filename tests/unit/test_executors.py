@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+阻塞调用线程池测试
+
+测试覆盖:
+1. 懒创建，run() 返回结果并透传异常
+2. 线程数受 max_workers 限制，排队数 / 活跃数 / 等待时间统计正确
+3. SSH 与数据库线程池互相隔离：SSH 线程占满时数据库任务不排队
+4. 关闭后可重新创建
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.executors import InstrumentedExecutor, get_db_executor, get_ssh_executor
+
+
+class TestInstrumentedExecutor:
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result_and_propagates_errors(self):
+        executor = InstrumentedExecutor('test', 2)
+        assert not executor.get_stats()['started']
+
+        try:
+            assert await executor.run(lambda a, b=0: a + b, 1, b=2) == 3
+            with pytest.raises(ValueError):
+                await executor.run(lambda: (_ for _ in ()).throw(ValueError('boom')))
+        finally:
+            executor.shutdown(wait=True)
+
+        stats = executor.get_stats()
+        assert stats['submitted'] == 2
+        assert stats['completed'] == 2
+        assert stats['failed'] == 1
+        assert stats['queued'] == 0 and stats['active'] == 0
+
+    @pytest.mark.asyncio
+    async def test_bounded_workers_and_queue_metrics(self):
+        executor = InstrumentedExecutor('test', 2)
+        release = threading.Event()
+
+        def blocking():
+            release.wait(5)
+            return threading.current_thread().name
+
+        try:
+            tasks = [asyncio.create_task(executor.run(blocking)) for _ in range(5)]
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if executor.get_stats()['active'] == 2:
+                    break
+            stats = executor.get_stats()
+            assert stats['active'] == 2
+            assert stats['queued'] == 3
+            await asyncio.sleep(0.05)
+            release.set()
+            names = await asyncio.gather(*tasks)
+        finally:
+            executor.shutdown(wait=True)
+
+        assert all(name.startswith('test') for name in names)
+        stats = executor.get_stats()
+        assert stats['peak_active'] == 2
+        assert stats['peak_queued'] >= 3
+        assert stats['max_wait_ms'] >= 50
+        assert stats['p95_wait_ms'] > 0
+
+    @pytest.mark.asyncio
+    async def test_recreated_after_shutdown(self):
+        executor = InstrumentedExecutor('test', 1)
+        await executor.run(time.sleep, 0)
+        executor.shutdown(wait=True)
+        assert not executor.get_stats()['started']
+
+        assert await executor.run(lambda: 'ok') == 'ok'
+        executor.shutdown(wait=True)
+
+
+class TestIsolation:
+
+    @pytest.mark.asyncio
+    async def test_db_work_not_starved_by_ssh(self):
+        ssh = InstrumentedExecutor('ssh-test', 2)
+        db = InstrumentedExecutor('db-test', 1)
+        release = threading.Event()
+
+        try:
+            ssh_tasks = [asyncio.create_task(ssh.run(release.wait, 5)) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            result = await asyncio.wait_for(db.run(lambda: 'committed'), timeout=1)
+            assert result == 'committed'
+            assert ssh.get_stats()['queued'] == 2
+            release.set()
+            await asyncio.gather(*ssh_tasks)
+        finally:
+            release.set()
+            ssh.shutdown(wait=True)
+            db.shutdown(wait=True)
+
+    def test_global_executors_are_separate(self):
+        assert get_ssh_executor() is not get_db_executor()
+        assert get_ssh_executor().name == 'ssh-io'
+        assert get_db_executor().name == 'db'
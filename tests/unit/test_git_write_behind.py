@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Git 写回阶段测试
+
+测试覆盖:
+1. 批次内多台设备各自提交，批次结束时只推送一次
+2. 批次外的提交在时间窗内合并为一次推送
+3. 推送失败按退避重试；重试耗尽时提交保留，下次推送一并带上
+4. 打开镜像（clone / fetch）期间 flush 与 get_stats 不被阻塞
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from git import Repo
+
+from app.config import settings
+from app.models.models import GitConfig
+from app.services.git_service import GitService
+from app.services.git_write_behind import GitWriteBehind
+
+
+@pytest.fixture
+def git_config(tmp_path, monkeypatch):
+    """本地裸仓库作为远程，镜像目录指向临时目录"""
+    monkeypatch.setattr(settings, "GIT_MIRROR_DIR", str(tmp_path / "mirrors"))
+    bare_path = tmp_path / "remote.git"
+    Repo.init(bare_path, bare=True, initial_branch="main")
+    seed = Repo.clone_from(str(bare_path), tmp_path / "seed")
+    (tmp_path / "seed" / "README").write_text("backup\n")
+    seed.index.add(["README"])
+    seed.index.commit("init")
+    seed.remote("origin").push("HEAD:refs/heads/main")
+    return GitConfig(repo_url=str(bare_path), branch="main", username=None, password=None)
+
+
+def remote_messages(git_config):
+    return [commit.message for commit in Repo(git_config.repo_url).iter_commits("main")]
+
+
+def count_pushes():
+    """统计 push_to_remote 调用次数（仍执行真实推送）"""
+    return patch.object(GitService, "push_to_remote", autospec=True, side_effect=GitService.push_to_remote)
+
+
+class TestGitWriteBehind:
+
+    @pytest.mark.asyncio
+    async def test_batch_pushes_once(self, git_config):
+        stage = GitWriteBehind(push_delay=60, push_retries=0, retry_backoff=0)
+
+        with count_pushes() as push:
+            async with stage.batch():
+                commit_ids = await asyncio.gather(*[
+                    stage.commit(git_config, f"sw{i}", f"hostname sw{i}\n", f"sw{i} v1") for i in range(3)
+                ])
+                assert stage.get_stats()["pending_commits"] == 3
+                push.assert_not_called()
+
+        assert push.call_count == 1
+        assert all(commit_ids)
+        assert sorted(remote_messages(git_config)[:3]) == ["sw0 v1", "sw1 v1", "sw2 v1"]
+        stats = stage.get_stats()
+        assert stats["pending_commits"] == 0
+        assert stats["pushes"] == 1
+        assert stats["last_push_commits"] == 3
+
+    @pytest.mark.asyncio
+    async def test_commits_outside_batch_coalesce_in_window(self, git_config):
+        stage = GitWriteBehind(push_delay=0.2, push_retries=0, retry_backoff=0)
+
+        with count_pushes() as push:
+            await stage.commit(git_config, "sw1", "hostname sw1\n", "sw1 v1")
+            await stage.commit(git_config, "sw2", "hostname sw2\n", "sw2 v1")
+            push.assert_not_called()
+            await stage._flush_task
+
+        assert push.call_count == 1
+        assert remote_messages(git_config)[:2] == ["sw2 v1", "sw1 v1"]
+
+    @pytest.mark.asyncio
+    async def test_push_retry_and_carry_over(self, git_config):
+        stage = GitWriteBehind(push_delay=60, push_retries=1, retry_backoff=0)
+
+        with patch.object(GitService, "push_to_remote", return_value=False):
+            async with stage.batch():
+                await stage.commit(git_config, "sw1", "hostname sw1\n", "sw1 v1")
+
+        stats = stage.get_stats()
+        assert stats["push_retries"] == 1
+        assert stats["push_failures"] == 1
+        assert stats["pending_commits"] == 1
+        assert remote_messages(git_config) == ["init"]
+
+        # 下次推送带上遗留的提交
+        assert await stage.flush()
+        assert remote_messages(git_config) == ["sw1 v1", "init"]
+        assert stage.get_stats()["pending_commits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_and_flush_not_blocked_by_repo_open(self, git_config):
+        stage = GitWriteBehind(push_delay=60, push_retries=0, retry_backoff=0)
+        opening = threading.Event()
+        release = threading.Event()
+        init_repo = GitService.init_repo
+
+        def slow_init_repo(service, config):
+            opening.set()
+            release.wait(5)
+            return init_repo(service, config)
+
+        with patch.object(GitService, "init_repo", autospec=True, side_effect=slow_init_repo):
+            async with stage.batch():
+                commit = asyncio.create_task(stage.commit(git_config, "sw1", "hostname sw1\n", "sw1 v1"))
+                assert await asyncio.to_thread(opening.wait, 5)
+
+                # 镜像仍在打开中：统计与推送立即返回，不等待 clone 完成
+                assert stage.get_stats()["pending_commits"] == 0
+                assert await asyncio.wait_for(stage.flush(), timeout=1)
+
+                release.set()
+                assert await commit
+
+        assert remote_messages(git_config) == ["sw1 v1", "init"]
+        assert stage.get_stats()["pending_commits"] == 0
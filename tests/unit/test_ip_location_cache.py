@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位查询缓存测试
+
+测试覆盖:
+1. LRU 淘汰与 TTL 过期
+2. 失效后旧代数的查询结果不写入
+3. IPLocationService 重复查询不访问数据库，新批次保存后失效
+"""
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.ip_location import IPLocationCurrent
+from app.services.ip_location_cache import IPLocationCache
+from app.services.ip_location_calculator import CalculationResult, IPLocationCalculator
+from app.services.ip_location_service import IPLocationService
+
+
+class TestIPLocationCache:
+
+    def test_lru_eviction(self):
+        cache = IPLocationCache(max_entries=2, ttl_seconds=60)
+        cache.put('a', 1, cache.generation)
+        cache.put('b', 2, cache.generation)
+        cache.get('a')
+        cache.put('c', 3, cache.generation)
+
+        assert cache.get('a') == (True, 1)
+        assert cache.get('b') == (False, None)
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_ttl_expiration(self):
+        cache = IPLocationCache(ttl_seconds=10)
+        with patch('app.services.ip_location_cache.time.monotonic', return_value=100.0):
+            cache.put('a', 1, cache.generation)
+        with patch('app.services.ip_location_cache.time.monotonic', return_value=111.0):
+            assert cache.get('a') == (False, None)
+
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1
+        assert stats['misses'] == 1
+
+    def test_put_after_invalidation_is_dropped(self):
+        """失效前开始的查询，其结果不写入缓存"""
+        cache = IPLocationCache()
+        generation = cache.generation
+        cache.invalidate('batch_2')
+
+        assert cache.put('a', 'stale', generation) is False
+        assert cache.get('a') == (False, None)
+        assert cache.get_stats()['batch_id'] == 'batch_2'
+
+    def test_disabled_cache(self):
+        cache = IPLocationCache(enabled=False)
+        cache.put('a', 1, cache.generation)
+
+        assert cache.get('a') == (False, None)
+        assert cache.get_stats()['entries'] == 0
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    IPLocationCurrent.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def cache():
+    cache = IPLocationCache(max_entries=100, ttl_seconds=60)
+    with patch('app.services.ip_location_service.get_ip_location_cache', return_value=cache), \
+            patch('app.services.ip_location_calculator.get_ip_location_cache', return_value=cache):
+        yield cache
+
+
+def make_result(ip: str, interface: str) -> CalculationResult:
+    return CalculationResult(
+        ip_address=ip, mac_address='AA:AA:AA:AA:AA:01', arp_source_device_id=1, mac_hit_device_id=2,
+        access_interface=interface, vlan_id=10, confidence=Decimal('0.80'), is_uplink=False,
+        is_core_switch=False, match_type='single_match', last_seen=datetime(2026, 1, 1, 8, 0, 0),
+    )
+
+
+class TestServiceReadThrough:
+
+    def test_repeated_lookups_served_from_cache(self, db, cache):
+        calculator = IPLocationCalculator(db)
+        calculator._batch_id = 'batch_1'
+        calculator._save_results([make_result('10.0.0.1', 'GE1/0/1')])
+        service = IPLocationService(db)
+
+        first = service.locate_ip('10.0.0.1')
+        first_list = service.get_ip_list(search='10.0')
+        with patch.object(service, 'db', MagicMock()) as untouched:
+            second = service.locate_ip('10.0.0.1')
+            total, items = service.get_ip_list(search='10.0')
+            untouched.query.assert_not_called()
+
+        assert second is first
+        assert (total, items) == first_list
+        assert total == 1 and items[0]['interface'] == 'GE1/0/1'
+        stats = cache.get_stats()
+        assert stats['hits'] == 2 and stats['misses'] == 2
+
+    def test_new_batch_invalidates(self, db, cache):
+        calculator = IPLocationCalculator(db)
+        calculator._batch_id = 'batch_1'
+        calculator._save_results([make_result('10.0.0.1', 'GE1/0/1')])
+        service = IPLocationService(db)
+        assert service.locate_ip('10.0.0.1')[0]['interface'] == 'GE1/0/1'
+
+        calculator._batch_id = 'batch_2'
+        calculator._save_results([make_result('10.0.0.1', 'GE1/0/9')])
+
+        assert service.locate_ip('10.0.0.1')[0]['interface'] == 'GE1/0/9'
+        assert cache.get_stats()['batch_id'] == 'batch_2'
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位快照候选索引测试
+
+测试覆盖:
+1. MAC 条目按 MAC 分组、按 last_seen 倒序、每个 MAC 截断到上限
+2. 全量加载与按 MAC 分块加载的查询次数与 ARP 条目数无关
+3. 索引查找：未知 MAC / 设备返回空结果
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Device, MACAddress
+from app.services.ip_location_candidate_index import CandidateIndex, load_candidate_index
+
+NOW = datetime(2026, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def engine():
+    """内存 SQLite 数据库"""
+    engine = create_engine("sqlite:///:memory:")
+    for model in (Device, MACAddress):
+        model.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Device(id=1, hostname="core", ip_address="10.0.0.1", vendor="huawei", model="S12700"),
+        Device(id=2, hostname="access", ip_address="10.0.0.2", vendor="huawei", model="S5735"),
+    ])
+    session.add_all(
+        MACAddress(device_id=2, mac_address=f"00:11:22:33:44:{i:02x}", vlan_id=10,
+                   interface=f"GE1/0/{i}", last_seen=NOW)
+        for i in range(0, 50, 2)
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    """记录执行的 SQL 语句"""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+
+class TestLoadCandidateIndex:
+
+    def test_entries_grouped_newest_first_and_truncated(self, db):
+        mac = "aa:bb:cc:dd:ee:ff"
+        db.add_all(
+            MACAddress(device_id=1 + i % 2, mac_address=mac, vlan_id=10,
+                       interface=f"GE1/0/{i}", last_seen=NOW - timedelta(minutes=i))
+            for i in range(12)
+        )
+        db.commit()
+
+        index = load_candidate_index(db, {"core": ["core"]}, max_mac_entries=10)
+
+        entries = index.mac_entries(mac)
+        assert [entry.interface for entry in entries] == [f"GE1/0/{i}" for i in range(10)]
+        assert index.config == {"core": ["core"]}
+        assert set(index.devices) == {1, 2}
+
+    def test_full_load_uses_constant_queries(self, db, statements):
+        index = load_candidate_index(db, {})
+
+        assert len(statements) == 2
+        hits = [f"00:11:22:33:44:{i:02x}" for i in range(50)]
+        matched = [mac for mac in hits if index.mac_entries(mac)]
+        assert len(matched) == 25
+        assert len(statements) == 2
+
+    def test_mac_subset_loaded_in_chunks(self, db, statements):
+        macs = [f"00:11:22:33:44:{i:02x}" for i in range(50)] * 2
+
+        index = load_candidate_index(db, {}, macs, chunk_size=20)
+
+        # 50 个去重 MAC 分 3 块 + 设备 1 次
+        assert len(statements) == 4
+        assert len(index.mac_index) == 25
+
+    def test_unknown_lookups(self):
+        index = CandidateIndex()
+
+        assert index.mac_entries("00:00:00:00:00:00") == []
+        assert index.device(1) is None
+        assert index.device(None) is None
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+IP 定位增量计算测试
+
+测试覆盖:
+1. 首次运行无水位线时执行全量重建并记录水位线
+2. 增量计算只处理 ARP/MAC 变化的 IP，结果与全量重建一致
+3. 无变化时不重算
+4. 强制全量、周期性全量、变化量过大时回退全量
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models.ip_location import IPLocationCurrent, IPLocationHistory, IPLocationSettings
+from app.models.ip_location_current import ARPEntry, MACAddressCurrent
+from app.models.models import Device
+from app.services.ip_location_calculator import IPLocationCalculator, LAST_FULL_REBUILD_KEY, WATERMARK_KEY
+
+BASE = datetime(2026, 3, 1, 8, 0, 0)
+TABLES = [Device, ARPEntry, MACAddressCurrent, IPLocationCurrent, IPLocationHistory, IPLocationSettings]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    for model in TABLES:
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def incremental_settings():
+    with patch.object(settings, 'IP_LOCATION_INCREMENTAL_ENABLED', True), \
+            patch.object(settings, 'IP_LOCATION_FULL_REBUILD_MINUTES', 0), \
+            patch.object(settings, 'IP_LOCATION_INCREMENTAL_MAX_RATIO', 0.5):
+        yield
+
+
+def seed(db, count: int = 20):
+    """每个 IP 一个 MAC，MAC 表在接入交换机上"""
+    db.add_all([
+        Device(id=1, hostname='core-1', ip_address='10.255.0.1', vendor='huawei', model='S12700'),
+        Device(id=2, hostname='access-2', ip_address='10.255.0.2', vendor='huawei', model='S5700'),
+    ])
+    for i in range(count):
+        mac = f'00:11:22:33:44:{i:02X}'
+        db.add(ARPEntry(ip_address=f'192.168.1.{i}', mac_address=mac, arp_device_id=1, vlan_id=10,
+                        last_seen=BASE, collection_batch_id='batch_seed', created_at=BASE, updated_at=BASE))
+        db.add(MACAddressCurrent(mac_address=mac, mac_device_id=2, mac_interface=f'GE1/0/{i}', vlan_id=10,
+                                 is_trunk=False, last_seen=BASE, collection_batch_id='batch_seed',
+                                 created_at=BASE, updated_at=BASE))
+    db.commit()
+
+
+def snapshot(db):
+    columns = ['ip_address', 'mac_address', 'arp_source_device_id', 'mac_hit_device_id', 'access_interface',
+               'vlan_id', 'confidence', 'is_uplink', 'is_core_switch', 'match_type', 'last_seen',
+               'mac_device_hostname', 'arp_device_hostname']
+    rows = db.query(IPLocationCurrent).order_by(IPLocationCurrent.ip_address, IPLocationCurrent.mac_address).all()
+    return [tuple(getattr(row, c) for c in columns) for row in rows]
+
+
+def make_calculator(db) -> IPLocationCalculator:
+    calculator = IPLocationCalculator(db)
+    calculator.INCREMENTAL_OVERLAP_SECONDS = 0
+    return calculator
+
+
+class TestIncrementalCalculation:
+
+    def test_first_run_falls_back_to_full_and_records_watermark(self, db):
+        seed(db)
+
+        stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'full'
+        assert stats['full_rebuild_reason'] == 'no_watermark'
+        assert stats['matched'] == 20
+        watermark = db.query(IPLocationSettings).filter(IPLocationSettings.key == WATERMARK_KEY).one()
+        assert datetime.fromisoformat(watermark.value) == BASE
+
+    def test_incremental_processes_only_changes_and_matches_full(self, db):
+        seed(db)
+        make_calculator(db).calculate_incremental()
+        later = BASE + timedelta(minutes=10)
+
+        # 一个 MAC 迁移到其他接口，新增一个 IP
+        moved = db.query(MACAddressCurrent).filter(MACAddressCurrent.mac_address == '00:11:22:33:44:03').one()
+        moved.mac_interface = 'GE1/0/48'
+        moved.last_seen = later
+        moved.updated_at = later
+        db.add(ARPEntry(ip_address='192.168.1.200', mac_address='00:11:22:33:44:05', arp_device_id=1,
+                        vlan_id=10, last_seen=later, collection_batch_id='batch_new',
+                        created_at=later, updated_at=later))
+        db.commit()
+
+        stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'incremental'
+        assert stats['changed_arp_rows'] == 1
+        assert stats['changed_mac_rows'] == 1
+        # 192.168.1.3（MAC 变化）、192.168.1.200（新增）、192.168.1.5（与新增 IP 共用 MAC）
+        assert stats['affected_ips'] == 3
+        assert stats['matched'] == 3
+        incremental_rows = snapshot(db)
+
+        full = make_calculator(db).calculate_incremental(force_full=True)
+        assert full['mode'] == 'full'
+        assert snapshot(db) == incremental_rows
+        assert any(row[0] == '192.168.1.3' and row[4] == 'GE1/0/48' for row in incremental_rows)
+
+    def test_no_changes_skips_recalculation(self, db):
+        seed(db)
+        make_calculator(db).calculate_incremental()
+
+        stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'incremental'
+        assert stats['affected_ips'] == 0
+        assert stats['matched'] == 0
+
+    def test_periodic_full_rebuild(self, db):
+        seed(db)
+        make_calculator(db).calculate_incremental()
+        db.query(IPLocationSettings).filter(IPLocationSettings.key == LAST_FULL_REBUILD_KEY).update(
+            {'value': (datetime.now() - timedelta(hours=2)).isoformat()}
+        )
+        db.commit()
+
+        with patch.object(settings, 'IP_LOCATION_FULL_REBUILD_MINUTES', 60):
+            stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'full'
+        assert stats['full_rebuild_reason'] == 'periodic'
+
+    def test_high_churn_falls_back_to_full(self, db):
+        seed(db)
+        make_calculator(db).calculate_incremental()
+        later = BASE + timedelta(minutes=10)
+        db.query(MACAddressCurrent).update({'updated_at': later})
+        db.commit()
+
+        stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'full'
+        assert stats['full_rebuild_reason'] == 'churn'
+
+    def test_incremental_disabled(self, db):
+        seed(db)
+        make_calculator(db).calculate_incremental()
+
+        with patch.object(settings, 'IP_LOCATION_INCREMENTAL_ENABLED', False):
+            stats = make_calculator(db).calculate_incremental()
+
+        assert stats['mode'] == 'full'
+        assert stats['full_rebuild_reason'] == 'incremental_disabled'
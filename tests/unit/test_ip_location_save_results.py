@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+IPLocationCalculator._save_results 集合式批量写入测试
+
+测试覆盖:
+1. 已存在的 (ip, mac) 更新，不存在的新增
+2. 重复结果只保留最后一条
+3. 语句数与结果数无关（按块执行，无逐条 SELECT）
+"""
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.ip_location import IPLocationCurrent
+from app.services.ip_location_calculator import CalculationResult, IPLocationCalculator
+
+
+@pytest.fixture
+def db():
+    """内存 SQLite 数据库会话"""
+    engine = create_engine("sqlite:///:memory:")
+    IPLocationCurrent.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def make_result(ip: str, mac: str, interface: str = 'GE1/0/1') -> CalculationResult:
+    return CalculationResult(
+        ip_address=ip,
+        mac_address=mac,
+        arp_source_device_id=1,
+        mac_hit_device_id=2,
+        access_interface=interface,
+        vlan_id=10,
+        confidence=Decimal('0.80'),
+        is_uplink=False,
+        is_core_switch=False,
+        match_type='single_match',
+        last_seen=datetime(2026, 1, 1, 8, 0, 0),
+        arp_device_hostname='core-1',
+        mac_device_hostname='access-2',
+    )
+
+
+def add_existing(db, ip: str, mac: str) -> int:
+    record = IPLocationCurrent(
+        ip_address=ip,
+        mac_address=mac,
+        arp_source_device_id=9,
+        access_interface='old',
+        confidence=Decimal('0.10'),
+        match_type='cross_device',
+        last_seen=datetime(2025, 1, 1),
+        calculated_at=datetime(2025, 1, 1),
+        calculate_batch_id='old_batch',
+        batch_status='active',
+    )
+    db.add(record)
+    db.commit()
+    return record.id
+
+
+class TestSaveResults:
+    """批量保存测试"""
+
+    def test_updates_existing_and_inserts_new(self, db):
+        existing_id = add_existing(db, '10.0.0.1', 'AA:AA:AA:AA:AA:01')
+        calculator = IPLocationCalculator(db)
+        calculator._batch_id = 'batch_new'
+
+        saved = calculator._save_results([
+            make_result('10.0.0.1', 'AA:AA:AA:AA:AA:01', 'GE1/0/5'),
+            make_result('10.0.0.2', 'AA:AA:AA:AA:AA:02'),
+        ])
+
+        records = {r.ip_address: r for r in db.query(IPLocationCurrent).all()}
+        assert saved == 2
+        assert len(records) == 2
+        assert records['10.0.0.1'].id == existing_id
+        assert records['10.0.0.1'].access_interface == 'GE1/0/5'
+        assert records['10.0.0.1'].calculate_batch_id == 'batch_new'
+        assert records['10.0.0.1'].mac_device_hostname == 'access-2'
+        assert records['10.0.0.2'].batch_status == 'active'
+
+    def test_duplicate_results_last_wins(self, db):
+        calculator = IPLocationCalculator(db)
+        calculator._batch_id = 'batch_new'
+
+        saved = calculator._save_results([
+            make_result('10.0.0.1', 'AA:AA:AA:AA:AA:01', 'GE1/0/1'),
+            make_result('10.0.0.1', 'AA:AA:AA:AA:AA:01', 'GE1/0/2'),
+        ])
+
+        assert saved == 1
+        assert db.query(IPLocationCurrent).one().access_interface == 'GE1/0/2'
+
+    def test_statement_count_independent_of_result_count(self, db):
+        """写入按块执行，语句数只与块数有关"""
+        for i in range(5):
+            add_existing(db, f'10.0.0.{i}', 'AA:AA:AA:AA:AA:01')
+        calculator = IPLocationCalculator(db)
+        calculator._batch_id = 'batch_new'
+        calculator.SAVE_CHUNK_SIZE = 10
+        results = [make_result(f'10.0.0.{i}', 'AA:AA:AA:AA:AA:01') for i in range(25)]
+
+        statements = []
+        engine = db.get_bind()
+        listener = lambda conn, cursor, stmt, params, context, executemany: statements.append(stmt)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            assert calculator._save_results(results) == 25
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+        # 1 次键加载 + 3 块（首块含 UPDATE 与 INSERT 各一次）
+        assert len(statements) <= 5
+        assert not any(s.lstrip().upper().startswith('SELECT') and 'LIMIT' in s.upper() for s in statements)
+        assert db.query(IPLocationCurrent).count() == 25
+
+    def test_empty_results(self, db):
+        assert IPLocationCalculator(db)._save_results([]) == 0
@@ -58,9 +58,7 @@ class TestIPLocationSnapshotService:
             mac_query.all.return_value = [mac_same, mac_cross]
 
             device_query = Mock()
-            device_query.filter.return_value = device_query
-            device_query.first.side_effect = [
-                Device(id=1, hostname="sw1", ip_address="10.0.0.11"),
+            device_query.all.return_value = [
                 Device(id=1, hostname="sw1", ip_address="10.0.0.11"),
                 Device(id=2, hostname="sw2", ip_address="10.0.0.12")
             ]
@@ -106,8 +104,7 @@ class TestIPLocationSnapshotService:
             mac_query.all.return_value = []
 
             device_query = Mock()
-            device_query.filter.return_value = device_query
-            device_query.first.return_value = Device(id=1, hostname="sw1", ip_address="10.0.0.11")
+            device_query.all.return_value = [Device(id=1, hostname="sw1", ip_address="10.0.0.11")]
 
             def query_side_effect(model):
                 if model == MACAddress:
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+设备延迟探测测试
+
+测试覆盖:
+1. TCP 建连探测：可达端口返回耗时，关闭端口判定不可达
+2. 并发数受限
+3. 批量回写 Device.latency / last_latency_check
+4. ARP/MAC 采集跳过探测不可达的设备
+"""
+import asyncio
+import socket
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Device
+from app.services.arp_mac_scheduler import ARPMACScheduler
+from app.services.latency_prober import LatencyProber, ProbeTarget
+
+
+def closed_port() -> int:
+    """获取一个当前未监听的本地端口"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestProbe:
+
+    @pytest.mark.asyncio
+    async def test_reachable_and_unreachable(self):
+        server = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        prober = LatencyProber(timeout=1.0)
+        try:
+            results = await prober.probe_targets([
+                ProbeTarget(1, '127.0.0.1', port),
+                ProbeTarget(2, '127.0.0.1', closed_port()),
+            ])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+        assert results[0].reachable and results[0].latency_ms >= 1
+        assert not results[1].reachable and results[1].latency_ms is None
+        assert not prober.is_unreachable(1)
+        assert prober.is_unreachable(2)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self):
+        prober = LatencyProber(concurrency=3)
+        active = 0
+        peak = 0
+
+        async def fake_probe(host, port, timeout):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return True, 0.005, None
+
+        with patch('app.services.latency_prober.probe_tcp', fake_probe):
+            results = await prober.probe_targets([ProbeTarget(i, '10.0.0.1') for i in range(20)])
+
+        assert len(results) == 20
+        assert peak == 3
+
+    def test_expired_result_not_used(self):
+        prober = LatencyProber(max_age_seconds=60)
+        prober._reachability[1] = (False, 0.0)
+
+        with patch('app.services.latency_prober.time.monotonic', return_value=61.0):
+            assert not prober.is_unreachable(1)
+
+    def test_build_targets_uses_ssh_login_port(self):
+        devices = [
+            Device(id=1, ip_address='10.0.0.1', login_method='ssh', login_port=2222),
+            Device(id=2, ip_address='10.0.0.2', login_method='telnet', login_port=23),
+            Device(id=3, ip_address=None),
+        ]
+
+        targets = LatencyProber.build_targets(devices)
+
+        assert [(t.device_id, t.port) for t in targets] == [(1, 2222), (2, 22)]
+
+
+class TestSaveResults:
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_back(self):
+        engine = create_engine("sqlite:///:memory:")
+        Device.__table__.create(engine)
+        db = sessionmaker(bind=engine)()
+        db.add_all([Device(id=i, hostname=f'sw{i}', ip_address=f'10.0.0.{i}', vendor='huawei', model='S5700')
+                    for i in (1, 2)])
+        db.commit()
+        prober = LatencyProber()
+
+        async def fake_probe(host, port, timeout):
+            return (True, 0.012, None) if host == '10.0.0.1' else (False, None, 'timeout')
+
+        with patch('app.services.latency_prober.probe_tcp', fake_probe):
+            results = await prober.probe_targets(prober.build_targets(db.query(Device).all()))
+
+        assert LatencyProber.save_results(db, results) == 2
+        db.expire_all()
+        devices = {d.id: d for d in db.query(Device).all()}
+        assert devices[1].latency == 12
+        assert devices[2].latency is None
+        assert devices[1].last_latency_check is not None and devices[2].last_latency_check is not None
+        db.close()
+        engine.dispose()
+
+
+class TestSweepSkipsUnreachable:
+
+    @pytest.mark.asyncio
+    async def test_unreachable_device_skipped(self):
+        devices = []
+        for device_id in (1, 2):
+            device = MagicMock()
+            device.id = device_id
+            device.hostname = f'switch-{device_id}'
+            device.vendor = 'huawei'
+            device.location = None
+            devices.append(device)
+        db = MagicMock()
+        db.query.return_value.filter.return_value.all.return_value = devices
+
+        netmiko = MagicMock()
+        collected = []
+
+        async def collect(device):
+            collected.append(device.id)
+            return [], []
+
+        netmiko.collect_arp_mac_tables = collect
+        prober = LatencyProber()
+        prober._reachability[2] = (False, float('inf'))
+        scheduler = ARPMACScheduler(concurrency=5, device_timeout=5)
+
+        with patch('app.services.arp_mac_scheduler.get_netmiko_service', return_value=netmiko), \
+                patch('app.services.arp_mac_scheduler.get_latency_prober', return_value=prober), \
+                patch.object(scheduler, '_save_device_tables', MagicMock()):
+            stats = await scheduler.collect_all_devices_async(db)
+
+        assert stats['unreachable'] == 1
+        assert set(collected) == {1}
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+华为/H3C 免分页会话测试
+
+测试覆盖:
+1. 每个会话只下发一次关闭分页命令
+2. 分页已关闭时按提示符读取，读到提示符立即返回，不再调用 send_command_timing
+3. 设备拒绝关闭分页时退回 send_command_timing + 翻页读取
+4. 提示符读取循环遇到残留分页标记时立即翻页
+"""
+import time
+from collections import deque
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.models import Device
+from app.services.netmiko_service import NetmikoService
+from app.services.ssh_transport import TransportTimeoutError
+
+MAC_LINES = [f"0000-0000-{i:04x}   10   -   GE0/0/{i % 48}   dynamic" for i in range(200)]
+
+
+class FakeNetmikoConnection:
+    """按脚本回放的 Netmiko 连接（write_channel / read_channel）"""
+
+    def __init__(self, reject_paging: bool = False, pages: int = 1):
+        self.base_prompt = "SW1"
+        self.reject_paging = reject_paging
+        self.pages = pages
+        self.writes = []
+        self.pending = deque()
+        self.next_page = None
+        self.send_command_timing = MagicMock(return_value="legacy")
+
+    def write_channel(self, data: str):
+        self.writes.append(data)
+        if data == " ":
+            self.pending.append(self.next_page + "<SW1>")
+            return
+        command = data.strip()
+        self.pending.append(command + "\r\n")
+        if command.startswith("screen-length"):
+            if self.reject_paging:
+                self.pending.append("              ^\r\nError: Unrecognized command found at '^' position.\r\n")
+        elif command == "display mac-address":
+            size = len(MAC_LINES) // self.pages
+            chunks = [MAC_LINES[i:i + size] for i in range(0, len(MAC_LINES), size)]
+            self.pending.extend("\r\n".join(chunks[0]) + "\r\n")
+            if len(chunks) > 1:
+                self.pending.append("  ---- More ----")
+                self.next_page = "\x1b[42D" + "\r\n".join(chunks[1]) + "\r\n"
+                return
+        elif command == "display clock":
+            return
+        self.pending.append("<SW1>")
+
+    def read_channel(self) -> str:
+        if not self.pending:
+            return ""
+        # 模拟网络分片：每次最多返回 4KB
+        data = ""
+        while self.pending and len(data) < 4096:
+            data += self.pending.popleft()
+        return data
+
+
+def make_device() -> Device:
+    return Device(id=1, hostname='sw1', ip_address='10.0.0.1', vendor='huawei', username='admin',
+                  password='pw', login_port=22, login_method='ssh')
+
+
+class TestEnsurePagingDisabled:
+
+    @pytest.mark.asyncio
+    async def test_disabled_once_per_session(self):
+        service = NetmikoService()
+        connection = FakeNetmikoConnection()
+
+        assert await service.ensure_paging_disabled(connection, make_device())
+        assert await service.ensure_paging_disabled(connection, make_device())
+
+        assert connection.writes == ["screen-length 0 temporary\n"]
+
+    @pytest.mark.asyncio
+    async def test_rejected_falls_back(self):
+        service = NetmikoService()
+        connection = FakeNetmikoConnection(reject_paging=True)
+
+        assert not await service.ensure_paging_disabled(connection, make_device())
+        assert connection.writes == ["screen-length 0 temporary\n", "screen-length disable\n"]
+
+
+class TestPromptDrivenRead:
+
+    def test_returns_when_prompt_appears(self):
+        service = NetmikoService()
+        connection = FakeNetmikoConnection()
+
+        started = time.monotonic()
+        output = service._read_until_prompt(connection, "display mac-address", 5, "huawei")
+
+        assert output.splitlines() == MAC_LINES
+        assert time.monotonic() - started < 0.5
+
+    def test_residual_pager_answered(self):
+        service = NetmikoService()
+        connection = FakeNetmikoConnection(pages=2)
+
+        output = service._read_until_prompt(connection, "display mac-address", 5, "huawei")
+
+        assert " " in connection.writes
+        assert output.splitlines() == MAC_LINES
+
+    def test_timeout_without_prompt(self):
+        service = NetmikoService()
+
+        with pytest.raises(TransportTimeoutError):
+            service._read_until_prompt(FakeNetmikoConnection(), "display clock", 0.1, "huawei")
+
+
+class TestExecuteCommand:
+
+    async def _execute(self, connection):
+        service = NetmikoService()
+        pooled = MagicMock()
+        pooled.connection = connection
+        pool = MagicMock()
+        pool.get_connection = AsyncMock(return_value=pooled)
+        pool.release_connection = AsyncMock()
+        pool.close_connection = AsyncMock()
+        with patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+            return await service.execute_command(make_device(), 'display mac-address', read_timeout=5)
+
+    @pytest.mark.asyncio
+    async def test_paging_free_path(self):
+        connection = FakeNetmikoConnection()
+
+        output = await self._execute(connection)
+
+        assert output.splitlines() == MAC_LINES
+        connection.send_command_timing.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_legacy_path_when_rejected(self):
+        connection = FakeNetmikoConnection(reject_paging=True)
+
+        with patch.object(NetmikoService, '_send_command_with_pagination',
+                          AsyncMock(return_value='legacy')) as legacy:
+            output = await self._execute(connection)
+
+        assert output == 'legacy'
+        legacy.assert_called_once()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+解析阶段测试
+
+测试覆盖:
+1. 小输出 / 未启用进程池时内联解析
+2. 大输出在子进程中解析，结果与内联一致
+3. 进程池损坏时退回内联解析并在下次重建
+4. 按解析方法统计次数与耗时
+"""
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.parse_stage import ParseStage
+
+MAC_OUTPUT = "".join(f"0011-2233-{i:04x} {i % 100}/-   GE1/0/{i % 48}   dynamic\n" for i in range(2000))
+
+
+class TestParseStage:
+
+    @pytest.mark.asyncio
+    async def test_inline_below_threshold(self):
+        stage = ParseStage(enabled=True, max_workers=1, min_offload_bytes=len(MAC_OUTPUT) * 2)
+
+        rows = await stage.run("parse_mac_table", MAC_OUTPUT, "huawei")
+
+        assert len(rows) == 2000
+        stats = stage.get_stats()
+        assert stats['methods']['parse_mac_table']['inline'] == 1
+        assert stats['process_pool_started'] is False
+
+    @pytest.mark.asyncio
+    async def test_disabled_never_offloads(self):
+        stage = ParseStage(enabled=False, max_workers=1, min_offload_bytes=0)
+
+        await stage.run("parse_mac_table", MAC_OUTPUT, "huawei")
+
+        assert stage.get_stats()['methods']['parse_mac_table']['offloaded'] == 0
+        assert stage._executor is None
+
+    @pytest.mark.asyncio
+    async def test_offload_matches_inline(self):
+        stage = ParseStage(enabled=True, max_workers=1, min_offload_bytes=1024)
+        inline = ParseStage(enabled=False, max_workers=1, min_offload_bytes=0)
+        try:
+            offloaded = await stage.run("parse_mac_table", MAC_OUTPUT, "huawei")
+        finally:
+            stage.shutdown(wait=True)
+
+        assert offloaded == await inline.run("parse_mac_table", MAC_OUTPUT, "huawei")
+        stats = stage.get_stats()['methods']['parse_mac_table']
+        assert stats['offloaded'] == 1
+        assert stats['bytes'] == len(MAC_OUTPUT) + len("huawei")
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_inline(self):
+        stage = ParseStage(enabled=True, max_workers=1, min_offload_bytes=0)
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        stage._executor = broken
+
+        rows = await stage.run("parse_mac_table", MAC_OUTPUT, "huawei")
+
+        assert len(rows) == 2000
+        assert stage._executor is None
+        stats = stage.get_stats()['methods']['parse_mac_table']
+        assert stats['fallbacks'] == 1
+        assert stats['inline'] == 1
+
+    @pytest.mark.asyncio
+    async def test_parse_error_counted(self):
+        stage = ParseStage(enabled=False, max_workers=1, min_offload_bytes=0)
+
+        with patch('app.services.netmiko_service.NetmikoService.parse_mac_table', side_effect=ValueError("bad")):
+            with pytest.raises(ValueError):
+                await stage.run("parse_mac_table", MAC_OUTPUT, "huawei")
+
+        assert stage.get_stats()['methods']['parse_mac_table']['failed'] == 1
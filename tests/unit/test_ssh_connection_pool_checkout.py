@@ -0,0 +1,212 @@
+"""
+SSHConnectionPool 独占借出/归还测试
+
+测试覆盖:
+1. 借出的连接在归还前不会被再次借出
+2. 单设备最大连接数 / 全局最大连接数
+3. FIFO 等待与等待超时
+4. 借出前健康探测，失效连接被替换
+5. 全局名额已满时回收其他设备的空闲连接
+6. 等待中的协程被取消时不泄漏名额
+7. FIFO 按设备生效，已满设备的排队不阻塞其他设备
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.ssh_connection_pool import SSHConnectionPool
+
+
+def make_device(device_id: int) -> MagicMock:
+    """创建模拟设备"""
+    device = MagicMock()
+    device.id = device_id
+    device.hostname = f"switch-{device_id}"
+    return device
+
+
+def make_pool(**kwargs) -> SSHConnectionPool:
+    """创建连接池，connect_to_device 返回健康的模拟会话"""
+    pool = SSHConnectionPool(**kwargs)
+    pool.netmiko_service = MagicMock()
+
+    async def connect(device):
+        session = MagicMock()
+        session.is_alive.return_value = True
+        return session
+
+    pool.netmiko_service.connect_to_device = AsyncMock(side_effect=connect)
+    return pool
+
+
+class TestExclusiveCheckout:
+    """独占借出测试"""
+
+    @pytest.mark.asyncio
+    async def test_borrowed_connection_not_shared(self):
+        """同一设备并发借出得到不同连接"""
+        pool = make_pool(max_connections=2)
+        device = make_device(1)
+
+        first = await pool.get_connection(device)
+        second = await pool.get_connection(device)
+
+        assert first is not None and second is not None
+        assert first is not second
+        assert first.in_use and second.in_use
+        assert pool.netmiko_service.connect_to_device.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_released_connection_reused(self):
+        """归还后的连接被复用"""
+        pool = make_pool(max_connections=2)
+        device = make_device(1)
+
+        first = await pool.get_connection(device)
+        await pool.release_connection(first)
+        again = await pool.get_connection(device)
+
+        assert again is first
+        assert pool.netmiko_service.connect_to_device.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_waiter_receives_released_connection(self):
+        """达到单设备上限时等待，归还后交给等待者"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+
+        held = await pool.get_connection(device)
+        waiter = asyncio.create_task(pool.get_connection(device, timeout=1))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert pool.get_pool_stats()["waiters"] == 1
+
+        await pool.release_connection(held)
+        assert await waiter is held
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout_returns_none(self):
+        """等待超时返回 None"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+
+        await pool.get_connection(device)
+        assert await pool.get_connection(device, timeout=0.05) is None
+        assert pool.get_pool_stats()["waiters"] == 0
+
+    @pytest.mark.asyncio
+    async def test_waiters_served_fifo(self):
+        """等待者按 FIFO 顺序获得连接"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+        order = []
+
+        held = await pool.get_connection(device)
+
+        async def borrow(tag):
+            conn = await pool.get_connection(device, timeout=1)
+            order.append(tag)
+            await pool.release_connection(conn)
+
+        tasks = []
+        for tag in ("a", "b", "c"):
+            tasks.append(asyncio.create_task(borrow(tag)))
+            await asyncio.sleep(0)
+
+        await pool.release_connection(held)
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "b", "c"]
+
+
+class TestPoolLimits:
+    """连接数上限测试"""
+
+    @pytest.mark.asyncio
+    async def test_global_limit(self):
+        """全局上限在所有设备间生效"""
+        pool = make_pool(max_connections=5, max_total_connections=1)
+
+        held = await pool.get_connection(make_device(1))
+        assert held is not None
+        assert await pool.get_connection(make_device(2), timeout=0.05) is None
+
+    @pytest.mark.asyncio
+    async def test_saturated_device_does_not_block_other_devices(self):
+        """一台设备达到上限且有人排队时，其他设备仍可立即借出"""
+        pool = make_pool(max_connections=1, max_total_connections=5)
+        device_a = make_device(1)
+
+        held = await pool.get_connection(device_a)
+        waiter = asyncio.create_task(pool.get_connection(device_a, timeout=1))
+        await asyncio.sleep(0.01)
+        assert pool.get_pool_stats()["waiters"] == 1
+
+        other = await pool.get_connection(make_device(2), timeout=0.05)
+        assert other is not None
+        assert not waiter.done()
+
+        await pool.release_connection(held)
+        assert await waiter is held
+
+    @pytest.mark.asyncio
+    async def test_global_limit_evicts_idle_connection(self):
+        """全局名额已满时回收其他设备的空闲连接"""
+        pool = make_pool(max_connections=5, max_total_connections=1)
+
+        first = await pool.get_connection(make_device(1))
+        await pool.release_connection(first)
+
+        other = await pool.get_connection(make_device(2), timeout=0.05)
+
+        assert other is not None
+        assert not first.is_active
+        assert 1 not in pool.connections
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak(self):
+        """等待中的协程被取消后，名额仍可被后续借出"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+
+        held = await pool.get_connection(device)
+        waiter = asyncio.create_task(pool.get_connection(device, timeout=5))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        await pool.release_connection(held)
+        assert await pool.get_connection(device, timeout=0.05) is held
+
+
+class TestHealthProbe:
+    """借出前健康探测测试"""
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_connection_replaced(self):
+        """失效的空闲连接被关闭并新建连接"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+
+        first = await pool.get_connection(device)
+        await pool.release_connection(first)
+        first.connection.is_alive.return_value = False
+
+        second = await pool.get_connection(device)
+
+        assert second is not first
+        assert not first.is_active
+        assert pool.netmiko_service.connect_to_device.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_connection_context_manager_releases(self):
+        """上下文管理器退出时自动归还"""
+        pool = make_pool(max_connections=1)
+        device = make_device(1)
+
+        async with pool.connection(device) as ssh_conn:
+            assert ssh_conn.in_use
+
+        assert not ssh_conn.in_use
+        assert pool.get_pool_stats()["idle_connections"] == 1
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+SSH 传输层测试（进程内假设备服务代替 SSH 服务端）
+
+测试覆盖:
+1. 会话初始化识别提示符并关闭分页，命令输出去除回显与提示符
+2. 未关闭分页时按分页标记自动翻页，输出不含分页标记与控制字符
+3. 提示符未出现时超时
+4. 配置模式切换提示符
+5. 识别提示符后只认本设备提示符，输出中形似提示符的行不会提前结束读取
+6. NetmikoService 通过注册的驱动建连并执行命令，驱动不支持设备时退回 Netmiko
+"""
+import asyncio
+from typing import List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings
+from app.models.models import Device
+from app.services.netmiko_service import NetmikoService
+from app.services.ssh_transport import (
+    AsyncCLISession,
+    SSHTransport,
+    TransportTimeoutError,
+    get_transport,
+    register_transport,
+)
+
+MAC_LINES = [f"0000-0000-{i:04x}   10   -   GE0/0/{i % 48}   dynamic" for i in range(60)]
+# 含形似提示符的行（其他设备的提示符样式），该行写出后稍作停顿，使其落在一次读取的末尾
+CONFIG_LINES = ["sysname SW1", "#", "<SW2>", "header login information \"[core]\"", "return"]
+PROMPT_LIKE_LINE = "<SW2>"
+
+
+class FakeDevice:
+    """进程内假设备：按行读取命令，模拟华为 / 思科 CLI、分页与配置模式"""
+
+    def __init__(self, vendor: str = "huawei", page_size: int = 20, honor_paging: bool = True,
+                 silent_commands=()):
+        self.vendor = vendor
+        self.page_size = page_size
+        self.honor_paging = honor_paging
+        self.silent_commands = set(silent_commands)
+        self.paging = True
+        self.config_mode = False
+        self.commands: List[str] = []
+        self.server = None
+
+    @property
+    def prompt(self) -> str:
+        if self.vendor == "huawei":
+            return "[SW1]" if self.config_mode else "<SW1>"
+        return "sw1(config)#" if self.config_mode else "sw1#"
+
+    @property
+    def pager(self) -> str:
+        return "  ---- More ----" if self.vendor == "huawei" else " --More-- "
+
+    @property
+    def pager_erase(self) -> str:
+        return "\x1b[42D" + " " * 42 + "\x1b[42D" if self.vendor == "huawei" else "\x08" * 9 + " " * 9 + "\x08" * 9
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def respond(self, command: str) -> List[str]:
+        if command in ("screen-length 0 temporary", "terminal length 0"):
+            if self.honor_paging:
+                self.paging = False
+            return []
+        if command in ("system-view", "configure terminal"):
+            self.config_mode = True
+            return []
+        if command in ("return", "end"):
+            self.config_mode = False
+            return []
+        if command.startswith(("display mac-address", "show mac address-table")):
+            return list(MAC_LINES)
+        if command == "display current-configuration":
+            return list(CONFIG_LINES)
+        if command.startswith("sysname"):
+            return []
+        return [f"Error: Unrecognized command {command}"]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            writer.write(b"Info: The max number of VTY users is 5.\r\n\r\n")
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip()
+                if command:
+                    self.commands.append(command)
+                writer.write(command.encode() + b"\r\n")
+                if command in self.silent_commands:
+                    await writer.drain()
+                    continue
+                lines = self.respond(command) if command else []
+                for index, text in enumerate(lines):
+                    if self.paging and index and index % self.page_size == 0:
+                        writer.write(self.pager.encode())
+                        await writer.drain()
+                        if await reader.readexactly(1) != b" ":
+                            return
+                        writer.write(self.pager_erase.encode())
+                    writer.write(text.encode())
+                    if text == PROMPT_LIKE_LINE:
+                        await writer.drain()
+                        await asyncio.sleep(0.05)
+                    writer.write(b"\r\n")
+                writer.write(self.prompt.encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def open_session(port: int, device_type: str = "huawei") -> AsyncCLISession:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    session = AsyncCLISession(reader, writer, device_type, encoding="utf-8")
+    await session.initialize(timeout=5)
+    return session
+
+
+class TestAsyncCLISession:
+
+    @pytest.mark.asyncio
+    async def test_initialize_disables_paging(self):
+        device = FakeDevice()
+        port = await device.start()
+        try:
+            session = await open_session(port)
+            output = await session.send_command("display mac-address", read_timeout=5)
+            session.disconnect()
+        finally:
+            await device.stop()
+
+        assert session.base_prompt == "<SW1>"
+        assert device.commands[0] == "screen-length 0 temporary"
+        assert output.splitlines() == MAC_LINES
+        assert not session.is_alive()
+
+    @pytest.mark.parametrize("vendor,device_type,command", [
+        ("huawei", "huawei", "display mac-address"),
+        ("cisco", "cisco_ios", "show mac address-table"),
+    ])
+    @pytest.mark.asyncio
+    async def test_pager_fallback(self, vendor, device_type, command):
+        device = FakeDevice(vendor=vendor, honor_paging=False)
+        port = await device.start()
+        try:
+            session = await open_session(port, device_type)
+            output = await session.send_command(command, read_timeout=5)
+            session.disconnect()
+        finally:
+            await device.stop()
+
+        assert output.splitlines() == MAC_LINES
+        assert "More" not in output and "\x1b" not in output and "\x08" not in output
+
+    @pytest.mark.asyncio
+    async def test_timeout_without_prompt(self):
+        device = FakeDevice(silent_commands={"display clock"})
+        port = await device.start()
+        try:
+            session = await open_session(port)
+            with pytest.raises(TransportTimeoutError):
+                await session.send_command("display clock", read_timeout=0.2)
+            session.disconnect()
+        finally:
+            await device.stop()
+
+    @pytest.mark.asyncio
+    async def test_prompt_like_output_line_does_not_end_read(self):
+        device = FakeDevice()
+        port = await device.start()
+        try:
+            session = await open_session(port)
+            output = await session.send_command("display current-configuration", read_timeout=5)
+            session.disconnect()
+        finally:
+            await device.stop()
+
+        assert session.prompt_regex.search("<SW1>")
+        assert not session.prompt_regex.search(PROMPT_LIKE_LINE)
+        assert output.splitlines() == CONFIG_LINES
+
+    @pytest.mark.asyncio
+    async def test_config_set_switches_prompt(self):
+        device = FakeDevice()
+        port = await device.start()
+        try:
+            session = await open_session(port)
+            await session.send_config_set(["sysname SW1"], read_timeout=5)
+            session.disconnect()
+        finally:
+            await device.stop()
+
+        assert device.commands[-3:] == ["system-view", "sysname SW1", "return"]
+        assert not device.config_mode
+
+
+class FakeTransport(SSHTransport):
+    """连接到进程内假设备的驱动"""
+
+    name = "fake"
+
+    def __init__(self, port: int):
+        self.port = port
+
+    def supports(self, device, device_type):
+        return device_type == "huawei"
+
+    async def connect(self, device_params):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        session = AsyncCLISession(reader, writer, device_params["device_type"], encoding="utf-8")
+        await session.initialize(timeout=5)
+        return session
+
+
+class TestNetmikoServiceTransport:
+
+    @pytest.mark.asyncio
+    async def test_execute_command_through_registered_transport(self):
+        device = FakeDevice()
+        port = await device.start()
+        register_transport(FakeTransport(port))
+        pool = MagicMock()
+        pool.get_connection = AsyncMock(return_value=None)
+        target = Device(id=9001, hostname='sw1', ip_address='127.0.0.1', vendor='huawei', username='admin',
+                        password='pw', login_port=port, login_method='ssh')
+        try:
+            with patch.object(settings, 'SSH_TRANSPORT', 'fake'), \
+                    patch('app.services.ssh_connection_pool.get_ssh_connection_pool', return_value=pool):
+                output = await NetmikoService().execute_command(target, 'display mac-address')
+        finally:
+            await device.stop()
+
+        assert output.splitlines() == MAC_LINES
+
+    def test_falls_back_to_netmiko(self):
+        service = NetmikoService()
+        cisco = Device(id=1, hostname='sw1', vendor='cisco', login_method='ssh')
+        huawei_telnet = Device(id=2, hostname='sw2', vendor='huawei', login_method='telnet')
+
+        with patch.object(settings, 'SSH_TRANSPORT', 'asyncssh'), \
+                patch('app.services.ssh_transport.ASYNCSSH_AVAILABLE', False):
+            assert service.select_transport(cisco, 'cisco_ios').name == 'netmiko'
+
+        with patch.object(settings, 'SSH_TRANSPORT', 'asyncssh'), \
+                patch('app.services.ssh_transport.ASYNCSSH_AVAILABLE', True):
+            assert service.select_transport(cisco, 'cisco_ios') is get_transport('asyncssh')
+            assert service.select_transport(huawei_telnet, 'huawei').name == 'netmiko'
+
+        with patch.object(settings, 'SSH_TRANSPORT', 'unknown'):
+            assert service.select_transport(cisco, 'cisco_ios').name == 'netmiko'
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+动态超时引擎测试
+
+测试覆盖:
+1. 无历史样本时使用命令类型基准超时 + RTT 补偿
+2. 快速设备有历史样本后超时下降
+3. 超时样本使下次超时放大，且不超过 NETMIKO_MAX_TIMEOUT
+4. 连接超时按 RTT 计算，动态超时关闭时退回默认值
+5. NetmikoService 按命令反查类型
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.models.models import Device
+from app.services.netmiko_service import NetmikoService
+from app.services.timeout_engine import TimeoutEngine
+
+
+@pytest.fixture(autouse=True)
+def timeout_settings():
+    with patch.object(settings, 'NETMIKO_DYNAMIC_TIMEOUT_ENABLED', True), \
+            patch.object(settings, 'NETMIKO_DEFAULT_TIMEOUT', 20), \
+            patch.object(settings, 'NETMIKO_ARP_TABLE_TIMEOUT', 65), \
+            patch.object(settings, 'NETMIKO_MAC_TABLE_TIMEOUT', 95), \
+            patch.object(settings, 'NETMIKO_MAX_TIMEOUT', 240), \
+            patch.object(settings, 'NETMIKO_NETWORK_DELAY_COMPENSATION', 5):
+        yield
+
+
+def make_device(latency=None, device_id=1) -> Device:
+    return Device(id=device_id, hostname=f'sw{device_id}', ip_address='10.0.0.1', vendor='huawei', latency=latency)
+
+
+class TestReadTimeout:
+
+    def test_base_timeout_without_history(self):
+        engine = TimeoutEngine()
+
+        assert engine.read_timeout(make_device(), 'mac_table') == 95 + 5
+        assert engine.read_timeout(make_device(latency=200), 'arp_table') == pytest.approx(65 + 0.2 + 5)
+        assert engine.read_timeout(make_device(), None) == 20 + 5
+
+    def test_fast_device_gets_shorter_timeout_from_history(self):
+        engine = TimeoutEngine()
+        device = make_device(latency=2)
+        for duration in (3.0, 3.5, 4.0):
+            engine.record(device.id, 'mac_table', duration, 4096)
+
+        timeout = engine.read_timeout(device, 'mac_table')
+
+        assert timeout < 95
+        assert timeout == pytest.approx(4.0 * 2.0 + 0.002 * 2 + 5)
+
+    def test_output_growth_scales_timeout(self):
+        engine = TimeoutEngine()
+        device = make_device()
+        for size in (1000, 1000, 1000, 4000):
+            engine.record(device.id, 'arp_table', 5.0, size)
+
+        assert engine.read_timeout(device, 'arp_table') == pytest.approx(5.0 * 4 * 2.0 + 5)
+
+    def test_timeout_backoff_and_cap(self):
+        engine = TimeoutEngine()
+        device = make_device()
+        engine.record_timeout(device.id, 'mac_table', 100)
+        assert engine.read_timeout(device, 'mac_table') == pytest.approx(100 * 1.5 + 5)
+
+        engine.record_timeout(device.id, 'mac_table', 200)
+        assert engine.read_timeout(device, 'mac_table') == 240
+
+    def test_disabled_returns_base(self):
+        engine = TimeoutEngine()
+        device = make_device(latency=500)
+        engine.record(device.id, 'mac_table', 1.0, 100)
+
+        with patch.object(settings, 'NETMIKO_DYNAMIC_TIMEOUT_ENABLED', False):
+            assert engine.read_timeout(device, 'mac_table') == 95
+            assert engine.connect_timeout(device, 30) == 30
+
+
+class TestConnectTimeout:
+
+    def test_session_timeout_is_largest_read_timeout(self):
+        engine = TimeoutEngine()
+        device = make_device(latency=1)
+
+        assert engine.session_timeout(device) == engine.read_timeout(device, 'mac_table')
+        assert engine.session_timeout(device, ['arp_table']) == engine.read_timeout(device, 'arp_table')
+
+        for _ in range(5):
+            engine.record(device.id, 'mac_table', 2.0, 1000)
+            engine.record(device.id, 'arp_table', 2.0, 1000)
+        assert engine.session_timeout(device) == engine.read_timeout(device, None) == pytest.approx(25.001)
+
+        engine.record_timeout(device.id, 'mac_table', 200)
+        assert engine.session_timeout(device) == 240
+
+    def test_connect_timeout_from_rtt(self):
+        engine = TimeoutEngine()
+
+        assert engine.connect_timeout(make_device(latency=1), 30) == 5.0 + 0.02
+        assert engine.connect_timeout(make_device(latency=1000), 30) == 25.0
+        assert engine.connect_timeout(make_device(latency=None), 30) == 30
+
+
+class TestCommandType:
+
+    @pytest.mark.parametrize('vendor,command,expected', [
+        ('huawei', 'display arp', 'arp_table'),
+        ('cisco', 'show ip arp', 'arp_table'),
+        ('huawei', 'display mac-address', 'mac_table'),
+        ('cisco', 'show running-config', 'running_config'),
+        ('huawei', 'display clock', None),
+    ])
+    def test_get_command_type(self, vendor, command, expected):
+        assert NetmikoService().get_command_type(command, vendor) == expected
+
+    def test_build_device_params_uses_latency(self):
+        service = NetmikoService()
+        # 全局引擎可能残留其他用例记录的样本，使用独立引擎
+        service.timeout_engine = TimeoutEngine()
+        device = Device(id=1, hostname='sw1', ip_address='10.0.0.1', vendor='huawei', username='admin',
+                        password='pw', login_port=22, login_method='ssh', latency=10)
+
+        params = service._build_device_params(device, 'huawei')
+
+        assert params['conn_timeout'] == pytest.approx(5.0 + 0.2)
+        assert params['timeout'] == pytest.approx(95 + 0.01 + 5)